@@ -2,6 +2,7 @@ import os
 import json
 import time
 from datetime import datetime
+from typing import List, Optional
 
 # Try to import Bytez, but make it optional
 try:
@@ -22,22 +23,57 @@ except ImportError:
 GOOGLE_AVAILABLE = False
 genai = None
 
-from fpdf import FPDF
 from supabase import create_client, Client
 from dotenv import load_dotenv
-from fastapi import FastAPI, BackgroundTasks, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Depends, Body, Header
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from apscheduler.schedulers.background import BackgroundScheduler
 from contextlib import asynccontextmanager
 import requests
 from youtube_transcript_api import YouTubeTranscriptApi
 import re
+from backend.rate_limit import provider_slot, note_rejection, fastapi_rate_limit, RateLimitExceeded
+from backend.telemetry import get_telemetry, current_route, metrics_access_denied
+from backend.batching import BatchTask, PromptBatcher
+from backend.ai import AI_OFFLINE, FAKE_LLM_URL
+from backend.intent_router import get_intent_router
+from backend.blocking_pool import BlockingPool, PoolSaturated, PoolTimeout
+from backend.cluster_scheduler import ClusterScheduler
+from backend.tool_plan import PLAN_MAX_STEPS, PlanError, parse_plan, get_plan_executor, format_plan_result
+from backend.session_memory import get_session_memory
+from backend.video_summaries import VideoSummarizer, get_video_store
+from backend.prediction_cache import get_prediction_cache, prediction_input_hash, FRESH, STALE, MISS
+from backend.pyq_parser import pyqs_for_subject, pyq_fingerprint
+from backend.question_stats import (QuestionFrequencyModel, records_from_pyqs, records_from_question_bank,
+                                    polish_paper)
+from backend.model_routing import resolve_route, bytez_completion
+from backend.answer_cache import get_answer_cache
+from backend.structured_output import (StructuredOutputError, parse_structured, repair_json,
+                                       PLANNER_DECISION, PREDICTED_PAPER, GTU_ANSWER)
 
 load_dotenv()
 
+INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "1").lower() not in ("0", "false", "no")
+# Paper prediction: "stats" (question frequency engine, LLM optional) or "llm"
+PREDICTION_ENGINE = os.getenv("PREDICTION_ENGINE", "stats").lower()
+PREDICTION_POLISH = os.getenv("PREDICTION_POLISH", "0").lower() in ("1", "true", "yes")
+PREDICTION_MIN_QUESTIONS = int(os.getenv("PREDICTION_MIN_QUESTIONS", 20))
+
 # ==================== ENHANCED AI AGENT ====================
 
+def validate_flashcards(output):
+    """Batch validator: a non-empty list of question/answer cards"""
+    if not isinstance(output, list):
+        raise ValueError("expected a list of cards")
+    cards = [
+        {"question": str(card['question']).strip(), "answer": str(card['answer']).strip()}
+        for card in output
+        if isinstance(card, dict) and card.get('question') and card.get('answer')
+    ]
+    if not cards:
+        raise ValueError("no valid cards")
+    return cards
+
 class EnhancedGTUAgent:
     """
     Advanced AI Agent with video summarization, flashcards, voice, and more
@@ -47,18 +83,23 @@ class EnhancedGTUAgent:
         # Initialize Bytez if available
         self.sdk = None
         self.llm = None
+        self._bytez_models = {}
         self.gemini_model = None
         self.lightning_client = None
         
         # 0. Try Lightning AI (Primary as per user request)
         lightning_key = lightning_key or os.getenv("LIGHTNING_API_KEY")
+        lightning_url = os.getenv("LIGHTNING_BASE_URL", "https://lightning.ai/api/v1")
+        if AI_OFFLINE:
+            # Offline mode: the fake provider stands in for Lightning, Bytez is skipped
+            lightning_key, lightning_url = "offline", FAKE_LLM_URL
         if lightning_key and OPENAI_AVAILABLE:
             try:
                 self.lightning_client = OpenAI(
                     api_key=lightning_key,
-                    base_url="https://lightning.ai/api/v1"
+                    base_url=lightning_url
                 )
-                print("✓ Lightning AI initialized")
+                print("✓ Lightning AI initialized" + (f" (offline: {lightning_url})" if AI_OFFLINE else ""))
             except Exception as e:
                 print(f"✗ Lightning AI initialization failed: {e}")
 
@@ -67,6 +108,7 @@ class EnhancedGTUAgent:
             try:
                 self.sdk = Bytez(bytez_key)
                 self.llm = self.sdk.model("openai/gpt-4o")
+                self._bytez_models["openai/gpt-4o"] = self.llm
                 print("✓ Bytez AI initialized")
             except Exception as e:
                 print(f"✗ Bytez initialization failed: {e}")
@@ -81,10 +123,15 @@ class EnhancedGTUAgent:
         else:
             self.supabase = None
         
-        # Agent memory and feedback
-        self.conversation_history = []
-        self.feedback_data = []
-        self.max_history = 10
+        # Per-session conversation memory and feedback (bounded, LRU-evicted)
+        self.memory = get_session_memory()
+        
+        # Map-reduce lecture summaries over cached transcripts
+        self.video_summarizer = VideoSummarizer(
+            lambda prompt, system=None: self._complete(prompt, system, task="summary"),
+            store=get_video_store(),
+            fetch_transcript=YouTubeTranscriptApi.get_transcript
+        )
         
         # Enhanced tools
         self.tools = {
@@ -100,12 +147,21 @@ class EnhancedGTUAgent:
             "voice_interaction": self.voice_interaction,  # NEW
         }
     
-    def think(self, user_input):
+    def think(self, user_input, session_id=None):
         """Enhanced reasoning with better prompt engineering"""
         print("\n🧠 Agent is thinking...")
         
+        # Obvious requests (YouTube link, "flashcards for X", "PDF for unit N")
+        # are resolved locally without a planner round trip
+        if INTENT_ROUTER_ENABLED:
+            decision = get_intent_router().route(user_input)
+            get_telemetry().record_cache('intent_router', hit=decision is not None)
+            if decision:
+                print(f"⚡ Routed locally: {decision['action']} ({decision['router']}, confidence: {decision['confidence']:.0%})")
+                return decision
+        
         # Check if LLM is available
-        if not self.llm:
+        if not self._ai_available():
             print("⚠️ LLM not available - returning fallback response")
             return {
                 "action": "answer_question",
@@ -136,30 +192,56 @@ Action: generate_flashcards, parameters: {{"topic": "Operating Systems Unit 2",
 User: "Summarize this lecture: https://youtube.com/watch?v=abc123"
 Action: summarize_video, parameters: {{"video_url": "https://youtube.com/watch?v=abc123"}}
 
+User: "Make flashcards and a PDF for DBMS (3130703) unit 3"
+Steps: generate_flashcards {{"topic": "DBMS Unit 3"}} and generate_pdf {{"subject_code": "3130703", "unit_number": 3}}, independent
+
 User request: "{user_input}"
-Context: {self._get_recent_context()}
+Context: {self._get_recent_context(session_id)}
 
-Respond with ONLY valid JSON:
+For a single tool, respond with ONLY valid JSON:
 {{
   "action": "action_name",
   "parameters": {{"param": "value"}},
   "reasoning": "why this action",
   "confidence": 0.95
-}}"""
+}}
+
+If the request needs several tools (at most {PLAN_MAX_STEPS}), respond instead with:
+{{
+  "steps": [
+    {{"id": "s1", "action": "action_name", "parameters": {{"param": "value"}}, "depends_on": []}},
+    {{"id": "s2", "action": "action_name", "parameters": {{"param": "$s1"}}, "depends_on": ["s1"]}}
+  ],
+  "reasoning": "why these actions",
+  "confidence": 0.95
+}}
+Steps without depends_on run at the same time; "$s1" passes step s1's result to a later step."""
 
         messages = [{"role": "user", "content": prompt}]
-        response = self._run_messages(messages)
+        response = self._run_messages(messages, json_mode=True, task="classify")
         
         if response.error:
             print(f"❌ Error: {response.error}")
             return None
         
         try:
-            decision = self._extract_json(response.output)
+            decision = parse_structured(response.output, PLANNER_DECISION)
             confidence = decision.get('confidence', 0.5)
             
-            print(f"✓ Action: {decision['action']} (confidence: {confidence:.0%})")
-            print(f"  Reasoning: {decision['reasoning']}")
+            if 'steps' in decision:
+                steps = parse_plan(decision, self.tools)
+                if len(steps) == 1:
+                    # A one-step plan is an ordinary single-tool decision
+                    decision = {"action": steps[0].action, "parameters": steps[0].parameters,
+                                "reasoning": decision.get('reasoning', ''), "confidence": confidence}
+                else:
+                    decision['steps'] = [step.to_dict() for step in steps]
+            
+            if 'steps' in decision:
+                print(f"✓ Plan: {', '.join(step['action'] for step in decision['steps'])} (confidence: {confidence:.0%})")
+            else:
+                print(f"✓ Action: {decision['action']} (confidence: {confidence:.0%})")
+            print(f"  Reasoning: {decision.get('reasoning', '')}")
             
             # Log low confidence decisions for improvement
             if confidence < 0.7:
@@ -176,6 +258,9 @@ Respond with ONLY valid JSON:
         if not decision:
             return "I couldn't understand your request. Please rephrase."
         
+        if len(decision.get('steps') or []) > 1:
+            return format_plan_result(self.run_plan(decision))
+        
         action = decision.get('action')
         params = decision.get('parameters', {})
         
@@ -191,45 +276,39 @@ Respond with ONLY valid JSON:
             print(f"❌ Execution error: {e}")
             return f"Error executing {action}: {str(e)}"
     
+    def run_plan(self, decision, on_result=None):
+        """Execute a multi-tool plan; independent steps run concurrently"""
+        try:
+            steps = parse_plan(decision, self.tools)
+        except PlanError as e:
+            print(f"❌ Invalid plan: {e}")
+            return {"status": "failed", "steps": [], "seconds": 0.0, "error": str(e)}
+        
+        print(f"\n🎬 Executing plan: {', '.join(f'{step.id}={step.action}' for step in steps)}")
+        plan = get_plan_executor().run(steps, self.tools, on_result=on_result)
+        print(f"  ✓ Plan {plan['status']} in {plan['seconds']:.1f}s")
+        return plan
+    
     # ==================== NEW TOOL: VIDEO SUMMARIZATION ====================
     
-    def summarize_video(self, video_url):
-        """Summarize YouTube educational videos"""
+    def summarize_video(self, video_url, force=False):
+        """Summarize YouTube educational videos (whole transcript, map-reduce)"""
         print(f"  📹 Summarizing video: {video_url}")
         
         try:
             # Extract video ID
             video_id = self._extract_youtube_id(video_url)
             
-            # Get transcript
-            transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
-            full_transcript = " ".join([item['text'] for item in transcript_list])
-            
-            print(f"  ✓ Transcript retrieved ({len(full_transcript)} chars)")
+            result = self.video_summarizer.summarize(video_id, force=force)
+            get_telemetry().record_cache('video_summary', hit=result['cached'])
+            print(f"  ✓ Transcript {result['transcript_chars']} chars in {result['chunks']} chunks "
+                  f"({result['chunks_reused']} reused, {result['chunks_generated']} generated, "
+                  f"{result['chunks_failed']} failed)")
             
-            # Summarize with LLM
-            prompt = f"""Summarize this GTU lecture video transcript for students.
-
-Transcript: {full_transcript[:3000]}...
-
-Provide:
-1. Main topics covered (bullet points)
-2. Key concepts explained
-3. Important formulas/algorithms mentioned
-4. Study tips based on content
-
-Keep it concise (200-300 words)."""
-
-            messages = [{"role": "user", "content": prompt}]
-            response = self._run_messages(messages)
-            
-            if response.error:
-                return f"Error summarizing: {response.error}"
-            
-            summary = response.output
+            summary = result['summary']
             
             # Store in database
-            if self.supabase:
+            if self.supabase and not result['cached']:
                 self.supabase.table("video_summaries").insert({
                     "video_url": video_url,
                     "video_id": video_id,
@@ -265,7 +344,7 @@ Requirements:
 Generate all {count} cards now."""
 
         messages = [{"role": "user", "content": prompt}]
-        response = self._run_messages(messages)
+        response = self._run_messages(messages, task="flashcards")
         
         if response.error:
             return f"Error: {response.error}"
@@ -292,23 +371,103 @@ Generate all {count} cards now."""
         
         return f"🗂️ Generated {len(flashcards)} flashcards for {topic}\n\n{flashcards_text}"
     
-    def _run_messages(self, messages):
-        """Run with fallback: Lightning -> Bytez -> Gemini"""
+    def generate_flashcards_batch(self, topics, count=10):
+        """
+        Generate flashcards for many topics (e.g. every topic of a unit),
+        packing several topics into each LLM call.
+        Returns {topic: [cards]} plus {topic: error} for topics that failed.
+        """
+        print(f"  🗂️ Generating {count} flashcards each for {len(topics)} topics (batched)...")
+        
+        tasks = [
+            BatchTask(
+                task_id=str(i),
+                kind=f"flashcards:{count}",
+                instruction=f"""Generate {count} high-quality flashcards for GTU exam preparation on: {topic}
+Mix definitions, concepts and application questions; include important formulas/algorithms where relevant.""",
+                output_format='an array of {"question": "...", "answer": "..."} objects',
+                validate=validate_flashcards
+            )
+            for i, topic in enumerate(topics)
+        ]
+        results = PromptBatcher(self._complete).run(tasks)
+        
+        flashcards, errors, rows = {}, {}, []
+        for topic, result in zip(topics, results):
+            if not result.ok:
+                errors[topic] = result.error
+                continue
+            flashcards[topic] = result.output
+            rows.extend({
+                "topic": topic,
+                "question": card['question'],
+                "answer": card['answer'],
+                "created_at": datetime.now().isoformat()
+            } for card in result.output)
+        
+        # One insert for the whole batch
+        if self.supabase and rows:
+            self.supabase.table("flashcards").insert(rows).execute()
+        
+        print(f"  ✓ Generated flashcards for {len(flashcards)}/{len(topics)} topics")
+        return {"flashcards": flashcards, "errors": errors}
+    
+    def _complete(self, prompt, system=None, task=None):
+        """Text completion for PromptBatcher: output text, or None on failure"""
+        messages = [{"role": "system", "content": system}] if system else []
+        messages.append({"role": "user", "content": prompt})
+        response = self._run_messages(messages, task=task)
+        if response.error:
+            return None
+        output = response.output
+        if isinstance(output, dict):
+            output = output.get('content', '')
+        return output
+    
+    def _ai_available(self):
+        """True if any provider (Lightning, Bytez or Gemini) is configured"""
+        return bool(self.lightning_client or self.llm or self.gemini_model)
+    
+    def _run_messages(self, messages, json_mode=False, task=None):
+        """Run with fallback: Lightning -> Bytez -> Gemini
+        
+        json_mode asks providers that support it for a JSON object; callers
+        still parse with backend.structured_output, which repairs the rest.
+        task picks the model tier and max_tokens (backend/model_routing.py).
+        """
+        route = resolve_route(task)
+        
         # 0. Try Lightning AI
         if self.lightning_client:
             try:
-                # We use a default model, but flexible to change
-                response = self.lightning_client.chat.completions.create(
-                    model="gpt-4o", # Lightning AI supports standard aliases
-                    messages=messages
-                )
-                
-                content = response.choices[0].message.content
+                model = route.model('lightning')
+                with provider_slot('lightning', max_wait=2 if self.llm else 10), \
+                        get_telemetry().llm_call('lightning', model, messages, task=route.task, tier=route.tier) as call:
+                    response = self.lightning_client.chat.completions.create(
+                        model=model, # Lightning AI supports standard aliases
+                        messages=messages,
+                        max_tokens=route.max_tokens,
+                        temperature=route.temperature,
+                        **({"response_format": {"type": "json_object"}} if json_mode else {})
+                    )
+                    content = response.choices[0].message.content
+                    usage = getattr(response, 'usage', None)
+                    call.set_output(content, {
+                        "prompt_tokens": getattr(usage, 'prompt_tokens', None),
+                        "completion_tokens": getattr(usage, 'completion_tokens', None)
+                    } if usage else None, getattr(response.choices[0], 'finish_reason', None))
                 
                 class AIResponse:
                     def __init__(self, output): self.output = output; self.error = None
                 return AIResponse(content)
                 
+            except RateLimitExceeded as e:
+                print(f"⚠️ Lightning AI busy: {e}")
+                if not self.llm:
+                    note_rejection(e.retry_after)
+                    class BusyResponse:
+                        def __init__(self, err): self.error = f"AI providers are busy: {err}"; self.output = None
+                    return BusyResponse(e)
             except Exception as e:
                 print(f"⚠️ Lightning AI exception: {e}")
                 # If it's a payment issue (402), we should probably let the user know specifically
@@ -321,8 +480,18 @@ Generate all {count} cards now."""
 
         # 1. Try Bytez
         if self.llm:
+            if self.lightning_client:
+                get_telemetry().record_fallback('lightning', 'bytez')
             try:
-                response = self.llm.run(messages)
+                model = route.model('bytez')
+                with provider_slot('bytez'), \
+                        get_telemetry().llm_call('bytez', model, messages, task=route.task, tier=route.tier) as call:
+                    response = self._bytez_model(model).run(messages, route.bytez_params())
+                    if hasattr(response, 'error') and response.error:
+                        call.set_error()
+                    else:
+                        output = getattr(response, 'output', None)
+                        call.set_output(output, *bytez_completion(response, output, route))
                 
                 # If Bytez has an error, return it directly instead of falling back
                 if hasattr(response, 'error') and response.error:
@@ -330,6 +499,12 @@ Generate all {count} cards now."""
                      return response
                 
                 return response
+            except RateLimitExceeded as e:
+                print(f"⚠️ Bytez busy: {e}")
+                note_rejection(e.retry_after)
+                class BusyResponse:
+                    def __init__(self, err): self.error = f"AI providers are busy: {err}"; self.output = None
+                return BusyResponse(e)
             except Exception as e:
                 print(f"⚠️ Bytez exception: {e}")
                 class ErrorResponse:
@@ -346,10 +521,18 @@ Generate all {count} cards now."""
                 self.output = None
         return NoAIResponse()
 
-    def _run_ai(self, prompt):
+    def _bytez_model(self, name):
+        """Bytez model handle for a routed model name (created once)"""
+        if self.sdk is None:
+            return self.llm
+        if name not in self._bytez_models:
+            self._bytez_models[name] = self.sdk.model(name)
+        return self._bytez_models[name]
+
+    def _run_ai(self, prompt, json_mode=False, task=None):
         """Run AI query using available provider (Bytez or Gemini)"""
         messages = [{"role": "user", "content": prompt}]
-        response = self._run_messages(messages)
+        response = self._run_messages(messages, json_mode=json_mode, task=task)
         
         if response.error:
              return {"error": str(response.error)}
@@ -357,58 +540,156 @@ Generate all {count} cards now."""
 
     # ==================== PREDICT SEMESTER PAPER ====================
     
-    def predict_semester_paper(self, subject_id):
-        """Predict a GTU semester paper by analyzing patterns"""
+    def _prediction_inputs(self, subject_id):
+        """Subject info, previous papers and the input hash a prediction is cached under"""
+        subject_resp = self.supabase.table("subjects").select("*").eq("id", subject_id).execute()
+        subject = subject_resp.data[0] if subject_resp.data else None
+        
+        papers_resp = self.supabase.table("previous_papers") \
+            .select("id, year, exam_type, paper_pdf_url") \
+            .eq("subject_id", subject_id) \
+            .execute()
+        papers = papers_resp.data or []
+        
+        # Question bank fingerprint: new or removed questions change the hash
+        bank_resp = self.supabase.table("questions") \
+            .select("id", count="exact") \
+            .eq("subject_id", subject_id) \
+            .order("id", desc=True) \
+            .limit(1) \
+            .execute()
+        question_bank = {
+            "count": bank_resp.count,
+            "max_id": bank_resp.data[0]["id"] if bank_resp.data else None,
+            "pyqs": pyq_fingerprint(),
+            "engine": PREDICTION_ENGINE
+        }
+        
+        return {
+            "subject_name": subject.get("subject_name", "Unknown") if subject else "Unknown",
+            "subject_code": subject.get("subject_code", "") if subject else "",
+            "papers": papers,
+            "input_hash": prediction_input_hash(papers, question_bank)
+        }
+    
+    def cached_prediction(self, subject_id, inputs=None):
+        """
+        Cached predicted paper with cache metadata, or None on a miss.
+        A stale entry is returned as-is and a background refresh is queued.
+        """
+        if not self.supabase:
+            return None
+        cache = get_prediction_cache()
+        inputs = inputs or self._prediction_inputs(subject_id)
+        entry = cache.get(subject_id, inputs["input_hash"])
+        status = cache.status(entry, inputs["input_hash"])
+        get_telemetry().record_cache('predicted_paper', hit=status == FRESH)
+        if status == MISS:
+            return None
+        
+        refreshing = False
+        if status == STALE:
+            from backend.jobs import get_job_queue
+            job = get_job_queue().submit("predict_paper", {"subject_id": subject_id, "refresh": True}, max_attempts=2)
+            refreshing = True
+            print(f"  ♻️ Serving stale predicted paper, refresh job {job['id']}")
+        
+        paper = dict(entry["paper"])
+        paper["cache"] = cache.describe(entry, status, refreshing)
+        return paper
+    
+    def predict_semester_paper(self, subject_id, refresh=False, force=False):
+        """
+        Predict a GTU semester paper by analyzing patterns (cached per input hash).
+        refresh skips the stale-while-revalidate shortcut; force (a user's
+        explicit refresh) also regenerates an entry that is still fresh.
+        """
         print(f"  🔮 Predicting semester paper for subject ID: {subject_id}...")
         
+        subject_name, subject_code = "Unknown", ""
         try:
             # Get subject info
             if not self.supabase:
                 return {"error": "Database not available"}
             
-            subject_resp = self.supabase.table("subjects").select("*").eq("id", subject_id).execute()
-            subject = subject_resp.data[0] if subject_resp.data else None
-            subject_name = subject.get("subject_name", "Unknown") if subject else "Unknown"
-            subject_code = subject.get("subject_code", "") if subject else ""
+            inputs = self._prediction_inputs(subject_id)
+            subject_name, subject_code = inputs["subject_name"], inputs["subject_code"]
             
-            # Check if AI is available
-            if not self.llm and not self.gemini_model:
+            # The statistical engine needs no AI; the LLM engine does
+            if PREDICTION_ENGINE != "stats" and not self._ai_available():
                 print("⚠️ AI service not available - using database fallback")
                 return self._generate_fallback_paper(subject_name, subject_code)
             
-            # --- CACHE CHECK (NEW) ---
-            try:
-                # Check for existing predicted paper in study_materials
-                cache_resp = self.supabase.table("study_materials") \
-                    .select("*") \
-                    .eq("subject_id", subject_id) \
-                    .eq("material_type", "predicted_paper") \
-                    .limit(1) \
-                    .execute()
-                
-                if cache_resp.data:
-                    print("  ✓ Found cached predicted paper")
-                    cached_paper = cache_resp.data[0]
-                    # Parse the JSON content
-                    import json
-                    try:
-                        paper_data = json.loads(cached_paper['content'])
-                        return paper_data
-                    except json.JSONDecodeError:
-                        print("  ⚠️ Cached paper has invalid JSON content, regenerating...")
-            except Exception as e:
-                print(f"  ⚠️ Cache check failed: {e}")
-            # -------------------------
-
-            # Get previous papers info
-            papers_resp = self.supabase.table("previous_papers").select("*").eq("subject_id", subject_id).execute()
-            papers = papers_resp.data or []
+            # Stale-while-revalidate: serve what we have, refresh in the background
+            if not refresh:
+                cached = self.cached_prediction(subject_id, inputs)
+                if cached:
+                    print(f"  ✓ Found cached predicted paper ({cached['cache']['status']})")
+                    return cached
             
-            papers_info = ""
-            for p in papers:
-                papers_info += f"- {p.get('year')} {p.get('exam_type')}\n"
+            # One generation per (subject, inputs) across all workers
+            cache = get_prediction_cache()
+            entry = cache.single_flight(
+                subject_id, inputs["input_hash"],
+                lambda: self._build_predicted_paper(subject_id, subject_name, subject_code, inputs["papers"]),
+                force=force
+            )
+            if entry is None:
+                print("  ⚠️ Prediction failed - using fallback")
+                return self._generate_fallback_paper(subject_name, subject_code)
             
-            prompt = f"""You are a GTU exam paper predictor. Analyze patterns and generate a predicted exam paper.
+            paper = dict(entry["paper"])
+            paper["cache"] = cache.describe(entry, FRESH)
+            return paper
+            
+        except Exception as e:
+            print(f"Error predicting paper: {e}")
+            # Try fallback as last resort
+            try:
+                return self._generate_fallback_paper(subject_name, subject_code)
+            except:
+                return {"error": str(e)}
+    
+    def _build_predicted_paper(self, subject_id, subject_name, subject_code, papers):
+        """Statistical prediction first (LLM only for polishing), LLM prediction as fallback"""
+        if PREDICTION_ENGINE == "stats":
+            paper = self._statistical_paper(subject_id, subject_name, subject_code)
+            if paper:
+                if PREDICTION_POLISH and self._ai_available():
+                    paper = polish_paper(paper, lambda prompt, system=None: self._complete(prompt, system, task="paper"))
+                return paper
+            print("  ⚠️ Not enough past questions for the statistical engine")
+        if not self._ai_available():
+            return None
+        return self._generate_predicted_paper(subject_name, papers)
+    
+    def _statistical_paper(self, subject_id, subject_name, subject_code):
+        """Rank past questions (local pyqs + question bank) into a predicted paper"""
+        start = time.perf_counter()
+        rows = self.supabase.table("questions").select("*").eq("subject_id", subject_id).execute().data or []
+        pyqs = pyqs_for_subject(subject_code)
+        if pyqs:
+            # Rows ingested from these same papers (backend/pyq_ingest.py) would count twice
+            rows = [r for r in rows if not r.get("content_hash")]
+        records = records_from_question_bank(rows) + records_from_pyqs(pyqs)
+        if len(records) < PREDICTION_MIN_QUESTIONS:
+            return None
+        
+        model = QuestionFrequencyModel().fit(records)
+        paper = model.predict_paper(subject_name, subject_code)
+        if not paper["questions"]:
+            return None
+        print(f"  ✓ Statistical prediction from {len(records)} questions "
+              f"({model.paper_count} papers) in {(time.perf_counter() - start) * 1000:.0f}ms")
+        return paper
+    
+    def _generate_predicted_paper(self, subject_name, papers):
+        """Ask the LLM for a predicted paper; returns the paper dict or None"""
+        papers_info = ""
+        for p in papers:
+            papers_info += f"- {p.get('year')} {p.get('exam_type')}\n"
+        
+        prompt = f"""You are a GTU exam paper predictor. Analyze patterns and generate a predicted exam paper.
 
 Subject: {subject_name}
 Available Previous Papers:
@@ -445,38 +726,18 @@ JSON Structure:
 
 Generate 15-20 question parts covering all units. Mark 5-7 as "High" probability."""
 
-            result = self._run_ai(prompt)
-            
-            if "error" in result:
-                print(f"AI Error: {result['error']} - using fallback")
-                return self._generate_fallback_paper(subject_name, subject_code)
-            
-            paper_json = self._extract_json(result["output"])
-            
-            # --- CACHE SAVE (NEW) ---
-            try:
-                # Store the generated paper in study_materials
-                self.supabase.table("study_materials").insert({
-                    "subject_id": subject_id,
-                    "title": f"Predicted GTU Paper 2025 - {subject_name}",
-                    "content": json.dumps(paper_json), # Store as string
-                    "material_type": "predicted_paper",
-                    "created_at": datetime.now().isoformat()
-                }).execute()
-                print("  ✓ Saved predicted paper to cache (study_materials)")
-            except Exception as e:
-                 print(f"  ⚠️ Failed to save to cache: {e}")
-            # ------------------------
-            
-            return paper_json
-            
-        except Exception as e:
-            print(f"Error predicting paper: {e}")
-            # Try fallback as last resort
-            try:
-                return self._generate_fallback_paper(subject_name, subject_code)
-            except:
-                return {"error": str(e)}
+        result = self._run_ai(prompt, json_mode=True, task="paper")
+        
+        if "error" in result:
+            print(f"AI Error: {result['error']}")
+            return None
+        
+        try:
+            # Truncated or sloppy JSON is repaired locally; a broken question part is dropped
+            return parse_structured(result["output"], PREDICTED_PAPER)
+        except StructuredOutputError as e:
+            print(f"  ⚠️ Could not parse predicted paper: {e}")
+            return None
 
     def _generate_fallback_paper(self, subject_name, subject_code):
         """Generate a paper using important questions from database"""
@@ -553,13 +814,27 @@ Generate 15-20 question parts covering all units. Mark 5-7 as "High" probability
             "note": "⚠️ Generated from Important Questions Database (AI Unavailable)"
         }
     
-    def generate_gtu_answer(self, question, subject_id=None):
-        """Generate a perfect GTU-style answer for a question"""
+    def generate_gtu_answer(self, question, subject_id=None, refresh=False):
+        """Generate a perfect GTU-style answer for a question (cached across rewordings)"""
         print(f"  ✍️ Generating answer for: {question[:50]}...")
         
+        # The same question in other words is served from the answer cache;
+        # refresh regenerates, replacing the cached answer of this exact
+        # (normalized) question only - a fuzzy match may be another question
+        cache, hit = get_answer_cache(), None
+        try:
+            hit = cache.lookup(question, subject_id)
+        except Exception as e:
+            print(f"⚠️ Answer cache lookup failed: {e}")
+        if not refresh:
+            get_telemetry().record_cache('gtu_answer', hit=hit is not None)
+            if hit:
+                print(f"  ✓ Cached answer ({hit['match']}, similarity {hit['similarity']:.2f}): {hit['question'][:50]}")
+                return {**hit['answer'], "cache": cache.describe(hit)}
+        
         try:
             # Check if AI is available
-            if not self.llm and not self.gemini_model:
+            if not self._ai_available():
                 print("⚠️ AI service not available - using fallback answer")
                 return self._generate_fallback_answer(question)
             
@@ -580,13 +855,19 @@ Output as JSON:
   "diagram_suggestion": "Description of diagram to draw (or null if not needed)"
 }}"""
 
-            result = self._run_ai(prompt)
+            result = self._run_ai(prompt, json_mode=True, task="answer")
             
             if "error" in result:
                 print(f"AI Error: {result['error']} - using fallback")
                 return self._generate_fallback_answer(question)
             
-            return self._extract_json(result["output"])
+            # A prose answer without JSON is still used as the answer
+            answer = parse_structured(result["output"], GTU_ANSWER, text_field="answer")
+            try:
+                cache.put(question, answer, subject_id)
+            except Exception as e:
+                print(f"⚠️ Could not cache answer: {e}")
+            return answer
             
         except Exception as e:
             print(f"Error generating answer: {e}")
@@ -625,7 +906,7 @@ Provide a clear, spoken-style answer that's easy to understand when read aloud.
 Keep it concise (2-3 sentences) and natural."""
 
         messages = [{"role": "user", "content": prompt}]
-        response = self._run_messages(messages)
+        response = self._run_messages(messages, task="voice")
         
         if response.error:
             return "Sorry, I couldn't process that."
@@ -634,7 +915,7 @@ Keep it concise (2-3 sentences) and natural."""
     
     # ==================== FEEDBACK LOOP ====================
     
-    def add_feedback(self, user_input, agent_response, rating, comment=""):
+    def add_feedback(self, user_input, agent_response, rating, comment="", session_id=None):
         """Collect user feedback to improve agent"""
         feedback = {
             "user_input": user_input,
@@ -644,7 +925,7 @@ Keep it concise (2-3 sentences) and natural."""
             "timestamp": datetime.now().isoformat()
         }
         
-        self.feedback_data.append(feedback)
+        self.memory.add_feedback(feedback, session_id)
         
         # Store in database
         if self.supabase:
@@ -654,22 +935,20 @@ Keep it concise (2-3 sentences) and natural."""
     
     def analyze_feedback(self):
         """Analyze feedback to identify improvement areas"""
-        if not self.feedback_data:
+        summary = self.memory.feedback_summary()
+        if not summary['count']:
             return "No feedback data yet"
         
-        avg_rating = sum([f['rating'] for f in self.feedback_data]) / len(self.feedback_data)
-        low_rated = [f for f in self.feedback_data if f['rating'] <= 2]
-        
         analysis = f"""Feedback Analysis:
-- Total feedback: {len(self.feedback_data)}
-- Average rating: {avg_rating:.2f}/5
-- Low-rated responses: {len(low_rated)}
+- Total feedback: {summary['count']}
+- Average rating: {summary['avg_rating']:.2f}/5
+- Low-rated responses: {summary['low_rated']}
 
 Improvement areas:
 """
         
-        if low_rated:
-            for feedback in low_rated[:3]:
+        if summary['low_rated_examples']:
+            for feedback in summary['low_rated_examples']:
                 analysis += f"\n- Query: {feedback['user_input'][:50]}..."
                 analysis += f"\n  Issue: {feedback['comment']}\n"
         
@@ -707,49 +986,24 @@ Improvement areas:
     
     def _save_flashcards_pdf(self, topic, flashcards):
         """Save flashcards as PDF"""
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", "B", 16)
-        pdf.cell(0, 10, f"Flashcards: {topic}", 0, 1, "C")
-        pdf.ln(10)
-        
-        for i, card in enumerate(flashcards, 1):
-            pdf.set_font("Arial", "B", 12)
-            pdf.cell(0, 8, f"Card {i}", 0, 1)
-            pdf.set_font("Arial", "", 11)
-            pdf.multi_cell(0, 6, f"Q: {card['question']}")
-            pdf.multi_cell(0, 6, f"A: {card['answer']}")
-            pdf.ln(5)
+        from backend.pdf_render import Document, Section, render_document
+        
+        document = Document(f"Flashcards: {topic}", theme='classic', sections=[
+            Section(f"**Q:** {card['question']}\n\n**A:** {card['answer']}", heading=f"Card {i}", level=3)
+            for i, card in enumerate(flashcards, 1)
+        ])
         
         filename = f"flashcards_{topic.replace(' ', '_')}.pdf"
-        pdf.output(filename)
+        render_document(document, filename)
         print(f"  ✓ Flashcards saved: {filename}")
     
-    def _get_recent_context(self):
-        """Get conversation context"""
-        recent = self.conversation_history[-4:]
-        return "\n".join([f"{msg['role']}: {msg['content'][:80]}..." for msg in recent])
+    def _get_recent_context(self, session_id=None):
+        """Get conversation context for this session"""
+        return self.memory.context(session_id, limit=4)
     
     def _extract_json(self, text):
-        """Extract JSON from response"""
-        # Handle dict response from Bytez
-        if isinstance(text, dict):
-            if 'content' in text:
-                text = text['content']
-            else:
-                # If it's already the JSON dict we want
-                return text
-            
-        start = text.find('{')
-        end = text.rfind('}') + 1
-        
-        if start != -1 and end != 0:
-            return json.loads(text[start:end])
-        raise ValueError("No JSON found")
-        
-        if start != -1 and end != 0:
-            return json.loads(text[start:end])
-        raise ValueError("No JSON found")
+        """Extract JSON from response (repairing it locally, no schema)"""
+        return repair_json(text, root='{')[0]
     
     def _log_uncertain_decision(self, user_input, decision):
         """Log low-confidence decisions for improvement"""
@@ -767,8 +1021,8 @@ Improvement areas:
     def generate_pdf_notes(self, subject_code, unit_number):
         print(f"  📄 Generating PDF notes for {subject_code} Unit {unit_number}...")
         try:
-            # Import here to avoid circular imports if any
-            from backend.pdf_generator import generate_unit_pdf
+            # Queue the generation - it takes 30s+ and must not block the chat request
+            from backend.jobs import get_job_queue
             
             # Convert unit_number to int if it's a string
             try:
@@ -776,12 +1030,13 @@ Improvement areas:
             except:
                 pass
                 
-            result = generate_unit_pdf(subject_code, unit_number)
+            job = get_job_queue().submit("generate_unit_pdf", {
+                "subject_code": subject_code,
+                "unit_number": unit_number
+            })
             
-            if result.get("success"):
-                return f"✅ PDF Generated Successfully!\nTitle: {result['title']}\nLink: {result['pdf_url']}"
-            else:
-                return f"❌ Failed to generate PDF: {result.get('error')}"
+            return (f"⏳ PDF generation started for {subject_code} Unit {unit_number}.\n"
+                    f"Job ID: {job['id']}\nTrack progress: /api/jobs/{job['id']}")
         except Exception as e:
             print(f"Error in generate_pdf_notes: {e}")
             return f"❌ Error: {str(e)}"
@@ -791,11 +1046,11 @@ Improvement areas:
     
     def answer_study_question(self, question):
         """Answer study questions - fallback when main AI is unavailable"""
-        if self.llm:
+        if self._ai_available():
             # Use AI to answer
             try:
                 messages = [{"role": "user", "content": f"Answer this GTU exam question concisely: {question}"}]
-                response = self._run_messages(messages)
+                response = self._run_messages(messages, task="short_answer")
                 if not response.error:
                     return response.output
             except:
@@ -825,42 +1080,45 @@ To enable AI answers, please configure the BYTEZ_API_KEY in your environment."""
 
 # ==================== FASTAPI WITH SCHEDULING ====================
 
-# Background scheduler for cron jobs
-scheduler = BackgroundScheduler()
+# Background scheduler for cron jobs: every worker registers them, only the
+# elected leader runs them (backend/cluster_scheduler.py)
+scheduler = ClusterScheduler("agent")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
     # Startup
-    print("🚀 Starting scheduler...")
-    scheduler.start()
-    
     # Schedule daily syllabus scraping at midnight
-    scheduler.add_job(
-        daily_scrape_task,
-        'cron',
-        hour=0,
-        minute=0,
-        id='daily_scrape'
-    )
+    scheduler.add_job(daily_scrape_task, "daily_scrape", heavy=True, hour=0, minute=0)
     
     # Schedule weekly summary generation every Sunday
-    scheduler.add_job(
-        weekly_summary_task,
-        'cron',
-        day_of_week='sun',
-        hour=20,
-        minute=0,
-        id='weekly_summary'
-    )
+    scheduler.add_job(weekly_summary_task, "weekly_summary", day_of_week="sun", hour=20, minute=0)
+    
+    # Nightly precompute of topic explanations / unit summaries, after the scrape
+    scheduler.add_job(nightly_precompute_task, "nightly_precompute", heavy=True,
+                      hour=int(os.getenv("PRECOMPUTE_HOUR", 2)), minute=30)
+    
+    # Weekly cleanup of superseded / orphaned study guide PDFs
+    scheduler.add_job(pdf_cache_gc_task, "pdf_cache_gc", heavy=True, day_of_week="sun", hour=4, minute=0)
     
-    print("✓ Scheduled jobs registered")
+    print("🚀 Starting scheduler...")
+    scheduler.start()
+    print(f"✓ Scheduled jobs registered ({'leader' if scheduler.is_leader else 'follower'}, pid {os.getpid()})")
+    
+    # This host has its own job queue (PDFs, flashcards, precompute, GC, prediction
+    # refreshes): run it here (JOB_WORKERS_IN_PROCESS=0 when run_worker.py shares the queue)
+    from backend.jobs import start_background_workers
+    start_background_workers()
     
     yield
     
     # Shutdown
     print("🛑 Stopping scheduler...")
     scheduler.shutdown()
+    from backend.jobs import stop_background_workers
+    stop_background_workers()
+    blocking_pool.shutdown()
+    get_plan_executor().shutdown()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -880,6 +1138,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def telemetry_route_label(request, call_next):
+    """Label LLM telemetry with the endpoint that triggered the call"""
+    token = current_route.set(request.url.path)
+    try:
+        return await call_next(request)
+    finally:
+        current_route.reset(token)
+
+# Blocking SDK calls (Supabase, Bytez/OpenAI, YouTube, PDF rendering) run here, not on the event loop
+blocking_pool = BlockingPool()
+
+@app.exception_handler(PoolSaturated)
+async def pool_saturated_handler(request, exc):
+    from fastapi.responses import JSONResponse
+    return JSONResponse(status_code=503, content={"detail": str(exc)},
+                        headers={"Retry-After": str(int(exc.retry_after))})
+
+@app.exception_handler(PoolTimeout)
+async def pool_timeout_handler(request, exc):
+    from fastapi.responses import JSONResponse
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
 # Initialize agent
 agent = EnhancedGTUAgent(
     bytez_key=os.getenv("BYTEZ_API_KEY"),
@@ -906,55 +1187,214 @@ async def health_check():
             "lightning_key_configured": bool(os.getenv("LIGHTNING_API_KEY")),
             "bytez_key_configured": bool(os.getenv("BYTEZ_API_KEY")),
             "google_key_configured": bool(os.getenv("GOOGLE_API_KEY"))
-        }
+        },
+        "worker_pool": blocking_pool.stats(),
+        "plan_executor": get_plan_executor().stats(),
+        "scheduler": scheduler.status()
     }
 
-@app.post("/agent/chat")
-async def chat_with_agent(user_input: str):
-    """Main chat endpoint"""
-    try:
-        # Think
-        decision = agent.think(user_input)
-        
-        # Act
+def require_metrics_access(authorization: Optional[str] = Header(None)):
+    """Metrics expose per-route cost: METRICS_TOKEN bearer auth, or METRICS_PUBLIC=1"""
+    denied = metrics_access_denied(authorization)
+    if denied:
+        raise HTTPException(status_code=denied, detail="Not authorized" if denied == 401 else "Not Found")
+
+@app.get("/metrics", dependencies=[Depends(require_metrics_access)])
+async def metrics():
+    """Prometheus metrics for LLM calls"""
+    from fastapi.responses import PlainTextResponse
+    return PlainTextResponse(get_telemetry().render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/agent/metrics/summary", dependencies=[Depends(require_metrics_access)])
+async def metrics_summary():
+    """Rolling summary of LLM latency, cost and fallbacks"""
+    return get_telemetry().summary()
+
+def _think_and_act(user_input, session_id=None):
+    decision = agent.think(user_input, session_id)
+    plan = None
+    if decision and len(decision.get('steps') or []) > 1:
+        # Several tools: independent steps run concurrently
+        plan = agent.run_plan(decision)
+        result = format_plan_result(plan)
+    else:
         result = agent.act(decision)
+    if session_id:
+        _remember_turn(session_id, user_input, result)
+    return decision, result, plan
+
+def _remember_turn(session_id, user_input, result):
+    agent.memory.add_turn(session_id, "user", user_input)
+    agent.memory.add_turn(session_id, "assistant", result)
+
+def _actions_taken(decision):
+    if not decision:
+        return None
+    if decision.get('steps'):
+        return [step['action'] for step in decision['steps']]
+    return decision.get('action')
+
+@app.post("/agent/chat", dependencies=[Depends(fastapi_rate_limit('ai'))])
+async def chat_with_agent(user_input: str, session_id: Optional[str] = None):
+    """Main chat endpoint (pass session_id to keep conversation context)"""
+    try:
+        # Think + act on the worker pool so parallel chats overlap
+        decision, result, plan = await blocking_pool.run(_think_and_act, user_input, session_id)
         
-        return {
+        response = {
             "success": True,
             "response": result,
-            "action_taken": decision.get('action') if decision else None
+            "action_taken": _actions_taken(decision),
+            "session_id": session_id
         }
+        if plan:
+            response["plan"] = {
+                "status": plan["status"],
+                "seconds": plan["seconds"],
+                "steps": [{k: step[k] for k in ("id", "action", "status", "seconds")} for step in plan["steps"]]
+            }
+        return response
+    except (PoolSaturated, PoolTimeout):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/agent/summarize-video")
-async def summarize_video_endpoint(video_url: str):
-    """Summarize YouTube video"""
-    result = agent.summarize_video(video_url)
+@app.post("/agent/chat/stream", dependencies=[Depends(fastapi_rate_limit('ai'))])
+async def chat_with_agent_stream(user_input: str, session_id: Optional[str] = None):
+    """Chat that streams each tool result as soon as it finishes (NDJSON lines)"""
+    deadline = time.monotonic() + blocking_pool.default_timeout
+    decision = await blocking_pool.run(agent.think, user_input, session_id)
+    
+    def remaining():
+        # Planning and every step share one request timeout, as in /agent/chat
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise PoolTimeout(f"Request timed out after {blocking_pool.default_timeout:.0f}s")
+        return left
+    
+    async def events():
+        # Every blocking call goes through the pool: admission control and the timeout apply here too
+        yield json.dumps({"event": "plan", "action_taken": _actions_taken(decision)}) + "\n"
+        try:
+            if decision and len(decision.get('steps') or []) > 1:
+                try:
+                    steps = parse_plan(decision, agent.tools)
+                except PlanError as e:
+                    yield json.dumps({"event": "done", "status": "failed", "error": str(e)}) + "\n"
+                    return
+                finished = []
+                results = get_plan_executor().iter_results(steps, agent.tools)
+                while True:
+                    entry = await blocking_pool.run(next, results, None, timeout=remaining())
+                    if entry is None:
+                        break
+                    finished.append(entry)
+                    yield json.dumps({"event": "step", **entry}, default=str) + "\n"
+                by_id = {entry["id"]: entry for entry in finished}
+                result = format_plan_result({"steps": [by_id[step.id] for step in steps]})
+                succeeded = sum(e["status"] == "ok" for e in finished)
+                status = "ok" if succeeded == len(finished) else ("partial" if succeeded else "failed")
+            else:
+                result = await blocking_pool.run(agent.act, decision, timeout=remaining())
+                status = "ok"
+                yield json.dumps({"event": "step", "id": "s1", "action": _actions_taken(decision),
+                                  "status": status, "result": result}, default=str) + "\n"
+            if session_id:
+                await blocking_pool.run(_remember_turn, session_id, user_input, result, timeout=remaining())
+        except PoolSaturated as e:
+            yield json.dumps({"event": "error", "status": "rejected", "error": str(e),
+                              "retry_after": e.retry_after}) + "\n"
+            return
+        except PoolTimeout as e:
+            yield json.dumps({"event": "error", "status": "timeout", "error": str(e)}) + "\n"
+            return
+        yield json.dumps({"event": "done", "status": status}) + "\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@app.post("/agent/summarize-video", dependencies=[Depends(fastapi_rate_limit('ai'))])
+async def summarize_video_endpoint(video_url: str, force: bool = False):
+    """Summarize YouTube video (force=true ignores cached transcript and summaries)"""
+    # Long lectures fan out into several chunk calls
+    result = await blocking_pool.run(agent.summarize_video, video_url, force,
+                                     timeout=blocking_pool.default_timeout * 3)
     return {"summary": result}
 
-@app.post("/agent/flashcards")
-async def generate_flashcards_endpoint(topic: str, count: int = 10):
-    """Generate flashcards"""
-    result = agent.generate_flashcards(topic, count)
+@app.post("/agent/flashcards", dependencies=[Depends(fastapi_rate_limit('ai'))])
+async def generate_flashcards_endpoint(topic: str, count: int = 10, background: bool = False):
+    """Generate flashcards (background=true queues a job and returns its id)"""
+    if background:
+        from backend.jobs import get_job_queue
+        job = await blocking_pool.run(get_job_queue().submit, "generate_flashcards", {"topic": topic, "count": count})
+        return {
+            "job_id": job["id"],
+            "status": job["status"],
+            "deduplicated": job["deduplicated"],
+            "status_url": f"/api/jobs/{job['id']}",
+            "result_url": f"/api/jobs/{job['id']}/result"
+        }
+    result = await blocking_pool.run(agent.generate_flashcards, topic, count)
     return {"flashcards": result}
 
+@app.post("/agent/flashcards/batch", dependencies=[Depends(fastapi_rate_limit('ai_heavy'))])
+async def generate_flashcards_batch_endpoint(topics: List[str] = Body(..., embed=True), count: int = 10,
+                                             background: bool = False):
+    """Generate flashcards for many topics at once (several topics per LLM call)"""
+    if background:
+        from backend.jobs import get_job_queue
+        job = await blocking_pool.run(get_job_queue().submit, "generate_flashcards_batch",
+                                      {"topics": topics, "count": count})
+        return {
+            "job_id": job["id"],
+            "status": job["status"],
+            "deduplicated": job["deduplicated"],
+            "status_url": f"/api/jobs/{job['id']}",
+            "result_url": f"/api/jobs/{job['id']}/result"
+        }
+    # Batches make several provider calls; allow them longer than a single chat
+    return await blocking_pool.run(agent.generate_flashcards_batch, topics, count,
+                                   timeout=blocking_pool.default_timeout * 3)
+
+@app.get("/api/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Status and progress of a job queued on this service (same shape as the Flask route)"""
+    from backend.jobs import get_job_queue, public_job
+    job = await blocking_pool.run(get_job_queue().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"success": True, "job": public_job(job)}
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Result of a job queued on this service; 202 while it is still pending or running"""
+    from fastapi.responses import JSONResponse
+    from backend.jobs import get_job_queue, public_job, SUCCEEDED, FAILED
+    job = await blocking_pool.run(get_job_queue().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] == SUCCEEDED:
+        return {"success": True, "job_id": job_id, "result": job["result"]}
+    if job["status"] == FAILED:
+        return JSONResponse(status_code=500, content={"success": False, "job_id": job_id, "error": job["error"]})
+    return JSONResponse(status_code=202, content={"success": True, "job": public_job(job)})
+
 @app.post("/agent/feedback")
 async def submit_feedback(
     user_input: str,
     agent_response: str,
     rating: int,
-    comment: str = ""
+    comment: str = "",
+    session_id: Optional[str] = None
 ):
     """Submit user feedback"""
-    agent.add_feedback(user_input, agent_response, rating, comment)
+    await blocking_pool.run(agent.add_feedback, user_input, agent_response, rating, comment, session_id)
     return {"message": "Feedback recorded"}
 
 @app.get("/agent/analytics")
 async def get_analytics():
     """Get agent performance analytics"""
-    analysis = agent.analyze_feedback()
-    return {"analytics": analysis}
+    analysis = await blocking_pool.run(agent.analyze_feedback)
+    return {"analytics": analysis, "sessions": agent.memory.stats()}
 
 # ==================== SCHEDULED TASKS ====================
 
@@ -969,6 +1409,18 @@ def daily_scrape_task():
     
     print("✓ Daily scrape completed")
 
+def nightly_precompute_task():
+    """Runs nightly - queues regeneration of stale precomputed explanations"""
+    from backend.jobs import get_job_queue
+    job = get_job_queue().submit("precompute_artifacts", {}, max_attempts=1)
+    print(f"🌙 Precompute job queued: {job['id']}")
+
+def pdf_cache_gc_task():
+    """Runs weekly - queues garbage collection of generated PDFs"""
+    from backend.jobs import get_job_queue
+    job = get_job_queue().submit("pdf_cache_gc", {}, max_attempts=1)
+    print(f"🧹 PDF cache GC job queued: {job['id']}")
+
 def weekly_summary_task():
     """Runs every Sunday at 8 PM"""
     print("\n📊 Generating weekly summary...")
@@ -976,8 +1428,9 @@ def weekly_summary_task():
     # Generate summary of user activity, popular topics, etc.
     summary = {
         "week": datetime.now().strftime("%Y-W%U"),
-        "total_queries": len(agent.conversation_history),
-        "avg_rating": sum([f['rating'] for f in agent.feedback_data]) / len(agent.feedback_data) if agent.feedback_data else 0
+        "active_sessions": agent.memory.stats()["sessions"],
+        "avg_rating": agent.memory.feedback_summary()["avg_rating"],
+        "purged_turns": agent.memory.purge_expired()
     }
     
     print(f"✓ Weekly summary: {summary}")
@@ -1,7 +1,12 @@
 import os
+import json
 import logging
 import requests
+from dataclasses import replace
 from dotenv import load_dotenv
+from backend.rate_limit import provider_slot, note_rejection, RateLimitExceeded
+from backend.telemetry import get_telemetry
+from backend.model_routing import resolve_route, bytez_completion
 
 # Try to import bytez (robust import)
 try:
@@ -36,6 +41,22 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+# AI_OFFLINE=1 sends every provider call to the local fake provider
+# (python -m backend.fake_llm_server) instead of Bytez/Groq/Lightning
+AI_OFFLINE = os.environ.get('AI_OFFLINE', '').lower() in ('1', 'true', 'yes')
+FAKE_LLM_URL = os.environ.get('FAKE_LLM_URL', 'http://127.0.0.1:8090/v1')
+GROQ_BASE_URL = FAKE_LLM_URL if AI_OFFLINE else os.environ.get('GROQ_BASE_URL', 'https://api.groq.com/openai/v1')
+
+# Returned by generate_response instead of raising, so callers that store
+# output (precompute, caches) must check is_error_response first
+UNAVAILABLE_RESPONSE = "I'm sorry, the AI service is currently experiencing issues. Please try again in a moment."
+ERROR_RESPONSE_PREFIX = "I encountered an error while processing your request"
+
+
+def is_error_response(text):
+    """True if text is one of generate_response's fallback error messages"""
+    return not text or text == UNAVAILABLE_RESPONSE or text.startswith(ERROR_RESPONSE_PREFIX)
+
 class AIProcessor:
     def __init__(self):
         self.bytez_client = None
@@ -44,7 +65,11 @@ class AIProcessor:
         # Initialize Bytez client if API key is available
         bytez_api_key = os.environ.get('BYTEZ_API_KEY')
         
-        if bytez_api_key and BYTEZ_AVAILABLE:
+        if AI_OFFLINE:
+            # The fake provider speaks the Groq/OpenAI protocol; Bytez is skipped
+            self.groq_api_key = 'offline'
+            logger.info(f"AI offline mode: using fake provider at {FAKE_LLM_URL}")
+        elif bytez_api_key and BYTEZ_AVAILABLE:
             try:
                 self.bytez_client = Bytez(bytez_api_key)
                 logger.info("Bytez client initialized")
@@ -54,39 +79,61 @@ class AIProcessor:
         if self.groq_api_key:
             logger.info("Groq API key found (fallback enabled)")
     
-    def _call_groq(self, messages):
+    def _call_groq(self, messages, route):
         """Call Groq API (super fast, reliable fallback)"""
         try:
-            response = requests.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {self.groq_api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "llama-3.3-70b-versatile",
-                    "messages": messages,
-                    "max_tokens": 1000,
-                    "temperature": 0.7
-                },
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                return data.get("choices", [{}])[0].get("message", {}).get("content", "")
-            else:
-                logger.warning(f"Groq API error: {response.status_code} - {response.text}")
-                return None
-        except Exception as e:
-            logger.error(f"Groq API call failed: {e}")
+            with provider_slot('groq'):
+                return self._post_groq(messages, route)
+        except RateLimitExceeded as e:
+            logger.warning(f"Groq concurrency limit reached: {e}")
+            note_rejection(e.retry_after)
             return None
+
+    def _post_groq(self, messages, route):
+        model = route.model('groq')
+        with get_telemetry().llm_call('groq', model, messages, task=route.task, tier=route.tier) as call:
+            try:
+                response = requests.post(
+                    f"{GROQ_BASE_URL}/chat/completions",
+                    headers={
+                        "Authorization": f"Bearer {self.groq_api_key}",
+                        "Content-Type": "application/json"
+                    },
+                    json={
+                        "model": model,
+                        "messages": messages,
+                        "max_tokens": route.max_tokens,
+                        "temperature": route.temperature
+                    },
+                    timeout=30
+                )
+                
+                if response.status_code == 200:
+                    data = response.json()
+                    choice = data.get("choices", [{}])[0]
+                    content = choice.get("message", {}).get("content", "")
+                    call.set_output(content, data.get("usage"), choice.get("finish_reason"))
+                    return content
+                else:
+                    logger.warning(f"Groq API error: {response.status_code} - {response.text}")
+                    call.set_error()
+                    return None
+            except Exception as e:
+                logger.error(f"Groq API call failed: {e}")
+                call.set_error()
+                return None
     
-    def generate_response(self, prompt, context="", model_type="gemini", image_parts=None):
+    def generate_response(self, prompt, context="", model_type="gemini", image_parts=None, task=None,
+                          max_tokens=None):
         """
         Generate a response using the available AI model.
         Tries Bytez first, then Groq as fallback.
+        task picks the model tier and max_tokens (see backend/model_routing.py);
+        max_tokens overrides the route's budget, e.g. for a batch of several answers.
         """
+        route = resolve_route(task)
+        if max_tokens:
+            route = replace(route, max_tokens=max_tokens)
         messages = []
         if context:
             messages.append({"role": "system", "content": context})
@@ -96,90 +143,125 @@ class AIProcessor:
             # 1. Bytez Generation (Primary)
             if self.bytez_client:
                 try:
-                    response = self.bytez_client.model("openai/gpt-4o").run(messages)
-                    
-                    print(f"DEBUG: Bytez raw response: {response}", flush=True)
-                    
-                    final_response = ""
-                    if hasattr(response, 'output'):
-                        raw_output = response.output
-                        if isinstance(raw_output, dict):
-                            final_response = raw_output.get('content', '')
+                    # Don't queue long for Bytez when Groq can take the request
+                    model = route.model('bytez')
+                    with provider_slot('bytez', max_wait=2 if self.groq_api_key else 10), \
+                            get_telemetry().llm_call('bytez', model, messages, task=route.task, tier=route.tier) as call:
+                        response = self.bytez_client.model(model).run(messages, route.bytez_params())
+                        
+                        logger.debug(f"Bytez raw response: {response}")
+                        
+                        final_response = ""
+                        if hasattr(response, 'output'):
+                            raw_output = response.output
+                            if isinstance(raw_output, dict):
+                                final_response = raw_output.get('content', '')
+                            else:
+                                final_response = raw_output
+                        elif isinstance(response, str):
+                            final_response = response
+                        
+                        # Check for error in response
+                        if hasattr(response, 'error') and response.error:
+                            logger.warning(f"Bytez returned error: {response.error}")
+                            final_response = ""  # Force fallback
+                            call.set_error()
                         else:
-                            final_response = raw_output
-                    elif isinstance(response, str):
-                        final_response = response
-                    
-                    # Check for error in response
-                    if hasattr(response, 'error') and response.error:
-                        print(f"DEBUG: Bytez returned error: {response.error}", flush=True)
-                        final_response = ""  # Force fallback
+                            call.set_output(final_response, *bytez_completion(response, final_response, route))
                     
                     if final_response:
                         return final_response
                     else:
-                        print("DEBUG: Bytez returned empty, trying Groq fallback...", flush=True)
+                        logger.debug("Bytez returned empty, trying Groq fallback...")
                         
+                except RateLimitExceeded as e:
+                    logger.warning(f"Bytez concurrency limit reached: {e}")
+                    if not self.groq_api_key:
+                        note_rejection(e.retry_after)
                 except Exception as e:
                     logger.error(f"Bytez generation failed: {e}")
             
             # 2. Groq Fallback (if Bytez failed or returned empty)
             if self.groq_api_key:
-                print("DEBUG: Trying Groq API fallback...", flush=True)
-                groq_response = self._call_groq(messages)
+                if self.bytez_client:
+                    get_telemetry().record_fallback('bytez', 'groq')
+                groq_response = self._call_groq(messages, route)
                 if groq_response:
-                    print(f"DEBUG: Groq success: {groq_response[:100]}...", flush=True)
+                    logger.debug(f"Groq success: {groq_response[:100]}...")
                     return groq_response
 
             # 3. Mock Response (last resort)
             logger.warning("All AI providers failed. Returning error message.")
-            return "I'm sorry, the AI service is currently experiencing issues. Please try again in a moment."
+            return UNAVAILABLE_RESPONSE
             
         except Exception as e:
             logger.error(f"Error generating AI response: {str(e)}", exc_info=True)
-            return f"I encountered an error while processing your request: {str(e)}. Please try again later."
+            return f"{ERROR_RESPONSE_PREFIX}: {str(e)}. Please try again later."
 
-    def stream_response(self, prompt, context=""):
+    def stream_response(self, prompt, context="", task="chat"):
         """
         Stream response using Groq (OpenAI-compatible) for Vercel AI SDK.
         """
+        route = resolve_route(task)
         messages = []
         if context:
             messages.append({"role": "system", "content": context})
         messages.append({"role": "user", "content": prompt})
 
         try:
-            # Using Groq for streaming as it's reliable and supports OpenAI-style streaming
-            response = requests.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {self.groq_api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "llama-3.3-70b-versatile",
-                    "messages": messages,
-                    "max_tokens": 1000,
-                    "temperature": 0.7,
-                    "stream": True # Enable streaming
-                },
-                stream=True,
-                timeout=30
-            )
-
-            if response.status_code == 200:
-                for line in response.iter_lines():
-                    if line:
-                        decoded_line = line.decode('utf-8')
-                        if decoded_line.startswith('data: '):
-                            data = decoded_line[6:]
-                            if data == '[DONE]':
-                                break
-                            yield f"data: {data}\n\n"
-            else:
-                yield f"data: {{\"error\": \"Groq API error: {response.status_code}\"}}\n\n"
-        except Exception as e:
-            yield f"data: {{\"error\": \"{str(e)}\"}}\n\n"
+            with provider_slot('groq'):
+                yield from self._stream_groq(messages, route)
+        except RateLimitExceeded as e:
+            yield f"data: {{\"error\": \"AI providers are busy, retry in {int(e.retry_after) + 1}s\"}}\n\n"
+
+    def _stream_groq(self, messages, route):
+        model = route.model('groq')
+        with get_telemetry().llm_call('groq', model, messages, task=route.task, tier=route.tier) as call:
+            streamed = []
+            try:
+                # Using Groq for streaming as it's reliable and supports OpenAI-style streaming
+                response = requests.post(
+                    f"{GROQ_BASE_URL}/chat/completions",
+                    headers={
+                        "Authorization": f"Bearer {self.groq_api_key}",
+                        "Content-Type": "application/json"
+                    },
+                    json={
+                        "model": model,
+                        "messages": messages,
+                        "max_tokens": route.max_tokens,
+                        "temperature": route.temperature,
+                        "stream": True # Enable streaming
+                    },
+                    stream=True,
+                    timeout=30
+                )
+
+                if response.status_code == 200:
+                    for line in response.iter_lines():
+                        if line:
+                            decoded_line = line.decode('utf-8')
+                            if decoded_line.startswith('data: '):
+                                data = decoded_line[6:]
+                                if data == '[DONE]':
+                                    break
+                                streamed.append(_delta_content(data))
+                                yield f"data: {data}\n\n"
+                    call.set_output("".join(streamed))
+                else:
+                    call.set_error()
+                    yield f"data: {{\"error\": \"Groq API error: {response.status_code}\"}}\n\n"
+            except Exception as e:
+                call.set_error()
+                yield f"data: {{\"error\": \"{str(e)}\"}}\n\n"
+
+
+def _delta_content(chunk):
+    """Pull the text delta out of an OpenAI-style stream chunk (for token counts)"""
+    try:
+        return json.loads(chunk)["choices"][0]["delta"].get("content") or ""
+    except (ValueError, KeyError, IndexError, TypeError):
+        return ""
 
 # Global instance
 ai_processor = AIProcessor()
\ No newline at end of file
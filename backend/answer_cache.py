@@ -0,0 +1,307 @@
+"""
+Fuzzy Answer Cache for GTU Answers
+Students ask for the same GTU questions in slightly different words; an
+answer generated once is served again in milliseconds instead of paying for
+another LLM call
+
+This module implements:
+1. Question normalization - case, punctuation, stop words, filler verbs
+   ("explain", "what is"), marks tags ("[7 marks]") and number formats
+   ("two", "2nd", "II" -> "2")
+2. Exact lookup on the normalized text's hash
+3. Fuzzy lookup: a character trigram inverted index (local SQLite) finds the
+   candidates sharing the most trigrams, which are then compared word by
+   word. Misspelled and split words ("necesary", "dead lock") still match
+   (within a bounded edit distance, never a longer or shorter word),
+   but numbers and negations must be identical, a word replaced by another
+   ("preorder" / "inorder") is a different question, and word order counts
+   ("postfix to infix" / "infix to postfix"). The best candidate at or above
+   ANSWER_CACHE_THRESHOLD is a hit
+4. Hit metadata - the canonical (first asked) question that was matched,
+   similarity and age - and hit counts per entry
+
+Entries are scoped per subject. Bump ANSWER_CACHE_VERSION when the answer
+prompt changes; older entries are then ignored.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional
+
+from backend.local_store import connect, get_db_path, transaction
+
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE_VERSION = 1
+# Word-level similarity of normalized questions at which a cached answer is reused
+ANSWER_CACHE_THRESHOLD = float(os.environ.get('ANSWER_CACHE_THRESHOLD', 0.85))
+# Edits (insert, delete, substitute, swap neighbours) by which a misspelled word may
+# differ from the real one; two only for long words and without changing the length
+TYPO_EDITS, LONG_WORD_TYPO_EDITS, LONG_WORD = 1, 2, 8
+# Candidates (by shared trigram count) scored per fuzzy lookup
+ANSWER_CACHE_CANDIDATES = 20
+NGRAM_SIZE = 3
+# Only the start of very long questions is indexed (keeps lookups under SQLite's variable limit)
+NGRAM_MAX_CHARS = 600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS answer_cache (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    subject_id TEXT NOT NULL,
+    norm_hash TEXT NOT NULL,
+    normalized TEXT NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    gram_count INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    last_hit_at REAL,
+    UNIQUE (subject_id, norm_hash)
+);
+CREATE TABLE IF NOT EXISTS answer_ngrams (
+    gram TEXT NOT NULL,
+    subject_id TEXT NOT NULL,
+    entry_id INTEGER NOT NULL,
+    PRIMARY KEY (subject_id, gram, entry_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_answer_ngrams_entry ON answer_ngrams(entry_id);
+"""
+
+STOPWORDS = set("""
+a an the and or of to in on for with by from as at is are be was were this that these those it its
+what which how why when where who whom please pls kindly me my i you your can could would will give
+they them their there has have having
+tell answer question gtu exam briefly brief detail detailed short note notes about do does
+explain define describe discuss write state elaborate
+""".split())
+
+NUMBER_WORDS = {
+    'one': '1', 'two': '2', 'three': '3', 'four': '4', 'five': '5', 'six': '6', 'seven': '7',
+    'eight': '8', 'nine': '9', 'ten': '10', 'first': '1', 'second': '2', 'third': '3', 'fourth': '4',
+    'fifth': '5', 'sixth': '6', 'seventh': '7', 'eighth': '8', 'ninth': '9', 'tenth': '10',
+    'ii': '2', 'iii': '3', 'iv': '4', 'vii': '7', 'viii': '8', 'ix': '9',  # not 'vi' (the editor)
+}
+MARKS_RE = re.compile(r"[\[(]?\s*\d+\s*(?:marks?|m)\b\s*[\])]?", re.IGNORECASE)
+ORDINAL_RE = re.compile(r"\b(\d+)(?:st|nd|rd|th)\b")
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Words that turn a question into another one; like numbers they must match exactly
+NEGATIONS = frozenset(('non', 'not', 'no', 'without'))
+
+
+def normalize_question(text: str) -> str:
+    """Canonical form used for matching: 'Explain the 2nd Normal Form. [7 Marks]' -> '2 normal form'"""
+    text = MARKS_RE.sub(' ', text.lower())
+    text = ORDINAL_RE.sub(r'\1', text)
+    tokens = []
+    for token in TOKEN_RE.findall(text):
+        token = NUMBER_WORDS.get(token, token)
+        if token in STOPWORDS:
+            continue
+        if len(token) > 4 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return ' '.join(tokens)
+
+
+def ngrams(normalized: str, size: int = NGRAM_SIZE) -> List[str]:
+    """Distinct character n-grams of a normalized question (padded so short words count)"""
+    padded = f" {normalized[:NGRAM_MAX_CHARS]} "
+    if len(padded) <= size:
+        return [padded]
+    return sorted({padded[i:i + size] for i in range(len(padded) - size + 1)})
+
+
+def _discriminating(word: str) -> bool:
+    return word in NEGATIONS or any(c.isdigit() for c in word)
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Edit distance with adjacent swaps counted as one edit; anything above limit is limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+    return min(current[-1], limit + 1)
+
+
+def _same_word(a: str, b: str) -> bool:
+    """
+    Equal, or one a misspelling of the other. Short words, numbers and
+    words extended at either end ("process" / "processor", "parse" /
+    "parser") only match exactly, so different terms are not typos.
+    """
+    if a == b:
+        return True
+    if min(len(a), len(b)) < 4 or a[0] != b[0] or _discriminating(a) or _discriminating(b):
+        return False
+    shorter, longer = sorted((a, b), key=len)
+    if longer.startswith(shorter) or longer.endswith(shorter):
+        return False
+    limit = LONG_WORD_TYPO_EDITS if len(a) == len(b) and len(a) >= LONG_WORD else TYPO_EDITS
+    return _edit_distance(a, b, limit) <= limit
+
+
+def _join_split_words(words: List[str], vocabulary: set) -> List[str]:
+    """'dead lock' -> 'deadlock' when the other question spells it as one word"""
+    joined, i = [], 0
+    while i < len(words):
+        if i + 1 < len(words) and words[i] + words[i + 1] in vocabulary:
+            joined.append(words[i] + words[i + 1])
+            i += 2
+        else:
+            joined.append(words[i])
+            i += 1
+    return joined
+
+
+def similarity(a: str, b: str) -> float:
+    """
+    Word-level similarity of two normalized questions in [0, 1]: the ratio
+    of their word sequences once misspellings are aligned. 0 when numbers
+    or negations differ, or when each side has a word the other lacks.
+    """
+    a_words = _join_split_words(a.split(), set(b.split()))
+    b_words = _join_split_words(b.split(), set(a_words))
+    if {w for w in a_words if _discriminating(w)} != {w for w in b_words if _discriminating(w)}:
+        return 0.0
+    a_set = set(a_words)
+    aligned = [w if w in a_set else next((x for x in a_words if _same_word(x, w)), w) for w in b_words]
+    if a_set - set(aligned) and set(aligned) - a_set:
+        return 0.0  # a word replaced by another: a different question, not a rewording
+    return SequenceMatcher(None, a_words, aligned, autojunk=False).ratio()
+
+
+def _hash(normalized: str) -> str:
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+class AnswerCache:
+    """Generated answers keyed by normalized question, with a trigram index for near matches"""
+
+    def __init__(self, db_path: Optional[str] = None, threshold: float = ANSWER_CACHE_THRESHOLD):
+        self.db_path = db_path or get_db_path('answers')
+        self.threshold = threshold
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        return connect(self.db_path)
+
+    # ---------- lookup ----------
+
+    def lookup(self, question: str, subject_id=None) -> Optional[Dict]:
+        """Best cached entry for question (exact or above threshold), or None"""
+        normalized = normalize_question(question)
+        if not normalized:
+            return None
+        subject = str(subject_id or '')
+        conn = self._conn()
+
+        row = conn.execute(
+            "SELECT * FROM answer_cache WHERE subject_id = ? AND norm_hash = ? AND version = ?",
+            (subject, _hash(normalized), ANSWER_CACHE_VERSION)
+        ).fetchone()
+        if row is not None:
+            return self._hit(row, 1.0, 'exact')
+
+        grams = ngrams(normalized)
+        placeholders = ','.join('?' * len(grams))
+        candidates = conn.execute(
+            f"""SELECT c.*, COUNT(*) AS shared FROM answer_ngrams g
+                JOIN answer_cache c ON c.id = g.entry_id
+                WHERE g.subject_id = ? AND g.gram IN ({placeholders}) AND c.version = ?
+                GROUP BY g.entry_id ORDER BY shared DESC LIMIT ?""",
+            (subject, *grams, ANSWER_CACHE_VERSION, ANSWER_CACHE_CANDIDATES)
+        ).fetchall()
+        best, best_score = None, 0.0
+        for candidate in candidates:
+            score = similarity(normalized, candidate['normalized'])
+            if score > best_score:
+                best, best_score = candidate, score
+        if best is None or best_score < self.threshold:
+            return None
+        return self._hit(best, best_score, 'fuzzy')
+
+    def _hit(self, row, similarity: float, match: str) -> Dict:
+        now = time.time()
+        self._conn().execute("UPDATE answer_cache SET hits = hits + 1, last_hit_at = ? WHERE id = ?",
+                             (now, row['id']))
+        return {
+            'id': row['id'],
+            'answer': json.loads(row['answer']),
+            'question': row['question'],
+            'similarity': round(similarity, 3),
+            'match': match,
+            'created_at': row['created_at'],
+        }
+
+    # ---------- store ----------
+
+    def put(self, question: str, answer: Dict, subject_id=None) -> Optional[int]:
+        """
+        Store an answer under question's normalized form, overwriting the
+        entry of the same normalized question (a regenerated answer). A
+        merely similar question gets an entry of its own.
+        """
+        normalized = normalize_question(question)
+        if not normalized:
+            return None
+        subject = str(subject_id or '')
+        conn = self._conn()
+        grams = ngrams(normalized)
+        with transaction(conn):
+            conn.execute(
+                """INSERT INTO answer_cache
+                   (subject_id, norm_hash, normalized, question, answer, gram_count, version, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (subject_id, norm_hash) DO UPDATE SET
+                   answer = excluded.answer, version = excluded.version, created_at = excluded.created_at""",
+                (subject, _hash(normalized), normalized, question.strip(), json.dumps(answer), len(grams),
+                 ANSWER_CACHE_VERSION, time.time())
+            )
+            entry_id = conn.execute("SELECT id FROM answer_cache WHERE subject_id = ? AND norm_hash = ?",
+                                    (subject, _hash(normalized))).fetchone()['id']
+            conn.executemany("INSERT OR IGNORE INTO answer_ngrams (gram, subject_id, entry_id) VALUES (?, ?, ?)",
+                             [(gram, subject, entry_id) for gram in grams])
+        return entry_id
+
+    def describe(self, hit: Dict) -> Dict:
+        """Cache metadata attached to responses"""
+        return {
+            'status': 'hit',
+            'match': hit['match'],
+            'matched_question': hit['question'],
+            'similarity': hit['similarity'],
+            'age_seconds': round(time.time() - hit['created_at']),
+        }
+
+    def stats(self) -> Dict:
+        row = self._conn().execute(
+            "SELECT COUNT(*) AS entries, COALESCE(SUM(hits), 0) AS hits FROM answer_cache WHERE version = ?",
+            (ANSWER_CACHE_VERSION,)
+        ).fetchone()
+        return {'entries': row['entries'], 'hits': row['hits']}
+
+
+# Singleton instance
+_answer_cache = None
+
+
+def get_answer_cache() -> AnswerCache:
+    """Get or create answer cache singleton"""
+    global _answer_cache
+    if _answer_cache is None:
+        _answer_cache = AnswerCache()
+    return _answer_cache
@@ -2,4 +2,4 @@ from flask import Blueprint
 
 api_bp = Blueprint('api', __name__)
 
-from backend.api import routes
\ No newline at end of file
+from backend.api import routes, job_routes
\ No newline at end of file
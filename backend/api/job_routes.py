@@ -0,0 +1,70 @@
+from flask import jsonify, request
+from backend.api import api_bp
+from backend.rate_limit import rate_limited
+from backend.jobs import get_job_queue, get_handler, public_job, SUCCEEDED, FAILED
+from backend.job_handlers import PUBLIC_JOB_PARAMS, public_job_params  # also registers handlers
+
+
+def accepted_response(job):
+    """Build the 202 response returned when a job is submitted"""
+    return jsonify({
+        'success': True,
+        'job_id': job['id'],
+        'status': job['status'],
+        'deduplicated': job.get('deduplicated', False),
+        'status_url': f"/api/jobs/{job['id']}",
+        'result_url': f"/api/jobs/{job['id']}/result"
+    }), 202
+
+
+@api_bp.route('/jobs', methods=['POST'])
+@rate_limited('ai_heavy')
+def submit_job():
+    """
+    Submit a background job
+    Body: {"type": "generate_unit_pdf", "params": {...}}
+    """
+    try:
+        data = request.get_json() or {}
+        job_type = data.get('type')
+        params = data.get('params', {})
+
+        if job_type not in PUBLIC_JOB_PARAMS or get_handler(job_type) is None:
+            return jsonify({'error': f'Unknown job type: {job_type}'}), 400
+        if not isinstance(params, dict):
+            return jsonify({'error': 'params must be an object'}), 400
+        try:
+            params = public_job_params(job_type, params)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        job = get_job_queue().submit(job_type, params)
+        return accepted_response(job)
+    except Exception as e:
+        return jsonify({'error': f'Failed to submit job: {str(e)}'}), 500
+
+
+@api_bp.route('/jobs/<string:job_id>')
+def get_job_status(job_id):
+    """Get status and progress of a background job"""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': public_job(job)}), 200
+
+
+@api_bp.route('/jobs/<string:job_id>/result')
+def get_job_result(job_id):
+    """
+    Get the result of a background job
+    Returns 202 while the job is still pending or running
+    """
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    if job['status'] == SUCCEEDED:
+        return jsonify({'success': True, 'job_id': job_id, 'result': job['result']}), 200
+    if job['status'] == FAILED:
+        return jsonify({'success': False, 'job_id': job_id, 'error': job['error']}), 500
+    return jsonify({'success': True, 'job': public_job(job)}), 202
@@ -3,6 +3,12 @@ from flask_jwt_extended import jwt_required
 from backend.api import api_bp
 from backend.supabase_client import supabase
 from backend.ai import ai_processor
+from backend.rate_limit import rate_limited
+from backend.telemetry import get_telemetry
+from backend.precompute import (
+    get_artifact_store, explanation_prompt, unit_summary_prompt, unit_summary_source,
+    EXPLANATION, UNIT_SUMMARY
+)
 
 @api_bp.route('/health')
 def health_check():
@@ -365,6 +371,7 @@ def get_mock_test_detail(test_id):
         return jsonify({'error': f'Failed to fetch test details: {str(e)}'}), 500
 
 @api_bp.route('/ai-assistant', methods=['POST'])
+@rate_limited('ai')
 def ai_assistant():
     """
     AI assistant endpoint using GPT-4o
@@ -378,7 +385,7 @@ def ai_assistant():
         
         # Generate AI response using GPT-4o
         context = "You are an AI tutor helping GTU students prepare for their exams. Provide clear, concise, and accurate explanations."
-        ai_response = ai_processor.generate_response(prompt, context)
+        ai_response = ai_processor.generate_response(prompt, context, task="chat")
         
         return jsonify({
             'success': True,
@@ -388,6 +395,7 @@ def ai_assistant():
         return jsonify({'error': f'AI response generation failed: {str(e)}'}), 500
 
 @api_bp.route('/chat', methods=['POST'])
+@rate_limited('ai')
 def chat():
     """
     Streaming chat endpoint for Vercel AI SDK
@@ -412,6 +420,7 @@ def chat():
         return jsonify({'error': f'Chat failed: {str(e)}'}), 500
 
 @api_bp.route('/summarize-unit', methods=['POST'])
+@rate_limited('ai')
 def summarize_unit():
     """
     Summarize a specific unit using AI
@@ -423,21 +432,27 @@ def summarize_unit():
         
         if not subject_code or not unit_number:
             return jsonify({'error': 'Subject code and unit number are required'}), 400
+        
+        # 0. Serve the nightly precomputed summary when there is one
+        artifact = get_artifact_store().get(UNIT_SUMMARY, subject_code, unit=unit_number)
+        get_telemetry().record_cache('precomputed_summary', hit=artifact is not None)
+        if artifact:
+            return jsonify({
+                'success': True,
+                'summary': artifact['content'],
+                'precomputed': True,
+                'generated_at': artifact['generated_at']
+            }), 200
             
         # 1. Fetch unit content from database (notes or syllabus)
         # Try notes first as they might have more content
         notes_response = supabase.table("notes").select("description").eq("subject_code", subject_code).eq("unit", unit_number).execute()
-        
-        content_to_summarize = ""
-        if notes_response.data:
-            # Combine descriptions from all notes for this unit
-            content_to_summarize = "\n".join([n.get('description', '') for n in notes_response.data])
+        content_to_summarize = unit_summary_source(notes_response.data or [], [])
             
         # If no notes, try syllabus content
         if not content_to_summarize:
-            syllabus_response = supabase.table("syllabus_content").select("topics").eq("subject_code", subject_code).eq("unit", unit_number).execute()
-            if syllabus_response.data:
-                content_to_summarize = "\n".join([s.get('topics', '') for s in syllabus_response.data])
+            syllabus_response = supabase.table("syllabus_content").select("topic, content").eq("subject_code", subject_code).eq("unit", unit_number).execute()
+            content_to_summarize = unit_summary_source([], syllabus_response.data or [])
                 
         if not content_to_summarize:
             # If still no content, try to fetch subject name to at least generate a generic summary based on unit title if available
@@ -445,10 +460,9 @@ def summarize_unit():
             return jsonify({'error': 'No content found for this unit to summarize'}), 404
             
         # 2. Generate Summary
-        prompt = f"Please provide a concise summary of the following unit content for Subject {subject_code}, Unit {unit_number}:\n\n{content_to_summarize[:2000]}"
-        context = "You are an expert academic summarizer. Create a clear, bulleted summary of the key concepts in this unit."
+        prompt, context = unit_summary_prompt(subject_code, unit_number, content_to_summarize)
         
-        summary = ai_processor.generate_response(prompt, context)
+        summary = ai_processor.generate_response(prompt, context, task="summary")
         
         return jsonify({
             'success': True,
@@ -934,12 +948,15 @@ def submit_rating():
         return jsonify({'error': f'Rating failed: {str(e)}'}), 500
 
 @api_bp.route('/generate-unit-pdf', methods=['POST'])
+@rate_limited('ai_heavy')
 def generate_unit_pdf_endpoint():
     """
     Generate AI-powered comprehensive PDF study guide for a unit
+    Runs as a background job; poll status_url / result_url for the PDF link
     """
     try:
-        from backend.pdf_generator import generate_unit_pdf
+        from backend.jobs import get_job_queue
+        from backend.api.job_routes import accepted_response
         
         data = request.get_json()
         subject_code = data.get('subject_code')
@@ -948,13 +965,13 @@ def generate_unit_pdf_endpoint():
         if not subject_code or not unit_number:
             return jsonify({'error': 'subject_code and unit_number are required'}), 400
         
-        # Generate the PDF
-        result = generate_unit_pdf(subject_code, int(unit_number))
-        
-        if result.get('success'):
-            return jsonify(result), 200
-        else:
-            return jsonify(result), 500
+        # Queue the PDF generation (identical pending requests share one job);
+        # an unchanged unit returns its existing PDF unless refresh is set
+        params = {'subject_code': subject_code, 'unit_number': int(unit_number)}
+        if data.get('refresh'):
+            params['refresh'] = True
+        job = get_job_queue().submit('generate_unit_pdf', params)
+        return accepted_response(job)
             
     except Exception as e:
         import traceback
@@ -1330,6 +1347,7 @@ def get_random_flashcards(subject_code):
 
 # ===== AI Chat Routes =====
 @api_bp.route('/ai-chat/subject', methods=['POST'])
+@rate_limited('ai')
 def subject_chat():
     """Subject-specific AI chat"""
     try:
@@ -1376,7 +1394,7 @@ Always be encouraging and supportive."""
         full_prompt += f"Student: {question}"
         
         # Generate response using Bytez GPT-4o
-        ai_response = ai_processor.generate_response(full_prompt, context=context)
+        ai_response = ai_processor.generate_response(full_prompt, context=context, task="chat")
         
         return jsonify({
             'success': True,
@@ -1389,6 +1407,7 @@ Always be encouraging and supportive."""
 
 
 @api_bp.route('/ai-chat/explain-topic', methods=['POST'])
+@rate_limited('ai')
 def explain_topic():
     """Get detailed explanation of a topic"""
     try:
@@ -1399,36 +1418,26 @@ def explain_topic():
         if not subject_code or not topic:
             return jsonify({'error': 'Subject code and topic are required'}), 400
         
+        # Serve the nightly precomputed explanation when there is one
+        artifact = get_artifact_store().get(EXPLANATION, subject_code, topic=topic)
+        get_telemetry().record_cache('precomputed_explanation', hit=artifact is not None)
+        if artifact:
+            return jsonify({
+                'success': True,
+                'explanation': artifact['content'],
+                'precomputed': True,
+                'generated_at': artifact['generated_at']
+            }), 200
+        
         # Get subject name
         subject_response = supabase.table("subjects").select("*").eq("subject_code", subject_code).execute()
         subject_name = subject_response.data[0]['subject_name'] if subject_response.data else subject_code
         
-        # Build context for comprehensive explanation
-        context = f"""You are an expert educator explaining concepts from {subject_name} ({subject_code}).
-
-Your goal is to provide a comprehensive, well-structured explanation that helps students learn effectively.
-
-Format your response with:
-- Clear headings (use ** for bold)
-- Bullet points for key concepts
-- Examples where relevant
-- Simple, student-friendly language"""
-
-        # Build the explanation prompt
-        prompt = f"""Provide a detailed explanation of '{topic}' in the context of {subject_name}.
-
-Include:
-1. **Definition and Core Concepts**: What is {topic}? What are the fundamental principles?
-2. **Key Points to Remember**: The most important facts and concepts students should memorize
-3. **Real-World Applications**: Where and how is this used in practice?
-4. **Common Exam Questions**: Types of questions students might face about this topic
-5. **Study Tips**: How to best understand and remember this concept
-
-Make it comprehensive but easy to understand."""
+        prompt, context = explanation_prompt(subject_code, subject_name, topic)
 
         # Use Bytez AI directly
         from backend.ai import ai_processor
-        explanation = ai_processor.generate_response(prompt, context=context)
+        explanation = ai_processor.generate_response(prompt, context=context, task="explanation")
         
         return jsonify({
             'success': True,
@@ -1440,6 +1449,7 @@ Make it comprehensive but easy to understand."""
         return jsonify({'error': f'Failed to generate explanation: {str(e)}'}), 500
 
 @api_bp.route('/generate-notes', methods=['POST'])
+@rate_limited('ai')
 def generate_notes():
     """
     Generate study notes for a subject/unit using AI
@@ -1463,7 +1473,7 @@ def generate_notes():
         prompt += ". Provide clear, structured notes with key points, examples, and explanations."
         
         context = "You are an expert GTU tutor creating study notes for students."
-        notes = ai_processor.generate_response(prompt, context)
+        notes = ai_processor.generate_response(prompt, context, task="notes")
         
         return jsonify({
             'success': True,
@@ -1478,6 +1488,7 @@ def generate_notes():
         return jsonify({'success': False, 'error': f'Failed to generate notes: {str(e)}'}), 500
 
 @api_bp.route('/generate-quiz', methods=['POST'])
+@rate_limited('ai')
 def generate_quiz():
     """
     Generate a practice quiz for a subject using AI
@@ -1499,7 +1510,7 @@ def generate_quiz():
         prompt += ". Create 5-10 multiple choice questions with 4 options each and indicate the correct answer."
         
         context = "You are an expert GTU exam creator designing practice quizzes for students."
-        quiz = ai_processor.generate_response(prompt, context)
+        quiz = ai_processor.generate_response(prompt, context, task="quiz")
         
         return jsonify({
             'success': True,
@@ -1514,6 +1525,7 @@ def generate_quiz():
         return jsonify({'success': False, 'error': f'Failed to generate quiz: {str(e)}'}), 500
 
 @api_bp.route('/important-questions', methods=['POST'])
+@rate_limited('ai')
 def get_important_questions_ai():
     """
     Get important questions for a subject using AI
@@ -1535,7 +1547,7 @@ def get_important_questions_ai():
         prompt += ". Focus on frequently asked questions in GTU exams with high probability of appearing."
         
         context = "You are an experienced GTU examiner who knows which questions are most likely to appear in exams."
-        questions = ai_processor.generate_response(prompt, context)
+        questions = ai_processor.generate_response(prompt, context, task="short_answer")
         
         return jsonify({
             'success': True,
@@ -1550,6 +1562,7 @@ def get_important_questions_ai():
         return jsonify({'success': False, 'error': f'Failed to generate questions: {str(e)}'}), 500
 
 @api_bp.route('/previous-papers', methods=['POST'])
+@rate_limited('ai')
 def get_previous_papers_ai():
     """
     Get previous year papers information using AI
@@ -1571,7 +1584,7 @@ def get_previous_papers_ai():
         prompt += ". Include exam patterns, important topics, and marking schemes."
         
         context = "You are a GTU exam expert who understands past exam patterns and trends."
-        papers_info = ai_processor.generate_response(prompt, context)
+        papers_info = ai_processor.generate_response(prompt, context, task="short_answer")
         
         return jsonify({
             'success': True,
@@ -10,6 +10,10 @@ load_dotenv()
 def create_app():
     app = Flask(__name__)
     
+    # Trust X-Forwarded-For only from our own proxies (TRUSTED_PROXY_HOPS)
+    from backend.rate_limit import install_proxy_fix
+    install_proxy_fix(app)
+    
     # Configure CORS to allow all origins for API and auth routes
     CORS(app, resources={
         r"/api/*": {"origins": "*"},
@@ -33,23 +37,72 @@ def create_app():
     app.register_blueprint(api_bp, url_prefix='/api')
     app.register_blueprint(auth_bp, url_prefix='/auth')
     
+    # Label LLM telemetry with the endpoint that triggered each provider call
+    from flask import request
+    from backend.telemetry import get_telemetry, current_route, metrics_access_denied
+    
+    @app.before_request
+    def set_telemetry_route():
+        current_route.set(request.endpoint or request.path)
+    
+    @app.route('/metrics')
+    def metrics():
+        """Prometheus metrics for LLM calls (latency, tokens, cost, fallbacks, cache hits)"""
+        from flask import Response
+        denied = metrics_access_denied(request.headers.get('Authorization'))
+        if denied:
+            return {"error": "Not authorized" if denied == 401 else "Not found"}, denied
+        return Response(get_telemetry().render_prometheus(), mimetype='text/plain; version=0.0.4')
+    
+    @app.route('/api/metrics/summary')
+    def metrics_summary():
+        """Rolling summary of LLM latency percentiles and cost per route"""
+        denied = metrics_access_denied(request.headers.get('Authorization'))
+        if denied:
+            return {"error": "Not authorized" if denied == 401 else "Not found"}, denied
+        return get_telemetry().summary()
+    
+    # Start in-process background job workers (JOB_WORKERS_IN_PROCESS=0 disables)
+    from backend.jobs import start_background_workers
+    start_background_workers()
+    
+    from backend.rate_limit import rate_limited
+    
     @app.post("/api/agent/predict-paper")
+    @rate_limited('ai_heavy')
     def predict_paper_endpoint():
-        """Predict semester paper using AI"""
+        """Predict semester paper using AI (cached; a miss runs as a background job)"""
         from flask import request
+        from backend.jobs import get_job_queue
+        from backend.api.job_routes import accepted_response
         data = request.get_json()
         subject_id = data.get("subject_id")
         if not subject_id:
             return {"error": "subject_id is required"}, 400
         
-        # Import and use the agent from agent_service
-        from backend.agent_service import agent
-        result = agent.predict_semester_paper(subject_id)
-        return {"predicted_paper": result}
+        # Cached (even stale) predictions are served immediately with their age;
+        # a stale one is refreshed by a background job
+        if not data.get("refresh"):
+            from backend.agent_service import agent
+            try:
+                cached = agent.cached_prediction(subject_id)
+            except Exception as e:
+                print(f"⚠️ Prediction cache lookup failed: {e}")
+                cached = None
+            if cached:
+                return {"success": True, "predicted_paper": cached, "cache": cached["cache"]}
+        
+        # An explicit refresh regenerates even a fresh prediction
+        params = {"subject_id": subject_id}
+        if data.get("refresh"):
+            params.update(refresh=True, force=True)
+        job = get_job_queue().submit("predict_paper", params)
+        return accepted_response(job)
 
     @app.post("/api/agent/generate-answer")
+    @rate_limited('ai')
     def generate_answer_endpoint():
-        """Generate GTU answer for a question"""
+        """Generate GTU answer for a question (cached; "refresh": true regenerates)"""
         from flask import request
         data = request.get_json()
         question = data.get("question")
@@ -59,29 +112,15 @@ def create_app():
         
         # Import and use the agent from agent_service
         from backend.agent_service import agent
-        result = agent.generate_gtu_answer(question, subject_id)
+        result = agent.generate_gtu_answer(question, subject_id, refresh=bool(data.get("refresh")))
         return {"result": result}
 
-    # PDF serving endpoint for local development
+    # Generated / mirrored PDFs (Range, ETag and proxy offload in backend/file_serving.py)
     @app.route('/api/pdf/<path:filename>')
     def serve_pdf(filename):
-        """Serve PDF files from /tmp/gtu_pdfs/ directory"""
-        from flask import send_file
-        import os
-        try:
-            # Check /tmp/gtu_pdfs/ first
-            pdf_path = f"/tmp/gtu_pdfs/{filename}"
-            if os.path.exists(pdf_path):
-                return send_file(pdf_path, mimetype='application/pdf')
-            
-            # Fallback to /tmp/ for backward compatibility
-            pdf_path = f"/tmp/{filename}"
-            if os.path.exists(pdf_path):
-                return send_file(pdf_path, mimetype='application/pdf')
-            else:
-                return {"error": "PDF not found"}, 404
-        except Exception as e:
-            return {"error": str(e)}, 500
+        """Redirect to the artifact store for stored guides, else serve from PDF_SERVE_DIRS (PDF_DIR), then files directly in /tmp"""
+        from backend.file_serving import send_pdf, redirect_to_artifact
+        return redirect_to_artifact(filename) or send_pdf(filename)
     
     @app.route('/')
     def hello():
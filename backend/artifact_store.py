@@ -0,0 +1,310 @@
+"""
+Artifact Storage
+Where generated PDFs live and the links handed out for them. Local disk
+(PDF_DIR) loses every artifact on a redeploy; an S3-compatible bucket
+(AWS S3, Cloudflare R2, MinIO, Supabase Storage's S3 API) keeps them, so
+unchanged units are not regenerated after a restart
+
+This module implements:
+1. One interface (put_file / stat / exists / url / download_url / delete)
+   with a 'local' store for development and an 's3' store for production,
+   picked by ARTIFACT_STORE
+2. Streaming uploads - files go to the bucket from disk through boto3's
+   transfer manager (multipart above ARTIFACT_MULTIPART_MB), never read
+   into memory whole
+3. Deduplication by content hash - every object carries the SHA-256 of its
+   bytes; putting identical bytes under a key again is a HEAD, not an upload
+4. Links that keep bytes out of the Flask workers - a CDN URL when
+   ARTIFACT_CDN_URL is set, otherwise /api/pdf/<key>, which redirects to a
+   short-lived pre-signed URL (memoized so repeat visits reuse one URL and
+   the browser cache)
+5. A local stand-in for the bucket: backend/fake_object_store.py
+
+Local:  ARTIFACT_STORE=local (default), files in PDF_DIR
+S3:     ARTIFACT_STORE=s3 ARTIFACT_S3_BUCKET=gtu-pdfs [ARTIFACT_S3_ENDPOINT=https://<account>.r2.cloudflarestorage.com]
+"""
+
+import os
+import shutil
+import hashlib
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+from urllib.parse import quote
+
+from backend.file_serving import is_content_addressed, PDF_IMMUTABLE_MAX_AGE, PDF_MAX_AGE
+from backend.pdf_cache import PDF_DIR, PARTIAL_SUFFIX
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_STORE = os.environ.get('ARTIFACT_STORE', 'local')
+# Origin of the /api/pdf/<key> links stored in the notes table ('' = same origin as the frontend's API calls)
+ARTIFACT_BASE_URL = os.environ.get(
+    'ARTIFACT_BASE_URL', '' if os.getenv('FLASK_ENV') == 'production' else 'http://localhost:5001'
+).rstrip('/')
+ARTIFACT_S3_BUCKET = os.environ.get('ARTIFACT_S3_BUCKET', '')
+# Only for S3-compatible stores (R2, MinIO, the fake object store); empty for AWS
+ARTIFACT_S3_ENDPOINT = os.environ.get('ARTIFACT_S3_ENDPOINT', '')
+ARTIFACT_S3_REGION = os.environ.get('ARTIFACT_S3_REGION', 'us-east-1')
+ARTIFACT_S3_PREFIX = os.environ.get('ARTIFACT_S3_PREFIX', 'pdfs/')
+# Public base URL of the bucket behind a CDN; links point straight at it instead of pre-signed URLs
+ARTIFACT_CDN_URL = os.environ.get('ARTIFACT_CDN_URL', '').rstrip('/')
+ARTIFACT_URL_TTL = int(os.environ.get('ARTIFACT_URL_TTL', 3600))
+ARTIFACT_MULTIPART_MB = int(os.environ.get('ARTIFACT_MULTIPART_MB', 8))
+HASH_CHUNK = 1 << 20
+META_SHA256 = 'sha256'
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _check_key(key: str) -> str:
+    if not key or key.startswith('/') or '\\' in key or '\x00' in key or '..' in key.split('/'):
+        raise ValueError(f"Invalid artifact key: {key!r}")
+    return key
+
+
+def _cache_control(key: str) -> str:
+    # Content-addressed guide names never get new bytes
+    if is_content_addressed(key):
+        return f"public, max-age={PDF_IMMUTABLE_MAX_AGE}, immutable"
+    return f"public, max-age={PDF_MAX_AGE}"
+
+
+class PdfArtifactStore(ABC):
+    """
+    Storage for generated files, addressed by key (the file name). Every
+    store answers with dicts of key, size, sha256 (None if unknown) and
+    modified (unix time). Stores implement put_file, stat and delete.
+    """
+
+    # True when bytes live elsewhere and /api/pdf should redirect instead of sending them
+    remote = False
+    base_url = ARTIFACT_BASE_URL
+    # How long a client may cache the /api/pdf redirect to download_url()
+    redirect_max_age = 0
+
+    @abstractmethod
+    def put_file(self, path: str, key: str, content_type: str = 'application/pdf') -> Dict:
+        """Store the file at path under key; the result has 'uploaded' False when identical bytes were there"""
+
+    @abstractmethod
+    def stat(self, key: str) -> Optional[Dict]:
+        """Metadata of the stored key, None when it is missing"""
+
+    def exists(self, key: str) -> bool:
+        return self.stat(key) is not None
+
+    def url(self, key: str) -> str:
+        """Long-lived link to hand out (stored in the notes table)"""
+        return f"{self.base_url}/api/pdf/{quote(key)}"
+
+    def download_url(self, key: str) -> Optional[str]:
+        """Direct URL of the bytes for /api/pdf to redirect to; None when the backend serves them"""
+        return None
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Remove key; a missing key is not an error"""
+
+
+class LocalArtifactStore(PdfArtifactStore):
+    """Files in a local directory, served by /api/pdf (sendfile / X-Accel-Redirect, see file_serving.py)"""
+
+    def __init__(self, root: str = PDF_DIR, base_url: str = ARTIFACT_BASE_URL):
+        self.root = root
+        self.base_url = base_url
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, _check_key(key))
+
+    def stat(self, key: str) -> Optional[Dict]:
+        try:
+            st = os.stat(self.path(key))
+        except FileNotFoundError:
+            return None
+        return {'key': key, 'size': st.st_size, 'sha256': None, 'modified': st.st_mtime}
+
+    def put_file(self, path: str, key: str, content_type: str = 'application/pdf') -> Dict:
+        target = self.path(key)
+        if os.path.exists(target) and os.path.samefile(path, target):
+            # Rendered in place (PDF_DIR is the cache's working directory)
+            return dict(self.stat(key), uploaded=False)
+
+        digest = file_sha256(path)
+        if os.path.exists(target) and os.path.getsize(target) == os.path.getsize(path) \
+                and file_sha256(target) == digest:
+            return dict(self.stat(key), sha256=digest, uploaded=False)
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        partial = f"{target}.{os.getpid()}{PARTIAL_SUFFIX}"
+        try:
+            shutil.copyfile(path, partial)
+            os.replace(partial, target)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        return dict(self.stat(key), sha256=digest, uploaded=True)
+
+    def delete(self, key: str):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+
+class S3ArtifactStore(PdfArtifactStore):
+    """Objects in an S3-compatible bucket; clients download from the bucket or its CDN, not from Flask"""
+
+    remote = True
+
+    def __init__(self, bucket: str = ARTIFACT_S3_BUCKET, endpoint_url: str = ARTIFACT_S3_ENDPOINT,
+                 region: str = ARTIFACT_S3_REGION, prefix: str = ARTIFACT_S3_PREFIX,
+                 cdn_url: str = ARTIFACT_CDN_URL, url_ttl: int = ARTIFACT_URL_TTL,
+                 multipart_mb: int = ARTIFACT_MULTIPART_MB, base_url: str = ARTIFACT_BASE_URL,
+                 access_key: Optional[str] = None, secret_key: Optional[str] = None):
+        if not bucket:
+            raise ValueError("ARTIFACT_S3_BUCKET must be set for ARTIFACT_STORE=s3")
+        self.bucket = bucket
+        self.endpoint_url = endpoint_url or None
+        self.region = region
+        self.prefix = prefix
+        self.cdn_url = cdn_url.rstrip('/')
+        self.url_ttl = url_ttl
+        # A memoized pre-signed URL has at least half its lifetime left when handed out
+        self.redirect_max_age = PDF_MAX_AGE if self.cdn_url else url_ttl // 4
+        self.multipart_bytes = multipart_mb * 1024 * 1024
+        self.base_url = base_url
+        # Falls back to boto3's credential chain (AWS_ACCESS_KEY_ID, instance role, ...)
+        self._credentials = {
+            'aws_access_key_id': access_key or os.environ.get('ARTIFACT_S3_ACCESS_KEY') or None,
+            'aws_secret_access_key': secret_key or os.environ.get('ARTIFACT_S3_SECRET_KEY') or None,
+        }
+        self._client = None
+        self._lock = threading.Lock()
+        self._presigned: Dict[str, tuple] = {}
+        # key -> (mtime_ns, size) of the local file last confirmed in the bucket
+        self._confirmed: Dict[str, tuple] = {}
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+            from botocore.config import Config
+
+            with self._lock:
+                if self._client is None:
+                    self._client = boto3.client(
+                        's3', endpoint_url=self.endpoint_url, region_name=self.region, **self._credentials,
+                        config=Config(
+                            signature_version='s3v4',
+                            s3={'addressing_style': 'path' if self.endpoint_url else 'auto'},
+                            # R2, MinIO and older S3 clones reject the newer default checksum trailers
+                            request_checksum_calculation='when_required',
+                            response_checksum_validation='when_required',
+                            retries={'max_attempts': 5, 'mode': 'standard'},
+                        ))
+        return self._client
+
+    def object_key(self, key: str) -> str:
+        return self.prefix + _check_key(key)
+
+    def stat(self, key: str) -> Optional[Dict]:
+        from botocore.exceptions import ClientError
+
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self.object_key(key))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+        return {'key': key, 'size': head['ContentLength'], 'sha256': head.get('Metadata', {}).get(META_SHA256),
+                'modified': head['LastModified'].timestamp()}
+
+    def put_file(self, path: str, key: str, content_type: str = 'application/pdf') -> Dict:
+        from boto3.s3.transfer import TransferConfig
+
+        st = os.stat(path)
+        with self._lock:
+            confirmed = self._confirmed.get(key) == (st.st_mtime_ns, st.st_size)
+        if confirmed:
+            # Same local file as last time: skip hashing and the HEAD
+            return {'key': key, 'size': st.st_size, 'sha256': None, 'modified': st.st_mtime, 'uploaded': False}
+
+        digest = file_sha256(path)
+        existing = self.stat(key)
+        if existing and existing['sha256'] == digest:
+            with self._lock:
+                self._confirmed[key] = (st.st_mtime_ns, st.st_size)
+            return dict(existing, uploaded=False)
+
+        # Streams from disk; parts of multipart_bytes above the threshold
+        self.client.upload_file(
+            path, self.bucket, self.object_key(key),
+            ExtraArgs={'ContentType': content_type, 'CacheControl': _cache_control(key),
+                       'Metadata': {META_SHA256: digest}},
+            Config=TransferConfig(multipart_threshold=self.multipart_bytes, multipart_chunksize=self.multipart_bytes),
+        )
+        with self._lock:
+            self._presigned.pop(key, None)
+            self._confirmed[key] = (st.st_mtime_ns, st.st_size)
+        logger.info(f"Uploaded {key} ({st.st_size} bytes) to s3://{self.bucket}/{self.object_key(key)}")
+        return {'key': key, 'size': st.st_size, 'sha256': digest, 'modified': time.time(), 'uploaded': True}
+
+    def url(self, key: str) -> str:
+        if self.cdn_url:
+            return f"{self.cdn_url}/{quote(self.object_key(key))}"
+        # Stable link; each visit is redirected to a fresh pre-signed URL
+        return super().url(key)
+
+    def download_url(self, key: str) -> Optional[str]:
+        """None when the object is missing, so /api/pdf falls back to the local copy instead of a bucket 404"""
+        now = time.time()
+        with self._lock:
+            cached = self._presigned.get(key)
+        # Reused for the first half of its lifetime, so the browser cache sees one URL
+        if cached and cached[1] > now:
+            return cached[0]
+        # One HEAD per memo lifetime, not per request
+        if self.stat(key) is None:
+            return None
+        if self.cdn_url:
+            target = self.url(key)
+        else:
+            target = self.client.generate_presigned_url(
+                'get_object', Params={'Bucket': self.bucket, 'Key': self.object_key(key),
+                                      'ResponseContentType': 'application/pdf'},
+                ExpiresIn=self.url_ttl)
+        with self._lock:
+            self._presigned[key] = (target, now + self.url_ttl / 2)
+        return target
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self.object_key(key))
+        with self._lock:
+            self._presigned.pop(key, None)
+            self._confirmed.pop(key, None)
+
+
+STORES = {'local': LocalArtifactStore, 's3': S3ArtifactStore}
+
+# Singleton instance
+_pdf_store = None
+
+
+def get_pdf_store() -> PdfArtifactStore:
+    """Get or create the PDF store selected by ARTIFACT_STORE"""
+    global _pdf_store
+    if _pdf_store is None:
+        if ARTIFACT_STORE not in STORES:
+            raise ValueError(f"Unknown ARTIFACT_STORE {ARTIFACT_STORE!r} (expected one of {', '.join(STORES)})")
+        _pdf_store = STORES[ARTIFACT_STORE]()
+    return _pdf_store
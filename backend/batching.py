@@ -0,0 +1,220 @@
+"""
+Prompt Batching for Small Generation Tasks
+Packs many small, compatible tasks (flashcards per topic, short
+explanations, content variants) into one multi-item LLM call
+
+This module implements:
+1. Grouping of tasks by kind into batches bounded by item count and prompt size
+2. One structured prompt per batch that asks for a JSON array keyed by item id
+3. Splitting and per-item validation of the response (salvaging the complete
+   items of a truncated array)
+4. Individual retries for items that were missing or failed validation
+"""
+
+import os
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BATCH_MAX_ITEMS = int(os.environ.get('BATCH_MAX_ITEMS', 6))
+BATCH_MAX_PROMPT_CHARS = int(os.environ.get('BATCH_MAX_PROMPT_CHARS', 12000))
+BATCH_ITEM_RETRIES = int(os.environ.get('BATCH_ITEM_RETRIES', 1))
+
+BATCH_SYSTEM_PROMPT = """You complete several independent tasks in one response.
+Return ONLY a JSON array with exactly one object per task, in the order given:
+[{"id": "<task id>", "output": <result>}, ...]
+Follow each task's own instructions for the content of "output".
+Do not add commentary, markdown fences or text outside the JSON array."""
+
+
+class BatchTask:
+    """
+    One small generation task.
+
+    kind groups compatible tasks (same output shape); only tasks of the same
+    kind share a call. validate receives the item's "output" value and returns
+    the cleaned result, raising ValueError if it is unusable.
+    """
+
+    def __init__(self, task_id: str, kind: str, instruction: str,
+                 output_format: str = 'a string',
+                 validate: Optional[Callable[[Any], Any]] = None):
+        self.task_id = str(task_id)
+        self.kind = kind
+        self.instruction = instruction
+        self.output_format = output_format
+        self.validate = validate or validate_text
+
+    def __repr__(self):
+        return f"<BatchTask {self.kind}:{self.task_id}>"
+
+
+class BatchResult:
+    """Outcome of one task: output on success, error otherwise"""
+
+    def __init__(self, task: BatchTask, output: Any = None, error: Optional[str] = None,
+                 attempts: int = 1, batch_size: int = 1):
+        self.task = task
+        self.output = output
+        self.error = error
+        self.attempts = attempts
+        self.batch_size = batch_size
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def validate_text(output: Any) -> str:
+    """Default validator: a non-empty string"""
+    if not isinstance(output, str) or not output.strip():
+        raise ValueError("expected a non-empty string")
+    return output.strip()
+
+
+def strip_code_fences(text: str) -> str:
+    text = text.strip()
+    if text.startswith('```'):
+        text = text.split('\n', 1)[1] if '\n' in text else ''
+        if text.rstrip().endswith('```'):
+            text = text.rstrip()[:-3]
+    return text.strip()
+
+
+def parse_items(text: str) -> List[Dict]:
+    """
+    Parse the objects of a JSON array response. If the array is truncated
+    or malformed part-way, the complete objects before the damage are kept.
+    """
+    text = strip_code_fences(text or '')
+    start = text.find('[')
+    if start < 0:
+        return []
+    try:
+        items = json.loads(text[start:text.rfind(']') + 1])
+        return [item for item in items if isinstance(item, dict)]
+    except ValueError:
+        pass
+
+    decoder = json.JSONDecoder()
+    items, pos = [], start + 1
+    while pos < len(text):
+        while pos < len(text) and text[pos] in ' \t\r\n,':
+            pos += 1
+        if pos >= len(text) or text[pos] != '{':
+            break
+        try:
+            item, pos = decoder.raw_decode(text, pos)
+        except ValueError:
+            break
+        if isinstance(item, dict):
+            items.append(item)
+    return items
+
+
+def build_batch_prompt(tasks: List[BatchTask]) -> str:
+    parts = [f"There are {len(tasks)} tasks. Each result's \"output\" must be {tasks[0].output_format}.\n"]
+    for task in tasks:
+        parts.append(f"### Task id: {task.task_id}\n{task.instruction.strip()}\n")
+    parts.append(f"Return the JSON array with {len(tasks)} objects now.")
+    return '\n'.join(parts)
+
+
+class PromptBatcher:
+    """
+    Runs BatchTasks through a text completion function in as few calls as
+    possible.
+
+    complete(prompt, system) must return the raw model text, or None/raise
+    on provider failure.
+    """
+
+    def __init__(self, complete: Callable[[str, str], Optional[str]],
+                 max_items: int = BATCH_MAX_ITEMS,
+                 max_prompt_chars: int = BATCH_MAX_PROMPT_CHARS,
+                 item_retries: int = BATCH_ITEM_RETRIES,
+                 max_parallel: int = 1):
+        self.complete = complete
+        self.max_items = max(1, max_items)
+        self.max_prompt_chars = max_prompt_chars
+        self.item_retries = item_retries
+        self.max_parallel = max(1, max_parallel)
+
+    def group(self, tasks: List[BatchTask]) -> List[List[BatchTask]]:
+        """Split tasks into batches of one kind within the item and size budgets"""
+        by_kind: Dict[str, List[BatchTask]] = {}
+        for task in tasks:
+            by_kind.setdefault(task.kind, []).append(task)
+
+        batches = []
+        for kind_tasks in by_kind.values():
+            batch, size = [], 0
+            for task in kind_tasks:
+                task_size = len(task.instruction) + 40
+                if batch and (len(batch) >= self.max_items or size + task_size > self.max_prompt_chars):
+                    batches.append(batch)
+                    batch, size = [], 0
+                batch.append(task)
+                size += task_size
+            if batch:
+                batches.append(batch)
+        return batches
+
+    def _call(self, tasks: List[BatchTask]) -> Dict[str, BatchResult]:
+        """One provider call for a batch; returns results for every task"""
+        try:
+            text = self.complete(build_batch_prompt(tasks), BATCH_SYSTEM_PROMPT)
+        except Exception as e:
+            logger.warning(f"Batch call for {len(tasks)} {tasks[0].kind} tasks failed: {e}")
+            text = None
+
+        results = {task.task_id: BatchResult(task, error='no output', batch_size=len(tasks)) for task in tasks}
+        if not text:
+            return results
+
+        by_id = {task.task_id: task for task in tasks}
+        for item in parse_items(text):
+            task = by_id.get(str(item.get('id')))
+            if task is None or results[task.task_id].ok:
+                continue
+            try:
+                results[task.task_id] = BatchResult(task, output=task.validate(item.get('output')),
+                                                    batch_size=len(tasks))
+            except (ValueError, TypeError, KeyError) as e:
+                results[task.task_id].error = f"invalid output: {e}"
+        return results
+
+    def _run_batch(self, batch: List[BatchTask]) -> List[BatchResult]:
+        results = self._call(batch)
+
+        # Retry failed items on their own, so one bad item can't sink its neighbours again
+        for task in batch:
+            attempts = 1
+            while not results[task.task_id].ok and attempts <= self.item_retries:
+                attempts += 1
+                logger.info(f"Retrying {task!r} individually: {results[task.task_id].error}")
+                retry = self._call([task])[task.task_id]
+                retry.batch_size = len(batch)
+                results[task.task_id] = retry
+            results[task.task_id].attempts = attempts
+
+        return [results[task.task_id] for task in batch]
+
+    def run(self, tasks: List[BatchTask]) -> List[BatchResult]:
+        """Run all tasks; results are returned in the order the tasks were given"""
+        if not tasks:
+            return []
+        batches = self.group(tasks)
+
+        if self.max_parallel > 1 and len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=min(self.max_parallel, len(batches)),
+                                    thread_name_prefix='batch') as pool:
+                batch_results = list(pool.map(self._run_batch, batches))
+        else:
+            batch_results = [self._run_batch(batch) for batch in batches]
+
+        by_id = {result.task.task_id: result for results in batch_results for result in results}
+        return [by_id[task.task_id] for task in tasks]
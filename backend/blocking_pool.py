@@ -0,0 +1,96 @@
+"""
+Blocking Work Pool for the Async Agent Service
+Runs blocking SDK calls (Supabase, Bytez/OpenAI, YouTube transcripts, PDF rendering)
+off the uvicorn event loop so one slow request no longer stalls the others
+
+This module implements:
+1. A sized thread pool shared by all agent endpoints
+2. Per-call timeouts (the caller gets an error; the worker thread finishes
+   in the background since threads cannot be cancelled)
+3. Admission control - calls beyond pool size + queue depth are rejected
+   immediately instead of piling up behind slow providers
+4. Context propagation so telemetry route labels survive the thread hop
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+AGENT_POOL_SIZE = int(os.environ.get('AGENT_POOL_SIZE', 16))
+AGENT_MAX_QUEUED = int(os.environ.get('AGENT_MAX_QUEUED', 32))
+AGENT_REQUEST_TIMEOUT = float(os.environ.get('AGENT_REQUEST_TIMEOUT', 90))
+
+
+class PoolSaturated(Exception):
+    """Raised when the pool already has max_workers + max_queued calls"""
+
+    def __init__(self, message: str, retry_after: float = 2.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class PoolTimeout(Exception):
+    """Raised when a call did not finish within its timeout"""
+
+
+class BlockingPool:
+    """Thread pool with per-call timeouts and bounded admission"""
+
+    def __init__(self, max_workers: int = AGENT_POOL_SIZE, max_queued: int = AGENT_MAX_QUEUED,
+                 default_timeout: float = AGENT_REQUEST_TIMEOUT, name: str = 'agent'):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.default_timeout = default_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats = {'completed': 0, 'failed': 0, 'timeouts': 0, 'rejected': 0, 'peak_in_flight': 0}
+
+    def _admit(self):
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queued:
+                self._stats['rejected'] += 1
+                raise PoolSaturated(f"Agent is busy ({self._in_flight} requests in progress)")
+            self._in_flight += 1
+            self._stats['peak_in_flight'] = max(self._stats['peak_in_flight'], self._in_flight)
+
+    def _release(self, future):
+        failed = future.cancelled() or future.exception() is not None
+        with self._lock:
+            self._in_flight -= 1
+            self._stats['failed' if failed else 'completed'] += 1
+
+    async def run(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs):
+        """Run func(*args, **kwargs) on the pool and await its result"""
+        self._admit()
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        future = loop.run_in_executor(self._executor, partial(context.run, func, *args, **kwargs))
+        # The slot is held until the thread really finishes, even after a timeout
+        future.add_done_callback(self._release)
+
+        timeout = timeout or self.default_timeout
+        started = time.perf_counter()
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._stats['timeouts'] += 1
+            logger.warning(f"{getattr(func, '__name__', func)} timed out after {time.perf_counter() - started:.1f}s")
+            raise PoolTimeout(f"Request timed out after {timeout:.0f}s")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'max_workers': self.max_workers, 'max_queued': self.max_queued,
+                    'in_flight': self._in_flight, **self._stats}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
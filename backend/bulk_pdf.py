@@ -0,0 +1,348 @@
+"""
+Bulk Unit Study Guide Generation
+Generates the study guide PDF of every syllabus unit (generate_all_pdfs.py)
+without walking the units one by one with a fixed sleep in between
+
+This module implements:
+1. A two-stage pipeline - an LLM-bound stage (fetch sources, hash, synthesize)
+   on a thread pool and a CPU-bound reportlab render stage on a process pool,
+   so rendering one unit overlaps with synthesizing the next
+2. Provider-aware pacing - synthesis takes a 'bulk_pdf' rate limit token and
+   the provider concurrency slots inside ai.py, so a bulk run leaves
+   headroom for live traffic instead of sleeping a fixed 3 seconds
+3. Change detection - units whose inputs hash to an existing PDF (see
+   backend/pdf_cache.py) are reused without an LLM call unless forced
+4. A persistent JSON checkpoint of every unit's outcome: an interrupted run
+   resumes where it stopped and --retry-failed re-runs only failed units
+5. Live progress with throughput and ETA
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, List, Optional
+
+from backend.local_store import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+# Synthesis calls in flight; keep below PROVIDER_MAX_CONCURRENCY_BYTEZ so live requests get a slot
+BULK_PDF_LLM_WORKERS = int(os.environ.get('BULK_PDF_LLM_WORKERS', 3))
+BULK_PDF_RENDER_WORKERS = int(os.environ.get('BULK_PDF_RENDER_WORKERS', min(4, os.cpu_count() or 1)))
+# Attempts per unit within one run (provider errors, rate limit timeouts)
+BULK_PDF_MAX_ATTEMPTS = int(os.environ.get('BULK_PDF_MAX_ATTEMPTS', 3))
+# Longest a worker waits for a 'bulk_pdf' rate limit token
+BULK_PDF_MAX_WAIT = float(os.environ.get('BULK_PDF_MAX_WAIT', 600))
+BULK_PDF_CHECKPOINT = os.environ.get('BULK_PDF_CHECKPOINT', os.path.join(DATA_DIR, 'bulk_pdf_checkpoint.json'))
+RETRY_BACKOFF = 5.0
+
+GENERATED = 'generated'
+CACHED = 'cached'
+FAILED = 'failed'
+FINISHED = (GENERATED, CACHED)
+
+
+def unit_key(subject_code, unit_number) -> str:
+    return f"{subject_code}:{int(unit_number)}"
+
+
+class Checkpoint:
+    """Per-unit outcome of the current bulk run, rewritten atomically after every unit"""
+
+    def __init__(self, path: str = BULK_PDF_CHECKPOINT):
+        self.path = path
+        self._lock = threading.Lock()
+        self.run: Dict = {}
+        self.units: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    state = json.load(f)
+                self.run, self.units = state.get('run') or {}, state.get('units') or {}
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable checkpoint {path}: {e}")
+
+    @property
+    def interrupted(self) -> bool:
+        """True if the last run did not finish (its finished units are skipped on resume)"""
+        return bool(self.run) and not self.run.get('finished_at')
+
+    def start_run(self, fresh: bool = False):
+        with self._lock:
+            if fresh or not self.interrupted:
+                self.run, self.units = {'started_at': time.time()}, {}
+            self.run['finished_at'] = None
+            self._save()
+
+    def finish_run(self):
+        with self._lock:
+            self.run['finished_at'] = time.time()
+            self._save()
+
+    def status(self, key: str) -> Optional[str]:
+        return (self.units.get(key) or {}).get('status')
+
+    def record(self, key: str, status: str, **fields):
+        with self._lock:
+            entry = self.units.setdefault(key, {'attempts': 0})
+            entry.update(fields, status=status, updated_at=time.time())
+            if status != CACHED:
+                entry['attempts'] += 1
+            if status != FAILED:
+                entry.pop('error', None)
+            self._save()
+
+    def failed(self) -> List[str]:
+        return [key for key, entry in self.units.items() if entry.get('status') == FAILED]
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        partial = f"{self.path}.partial"
+        with open(partial, 'w') as f:
+            json.dump({'run': self.run, 'units': self.units}, f, indent=1)
+        os.replace(partial, self.path)
+
+
+class Progress:
+    """Running counts, throughput and ETA of a bulk run"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.counts = {GENERATED: 0, CACHED: 0, FAILED: 0}
+        self.started = time.time()
+
+    @property
+    def finished(self) -> int:
+        return sum(self.counts.values())
+
+    def add(self, status: str):
+        self.counts[status] += 1
+
+    def eta(self) -> Optional[float]:
+        """Seconds left at the run's throughput so far"""
+        elapsed = time.time() - self.started
+        if not self.finished or elapsed <= 0:
+            return None
+        return (self.total - self.finished) * elapsed / self.finished
+
+    def line(self) -> str:
+        elapsed = time.time() - self.started
+        rate = self.finished * 60.0 / elapsed if elapsed > 0 else 0.0
+        eta = self.eta()
+        return (f"{self.finished}/{self.total} | generated {self.counts[GENERATED]}, "
+                f"unchanged {self.counts[CACHED]}, failed {self.counts[FAILED]} | "
+                f"{rate:.1f} units/min | ETA {_duration(eta) if eta is not None else '?'}")
+
+
+def _duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def load_units(subject_codes: Optional[List[str]] = None, client=None) -> List[Dict]:
+    """Every distinct (subject_code, unit_number) in the syllabus table"""
+    from backend.pyq_ingest import _fetch_all
+
+    if client is None:
+        from backend.supabase_client import supabase as client
+
+    # Paged reads: a single select stops at the API's 1000-row cap
+    wanted = {str(code) for code in subject_codes} if subject_codes else None
+    subjects = {s['id']: s for s in _fetch_all(client, "subjects", "id, subject_code, subject_name")
+                if wanted is None or str(s['subject_code']) in wanted}
+    if not subjects:
+        return []
+
+    rows = [row for row in _fetch_all(client, "syllabus", "subject_id, unit_number, unit_title")
+            if row['subject_id'] in subjects]
+    units = {}
+    for row in rows:
+        subject = subjects[row['subject_id']]
+        key = unit_key(subject['subject_code'], row['unit_number'])
+        units.setdefault(key, {
+            "subject_code": subject['subject_code'],
+            "subject_name": subject['subject_name'],
+            "unit_number": int(row['unit_number']),
+            "unit_title": row.get('unit_title') or f"Unit {row['unit_number']}",
+        })
+    return sorted(units.values(), key=lambda u: (u['subject_code'], u['unit_number']))
+
+
+class BulkPDFRunner:
+    """
+    Two-stage bulk generator. The stage functions default to the ones in
+    backend/pdf_generator.py; tests pass fakes.
+    """
+
+    def __init__(self, checkpoint: Optional[Checkpoint] = None,
+                 llm_workers: int = BULK_PDF_LLM_WORKERS,
+                 render_workers: int = BULK_PDF_RENDER_WORKERS,
+                 max_attempts: int = BULK_PDF_MAX_ATTEMPTS,
+                 render_processes: bool = True,
+                 pace: bool = True,
+                 cache=None,
+                 prepare: Optional[Callable] = None,
+                 synthesize: Optional[Callable] = None,
+                 render: Optional[Callable] = None,
+                 reuse: Optional[Callable] = None,
+                 publish: Optional[Callable] = None):
+        self.checkpoint = checkpoint or Checkpoint()
+        self.llm_workers = max(1, llm_workers)
+        self.render_workers = max(1, render_workers)
+        self.max_attempts = max(1, max_attempts)
+        self.render_processes = render_processes
+        self.pace = pace
+        self.retry_backoff = RETRY_BACKOFF
+        self._cache = cache
+        self._stages = {'prepare': prepare, 'synthesize': synthesize, 'render': render,
+                        'reuse': reuse, 'publish': publish}
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            from backend.pdf_cache import get_pdf_cache
+            self._cache = get_pdf_cache()
+        return self._cache
+
+    def _stage(self, name: str) -> Callable:
+        if self._stages[name] is None:
+            from backend import pdf_generator
+            self._stages.update(
+                prepare=self._stages['prepare'] or pdf_generator.prepare_unit,
+                synthesize=self._stages['synthesize'] or pdf_generator.synthesize_content_with_ai,
+                render=self._stages['render'] or pdf_generator.render_unit_pdf,
+                reuse=self._stages['reuse'] or pdf_generator.reuse_unit_pdf,
+                publish=self._stages['publish'] or pdf_generator.publish_unit_pdf,
+            )
+        return self._stages[name]
+
+    # ---------- selection ----------
+
+    def select(self, units: List[Dict], retry_failed: bool = False) -> List[Dict]:
+        """Units this run still has to process"""
+        if retry_failed:
+            failed = set(self.checkpoint.failed())
+            return [u for u in units if unit_key(u['subject_code'], u['unit_number']) in failed]
+        if self.checkpoint.interrupted:
+            return [u for u in units
+                    if self.checkpoint.status(unit_key(u['subject_code'], u['unit_number'])) not in FINISHED]
+        return list(units)
+
+    # ---------- LLM stage ----------
+
+    def _synthesize(self, unit: Dict, force: bool):
+        """Fetch, hash and synthesize one unit. Returns (job, content); content is None if unchanged."""
+        from backend.ai import is_error_response
+        from backend.telemetry import current_route
+
+        job = self._stage('prepare')(unit['subject_code'], unit['unit_number'], refresh=force)
+        if job.get('cached'):
+            return job, None
+
+        token = current_route.set('bulk_pdf')
+        try:
+            for attempt in range(1, self.max_attempts + 1):
+                try:
+                    if self.pace:
+                        from backend.rate_limit import get_rate_limiter
+                        get_rate_limiter().wait_for_token('bulk_pdf', 'batch', max_wait=BULK_PDF_MAX_WAIT,
+                                                          max_waiters=self.llm_workers + 1)
+                    content = self._stage('synthesize')(job['data'], unit['subject_code'], unit['unit_number'])
+                    if not is_error_response(content):
+                        return job, content
+                    error = "AI synthesis failed"
+                except Exception as e:
+                    error = str(e)
+                if attempt < self.max_attempts:
+                    logger.warning(f"{unit_key(unit['subject_code'], unit['unit_number'])} attempt "
+                                   f"{attempt} failed ({error}), retrying")
+                    time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+            raise RuntimeError(error)
+        finally:
+            current_route.reset(token)
+
+    # ---------- run ----------
+
+    def _render_pool(self):
+        if self.render_processes:
+            # Shared with every other batch renderer: spawned workers with the styles pre-compiled
+            from backend.pdf_render import render_pool
+            return render_pool(self.render_workers)
+        return ThreadPoolExecutor(max_workers=self.render_workers, thread_name_prefix='bulk-pdf-render')
+
+    def run(self, units: List[Dict], force: bool = False, retry_failed: bool = False, fresh: bool = False,
+            progress: Optional[Callable[[str], None]] = None) -> Dict:
+        """
+        Generate every selected unit. Every outcome is checkpointed as it
+        happens, so an interrupted run resumes with the units it had not
+        finished.
+        """
+        if not retry_failed:
+            self.checkpoint.start_run(fresh=fresh)
+        todo = self.select(units, retry_failed=retry_failed)
+        tracker = Progress(len(todo))
+        logger.info(f"Bulk PDF run: {len(todo)} of {len(units)} units to process")
+
+        def finish(unit, status, **fields):
+            self.checkpoint.record(unit_key(unit['subject_code'], unit['unit_number']), status, **fields)
+            tracker.add(status)
+            if status == FAILED:
+                logger.warning(f"{unit['subject_code']} unit {unit['unit_number']} failed: {fields.get('error')}")
+            if progress:
+                progress(tracker.line())
+
+        with ThreadPoolExecutor(max_workers=self.llm_workers, thread_name_prefix='bulk-pdf-llm') as llm_pool, \
+                self._render_pool() as render_pool:
+            pending = {llm_pool.submit(self._synthesize, unit, force): ('llm', unit, None) for unit in todo}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, unit, writer = pending.pop(future)
+                    if stage == 'llm':
+                        try:
+                            job, content = future.result()
+                        except Exception as e:
+                            finish(unit, FAILED, error=str(e))
+                            continue
+                        if content is None:
+                            try:
+                                result = self._stage('reuse')(job)
+                                finish(unit, CACHED, input_hash=job['input_hash'], filename=result.get('filename'))
+                            except Exception as e:
+                                finish(unit, FAILED, error=str(e))
+                            continue
+                        # Only what the renderer needs crosses the process boundary
+                        render_job = {k: v for k, v in job.items() if k not in ('data', 'cached')}
+                        writer = (job, self.cache.writing(job['filename']))
+                        file_path = writer[1].__enter__()
+                        pending[render_pool.submit(self._stage('render'), render_job, content, file_path)] = \
+                            ('render', unit, writer)
+                        continue
+
+                    job, writing = writer
+                    try:
+                        future.result()
+                    except Exception as e:
+                        writing.__exit__(type(e), e, e.__traceback__)
+                        finish(unit, FAILED, error=f"render: {e}")
+                        continue
+                    try:
+                        writing.__exit__(None, None, None)
+                        result = self._stage('publish')(job)
+                        finish(unit, GENERATED, input_hash=job['input_hash'], filename=result.get('filename'))
+                    except Exception as e:
+                        finish(unit, FAILED, error=str(e))
+
+        self.checkpoint.finish_run()
+        status = 'completed' if tracker.counts[FAILED] == 0 else 'partial'
+        return {'status': status, 'total': len(units), 'processed': len(todo),
+                'elapsed': round(time.time() - tracker.started, 1), **tracker.counts}
@@ -0,0 +1,376 @@
+"""
+Cluster-Wide Job Scheduling
+APScheduler jobs that run once per cluster instead of once per worker process
+
+This module implements:
+1. Leader election per scheduler group - a file lock (every worker on one
+   host) or a database lease (several hosts, backend/db/create_scheduler_tables.sql).
+   Followers keep trying on every heartbeat and take over when the leader dies.
+2. Persisted job state - last run, status, duration and error per job
+3. Missed-run catch-up - a run that fell due while no leader was up (deploy,
+   restart, crash) is made up once when leadership is gained
+4. Jitter and quiet windows - jobs start with a random delay, and heavy jobs
+   due during peak API traffic hours are deferred to the end of the window
+
+Every process registers the same jobs; the wrapper only runs them on the
+leader, so a follower needs no special code path to take over.
+"""
+
+import os
+import time
+import uuid
+import random
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+
+from backend.local_store import DATA_DIR, connect, get_db_path
+
+logger = logging.getLogger(__name__)
+
+# "file" (one host) or "db" (Supabase lease, several hosts)
+SCHEDULER_LEADER_BACKEND = os.environ.get('SCHEDULER_LEADER_BACKEND', 'file').lower()
+SCHEDULER_HEARTBEAT = float(os.environ.get('SCHEDULER_HEARTBEAT', 30))
+SCHEDULER_LEASE_TTL = int(os.environ.get('SCHEDULER_LEASE_TTL', 90))
+# Peak API traffic hours, local time: heavy jobs never start inside them
+SCHEDULER_QUIET_HOURS = os.environ.get('SCHEDULER_QUIET_HOURS', '08:00-23:00')
+# Missed runs older than this are skipped instead of caught up
+SCHEDULER_CATCH_UP = float(os.environ.get('SCHEDULER_CATCH_UP', 24 * 3600))
+SCHEDULER_JITTER = int(os.environ.get('SCHEDULER_JITTER', 300))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scheduler_jobs (
+    group_name TEXT NOT NULL,
+    job_id TEXT NOT NULL,
+    last_run_at REAL,
+    last_status TEXT,
+    last_duration REAL,
+    last_error TEXT,
+    runs INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (group_name, job_id)
+);
+"""
+
+
+# ---------- leader election ----------
+
+class FileLeaderLock:
+    """
+    Exclusive flock on a file per group. The OS drops the lock when the
+    holding process exits, however it exits.
+    """
+
+    def __init__(self, name: str, path: Optional[str] = None):
+        self.name = name
+        self.path = path or os.path.join(DATA_DIR, f"scheduler-{name}.lock")
+        self._fd = None
+
+    def try_acquire(self) -> bool:
+        import fcntl
+
+        if self._fd is not None:
+            return True
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            import fcntl
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+class DatabaseLeaderLease:
+    """Expiring lease row taken/renewed through the try_scheduler_lease RPC"""
+
+    def __init__(self, name: str, client=None, ttl: int = SCHEDULER_LEASE_TTL):
+        self.name = name
+        self.client = client
+        self.ttl = ttl
+        self.owner = f"{os.uname().nodename}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def _client(self):
+        if self.client is None:
+            from backend.supabase_client import supabase
+            self.client = supabase
+        return self.client
+
+    def try_acquire(self) -> bool:
+        try:
+            result = self._client().rpc('try_scheduler_lease', {
+                'lease_name': self.name, 'lease_owner': self.owner, 'ttl_seconds': self.ttl
+            }).execute()
+            return bool(result.data)
+        except Exception as e:
+            logger.warning(f"Scheduler lease check failed for {self.name}: {e}")
+            return False
+
+    def release(self):
+        try:
+            self._client().rpc('release_scheduler_lease', {'lease_name': self.name,
+                                                           'lease_owner': self.owner}).execute()
+        except Exception as e:
+            logger.warning(f"Could not release scheduler lease {self.name}: {e}")
+
+
+# ---------- job state ----------
+
+class LocalJobState:
+    """Job state in the local store (shared by every worker on the host)"""
+
+    def __init__(self, group: str, db_path: Optional[str] = None):
+        self.group = group
+        self.db_path = db_path or get_db_path('scheduler')
+        connect(self.db_path).executescript(SCHEMA)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        row = connect(self.db_path).execute("SELECT * FROM scheduler_jobs WHERE group_name = ? AND job_id = ?",
+                                            (self.group, job_id)).fetchone()
+        return dict(row) if row else None
+
+    def record(self, job_id: str, started_at: float, status: str, duration: float, error: Optional[str] = None):
+        connect(self.db_path).execute(
+            """INSERT INTO scheduler_jobs (group_name, job_id, last_run_at, last_status, last_duration, last_error, runs)
+               VALUES (?, ?, ?, ?, ?, ?, 1)
+               ON CONFLICT(group_name, job_id) DO UPDATE SET
+                   last_run_at = excluded.last_run_at, last_status = excluded.last_status,
+                   last_duration = excluded.last_duration, last_error = excluded.last_error,
+                   runs = scheduler_jobs.runs + 1""",
+            (self.group, job_id, started_at, status, duration, error)
+        )
+
+
+class SupabaseJobState:
+    """Job state in the shared database, for the db leader backend"""
+
+    def __init__(self, group: str, client=None):
+        self.group = group
+        self.client = client
+
+    def _client(self):
+        if self.client is None:
+            from backend.supabase_client import supabase
+            self.client = supabase
+        return self.client
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        rows = self._client().table('scheduler_jobs').select('*').eq('group_name', self.group) \
+            .eq('job_id', job_id).execute().data
+        return rows[0] if rows else None
+
+    def record(self, job_id: str, started_at: float, status: str, duration: float, error: Optional[str] = None):
+        previous = self.get(job_id) or {}
+        self._client().table('scheduler_jobs').upsert({
+            'group_name': self.group, 'job_id': job_id, 'last_run_at': started_at, 'last_status': status,
+            'last_duration': duration, 'last_error': error, 'runs': (previous.get('runs') or 0) + 1
+        }).execute()
+
+
+# ---------- quiet windows ----------
+
+def parse_windows(spec: str) -> List[Tuple[int, int]]:
+    """'08:00-12:30,14:00-23:00' -> [(480, 750), (840, 1380)] in minutes; a window may wrap midnight"""
+    def minutes(hhmm: str) -> int:
+        hours, _, mins = hhmm.strip().partition(':')
+        return int(hours) * 60 + int(mins or 0)
+
+    windows = []
+    for part in (spec or '').split(','):
+        if part.strip():
+            start, end = part.split('-')
+            windows.append((minutes(start), minutes(end)))
+    return windows
+
+
+def quiet_until(now: datetime, windows: List[Tuple[int, int]]) -> Optional[datetime]:
+    """End of the quiet window now falls in, or None when outside all windows"""
+    minute = now.hour * 60 + now.minute
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    for start, end in windows:
+        if start <= end and start <= minute < end:
+            return midnight + timedelta(minutes=end)
+        if start > end:  # wraps midnight
+            if minute >= start:
+                return midnight + timedelta(days=1, minutes=end)
+            if minute < end:
+                return midnight + timedelta(minutes=end)
+    return None
+
+
+# ---------- scheduler ----------
+
+class ScheduledJob:
+    def __init__(self, job_id: str, func: Callable, trigger: CronTrigger, heavy: bool, jitter: int, catch_up: float):
+        self.job_id = job_id
+        self.func = func
+        self.trigger = trigger
+        self.heavy = heavy
+        self.jitter = jitter
+        self.catch_up = catch_up
+
+
+class ClusterScheduler:
+    """
+    BackgroundScheduler wrapper whose jobs run only on the group leader.
+
+    Usage:
+        scheduler = ClusterScheduler('agent')
+        scheduler.add_job(nightly_task, 'nightly', heavy=True, hour=2, minute=30)
+        scheduler.start()
+    """
+
+    def __init__(self, group: str, scheduler: Optional[BackgroundScheduler] = None, lock=None, state=None,
+                 quiet_hours: str = SCHEDULER_QUIET_HOURS, heartbeat: float = SCHEDULER_HEARTBEAT,
+                 backend: str = SCHEDULER_LEADER_BACKEND, clock: Callable[[], datetime] = datetime.now):
+        self.group = group
+        self.scheduler = scheduler or BackgroundScheduler()
+        if lock is None:
+            lock = DatabaseLeaderLease(group) if backend == 'db' else FileLeaderLock(group)
+        if state is None:
+            state = SupabaseJobState(group) if backend == 'db' else LocalJobState(group)
+        self.lock = lock
+        self.state = state
+        self.quiet_windows = parse_windows(quiet_hours)
+        self.heartbeat = heartbeat
+        self.clock = clock
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self.is_leader = False
+        self._running: set = set()
+        self._guard = threading.Lock()
+
+    def add_job(self, func: Callable, job_id: str, heavy: bool = False, jitter: Optional[int] = None,
+                catch_up: float = SCHEDULER_CATCH_UP, **cron):
+        """Register a cron job (cron keywords as for APScheduler's CronTrigger)"""
+        jitter = SCHEDULER_JITTER if jitter is None else jitter
+        trigger = CronTrigger(**cron)
+        self.jobs[job_id] = ScheduledJob(job_id, func, trigger, heavy, jitter, catch_up)
+        self.scheduler.add_job(self.run_job, CronTrigger(jitter=jitter or None, **cron), args=[job_id],
+                               id=job_id, replace_existing=True, coalesce=True, max_instances=1,
+                               misfire_grace_time=max(60, jitter or 0))
+
+    def start(self):
+        self.scheduler.start()
+        self.scheduler.add_job(self.check_leadership, 'interval', seconds=self.heartbeat,
+                               id='_leader_heartbeat', replace_existing=True, max_instances=1)
+        self.check_leadership()
+
+    def shutdown(self):
+        self.scheduler.shutdown(wait=False)
+        if self.is_leader:
+            self.lock.release()
+            self.is_leader = False
+
+    # ---------- leadership ----------
+
+    def check_leadership(self):
+        """Take or renew leadership; a new leader catches up missed runs"""
+        was_leader = self.is_leader
+        self.is_leader = self.lock.try_acquire()
+        if self.is_leader and not was_leader:
+            logger.info(f"Scheduler '{self.group}': this process (pid {os.getpid()}) is the leader")
+            self.catch_up()
+        elif was_leader and not self.is_leader:
+            logger.warning(f"Scheduler '{self.group}': lost leadership")
+
+    def missed_run(self, job: ScheduledJob, now: datetime) -> Optional[datetime]:
+        """
+        Latest scheduled time before now that has no run recorded (within
+        catch_up). A job with no recorded run at all is not caught up: that
+        is a first boot or a fresh local state (the file backend's state is
+        wiped on every deploy), not evidence that a run was missed.
+        """
+        state = self.state.get(job.job_id) or {}
+        last_run = state.get('last_run_at')
+        if not last_run:
+            return None
+        tz = job.trigger.timezone
+        cursor = datetime.fromtimestamp(max(now.timestamp() - job.catch_up, last_run), tz)
+        end = datetime.fromtimestamp(now.timestamp(), tz)
+
+        due = None
+        fire = job.trigger.get_next_fire_time(None, cursor)
+        while fire is not None and fire <= end:
+            due = fire
+            fire = job.trigger.get_next_fire_time(fire, fire + timedelta(seconds=1))
+        if due is None or last_run >= due.timestamp():
+            return None
+        return due
+
+    def catch_up(self):
+        now = self.clock()
+        for job in self.jobs.values():
+            due = self.missed_run(job, now)
+            if due is None:
+                continue
+            delay = random.uniform(0, job.jitter) if job.jitter else 0
+            logger.info(f"Scheduler '{self.group}': catching up {job.job_id} (due {due:%Y-%m-%d %H:%M})")
+            self._schedule_once(job.job_id, now + timedelta(seconds=delay), 'catch-up')
+
+    def _schedule_once(self, job_id: str, when: datetime, reason: str):
+        self.scheduler.add_job(self.run_job, 'date', run_date=when, args=[job_id], id=f"{job_id}:{reason}",
+                               replace_existing=True, misfire_grace_time=None)
+
+    # ---------- execution ----------
+
+    def run_job(self, job_id: str) -> Optional[str]:
+        """Run a job if this process leads and the time is right; returns what happened"""
+        job = self.jobs[job_id]
+        if not self.is_leader:
+            return 'follower'
+
+        now = self.clock()
+        if job.heavy:
+            until = quiet_until(now, self.quiet_windows)
+            if until is not None:
+                when = until + timedelta(seconds=random.uniform(0, job.jitter) if job.jitter else 0)
+                logger.info(f"Scheduler '{self.group}': {job_id} deferred to {when:%H:%M} (peak traffic window)")
+                self._schedule_once(job_id, when, 'deferred')
+                return 'deferred'
+
+        with self._guard:
+            if job_id in self._running:
+                return 'overlap'
+            self._running.add(job_id)
+        started = time.time()
+        try:
+            job.func()
+            status, error = 'ok', None
+        except Exception as e:
+            status, error = 'failed', str(e)
+            logger.error(f"Scheduled job {job_id} failed: {e}")
+        finally:
+            with self._guard:
+                self._running.discard(job_id)
+        try:
+            self.state.record(job_id, started, status, time.time() - started, error)
+        except Exception as e:
+            logger.warning(f"Could not record run of {job_id}: {e}")
+        return status
+
+    def status(self) -> Dict:
+        jobs = {}
+        for job_id in self.jobs:
+            scheduled = self.scheduler.get_job(job_id)
+            state = self.state.get(job_id) or {}
+            jobs[job_id] = {
+                'heavy': self.jobs[job_id].heavy,
+                'next_run': scheduled.next_run_time.isoformat() if scheduled and scheduled.next_run_time else None,
+                'last_run_at': state.get('last_run_at'),
+                'last_status': state.get('last_status'),
+                'last_duration': state.get('last_duration')
+            }
+        return {'group': self.group, 'leader': self.is_leader, 'pid': os.getpid(), 'jobs': jobs}
@@ -0,0 +1,42 @@
+-- Shared predicted paper cache (backend/prediction_cache.py, PREDICTION_CACHE_BACKEND=db)
+-- Run after create_predicted_papers_table.sql
+
+-- Cache metadata: what the prediction was made from and when
+ALTER TABLE predicted_papers ADD COLUMN IF NOT EXISTS input_hash VARCHAR(64);
+ALTER TABLE predicted_papers ADD COLUMN IF NOT EXISTS version INTEGER;
+ALTER TABLE predicted_papers ADD COLUMN IF NOT EXISTS source VARCHAR(20);
+ALTER TABLE predicted_papers ADD COLUMN IF NOT EXISTS generated_at DOUBLE PRECISION;
+
+-- Upserts replace the cached paper in place
+DROP POLICY IF EXISTS "Everyone can update predicted papers" ON predicted_papers;
+CREATE POLICY "Everyone can update predicted papers" ON predicted_papers
+    FOR UPDATE USING (true);
+
+-- Single-flight generation: one lease row per (subject, input hash)
+CREATE TABLE IF NOT EXISTS prediction_leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+-- Take a lease unless another owner holds an unexpired one. The advisory lock
+-- serializes contenders for the same key.
+CREATE OR REPLACE FUNCTION try_prediction_lease(lease_key TEXT, lease_owner TEXT, ttl_seconds INTEGER)
+RETURNS BOOLEAN LANGUAGE plpgsql AS $$
+DECLARE
+    holder TEXT;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('prediction_lease:' || lease_key));
+    INSERT INTO prediction_leases AS l (key, owner, expires_at)
+    VALUES (lease_key, lease_owner, NOW() + make_interval(secs => ttl_seconds))
+    ON CONFLICT (key) DO UPDATE
+        SET owner = EXCLUDED.owner, expires_at = EXCLUDED.expires_at
+        WHERE l.owner = EXCLUDED.owner OR l.expires_at < NOW()
+    RETURNING owner INTO holder;
+    RETURN COALESCE(holder = lease_owner, FALSE);
+END $$;
+
+CREATE OR REPLACE FUNCTION release_prediction_lease(lease_key TEXT, lease_owner TEXT)
+RETURNS VOID LANGUAGE sql AS $$
+    DELETE FROM prediction_leases WHERE key = lease_key AND owner = lease_owner;
+$$;
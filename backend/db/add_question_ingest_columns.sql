@@ -0,0 +1,18 @@
+-- Columns used by the previous paper ingestion pipeline (backend/pyq_ingest.py)
+
+-- Hash of subject + normalized question text; the upsert conflict key
+ALTER TABLE questions ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_questions_content_hash ON questions(content_hash);
+
+-- Number of ingested papers the question appeared in (written by every ingest;
+-- frequency_count starts from it but then belongs to the dedup write-back)
+ALTER TABLE questions ADD COLUMN IF NOT EXISTS paper_count INTEGER;
+
+-- Latest exam the question was asked in
+ALTER TABLE questions ADD COLUMN IF NOT EXISTS last_asked_year INTEGER;
+ALTER TABLE questions ADD COLUMN IF NOT EXISTS last_asked_session VARCHAR(10); -- Summer, Winter
+
+-- Near-duplicate clusters (backend/question_dedup.py): the canonical row of a
+-- question's cluster; frequency_count is then the cluster's true frequency
+ALTER TABLE questions ADD COLUMN IF NOT EXISTS canonical_question_id INTEGER REFERENCES questions(id) ON DELETE SET NULL;
+CREATE INDEX IF NOT EXISTS idx_questions_canonical ON questions(canonical_question_id);
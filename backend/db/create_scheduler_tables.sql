@@ -0,0 +1,43 @@
+-- Cluster-wide scheduler state (backend/cluster_scheduler.py, SCHEDULER_LEADER_BACKEND=db)
+
+-- One row per scheduler group: the instance that currently runs its jobs
+CREATE TABLE IF NOT EXISTS scheduler_leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+-- Last run of every scheduled job, used for missed-run catch-up
+CREATE TABLE IF NOT EXISTS scheduler_jobs (
+    group_name TEXT NOT NULL,
+    job_id TEXT NOT NULL,
+    last_run_at DOUBLE PRECISION,
+    last_status VARCHAR(20),
+    last_duration DOUBLE PRECISION,
+    last_error TEXT,
+    runs INTEGER DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (group_name, job_id)
+);
+
+-- Take or renew a lease. The advisory lock serializes contenders for the same
+-- name; the row survives the transaction and expires unless renewed.
+CREATE OR REPLACE FUNCTION try_scheduler_lease(lease_name TEXT, lease_owner TEXT, ttl_seconds INTEGER)
+RETURNS BOOLEAN LANGUAGE plpgsql AS $$
+DECLARE
+    holder TEXT;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('scheduler_lease:' || lease_name));
+    INSERT INTO scheduler_leases AS l (name, owner, expires_at)
+    VALUES (lease_name, lease_owner, NOW() + make_interval(secs => ttl_seconds))
+    ON CONFLICT (name) DO UPDATE
+        SET owner = EXCLUDED.owner, expires_at = EXCLUDED.expires_at
+        WHERE l.owner = EXCLUDED.owner OR l.expires_at < NOW()
+    RETURNING owner INTO holder;
+    RETURN COALESCE(holder = lease_owner, FALSE);
+END $$;
+
+CREATE OR REPLACE FUNCTION release_scheduler_lease(lease_name TEXT, lease_owner TEXT)
+RETURNS VOID LANGUAGE sql AS $$
+    DELETE FROM scheduler_leases WHERE name = lease_name AND owner = lease_owner;
+$$;
@@ -0,0 +1,390 @@
+"""
+Fake OpenAI/Groq-compatible LLM Provider
+Local stand-in for Groq / Lightning so AI routes can be load-tested and run
+offline without spending provider quota
+
+This module implements:
+1. POST /v1/chat/completions (plain and streaming SSE) in the OpenAI format
+2. Configurable latency distributions, time-to-first-token and chunk cadence
+3. Error injection: HTTP 500, 429 with Retry-After, hangs and garbled output
+4. Deterministic canned outputs keyed on the prompt, including valid JSON for
+   paper prediction, GTU answers, agent decisions and batched prompts
+5. /_stats (in-flight, peak concurrency, status counts), /_config and /_reset
+
+Run:  python -m backend.fake_llm_server --port 8090 --latency lognormal:0.8,0.5
+Then start the backend with AI_OFFLINE=1 (and FAKE_LLM_URL if not the default).
+"""
+
+import re
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+DEFAULT_CONFIG = {
+    'latency': 'lognormal:0.6,0.5',   # total time for non-streaming responses
+    'first_token': 'uniform:0.2,0.5',  # streaming: delay before the first chunk
+    'chunk_interval': 0.03,            # streaming: seconds between chunks
+    'chunk_words': 3,                  # streaming: words per chunk
+    'error_rate': 0.0,                 # HTTP 500
+    'rate_limit_rate': 0.0,            # HTTP 429 with Retry-After
+    'timeout_rate': 0.0,               # hang for hang_seconds, then drop the connection
+    'hang_seconds': 35.0,
+    'garble_rate': 0.0,                # truncate the completion mid-way (broken JSON)
+    'seed': 1234,
+}
+
+WORDS = ("process memory scheduling algorithm complexity structure network protocol layer "
+         "database normalization transaction index query graph tree traversal stack queue "
+         "pointer recursion thread deadlock semaphore paging cache register compiler parser "
+         "grammar automaton signal system model design pattern interface").split()
+
+
+def sample_latency(spec, rng: random.Random) -> float:
+    """
+    Sample seconds from a distribution spec:
+    fixed:S | uniform:A,B | normal:MU,SIGMA | lognormal:MEDIAN,SIGMA | exp:MEAN
+    A bare number is treated as fixed.
+    """
+    if isinstance(spec, (int, float)):
+        return float(spec)
+    kind, _, args = str(spec).partition(':')
+    if not args:
+        return float(kind)
+    values = [float(v) for v in args.split(',')]
+    if kind == 'fixed':
+        value = values[0]
+    elif kind == 'uniform':
+        value = rng.uniform(values[0], values[1])
+    elif kind == 'normal':
+        value = rng.gauss(values[0], values[1])
+    elif kind == 'lognormal':
+        value = rng.lognormvariate(math.log(values[0]), values[1])
+    elif kind == 'exp':
+        value = rng.expovariate(1.0 / values[0])
+    else:
+        raise ValueError(f"Unknown latency distribution: {spec}")
+    return max(0.0, value)
+
+
+def _prompt_seed(messages: List[Dict]) -> int:
+    encoded = json.dumps(messages, sort_keys=True).encode('utf-8')
+    return int(hashlib.sha256(encoded).hexdigest()[:12], 16)
+
+
+def _sentence(rng: random.Random, words: int = 12) -> str:
+    text = ' '.join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + '.'
+
+
+def _paragraphs(rng: random.Random, count: int = 3) -> str:
+    lines = [f"**{_sentence(rng, 3)[:-1]}**"]
+    for _ in range(count):
+        lines.append(f"- {_sentence(rng)}")
+    return '\n'.join(lines)
+
+
+# ---------- canned outputs ----------
+
+def _paper(rng: random.Random, subject_name: str) -> Dict:
+    """A valid 70-mark predicted paper: Q1-Q5 with (a) 3, (b) 4, (c) 7 marks"""
+    questions = []
+    for q in range(1, 6):
+        for part, marks in (('a', 3), ('b', 4), ('c', 7)):
+            questions.append({
+                "q_number": f"{q}({part})",
+                "question": f"Explain {rng.choice(WORDS)} {rng.choice(WORDS)} with an example.",
+                "marks": marks,
+                "unit": f"Unit {q}",
+                "chapter": rng.choice(WORDS).title(),
+                "probability": rng.choice(["High", "Medium", "Medium", "Low"])
+            })
+    return {"subject_name": subject_name, "questions": questions}
+
+
+def _decision(user_text: str) -> Dict:
+    """Agent tool choice from keywords in the request"""
+    text = user_text.lower()
+    url = re.search(r'https?://\S+', user_text)
+    if 'flashcard' in text:
+        return {"action": "generate_flashcards", "parameters": {"topic": user_text[:60], "count": 10}}
+    if url and ('youtu' in url.group(0) or 'summar' in text):
+        return {"action": "summarize_video", "parameters": {"video_url": url.group(0).rstrip('"')}}
+    if 'quiz' in text:
+        return {"action": "create_quiz", "parameters": {"topic": user_text[:60], "difficulty": "medium"}}
+    if 'pdf' in text or 'notes' in text:
+        return {"action": "generate_pdf", "parameters": {"subject_code": "3140705", "unit_number": 1}}
+    return {"action": "answer_question", "parameters": {"question": user_text}}
+
+
+def canned_completion(messages: List[Dict]) -> str:
+    """Deterministic completion for a conversation"""
+    rng = random.Random(_prompt_seed(messages))
+    prompt = messages[-1].get('content', '') if messages else ''
+    if not isinstance(prompt, str):
+        prompt = json.dumps(prompt)
+
+    # Batched multi-item prompt (backend/batching.py)
+    task_ids = re.findall(r'### Task id: (\S+)', prompt)
+    if task_ids:
+        wants_cards = '"question"' in prompt and 'array of' in prompt
+        items = []
+        for task_id in task_ids:
+            if wants_cards:
+                output = [{"question": f"What is {rng.choice(WORDS)}?", "answer": _sentence(rng)}
+                          for _ in range(3)]
+            else:
+                output = _paragraphs(rng, 2)
+            items.append({"id": task_id, "output": output})
+        return json.dumps(items)
+
+    if 'PREDICTED GTU EXAM PAPER' in prompt:
+        subject = re.search(r'Subject:\s*(.+)', prompt)
+        return json.dumps(_paper(rng, subject.group(1).strip() if subject else "Unknown"), indent=2)
+
+    if 'GTU exam answer' in prompt:
+        return json.dumps({
+            "answer": '\n'.join(f"{i}. {_sentence(rng)}" for i in range(1, 6)),
+            "unit": f"Unit {rng.randint(1, 5)}",
+            "chapter": rng.choice(WORDS).title(),
+            "diagram_suggestion": None
+        })
+
+    if 'Available tools:' in prompt and '"action"' in prompt:
+        request = re.search(r'User request: "(.*)"', prompt)
+        decision = _decision(request.group(1) if request else prompt)
+        decision.update({"reasoning": "keyword match (fake provider)", "confidence": 0.9})
+        return json.dumps(decision)
+
+    if 'flashcards' in prompt.lower() and 'CARD' in prompt:
+        count = re.search(r'Generate (\d+)', prompt)
+        return '\n\n'.join(
+            f"CARD {i}:\nQ: What is {rng.choice(WORDS)} {rng.choice(WORDS)}?\nA: {_sentence(rng)}"
+            for i in range(1, int(count.group(1)) + 1 if count else 6)
+        )
+
+    return '\n\n'.join(_paragraphs(rng) for _ in range(3))
+
+
+# ---------- server ----------
+
+class FakeProvider:
+    """Shared config, RNG and statistics for the request handlers"""
+
+    def __init__(self, **overrides):
+        self.config = dict(DEFAULT_CONFIG)
+        self.lock = threading.Lock()
+        self.configure(**overrides)
+        self.reset()
+
+    def configure(self, **overrides):
+        with self.lock:
+            self.config.update({k: v for k, v in overrides.items() if v is not None})
+            self.rng = random.Random(self.config['seed'])
+
+    def reset(self):
+        with self.lock:
+            self.stats = {'requests': 0, 'in_flight': 0, 'peak_in_flight': 0,
+                          'status': {}, 'injected': {}, 'started_at': time.time()}
+
+    def enter(self):
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats['in_flight'] += 1
+            self.stats['peak_in_flight'] = max(self.stats['peak_in_flight'], self.stats['in_flight'])
+
+    def leave(self, status: int):
+        with self.lock:
+            self.stats['in_flight'] -= 1
+            key = str(status)
+            self.stats['status'][key] = self.stats['status'].get(key, 0) + 1
+
+    def roll(self) -> Optional[str]:
+        """Pick an injected fault for this request (or None)"""
+        with self.lock:
+            r = self.rng.random()
+            for fault in ('error_rate', 'rate_limit_rate', 'timeout_rate', 'garble_rate'):
+                r -= float(self.config[fault])
+                if r < 0:
+                    name = fault[:-5]
+                    self.stats['injected'][name] = self.stats['injected'].get(name, 0) + 1
+                    return name
+        return None
+
+    def latency(self, key: str) -> float:
+        with self.lock:
+            return sample_latency(self.config[key], self.rng)
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            stats = json.loads(json.dumps(self.stats))
+        stats['uptime'] = time.time() - stats.pop('started_at')
+        stats['config'] = dict(self.config)
+        return stats
+
+
+def _completion_body(model: str, content: str, prompt_tokens: int) -> Dict:
+    completion_tokens = max(1, len(content) // 4)
+    return {
+        "id": f"chatcmpl-fake-{hashlib.md5(content.encode()).hexdigest()[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                  "total_tokens": prompt_tokens + completion_tokens}
+    }
+
+
+def make_handler(provider: FakeProvider):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _json(self, status: int, body: Dict, headers: Optional[Dict] = None):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self) -> Dict:
+            length = int(self.headers.get('Content-Length') or 0)
+            return json.loads(self.rfile.read(length) or b'{}')
+
+        def do_GET(self):
+            if self.path.rstrip('/') == '/_stats':
+                return self._json(200, provider.snapshot())
+            if self.path.rstrip('/').endswith('/models'):
+                return self._json(200, {"object": "list", "data": [{"id": "fake-gpt", "object": "model"}]})
+            self._json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            path = self.path.rstrip('/')
+            if path == '/_config':
+                provider.configure(**self._body())
+                return self._json(200, provider.snapshot())
+            if path == '/_reset':
+                provider.reset()
+                return self._json(200, provider.snapshot())
+            if not path.endswith('/chat/completions'):
+                return self._json(404, {"error": {"message": "not found"}})
+
+            provider.enter()
+            status = 200
+            try:
+                status = self._chat(self._body())
+            except (BrokenPipeError, ConnectionResetError):
+                status = 499
+            finally:
+                provider.leave(status)
+
+        def _chat(self, request: Dict) -> int:
+            messages = request.get('messages') or []
+            model = request.get('model', 'fake-gpt')
+            fault = provider.roll()
+
+            if fault == 'error':
+                time.sleep(provider.latency('first_token'))
+                self._json(500, {"error": {"message": "injected server error", "type": "server_error"}})
+                return 500
+            if fault == 'rate_limit':
+                self._json(429, {"error": {"message": "injected rate limit", "type": "rate_limit"}},
+                           headers={'Retry-After': '1'})
+                return 429
+            if fault == 'timeout':
+                time.sleep(float(provider.config['hang_seconds']))
+                self.close_connection = True
+                return 504
+
+            content = canned_completion(messages)
+            if fault == 'garble':
+                content = content[:max(1, len(content) // 2)]
+            prompt_tokens = max(1, len(json.dumps(messages)) // 4)
+
+            if request.get('stream'):
+                return self._stream(model, content)
+
+            time.sleep(provider.latency('latency'))
+            self._json(200, _completion_body(model, content, prompt_tokens))
+            return 200
+
+        def _stream(self, model: str, content: str) -> int:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            self.close_connection = True
+
+            time.sleep(provider.latency('first_token'))
+            words = re.findall(r'\S+\s*', content)
+            step = max(1, int(provider.config['chunk_words']))
+            interval = float(provider.config['chunk_interval'])
+            for i in range(0, len(words), step):
+                chunk = {
+                    "id": "chatcmpl-fake", "object": "chat.completion.chunk", "model": model,
+                    "choices": [{"index": 0, "delta": {"content": ''.join(words[i:i + step])}, "finish_reason": None}]
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+                time.sleep(interval)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            return 200
+
+    return Handler
+
+
+def serve(host: str = '127.0.0.1', port: int = 8090, **config) -> ThreadingHTTPServer:
+    """Create the server (call serve_forever, or run it in a thread for tests)"""
+    provider = FakeProvider(**config)
+    server = ThreadingHTTPServer((host, port), make_handler(provider))
+    server.daemon_threads = True
+    server.provider = provider
+    return server
+
+
+def start_in_thread(host: str = '127.0.0.1', port: int = 0, **config) -> ThreadingHTTPServer:
+    """Start a server on a background thread; port 0 picks a free port"""
+    server = serve(host, port, **config)
+    threading.Thread(target=server.serve_forever, name='fake-llm', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI/Groq-compatible provider for offline/load testing")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--latency', help="e.g. fixed:0.5, uniform:0.2,1.5, lognormal:0.8,0.5, exp:0.7")
+    parser.add_argument('--first-token', dest='first_token')
+    parser.add_argument('--chunk-interval', dest='chunk_interval', type=float)
+    parser.add_argument('--chunk-words', dest='chunk_words', type=int)
+    parser.add_argument('--error-rate', dest='error_rate', type=float)
+    parser.add_argument('--rate-limit-rate', dest='rate_limit_rate', type=float)
+    parser.add_argument('--timeout-rate', dest='timeout_rate', type=float)
+    parser.add_argument('--hang-seconds', dest='hang_seconds', type=float)
+    parser.add_argument('--garble-rate', dest='garble_rate', type=float)
+    parser.add_argument('--seed', type=int)
+    args = vars(parser.parse_args())
+
+    host, port = args.pop('host'), args.pop('port')
+    server = serve(host, port, **args)
+    print(f"🤖 Fake LLM provider on http://{host}:{port}/v1 ({server.provider.config})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,376 @@
+"""
+Fake S3-compatible Object Store
+Local stand-in for S3 / R2 / MinIO so the 's3' artifact store
+(backend/artifact_store.py) can be developed and tested without a bucket
+
+This module implements:
+1. Path-style object API: PUT, GET (with Range), HEAD and DELETE on
+   /<bucket>/<key>, with Content-Type, ETag, Last-Modified and x-amz-meta-*
+   metadata; buckets are created on first use. Objects and their metadata
+   live under --root, so a restarted store still has them
+2. Multipart uploads (initiate, upload part, complete, abort), which boto3
+   switches to for large files
+3. Streaming request bodies - plain, HTTP chunked and aws-chunked - written
+   to disk in blocks, never held in memory whole
+4. Pre-signed URL expiry (X-Amz-Date + X-Amz-Expires); signatures are
+   not verified
+5. /_stats (requests per operation, bytes in/out) and /_reset
+
+Run:  python -m backend.fake_object_store --port 9000 --root /tmp/fake_s3
+Then start the backend with ARTIFACT_STORE=s3 ARTIFACT_S3_ENDPOINT=http://127.0.0.1:9000
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+import threading
+import uuid
+from datetime import datetime, timezone
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+BLOCK = 1 << 16
+
+
+class ObjectStore:
+    """Objects and metadata sidecars on disk, shared by the request handlers"""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or tempfile.mkdtemp(prefix='fake_s3_')
+        os.makedirs(self.root, exist_ok=True)
+        self.lock = threading.Lock()
+        self.objects: Dict[tuple, Dict] = {}
+        self.uploads: Dict[str, Dict] = {}
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.stats = {'requests': 0, 'operations': {}, 'bytes_in': 0, 'bytes_out': 0,
+                          'started_at': time.time()}
+
+    def count(self, operation: str, bytes_in: int = 0, bytes_out: int = 0):
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats['operations'][operation] = self.stats['operations'].get(operation, 0) + 1
+            self.stats['bytes_in'] += bytes_in
+            self.stats['bytes_out'] += bytes_out
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            stats = json.loads(json.dumps(self.stats))
+            stats['objects'] = len(self.objects)
+        stats['uptime'] = time.time() - stats.pop('started_at')
+        return stats
+
+    def data_path(self, bucket: str, key: str) -> str:
+        # Hashed names: keys may contain anything, including '..'
+        return os.path.join(self.root, hashlib.sha256(f"{bucket}/{key}".encode()).hexdigest())
+
+    def temp_path(self) -> str:
+        return os.path.join(self.root, f"incoming-{uuid.uuid4().hex}")
+
+    def commit(self, bucket: str, key: str, source: str, etag: str, headers) -> Dict:
+        """Move a fully received body into place and record its metadata"""
+        path = self.data_path(bucket, key)
+        entry = {
+            'size': os.path.getsize(source),
+            'etag': etag,
+            'content_type': headers.get('Content-Type') or 'binary/octet-stream',
+            'cache_control': headers.get('Cache-Control'),
+            'meta': {name.lower(): value for name, value in headers.items()
+                     if name.lower().startswith('x-amz-meta-')},
+            'modified': time.time(),
+        }
+        with self.lock:
+            os.replace(source, path)
+            with open(f"{path}.json", 'w') as f:
+                json.dump(entry, f)
+            self.objects[(bucket, key)] = entry
+        return entry
+
+    def get(self, bucket: str, key: str) -> Optional[Dict]:
+        with self.lock:
+            entry = self.objects.get((bucket, key))
+            if entry is None:
+                try:
+                    with open(f"{self.data_path(bucket, key)}.json") as f:
+                        entry = self.objects[(bucket, key)] = json.load(f)
+                except FileNotFoundError:
+                    pass
+            return entry
+
+    def delete(self, bucket: str, key: str):
+        path = self.data_path(bucket, key)
+        with self.lock:
+            self.objects.pop((bucket, key), None)
+            for name in (f"{path}.json", path):
+                try:
+                    os.remove(name)
+                except FileNotFoundError:
+                    pass
+
+
+def _xml(tag: str, **fields) -> bytes:
+    body = ''.join(f"<{name}>{escape(str(value))}</{name}>" for name, value in fields.items())
+    return f'<?xml version="1.0" encoding="UTF-8"?><{tag}>{body}</{tag}>'.encode('utf-8')
+
+
+def _expired(query: Dict) -> bool:
+    """Pre-signed URL past X-Amz-Date + X-Amz-Expires"""
+    if 'X-Amz-Expires' not in query or 'X-Amz-Date' not in query:
+        return False
+    signed = datetime.strptime(query['X-Amz-Date'], '%Y%m%dT%H%M%SZ').replace(tzinfo=timezone.utc)
+    return time.time() > signed.timestamp() + int(query['X-Amz-Expires'])
+
+
+def make_handler(store: ObjectStore):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body: bytes = b'', headers: Optional[Dict] = None,
+                  content_type: str = 'application/xml'):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            if self.command != 'HEAD':
+                self.wfile.write(body)
+
+        def _error(self, status: int, code: str, message: str):
+            self._send(status, _xml('Error', Code=code, Message=message))
+
+        def _target(self):
+            parts = urlsplit(self.path)
+            query = {k: v[-1] for k, v in parse_qs(parts.query, keep_blank_values=True).items()}
+            bucket, _, key = unquote(parts.path).lstrip('/').partition('/')
+            return bucket, key, query
+
+        # ---------- bodies ----------
+
+        def _read_exact(self, n: int, out, digest) -> int:
+            remaining = n
+            while remaining:
+                block = self.rfile.read(min(BLOCK, remaining))
+                if not block:
+                    raise ConnectionError("client closed the connection mid-body")
+                out.write(block)
+                digest.update(block)
+                remaining -= len(block)
+            return n
+
+        def _read_chunks(self, out, digest) -> int:
+            """HTTP chunked or aws-chunked framing: <hex size>[;ext]\\r\\n<data>\\r\\n ... 0\\r\\n<trailers>\\r\\n"""
+            total = 0
+            while True:
+                size = int(self.rfile.readline().split(b';')[0].strip() or b'0', 16)
+                if size == 0:
+                    # Trailers (e.g. x-amz-checksum-*) up to the blank line
+                    while self.rfile.readline().strip():
+                        pass
+                    return total
+                total += self._read_exact(size, out, digest)
+                self.rfile.readline()
+
+        def _receive(self, path: str):
+            """Stream the request body to path; returns (md5 hex, bytes)"""
+            digest = hashlib.md5()
+            with open(path, 'wb') as out:
+                if 'aws-chunked' in (self.headers.get('Content-Encoding') or '') \
+                        or self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+                    size = self._read_chunks(out, digest)
+                else:
+                    size = self._read_exact(int(self.headers.get('Content-Length') or 0), out, digest)
+            return digest.hexdigest(), size
+
+        # ---------- verbs ----------
+
+        def do_GET(self):
+            bucket, key, query = self._target()
+            if bucket == '_stats':
+                return self._send(200, json.dumps(store.snapshot()).encode(), content_type='application/json')
+            self._read_object(bucket, key, query)
+
+        def do_HEAD(self):
+            bucket, key, query = self._target()
+            self._read_object(bucket, key, query)
+
+        def _read_object(self, bucket: str, key: str, query: Dict):
+            if _expired(query):
+                store.count('expired')
+                return self._error(403, 'AccessDenied', 'Request has expired')
+            entry = store.get(bucket, key) if key else None
+            if entry is None:
+                store.count('miss')
+                return self._error(404, 'NoSuchKey', 'The specified key does not exist.')
+
+            headers = {'ETag': f'"{entry["etag"]}"', 'Accept-Ranges': 'bytes',
+                       'Last-Modified': formatdate(entry['modified'], usegmt=True)}
+            headers.update(entry['meta'])
+            if entry['cache_control']:
+                headers['Cache-Control'] = entry['cache_control']
+            start, end, status = 0, entry['size'] - 1, 200
+            requested = self.headers.get('Range', '')
+            if requested.startswith('bytes='):
+                first, _, last = requested[6:].partition('-')
+                if first:
+                    start, end = int(first), min(int(last), end) if last else end
+                else:
+                    start = max(0, entry['size'] - int(last))
+                if start > end:
+                    return self._error(416, 'InvalidRange', 'The requested range is not satisfiable')
+                status = 206
+                headers['Content-Range'] = f"bytes {start}-{end}/{entry['size']}"
+
+            length = end - start + 1 if entry['size'] else 0
+            store.count(self.command.lower(), bytes_out=0 if self.command == 'HEAD' else length)
+            self.send_response(status)
+            self.send_header('Content-Type', query.get('response-content-type') or entry['content_type'])
+            self.send_header('Content-Length', str(length))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            if self.command == 'HEAD':
+                return
+            with open(store.data_path(bucket, key), 'rb') as f:
+                f.seek(start)
+                remaining = length
+                while remaining:
+                    block = f.read(min(BLOCK, remaining))
+                    if not block:
+                        break
+                    self.wfile.write(block)
+                    remaining -= len(block)
+
+        def do_PUT(self):
+            bucket, key, query = self._target()
+            if not key:
+                store.count('create_bucket')
+                return self._send(200)
+            if 'uploadId' in query:
+                return self._upload_part(query)
+            incoming = store.temp_path()
+            try:
+                etag, size = self._receive(incoming)
+                store.commit(bucket, key, incoming, etag, self.headers)
+            finally:
+                if os.path.exists(incoming):
+                    os.remove(incoming)
+            store.count('put', bytes_in=size)
+            self._send(200, headers={'ETag': f'"{etag}"'})
+
+        def do_DELETE(self):
+            bucket, key, query = self._target()
+            if 'uploadId' in query:
+                with store.lock:
+                    upload = store.uploads.pop(query['uploadId'], None)
+                if upload:
+                    shutil.rmtree(upload['dir'], ignore_errors=True)
+                store.count('abort_multipart')
+                return self._send(204)
+            store.delete(bucket, key)
+            store.count('delete')
+            self._send(204)
+
+        def do_POST(self):
+            bucket, key, query = self._target()
+            if bucket == '_reset':
+                store.reset()
+                return self._send(200, json.dumps(store.snapshot()).encode(), content_type='application/json')
+            if 'uploads' in query:
+                upload_id = uuid.uuid4().hex
+                directory = os.path.join(store.root, f"upload-{upload_id}")
+                os.makedirs(directory)
+                with store.lock:
+                    store.uploads[upload_id] = {'bucket': bucket, 'key': key, 'dir': directory,
+                                                'headers': dict(self.headers), 'parts': {}}
+                store.count('create_multipart')
+                return self._send(200, _xml('InitiateMultipartUploadResult', Bucket=bucket, Key=key,
+                                            UploadId=upload_id))
+            if 'uploadId' in query:
+                return self._complete_upload(bucket, key, query['uploadId'])
+            self._error(400, 'InvalidRequest', 'Unsupported POST')
+
+        # ---------- multipart ----------
+
+        def _upload_part(self, query: Dict):
+            upload = store.uploads.get(query['uploadId'])
+            if upload is None:
+                return self._error(404, 'NoSuchUpload', 'The specified upload does not exist.')
+            number = int(query['partNumber'])
+            etag, size = self._receive(os.path.join(upload['dir'], f"{number:05d}"))
+            with store.lock:
+                upload['parts'][number] = etag
+            store.count('upload_part', bytes_in=size)
+            self._send(200, headers={'ETag': f'"{etag}"'})
+
+        def _complete_upload(self, bucket: str, key: str, upload_id: str):
+            with store.lock:
+                upload = store.uploads.pop(upload_id, None)
+            if upload is None:
+                return self._error(404, 'NoSuchUpload', 'The specified upload does not exist.')
+            length = int(self.headers.get('Content-Length') or 0)
+            manifest = ElementTree.fromstring(self.rfile.read(length))
+            numbers = [int(node.text) for node in manifest.iter() if node.tag.endswith('PartNumber')]
+
+            incoming = store.temp_path()
+            combined = hashlib.md5()
+            with open(incoming, 'wb') as out:
+                for number in numbers:
+                    with open(os.path.join(upload['dir'], f"{number:05d}"), 'rb') as part:
+                        shutil.copyfileobj(part, out, BLOCK)
+                    combined.update(bytes.fromhex(upload['parts'][number]))
+            etag = f"{combined.hexdigest()}-{len(numbers)}"
+            store.commit(bucket, key, incoming, etag, upload['headers'])
+            shutil.rmtree(upload['dir'], ignore_errors=True)
+            store.count('complete_multipart')
+            self._send(200, _xml('CompleteMultipartUploadResult', Bucket=bucket, Key=key, ETag=f'"{etag}"'))
+
+    return Handler
+
+
+def serve(host: str = '127.0.0.1', port: int = 9000, root: Optional[str] = None) -> ThreadingHTTPServer:
+    """Create the server (call serve_forever, or run it in a thread for tests)"""
+    store = ObjectStore(root)
+    server = ThreadingHTTPServer((host, port), make_handler(store))
+    server.daemon_threads = True
+    server.store = store
+    return server
+
+
+def start_in_thread(host: str = '127.0.0.1', port: int = 0, root: Optional[str] = None) -> ThreadingHTTPServer:
+    """Start a server on a background thread; port 0 picks a free port"""
+    server = serve(host, port, root)
+    threading.Thread(target=server.serve_forever, name='fake-s3', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake S3-compatible object store for local development and tests")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--root', help="Directory for object data (default: a new temporary directory)")
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.root)
+    print(f"🪣 Fake object store on http://{args.host}:{args.port} (data in {server.store.root})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
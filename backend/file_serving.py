@@ -0,0 +1,185 @@
+"""
+PDF File Serving
+Generated study guides (PDF_DIR) and other PDFs served at /api/pdf/<name>,
+so mobile viewers can resume and seek instead of re-downloading whole files
+
+This module implements:
+1. Safe path resolution - only existing .pdf files inside the configured
+   roots; absolute paths, '..' and symlinks leading out of a root are refused.
+   Flat roots (the /tmp fallback) serve only files directly inside them
+2. Strong ETags from a hash of the file's bytes (memoized per path, mtime
+   and size, so a file is hashed once per change)
+3. Cache-Control - content-addressed guide names (<kind>_<code>_unit<n>_<hash>.pdf)
+   never change and are cached for a year as immutable; other names are
+   cached briefly and revalidated with the ETag
+4. Range and conditional requests (206, 304, 412, 416) through werkzeug's
+   send_file
+5. Offload to the front proxy - X-Accel-Redirect (nginx) or X-Sendfile
+   (Apache/lighttpd) so the worker never streams the bytes; without either,
+   full responses go out through gunicorn's sendfile
+6. Redirects to a remote artifact store (backend/artifact_store.py) for
+   guides kept in a bucket - the client downloads from the bucket or CDN
+"""
+
+import os
+import re
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from backend.pdf_cache import PDF_DIR
+
+logger = logging.getLogger(__name__)
+
+# Directories searched in order, subdirectories included
+PDF_SERVE_DIRS = [d for d in os.environ.get('PDF_SERVE_DIRS', PDF_DIR).split(os.pathsep) if d]
+# Searched last, for files directly inside only: /tmp keeps links to PDFs written
+# before PDF_DIR existed working without exposing every PDF below /tmp
+PDF_FLAT_SERVE_DIRS = [d for d in os.environ.get('PDF_FLAT_SERVE_DIRS', '/tmp').split(os.pathsep) if d]
+PDF_MAX_AGE = int(os.environ.get('PDF_MAX_AGE', 300))
+PDF_IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# nginx internal locations per root, e.g. "/tmp/gtu_pdfs=/_protected_pdfs/"
+PDF_ACCEL_REDIRECT = os.environ.get('PDF_ACCEL_REDIRECT', '')
+PDF_X_SENDFILE = os.environ.get('PDF_X_SENDFILE', '0') == '1'
+ETAG_MEMO_SIZE = 2048
+HASH_CHUNK = 1 << 20
+
+CONTENT_ADDRESSED_RE = re.compile(r"^[a-z_]+_[\w-]+_unit\d+_[0-9a-f]{16}\.pdf$")
+
+
+def parse_accel_map(spec: str) -> Dict[str, str]:
+    """'root=prefix,root2=prefix2' -> {realpath(root): '/prefix/'}"""
+    mapping = {}
+    for part in spec.split(','):
+        root, sep, prefix = part.strip().partition('=')
+        if sep and root and prefix:
+            mapping[os.path.realpath(root)] = '/' + prefix.strip('/') + '/'
+    return mapping
+
+
+def resolve_pdf(filename: str, roots: Optional[List[str]] = None,
+                flat_roots: Optional[List[str]] = None) -> Optional[Tuple[str, str]]:
+    """
+    (real root, real path) of filename under the first root that has it, or
+    None. flat_roots (searched after roots) only serve files directly inside
+    them; they default to PDF_FLAT_SERVE_DIRS when roots is not given.
+    """
+    if not filename or '\x00' in filename or '\\' in filename or not filename.lower().endswith('.pdf'):
+        return None
+    if os.path.isabs(filename) or '..' in filename.split('/'):
+        return None
+    if flat_roots is None:
+        flat_roots = PDF_FLAT_SERVE_DIRS if roots is None else []
+    searched = [(root, False) for root in (roots if roots is not None else PDF_SERVE_DIRS)]
+    for root, flat in searched + [(root, True) for root in flat_roots]:
+        real_root = os.path.realpath(root)
+        path = os.path.realpath(os.path.join(real_root, filename))
+        # realpath resolves symlinks, so a link pointing outside the root (or below a flat one) fails here
+        if os.path.commonpath([real_root, path]) != real_root:
+            continue
+        if flat and os.path.dirname(path) != real_root:
+            continue
+        if os.path.isfile(path):
+            return real_root, path
+    return None
+
+
+def is_content_addressed(filename: str) -> bool:
+    """Names that embed the hash of their inputs never get new content"""
+    return bool(CONTENT_ADDRESSED_RE.match(os.path.basename(filename)))
+
+
+class ETagMemo:
+    """Content hashes of served files, keyed on (path, mtime, size)"""
+
+    def __init__(self, size: int = ETAG_MEMO_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._memo: 'OrderedDict[Tuple[str, int, int], str]' = OrderedDict()
+
+    def get(self, path: str) -> str:
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+                digest.update(chunk)
+        etag = digest.hexdigest()[:32]
+
+        with self._lock:
+            self._memo[key] = etag
+            while len(self._memo) > self.size:
+                self._memo.popitem(last=False)
+        return etag
+
+
+_etags = ETagMemo()
+_accel_map = parse_accel_map(PDF_ACCEL_REDIRECT)
+
+
+def redirect_to_artifact(filename: str):
+    """302 to the bucket (pre-signed or CDN URL) for a guide in a remote artifact store, else None"""
+    from backend.artifact_store import get_pdf_store
+
+    store = get_pdf_store()
+    # Only generated guides are uploaded; other PDFs are still served from the local roots
+    if not store.remote or '/' in filename or not is_content_addressed(filename):
+        return None
+    try:
+        target = store.download_url(filename)
+    except Exception as e:
+        logger.warning(f"No artifact URL for {filename}: {e}")
+        return None
+    if not target:
+        return None
+
+    from flask import redirect
+    response = redirect(target, 302)
+    response.cache_control.private = True
+    response.cache_control.max_age = store.redirect_max_age
+    return response
+
+
+def send_pdf(filename: str, roots: Optional[List[str]] = None, accel_map: Optional[Dict[str, str]] = None,
+             x_sendfile: bool = PDF_X_SENDFILE, flat_roots: Optional[List[str]] = None):
+    """Flask response for /api/pdf/<filename>"""
+    from flask import current_app, request
+    from werkzeug.utils import send_file
+
+    resolved = resolve_pdf(filename, roots, flat_roots)
+    if resolved is None:
+        return {"error": "PDF not found"}, 404
+    root, path = resolved
+
+    immutable = is_content_addressed(filename)
+    max_age = PDF_IMMUTABLE_MAX_AGE if immutable else PDF_MAX_AGE
+    etag = _etags.get(path)
+    accel_map = _accel_map if accel_map is None else accel_map
+
+    prefix = accel_map.get(root)
+    if prefix:
+        # nginx serves the bytes (ranges included) from its internal location
+        response = current_app.response_class(mimetype='application/pdf')
+        response.headers['X-Accel-Redirect'] = prefix + quote(os.path.relpath(path, root))
+        response.headers['Content-Disposition'] = f'inline; filename="{os.path.basename(path)}"'
+        response.set_etag(etag)
+        response.last_modified = os.path.getmtime(path)
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+        response = response.make_conditional(request)
+    else:
+        response = send_file(path, request.environ, mimetype='application/pdf',
+                             download_name=os.path.basename(path), conditional=True, etag=etag,
+                             max_age=max_age, use_x_sendfile=x_sendfile,
+                             response_class=current_app.response_class)
+    if immutable:
+        response.cache_control.immutable = True
+    return response
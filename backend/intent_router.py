@@ -0,0 +1,333 @@
+"""
+Intent Router for the GTU Agent
+Resolves obvious requests ("flashcards for X", a YouTube link, "PDF for
+unit N") locally so EnhancedGTUAgent.think can skip the LLM planner
+
+This module implements:
+1. Compiled regex rules that detect an intent and extract its parameters
+2. A small TF-IDF nearest-centroid model trained on TRAINING_EXAMPLES for
+   phrasings the rules miss; it is consulted before the generic question
+   rule, so "how should I schedule revision" is not taken for a study question
+3. Confidence gating - a request is only routed locally when the intent is
+   clear and every required parameter was extracted; everything else is
+   left to the LLM planner (route() returns None)
+4. Compound requests that trigger several tools ("flashcards and a PDF")
+   always go to the planner, which can return a multi-tool plan
+
+Decisions use the same shape as the planner's JSON:
+{"action", "parameters", "reasoning", "confidence"}
+"""
+
+import os
+import re
+import math
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+ROUTER_THRESHOLD = float(os.environ.get('INTENT_ROUTER_THRESHOLD', 0.75))
+# A question-shaped request the model ties to a tool at least this strongly is
+# not a plain study question - it is left to the planner instead
+TOOL_HINT_CONFIDENCE = 0.5
+
+# Parameters a tool cannot run without
+REQUIRED_PARAMS = {
+    'summarize_video': ['video_url'],
+    'generate_flashcards': ['topic'],
+    'generate_pdf': ['subject_code', 'unit_number'],
+    'scrape_syllabus': ['subject_code'],
+    'create_quiz': ['topic'],
+    'analyze_weak_topics': ['subject_code'],
+    'create_study_plan': ['exam_date', 'subjects'],
+    'search_materials': ['query'],
+    'answer_question': ['question'],
+}
+
+YOUTUBE_URL = re.compile(r'https?://(?:www\.|m\.)?(?:youtube\.com/(?:watch\?\S*v=|embed/|shorts/)|youtu\.be/)[\w-]+\S*', re.I)
+SUBJECT_CODE = re.compile(r'\b(3\d{6}|2\d{6}|\d{7})\b')
+UNIT = re.compile(r'\b(?:unit|chapter|module)\s*[-#:]?\s*(\d{1,2}|one|two|three|four|five|six)\b', re.I)
+COUNT = re.compile(r'\b(\d{1,3})\s+(?:flash\s*cards?|cards?|questions?|mcqs?)\b', re.I)
+DATE = re.compile(r'\b(\d{4}-\d{2}-\d{2}|\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|'
+                  r'\d{1,2}(?:st|nd|rd|th)?\s+(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*'
+                  r'(?:\s+\d{4})?|in\s+\d+\s+(?:days?|weeks?))\b', re.I)
+DIFFICULTY = re.compile(r'\b(easy|medium|hard|difficult|advanced|basic)\b', re.I)
+TOPIC_AFTER = re.compile(r'\b(?:for|on|about|of|regarding|covering)\s+(.+)$', re.I)
+
+WORD_NUMBERS = {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6}
+DIFFICULTY_ALIASES = {'difficult': 'hard', 'advanced': 'hard', 'basic': 'easy'}
+
+FILLER = re.compile(r'^(?:(?:please|pls|can you|could you|i want|i need|give me|make|create|generate|'
+                    r'show me|get me|some|a|an|the|me)\b\s*)+', re.I)
+TRAILING = re.compile(r'[\s?.!]+$|\s+(?:please|pls|now|quickly)$', re.I)
+# "What are flashcards good for?" mentions a tool but asks about it; only a
+# question that also asks for something ("how do I make flashcards on X?",
+# "can you give me a quiz?") is a tool request
+QUESTION = re.compile(r'^\s*(?:what|why|how|when|where|which|who|is|are|does|do|did|should|would)\b.*\?\s*$',
+                      re.I | re.S)
+REQUEST = re.compile(r'\b(?:make|create|generate|give|send|build|prepare|get|download|want|need|'
+                     r'can\s+i\s+(?:have|get)|quiz\s+me|test\s+me|show\s+me)\b', re.I)
+# Tools whose rule fires on a bare noun ("flashcards", "pdf", "quiz") rather
+# than on request phrasing, so a question about the noun must not trigger them
+KEYWORD_TOOLS = frozenset({'generate_flashcards', 'generate_pdf', 'create_quiz'})
+# A "topic" made only of these words ("how do I make") is no topic at all
+STOP_WORDS = frozenset(
+    'a an the me my i we you it this that these those some any for on about of to in with and or '
+    'how what why when where which who do does did can could should would will is are am be '
+    'make create generate give get show want need please pls help use using'.split()
+)
+
+# Compact seed set for the TF-IDF model; the labelled evaluation corpus
+# lives separately in evaluation/intent_corpus.jsonl
+TRAINING_EXAMPLES: List[Tuple[str, str]] = [
+    ("summarize this lecture video", 'summarize_video'),
+    ("give me a summary of this youtube video", 'summarize_video'),
+    ("what does this video cover", 'summarize_video'),
+    ("key points from this lecture recording", 'summarize_video'),
+    ("make flashcards for operating systems", 'generate_flashcards'),
+    ("create revision cards on normalization", 'generate_flashcards'),
+    ("flash cards about sorting algorithms", 'generate_flashcards'),
+    ("i want cards to memorize tcp ip layers", 'generate_flashcards'),
+    ("generate pdf notes for unit 3", 'generate_pdf'),
+    ("download notes pdf for this unit", 'generate_pdf'),
+    ("make a study notes document for chapter 2", 'generate_pdf'),
+    ("create printable notes for unit 1", 'generate_pdf'),
+    ("fetch the syllabus for subject", 'scrape_syllabus'),
+    ("get latest gtu syllabus", 'scrape_syllabus'),
+    ("what is the syllabus of this subject", 'scrape_syllabus'),
+    ("update syllabus from gtu website", 'scrape_syllabus'),
+    ("quiz me on graphs", 'create_quiz'),
+    ("create a practice test on dbms", 'create_quiz'),
+    ("mcq questions on computer networks", 'create_quiz'),
+    ("test my knowledge of recursion", 'create_quiz'),
+    ("which topics am i weak in", 'analyze_weak_topics'),
+    ("analyze my weak areas", 'analyze_weak_topics'),
+    ("where do i need to improve", 'analyze_weak_topics'),
+    ("find my weakest chapters", 'analyze_weak_topics'),
+    ("make a study plan for my exams", 'create_study_plan'),
+    ("plan my preparation schedule", 'create_study_plan'),
+    ("create a timetable until the exam", 'create_study_plan'),
+    ("how should i schedule revision before exams", 'create_study_plan'),
+    ("search materials on hashing", 'search_materials'),
+    ("find notes about deadlock", 'search_materials'),
+    ("look for study material on trees", 'search_materials'),
+    ("any resources for compiler design", 'search_materials'),
+    ("what is a deadlock", 'answer_question'),
+    ("explain normalization with example", 'answer_question'),
+    ("difference between process and thread", 'answer_question'),
+    ("define virtual memory", 'answer_question'),
+    ("how does dijkstra algorithm work", 'answer_question'),
+    ("why is tcp reliable", 'answer_question'),
+]
+
+
+def _tokens(text: str) -> List[str]:
+    words = re.findall(r'[a-z0-9+#]+', text.lower())
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+class TfidfCentroidModel:
+    """Nearest-centroid classifier over TF-IDF unigram+bigram vectors"""
+
+    def __init__(self, examples: List[Tuple[str, str]]):
+        docs = [(Counter(_tokens(text)), label) for text, label in examples]
+        doc_freq = Counter(token for counts, _ in docs for token in counts)
+        n = len(docs)
+        self.idf = {token: math.log((1 + n) / (1 + df)) + 1 for token, df in doc_freq.items()}
+
+        sums: Dict[str, Counter] = {}
+        for counts, label in docs:
+            sums.setdefault(label, Counter()).update(self._vector(counts))
+        self.centroids = {label: self._normalize(vec) for label, vec in sums.items()}
+
+    def _vector(self, counts: Counter) -> Dict[str, float]:
+        return self._normalize({t: (1 + math.log(c)) * self.idf[t] for t, c in counts.items() if t in self.idf})
+
+    @staticmethod
+    def _normalize(vec: Dict[str, float]) -> Dict[str, float]:
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        return {t: v / norm for t, v in vec.items()}
+
+    def predict(self, text: str) -> Tuple[Optional[str], float]:
+        """Return (label, confidence); confidence blends similarity and margin over the runner-up"""
+        vec = self._vector(Counter(_tokens(text)))
+        if not vec:
+            return None, 0.0
+        scores = sorted(
+            ((sum(w * centroid.get(t, 0.0) for t, w in vec.items()), label)
+             for label, centroid in self.centroids.items()),
+            reverse=True
+        )
+        best, label = scores[0]
+        runner_up = scores[1][0] if len(scores) > 1 else 0.0
+        if best <= 0:
+            return None, 0.0
+        return label, min(1.0, 0.5 * best + 0.5 * (best - runner_up) / best)
+
+
+def _clean_topic(text: str) -> str:
+    text = YOUTUBE_URL.sub('', text)
+    text = re.sub(r'\b\d{1,3}\s+(?:flash\s*cards?|cards?|questions?|mcqs?)\b', '', text, flags=re.I)
+    text = re.sub(r'\b(?:easy|medium|hard|difficult|advanced|basic)\b(?:\s+(?:level|difficulty))?', '', text, flags=re.I)
+    text = FILLER.sub('', text.strip())
+    text = TRAILING.sub('', text)
+    text = ' '.join(text.split()).strip(' ,:;-')
+    if all(word in STOP_WORDS for word in re.findall(r"[a-z0-9+#']+", text.lower())):
+        return ''
+    return text
+
+
+def _topic_after(text: str, keyword: str) -> Optional[str]:
+    """Topic phrase following 'for/on/about' after a keyword, or the text around the keyword"""
+    position = re.search(keyword, text, re.I)
+    tail = text[position.end():] if position else text
+    match = TOPIC_AFTER.search(tail)
+    topic = _clean_topic(match.group(1) if match else tail)
+    if not topic and position:
+        topic = _clean_topic(text[:position.start()])
+    return topic or None
+
+
+def _unit(text: str) -> Optional[int]:
+    match = UNIT.search(text)
+    if not match:
+        return None
+    value = match.group(1).lower()
+    return WORD_NUMBERS.get(value) or int(value)
+
+
+def extract_parameters(action: str, text: str) -> Dict:
+    """Best-effort parameters for an action from free text"""
+    params: Dict = {}
+    if action == 'summarize_video':
+        url = YOUTUBE_URL.search(text)
+        if url:
+            params['video_url'] = url.group(0).rstrip('.,)"\'')
+    elif action == 'generate_flashcards':
+        params['topic'] = _topic_after(text, r'flash\s*cards?|revision cards?|cards?')
+        count = COUNT.search(text)
+        params['count'] = int(count.group(1)) if count else 10
+    elif action == 'generate_pdf':
+        code, unit = SUBJECT_CODE.search(text), _unit(text)
+        params['subject_code'] = code.group(1) if code else None
+        params['unit_number'] = unit
+    elif action in ('scrape_syllabus', 'analyze_weak_topics'):
+        code = SUBJECT_CODE.search(text)
+        params['subject_code'] = code.group(1) if code else None
+    elif action == 'create_quiz':
+        params['topic'] = _topic_after(text, r'quiz(?:zes)?|mcqs?|practice test|test')
+        difficulty = DIFFICULTY.search(text)
+        level = difficulty.group(1).lower() if difficulty else 'medium'
+        params['difficulty'] = DIFFICULTY_ALIASES.get(level, level)
+    elif action == 'create_study_plan':
+        date = DATE.search(text)
+        params['exam_date'] = date.group(1) if date else None
+        codes = SUBJECT_CODE.findall(text)
+        subjects = _topic_after(re.sub(DATE, '', text), r'study plan|schedule|timetable|plan')
+        params['subjects'] = codes or ([s.strip() for s in re.split(r',|\band\b', subjects) if s.strip()]
+                                       if subjects else None)
+    elif action == 'search_materials':
+        keyword = r'\b(?:materials?|notes|resources)\b'
+        params['query'] = _topic_after(text, keyword if re.search(keyword, text, re.I) else r'search|find|look for')
+    elif action == 'answer_question':
+        params['question'] = text.strip()
+    return {k: v for k, v in params.items() if v not in (None, '', [])}
+
+
+def is_question_about(text: str) -> bool:
+    """True for a question-shaped input that asks nothing to be made or fetched"""
+    return bool(QUESTION.match(text)) and not REQUEST.search(text)
+
+
+class IntentRouter:
+    """Rules first, then the TF-IDF model; None means 'ask the LLM planner'"""
+
+    # (action, compiled trigger, confidence when the trigger fires)
+    RULES = [
+        ('summarize_video', YOUTUBE_URL, 0.98),
+        ('generate_flashcards', re.compile(r'\bflash\s*cards?\b|\brevision cards?\b', re.I), 0.95),
+        ('generate_pdf', re.compile(r'\bpdf\b|\b(?:printable|downloadable)\s+notes\b', re.I), 0.93),
+        ('create_quiz', re.compile(r'\bquiz(?:zes)?\b|\bmcqs?\b|\bpractice test\b|\btest me\b', re.I), 0.92),
+        ('scrape_syllabus', re.compile(r'\b(?:fetch|scrape|get|update|download)\b.*\bsyllabus\b', re.I), 0.9),
+        ('analyze_weak_topics', re.compile(r'\bweak(?:est)?\s+(?:topics?|areas?|chapters?|units?|points?)\b'
+                                           r'|\b(?:topics?|areas?|chapters?|units?)\b.*\b(?:am|are)\s+(?:i|we)\s+weak\b',
+                                           re.I), 0.9),
+        ('create_study_plan', re.compile(r'\b(?:study|revision|preparation)\s+(?:plan|schedule|timetable)\b', re.I), 0.9),
+        ('search_materials', re.compile(r'\b(?:search|find|look for)\b.*\b(?:materials?|notes|resources)\b', re.I), 0.88),
+        # Plain study questions go to answer_question - checked last, after the
+        # tool rules and the model, because tool requests are often phrased as
+        # questions too ("how should I schedule revision before exams")
+        ('answer_question', re.compile(r'^\s*(?:what|why|how|when|explain|define|describe|compare|differentiate)\b'
+                                       r'|\bdifference between\b', re.I), 0.8),
+    ]
+
+    def __init__(self, threshold: float = ROUTER_THRESHOLD,
+                 examples: Optional[List[Tuple[str, str]]] = None):
+        self.threshold = threshold
+        self.model = TfidfCentroidModel(examples or TRAINING_EXAMPLES)
+
+    def classify(self, text: str) -> Tuple[Optional[str], float, str]:
+        """
+        Return (action, confidence, source) without the parameter check.
+        Order: tool rules, then the model, then the question catch-all -
+        which only applies when the model does not point at a tool.
+        A question about a keyword tool ("what are flashcards good for?")
+        skips that tool's rule and the model's hint for it.
+        """
+        tools = self.tool_actions(text)
+        if tools:
+            return tools[0], self._confidence(tools[0]), 'rules'
+        action, confidence = self.model.predict(text)
+        if action in KEYWORD_TOOLS and is_question_about(text):
+            action, confidence = None, 0.0
+        if action is not None and (confidence >= self.threshold or
+                                   (action != 'answer_question' and confidence >= TOOL_HINT_CONFIDENCE)):
+            return action, confidence, 'model'
+        for rule_action, pattern, rule_confidence in self.RULES:
+            if rule_action == 'answer_question' and pattern.search(text):
+                return rule_action, rule_confidence, 'rules'
+        return action, confidence, 'model'
+
+    def _confidence(self, action: str) -> float:
+        return next(confidence for rule_action, _, confidence in self.RULES if rule_action == action)
+
+    def tool_actions(self, text: str) -> List[str]:
+        """Every tool whose rule fires (answer_question, the catch-all, excluded)"""
+        asking = is_question_about(text)
+        return [action for action, pattern, _ in self.RULES
+                if action != 'answer_question' and pattern.search(text)
+                and not (asking and action in KEYWORD_TOOLS)]
+
+    def route(self, text: str) -> Optional[Dict]:
+        """A planner-style decision, or None when the request is ambiguous"""
+        if not text or not text.strip():
+            return None
+        if len(self.tool_actions(text)) > 1:
+            # "flashcards and a PDF for ...": the planner builds a multi-tool plan
+            return None
+        action, confidence, source = self.classify(text)
+        if action is None or confidence < self.threshold:
+            return None
+
+        params = extract_parameters(action, text)
+        missing = [p for p in REQUIRED_PARAMS.get(action, []) if p not in params]
+        if missing:
+            return None
+
+        return {
+            "action": action,
+            "parameters": params,
+            "reasoning": f"local intent router ({source})",
+            "confidence": round(confidence, 3),
+            "router": source
+        }
+
+
+# Singleton instance
+_intent_router = None
+
+
+def get_intent_router() -> IntentRouter:
+    """Get or create intent router singleton"""
+    global _intent_router
+    if _intent_router is None:
+        _intent_router = IntentRouter()
+    return _intent_router
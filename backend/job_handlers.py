@@ -0,0 +1,187 @@
+"""
+Handlers for background jobs
+Each handler receives a JobContext plus the job params and returns a
+JSON-serialisable result. Heavy modules are imported lazily so that
+registering handlers does not require Supabase/AI credentials.
+"""
+
+import os
+from typing import Dict
+
+from backend.jobs import register_handler, PermanentJobError
+
+# Bounds on what clients may ask for through POST /api/jobs
+MAX_FLASHCARDS = int(os.environ.get('JOB_MAX_FLASHCARDS', 30))
+MAX_BATCH_TOPICS = int(os.environ.get('JOB_MAX_BATCH_TOPICS', 20))
+MAX_TOPIC_LENGTH = 200
+
+
+def _text(value) -> str:
+    if not isinstance(value, (str, int)) or not str(value).strip():
+        raise ValueError("must be a non-empty string")
+    return str(value).strip()[:MAX_TOPIC_LENGTH]
+
+
+def _positive_int(value) -> int:
+    if isinstance(value, bool):
+        raise ValueError("must be an integer")
+    number = int(value)
+    if number < 1:
+        raise ValueError("must be positive")
+    return number
+
+
+def _count(value) -> int:
+    return min(_positive_int(value), MAX_FLASHCARDS)
+
+
+def _flag(value) -> bool:
+    if not isinstance(value, bool):
+        raise ValueError("must be true or false")
+    return value
+
+
+def _topics(value) -> list:
+    if not isinstance(value, list) or not value:
+        raise ValueError("must be a non-empty list")
+    if len(value) > MAX_BATCH_TOPICS:
+        raise ValueError(f"at most {MAX_BATCH_TOPICS} topics per job")
+    return [_text(topic) for topic in value]
+
+
+# Job types clients may submit directly, and the params each accepts.
+# Everything else (force, precompute, ingest, gc) is for operators and the scheduler.
+PUBLIC_JOB_PARAMS = {
+    'generate_unit_pdf': {'subject_code': _text, 'unit_number': _positive_int, 'refresh': _flag},
+    'predict_paper': {'subject_id': _positive_int, 'refresh': _flag},
+    'generate_flashcards': {'topic': _text, 'count': _count},
+    'generate_flashcards_batch': {'topics': _topics, 'count': _count},
+}
+PUBLIC_REQUIRED_PARAMS = {
+    'generate_unit_pdf': ['subject_code', 'unit_number'],
+    'predict_paper': ['subject_id'],
+    'generate_flashcards': ['topic'],
+    'generate_flashcards_batch': ['topics'],
+}
+
+
+def public_job_params(job_type: str, params: Dict) -> Dict:
+    """Validated, clamped params of a client-submitted job; ValueError names the bad param"""
+    allowed = PUBLIC_JOB_PARAMS[job_type]
+    unknown = sorted(set(params) - set(allowed))
+    if unknown:
+        raise ValueError(f"Unsupported params for {job_type}: {', '.join(unknown)}")
+    missing = [name for name in PUBLIC_REQUIRED_PARAMS[job_type] if name not in params]
+    if missing:
+        raise ValueError(f"Missing params for {job_type}: {', '.join(missing)}")
+    cleaned = {}
+    for name, value in params.items():
+        try:
+            cleaned[name] = allowed[name](value)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid {name}: {e}")
+    return cleaned
+
+
+@register_handler('generate_unit_pdf')
+def generate_unit_pdf_job(ctx, subject_code, unit_number, refresh=False):
+    """Supabase fetch + GPT-4o synthesis + reportlab render for one unit (reused if inputs are unchanged)"""
+    from backend.pdf_generator import generate_unit_pdf
+
+    try:
+        unit_number = int(unit_number)
+    except (TypeError, ValueError):
+        raise PermanentJobError(f"Invalid unit_number: {unit_number}")
+
+    result = generate_unit_pdf(subject_code, unit_number, progress=ctx.progress, refresh=bool(refresh))
+    if not result.get('success'):
+        raise RuntimeError(result.get('error', 'PDF generation failed'))
+    return result
+
+
+@register_handler('predict_paper')
+def predict_paper_job(ctx, subject_id, refresh=False, force=False):
+    """
+    Predict a semester paper for a subject (refresh=True regenerates a stale
+    cache entry, force=True regenerates even a fresh one)
+    """
+    from backend.agent_service import agent
+
+    ctx.progress(0.1, "Analyzing previous papers")
+    result = agent.predict_semester_paper(subject_id, refresh=bool(refresh), force=bool(force))
+    if isinstance(result, dict) and result.get('error'):
+        raise RuntimeError(result['error'])
+    return {"predicted_paper": result}
+
+
+@register_handler('generate_flashcards')
+def generate_flashcards_job(ctx, topic, count=10):
+    """Generate flashcards for a topic"""
+    from backend.agent_service import agent
+
+    if not topic:
+        raise PermanentJobError("topic is required")
+
+    ctx.progress(0.1, f"Generating {count} flashcards")
+    result = agent.generate_flashcards(topic, int(count))
+    if isinstance(result, str) and result.startswith("Error"):
+        raise RuntimeError(result)
+    return {"flashcards": result}
+
+
+@register_handler('precompute_artifacts')
+def precompute_artifacts_job(ctx, subject_codes=None, force=False):
+    """Regenerate stale topic explanations and unit summaries"""
+    from backend.precompute import Precomputer
+
+    ctx.progress(0.0, "Loading syllabus content")
+    return Precomputer().run(subject_codes=subject_codes, force=bool(force), progress=ctx.progress)
+
+
+@register_handler('pdf_cache_gc')
+def pdf_cache_gc_job(ctx, dry_run=False):
+    """Remove superseded and orphaned study guide PDFs"""
+    from backend.pdf_cache import get_pdf_cache
+
+    return get_pdf_cache().gc(dry_run=bool(dry_run))
+
+
+@register_handler('generate_flashcards_batch')
+def generate_flashcards_batch_job(ctx, topics, count=10):
+    """Generate flashcards for many topics, several topics per LLM call"""
+    from backend.agent_service import agent
+
+    if not topics:
+        raise PermanentJobError("topics is required")
+
+    ctx.progress(0.1, f"Generating flashcards for {len(topics)} topics")
+    result = agent.generate_flashcards_batch(list(topics), int(count))
+    if not result['flashcards']:
+        raise RuntimeError(f"All topics failed: {result['errors']}")
+    return result
+
+
+@register_handler('ingest_pyqs')
+def ingest_pyqs_job(ctx, remote=True, workers=None):
+    """Extract previous year papers into the questions table"""
+    from backend.pyq_ingest import ingest, PYQ_WORKERS
+
+    from backend.question_dedup import run as dedup
+
+    ctx.progress(0.1, "Extracting previous year papers")
+    stats = ingest(remote=bool(remote), workers=int(workers or PYQ_WORKERS))
+    if stats['upsert_failed'] and not stats['upserted']:
+        raise RuntimeError(f"All {stats['upsert_failed']} question upserts failed")
+    ctx.progress(0.8, "Matching new questions against the dedup index")
+    # The upsert keeps frequency_count of existing rows: only clusters the new questions joined change
+    stats['dedup'] = dedup()
+    return stats
+
+
+@register_handler('dedup_questions')
+def dedup_questions_job(ctx, rebuild=False):
+    """Cluster near-duplicate questions and write canonical ids / frequencies back"""
+    from backend.question_dedup import run
+
+    ctx.progress(0.1, "Re-clustering all questions" if rebuild else "Indexing new questions")
+    return run(rebuild=bool(rebuild))
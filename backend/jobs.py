@@ -0,0 +1,439 @@
+"""
+Background Job System for GTU App
+Runs long generation work (unit PDFs, paper prediction, flashcards) outside
+the request cycle
+
+This module implements:
+1. JobQueue: persistent SQLite queue shared by all workers on a host
+2. Deduplication of identical pending/running jobs
+3. Retries with exponential backoff
+4. Progress reporting for status endpoints
+5. JobWorkerPool: threads that claim jobs and run registered handlers
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import socket
+import hashlib
+import logging
+import sqlite3
+import threading
+from typing import Callable, Dict, Optional
+
+from backend.local_store import connect, get_db_path, transaction
+from backend.telemetry import current_route
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+# A running job whose worker stopped heartbeating for this long is requeued
+STALE_AFTER_SECONDS = int(os.environ.get('JOB_STALE_AFTER_SECONDS', 600))
+RETRY_BASE_SECONDS = float(os.environ.get('JOB_RETRY_BASE_SECONDS', 5))
+RETRY_MAX_SECONDS = float(os.environ.get('JOB_RETRY_MAX_SECONDS', 300))
+RESULT_RETENTION_SECONDS = int(os.environ.get('JOB_RESULT_RETENTION_SECONDS', 7 * 24 * 3600))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    job_type TEXT NOT NULL,
+    params TEXT NOT NULL,
+    dedup_key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL DEFAULT 0,
+    message TEXT,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER DEFAULT 0,
+    max_attempts INTEGER DEFAULT 3,
+    run_after REAL NOT NULL,
+    locked_by TEXT,
+    heartbeat_at REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(status, run_after);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_active_dedup
+    ON jobs(dedup_key) WHERE status IN ('pending', 'running');
+"""
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot help (bad input, missing data)"""
+
+
+# Registered handlers: job_type -> callable(ctx, **params)
+_HANDLERS: Dict[str, Callable] = {}
+
+
+def register_handler(job_type: str):
+    """Decorator registering a function as the handler for a job type"""
+    def decorator(func):
+        _HANDLERS[job_type] = func
+        return func
+    return decorator
+
+
+def get_handler(job_type: str) -> Optional[Callable]:
+    return _HANDLERS.get(job_type)
+
+
+def make_dedup_key(job_type: str, params: Dict) -> str:
+    """Identical job type + params produce the same key"""
+    payload = json.dumps({'type': job_type, 'params': params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class JobContext:
+    """Passed to handlers so they can report progress while running"""
+
+    def __init__(self, queue: 'JobQueue', job_id: str, attempt: int):
+        self.queue = queue
+        self.job_id = job_id
+        self.attempt = attempt
+
+    def progress(self, fraction: float, message: str = ""):
+        self.queue.update_progress(self.job_id, fraction, message)
+
+
+class JobQueue:
+    """
+    Persistent job queue backed by a local SQLite file
+
+    Claiming happens inside an IMMEDIATE transaction so a job is only ever
+    handed to one worker, even across processes.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.environ.get('JOBS_DB_PATH') or get_db_path('jobs')
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        return connect(self.db_path)
+
+    # ---------- submission ----------
+
+    def submit(self, job_type: str, params: Optional[Dict] = None,
+               max_attempts: int = 3, delay: float = 0) -> Dict:
+        """
+        Enqueue a job. If an identical job is already pending or running,
+        that job is returned instead (with 'deduplicated': True).
+        """
+        params = params or {}
+        dedup_key = make_dedup_key(job_type, params)
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        conn = self._conn()
+
+        try:
+            conn.execute(
+                """INSERT INTO jobs (id, job_type, params, dedup_key, status, max_attempts,
+                                     run_after, created_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (job_id, job_type, json.dumps(params, default=str), dedup_key, PENDING,
+                 max_attempts, now + delay, now, now)
+            )
+        except sqlite3.IntegrityError:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE dedup_key = ? AND status IN (?, ?)",
+                (dedup_key, PENDING, RUNNING)
+            ).fetchone()
+            if row is not None:
+                job = self._row_to_job(row)
+                job['deduplicated'] = True
+                return job
+            # The active job finished between our insert and select - try once more
+            return self.submit(job_type, params, max_attempts, delay)
+
+        job = self.get(job_id)
+        job['deduplicated'] = False
+        return job
+
+    # ---------- worker side ----------
+
+    def claim(self, worker_id: str) -> Optional[Dict]:
+        """Atomically take the oldest runnable job, or return None"""
+        now = time.time()
+        conn = self._conn()
+        with transaction(conn):
+            # Requeue jobs whose worker died mid-run
+            conn.execute(
+                """UPDATE jobs SET status = ?, locked_by = NULL, updated_at = ?
+                   WHERE status = ? AND heartbeat_at < ?""",
+                (PENDING, now, RUNNING, now - STALE_AFTER_SECONDS)
+            )
+            row = conn.execute(
+                """SELECT id FROM jobs WHERE status = ? AND run_after <= ?
+                   ORDER BY run_after, created_at LIMIT 1""",
+                (PENDING, now)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                """UPDATE jobs SET status = ?, attempts = attempts + 1, locked_by = ?,
+                                   heartbeat_at = ?, updated_at = ?
+                   WHERE id = ?""",
+                (RUNNING, worker_id, now, now, row['id'])
+            )
+        return self.get(row['id'])
+
+    def update_progress(self, job_id: str, fraction: float, message: str = ""):
+        now = time.time()
+        self._conn().execute(
+            "UPDATE jobs SET progress = ?, message = ?, heartbeat_at = ?, updated_at = ? WHERE id = ?",
+            (max(0.0, min(1.0, fraction)), message, now, now, job_id)
+        )
+
+    def complete(self, job_id: str, worker_id: str, attempt: int, result) -> bool:
+        """
+        Store a job's result. Only the worker holding the current lease may do
+        so - returns False (and changes nothing) if the lease was lost, e.g.
+        the job went stale and another worker reclaimed it.
+        """
+        now = time.time()
+        cursor = self._conn().execute(
+            """UPDATE jobs SET status = ?, progress = 1, result = ?, error = NULL,
+                               locked_by = NULL, updated_at = ?, finished_at = ?
+               WHERE id = ? AND locked_by = ? AND attempts = ?""",
+            (SUCCEEDED, json.dumps(result, default=str), now, now, job_id, worker_id, attempt)
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: str, worker_id: str, attempt: int, error: str,
+             retryable: bool = True) -> Optional[str]:
+        """
+        Record a failed attempt. Retryable failures go back to pending with
+        exponential backoff until max_attempts is reached.
+        Returns the job's new status, or None if the lease was lost.
+        """
+        now = time.time()
+        job = self.get(job_id)
+        if job is None:
+            return FAILED
+
+        if retryable and attempt < job['max_attempts']:
+            backoff = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * (2 ** (attempt - 1)))
+            backoff *= random.uniform(0.8, 1.2)
+            cursor = self._conn().execute(
+                """UPDATE jobs SET status = ?, error = ?, locked_by = NULL,
+                                   run_after = ?, updated_at = ?
+                   WHERE id = ? AND locked_by = ? AND attempts = ?""",
+                (PENDING, error, now + backoff, now, job_id, worker_id, attempt)
+            )
+            return PENDING if cursor.rowcount == 1 else None
+
+        cursor = self._conn().execute(
+            """UPDATE jobs SET status = ?, error = ?, locked_by = NULL,
+                               updated_at = ?, finished_at = ?
+               WHERE id = ? AND locked_by = ? AND attempts = ?""",
+            (FAILED, error, now, now, job_id, worker_id, attempt)
+        )
+        return FAILED if cursor.rowcount == 1 else None
+
+    # ---------- queries ----------
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def stats(self) -> Dict[str, int]:
+        rows = self._conn().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row['status']: row['n'] for row in rows}
+
+    def purge_finished(self, older_than_seconds: int = RESULT_RETENTION_SECONDS) -> int:
+        cutoff = time.time() - older_than_seconds
+        cursor = self._conn().execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+            (SUCCEEDED, FAILED, cutoff)
+        )
+        return cursor.rowcount
+
+    def _row_to_job(self, row) -> Dict:
+        return {
+            'id': row['id'],
+            'type': row['job_type'],
+            'params': json.loads(row['params']),
+            'status': row['status'],
+            'progress': row['progress'],
+            'message': row['message'],
+            'result': json.loads(row['result']) if row['result'] else None,
+            'error': row['error'],
+            'attempts': row['attempts'],
+            'locked_by': row['locked_by'],
+            'max_attempts': row['max_attempts'],
+            'run_after': row['run_after'],
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at'],
+            'finished_at': row['finished_at'],
+        }
+
+
+class JobWorkerPool:
+    """
+    Pool of worker threads pulling from a JobQueue
+
+    Can run inside the web process (daemon threads) or as a dedicated
+    process via run_worker.py.
+    """
+
+    def __init__(self, queue: JobQueue, num_workers: int = 2, poll_interval: float = 1.0):
+        self.queue = queue
+        self.num_workers = num_workers
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads = []
+        self._worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+    def start(self):
+        for i in range(self.num_workers):
+            thread = threading.Thread(
+                target=self._worker_loop,
+                args=(f"{self._worker_prefix}:{i}",),
+                name=f"job-worker-{i}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {self.num_workers} job workers")
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def run_forever(self):
+        """Block the calling thread while workers run (used by run_worker.py)"""
+        self.start()
+        last_purge = 0.0
+        try:
+            while not self._stop.is_set():
+                if time.time() - last_purge > 3600:
+                    purged = self.queue.purge_finished()
+                    if purged:
+                        logger.info(f"Purged {purged} finished jobs")
+                    last_purge = time.time()
+                self._stop.wait(5)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def run_once(self, worker_id: str = "inline") -> bool:
+        """Claim and run a single job. Returns False if the queue was empty."""
+        job = self.queue.claim(worker_id)
+        if job is None:
+            return False
+        self._execute(job)
+        return True
+
+    def _worker_loop(self, worker_id: str):
+        while not self._stop.is_set():
+            try:
+                if not self.run_once(worker_id):
+                    self._stop.wait(self.poll_interval)
+            except Exception as e:
+                logger.error(f"Job worker {worker_id} error: {e}", exc_info=True)
+                self._stop.wait(self.poll_interval)
+
+    def _execute(self, job: Dict):
+        job_id = job['id']
+        lease = (job['locked_by'], job['attempts'])
+        handler = get_handler(job['type'])
+        if handler is None:
+            self.queue.fail(job_id, *lease, f"No handler registered for job type '{job['type']}'", retryable=False)
+            return
+
+        ctx = JobContext(self.queue, job_id, job['attempts'])
+        started = time.time()
+        route_token = current_route.set(f"job:{job['type']}")
+        try:
+            result = handler(ctx, **job['params'])
+            if self.queue.complete(job_id, *lease, result):
+                logger.info(f"Job {job_id} ({job['type']}) succeeded in {time.time() - started:.1f}s")
+            else:
+                logger.warning(f"Job {job_id} ({job['type']}) finished after its lease was lost - result dropped")
+        except PermanentJobError as e:
+            if self.queue.fail(job_id, *lease, str(e), retryable=False) is None:
+                logger.warning(f"Job {job_id} ({job['type']}) failed after its lease was lost: {e}")
+            else:
+                logger.warning(f"Job {job_id} ({job['type']}) failed permanently: {e}")
+        except Exception as e:
+            status = self.queue.fail(job_id, *lease, str(e), retryable=True)
+            if status is None:
+                logger.warning(f"Job {job_id} ({job['type']}) failed after its lease was lost: {e}")
+            else:
+                logger.warning(f"Job {job_id} ({job['type']}) attempt {job['attempts']} failed ({status}): {e}")
+        finally:
+            current_route.reset(route_token)
+
+
+# Singletons
+_job_queue = None
+_worker_pool = None
+_singleton_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Get or create the job queue singleton"""
+    global _job_queue
+    if _job_queue is None:
+        with _singleton_lock:
+            if _job_queue is None:
+                _job_queue = JobQueue()
+    return _job_queue
+
+
+def start_background_workers(num_workers: Optional[int] = None) -> Optional[JobWorkerPool]:
+    """
+    Start in-process job workers for this web process.
+
+    JOB_WORKERS_IN_PROCESS controls the thread count; set it to 0 when a
+    dedicated worker (run_worker.py) is deployed.
+    """
+    global _worker_pool
+    if num_workers is None:
+        num_workers = int(os.environ.get('JOB_WORKERS_IN_PROCESS', 2))
+    if num_workers <= 0:
+        return None
+
+    with _singleton_lock:
+        if _worker_pool is None:
+            # Importing registers the handlers
+            import backend.job_handlers  # noqa: F401
+            _worker_pool = JobWorkerPool(get_job_queue(), num_workers=num_workers)
+            _worker_pool.start()
+    return _worker_pool
+
+
+def stop_background_workers(timeout: float = 10):
+    """Stop the in-process workers started by start_background_workers"""
+    global _worker_pool
+    with _singleton_lock:
+        pool, _worker_pool = _worker_pool, None
+    if pool is not None:
+        pool.stop(timeout)
+
+
+def public_job(job: Dict) -> Dict:
+    """Job fields shown to clients (status endpoints of both services)"""
+    return {
+        'job_id': job['id'],
+        'type': job['type'],
+        'status': job['status'],
+        'progress': job['progress'],
+        'message': job['message'],
+        'attempts': job['attempts'],
+        'max_attempts': job['max_attempts'],
+        'error': job['error'],
+        'created_at': job['created_at'],
+        'updated_at': job['updated_at'],
+        'finished_at': job['finished_at']
+    }
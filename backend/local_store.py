@@ -0,0 +1,62 @@
+"""
+Local SQLite store shared by background subsystems
+Jobs, caches and limiter state that must survive restarts and be visible
+to every gunicorn/uvicorn worker on the same host live here.
+"""
+
+import os
+import sqlite3
+import threading
+
+DATA_DIR = os.environ.get('GTU_DATA_DIR', '/tmp/gtu_data')
+
+_local = threading.local()
+
+
+def get_db_path(name):
+    """Return the path of a named local database (e.g. 'jobs' -> /tmp/gtu_data/jobs.sqlite3)"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    return os.path.join(DATA_DIR, f"{name}.sqlite3")
+
+
+def connect(path):
+    """
+    Get a per-thread connection to a SQLite database.
+
+    WAL mode lets readers run alongside a writer from another process and the
+    busy timeout makes concurrent writers wait instead of failing.
+    """
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    conn = connections.get(path)
+    if conn is None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        connections[path] = conn
+    return conn
+
+
+class transaction:
+    """Context manager for an IMMEDIATE (write-locked) transaction"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
+        return False
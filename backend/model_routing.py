@@ -0,0 +1,173 @@
+"""
+Task-Based Model Routing for GTU App
+Picks the model tier and token limit for an LLM call from what the call is
+for: a two-sentence voice answer or an intent decision does not need GPT-4o
+with 1000 tokens, a 20-page study guide does
+
+This module implements:
+1. Model tiers (small / large) mapped to a model per provider
+2. A routing table: task type -> tier, max_tokens, temperature
+3. Overrides from MODEL_ROUTES, keyed by task or by telemetry route label
+   (Flask endpoint, FastAPI path, "job:<type>", "precompute:<kind>"):
+
+       MODEL_ROUTES="voice=large,notes=large:4000,api.explain_topic=small:800"
+
+   A route override wins over a task override, which wins over the table.
+   MODEL_ROUTING=0 sends every task to the large tier (the old behaviour).
+4. Bytez run params for a route (max_tokens/temperature in the form the
+   model takes) and truncation detection from the Bytez response
+
+Each call is recorded by task and tier in telemetry (latency, cost,
+truncations at max_tokens), so a tier change can be checked in
+/metrics/summary before and after.
+"""
+
+import os
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MODEL_ROUTING_ENABLED = os.environ.get('MODEL_ROUTING', '1').lower() not in ('0', 'false', 'no')
+
+SMALL, LARGE = 'small', 'large'
+
+# Bytez proxies these providers' chat APIs (OpenAI-style max_tokens); other
+# Bytez models are open models run with Hugging Face generation params
+BYTEZ_CLOSED_PROVIDERS = ('openai/', 'anthropic/', 'cohere/', 'mistral/')
+
+TIERS: Dict[str, Dict[str, str]] = {
+    SMALL: {
+        'bytez': os.environ.get('MODEL_SMALL_BYTEZ', 'openai/gpt-4o-mini'),
+        'groq': os.environ.get('MODEL_SMALL_GROQ', 'llama-3.1-8b-instant'),
+        'lightning': os.environ.get('MODEL_SMALL_LIGHTNING', 'gpt-4o-mini'),
+    },
+    LARGE: {
+        'bytez': os.environ.get('MODEL_LARGE_BYTEZ', 'openai/gpt-4o'),
+        'groq': os.environ.get('MODEL_LARGE_GROQ', 'llama-3.3-70b-versatile'),
+        'lightning': os.environ.get('MODEL_LARGE_LIGHTNING', 'gpt-4o'),
+    },
+}
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    task: str
+    tier: str
+    max_tokens: int
+    temperature: float = 0.7
+
+    def model(self, provider: str) -> str:
+        return TIERS[self.tier][provider]
+
+    def bytez_params(self) -> Dict:
+        """Params for Bytez model.run(input, params)"""
+        if self.model('bytez').startswith(BYTEZ_CLOSED_PROVIDERS):
+            return {'max_tokens': self.max_tokens, 'temperature': self.temperature}
+        return {'max_new_tokens': self.max_tokens, 'temperature': self.temperature}
+
+
+# Short, classification-like work goes small; synthesis stays large.
+# 'default' keeps the previous behaviour for call sites that pass no task.
+DEFAULT_ROUTES: Dict[str, ModelRoute] = {route.task: route for route in (
+    ModelRoute('classify', SMALL, 900, 0.0),        # agent planner decision, up to PLAN_MAX_STEPS steps
+    ModelRoute('voice', SMALL, 250, 0.5),           # spoken 2-3 sentence answer
+    ModelRoute('short_answer', SMALL, 600, 0.5),
+    ModelRoute('flashcards', SMALL, 1500, 0.7),
+    ModelRoute('chat', LARGE, 1000, 0.7),
+    ModelRoute('answer', LARGE, 1500, 0.4),         # GTU exam answer
+    ModelRoute('explanation', LARGE, 1500, 0.5),
+    ModelRoute('summary', LARGE, 1500, 0.3),
+    ModelRoute('quiz', LARGE, 1500, 0.7),
+    ModelRoute('paper', LARGE, 3000, 0.4),          # predicted semester paper
+    ModelRoute('notes', LARGE, 3000, 0.5),
+    ModelRoute('study_guide', LARGE, 4000, 0.5),
+    ModelRoute('default', LARGE, 1000, 0.7),
+)}
+
+
+def parse_overrides(spec: str) -> Dict[str, Dict]:
+    """"key=tier[:max_tokens],..." -> {key: {'tier': ..., 'max_tokens': ...}}"""
+    overrides = {}
+    for part in (spec or '').split(','):
+        if not part.strip():
+            continue
+        try:
+            key, value = part.split('=', 1)
+            tier, _, max_tokens = value.strip().partition(':')
+            override = {}
+            if tier:
+                if tier not in TIERS:
+                    raise ValueError(f"unknown tier {tier!r}")
+                override['tier'] = tier
+            if max_tokens:
+                override['max_tokens'] = int(max_tokens)
+            overrides[key.strip()] = override
+        except ValueError as e:
+            logger.warning(f"Ignoring MODEL_ROUTES entry {part!r}: {e}")
+    return overrides
+
+
+class ModelRouter:
+    """Resolves (task, route) to a ModelRoute"""
+
+    def __init__(self, routes: Optional[Dict[str, ModelRoute]] = None, overrides: Optional[Dict[str, Dict]] = None,
+                 enabled: bool = True):
+        self.routes = dict(routes or DEFAULT_ROUTES)
+        self.overrides = overrides or {}
+        self.enabled = enabled
+
+    def resolve(self, task: Optional[str] = None, route: Optional[str] = None) -> ModelRoute:
+        task = task if task in self.routes else 'default'
+        resolved = self.routes[task]
+        if not self.enabled:
+            resolved = ModelRoute(task, LARGE, max(resolved.max_tokens, self.routes['default'].max_tokens),
+                                  resolved.temperature)
+        for key in (task, route):
+            override = self.overrides.get(key) if key else None
+            if override:
+                resolved = ModelRoute(task, override.get('tier', resolved.tier),
+                                      override.get('max_tokens', resolved.max_tokens), resolved.temperature)
+        return resolved
+
+
+def bytez_completion(response, output, route: ModelRoute) -> Tuple[Optional[Dict], Optional[str]]:
+    """
+    (usage, finish_reason) of a Bytez response. Closed models carry the
+    provider's own response; for the rest an output that fills max_tokens
+    is taken as cut off.
+    """
+    from backend.telemetry import estimate_tokens
+    provider = getattr(response, 'provider', None)
+    usage, finish_reason = None, None
+    if isinstance(provider, dict):
+        usage = provider.get('usage')
+        choices = provider.get('choices') or [{}]
+        finish_reason = choices[0].get('finish_reason') if isinstance(choices[0], dict) else None
+    if isinstance(output, dict):
+        output = output.get('content')
+    if finish_reason is None and output:
+        completion_tokens = (usage or {}).get('completion_tokens') or estimate_tokens(output)
+        if completion_tokens >= route.max_tokens:
+            finish_reason = 'length'
+    return usage, finish_reason
+
+
+# Singleton instance
+_router = None
+
+
+def get_model_router() -> ModelRouter:
+    """Get or create the router from MODEL_ROUTING / MODEL_ROUTES"""
+    global _router
+    if _router is None:
+        _router = ModelRouter(overrides=parse_overrides(os.environ.get('MODEL_ROUTES', '')),
+                              enabled=MODEL_ROUTING_ENABLED)
+    return _router
+
+
+def resolve_route(task: Optional[str] = None) -> ModelRoute:
+    """Route for task in the current request/job (route label from telemetry)"""
+    from backend.telemetry import current_route
+    return get_model_router().resolve(task, current_route.get())
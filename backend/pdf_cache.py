@@ -0,0 +1,257 @@
+"""
+Content-Addressed PDF Artifact Cache
+Unit study guides are keyed by a hash of what they are generated from, so an
+unchanged unit returns its existing PDF instead of a new GPT-4o synthesis and
+reportlab render every day
+
+This module implements:
+1. Input hashing - syllabus points, previous questions and source notes of a
+   unit (order-insensitive, volatile columns ignored) plus the prompt and
+   template versions; any change produces a new hash and a new file
+2. A manifest index (local SQLite) of generated artifacts: hash, file,
+   subject/unit, size, timestamps and which artifact is published for a unit
+3. Atomic writes - PDFs are rendered to a temporary name and renamed, so a
+   reader never sees a half-written file
+4. Garbage collection of PDF_DIR: superseded artifacts past a grace period,
+   manifest rows whose file is gone, and orphaned guide files not in the
+   manifest (e.g. the old date-stamped names)
+
+Run: python -m backend.pdf_cache [--dry-run] [--grace SECONDS]
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from backend.local_store import connect, get_db_path, transaction
+
+logger = logging.getLogger(__name__)
+
+PDF_DIR = os.environ.get('PDF_DIR', '/tmp/gtu_pdfs')
+# Superseded guides stay downloadable this long (links already handed out)
+PDF_GC_GRACE = float(os.environ.get('PDF_GC_GRACE', 7 * 24 * 3600))
+GUIDE_PREFIX = 'unit_guide_'
+PARTIAL_SUFFIX = '.partial'
+
+# Fields of each source row that affect the generated guide
+INPUT_FIELDS = {
+    'syllabus': ('unit_title', 'content'),
+    'questions': ('question_text', 'marks'),
+    'notes': ('source_name', 'title', 'description'),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pdf_artifacts (
+    input_hash TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    subject_code TEXT NOT NULL,
+    unit INTEGER NOT NULL,
+    filename TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    meta TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    published_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_pdf_artifacts_unit ON pdf_artifacts(kind, subject_code, unit);
+"""
+
+
+def unit_input_hash(data: Dict, subject_code: str, unit_number: int, versions: Dict) -> str:
+    """Hash of a unit's source rows plus prompt/template versions"""
+    inputs = {
+        name: sorted(json.dumps({f: row.get(f) for f in fields}, sort_keys=True, default=str)
+                     for row in data.get(name) or [])
+        for name, fields in INPUT_FIELDS.items()
+    }
+    subject = data.get('subject') or {}
+    encoded = json.dumps({
+        'subject_code': str(subject_code),
+        'unit': int(unit_number),
+        'subject_name': subject.get('subject_name'),
+        'inputs': inputs,
+        'versions': versions,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class PDFCache:
+    """Manifest of generated PDF artifacts in PDF_DIR"""
+
+    def __init__(self, pdf_dir: str = PDF_DIR, db_path: Optional[str] = None):
+        self.pdf_dir = pdf_dir
+        self.db_path = db_path or get_db_path('pdf_artifacts')
+        os.makedirs(pdf_dir, exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        return connect(self.db_path)
+
+    def path(self, filename: str) -> str:
+        return os.path.join(self.pdf_dir, filename)
+
+    @staticmethod
+    def filename(kind: str, subject_code: str, unit: int, input_hash: str) -> str:
+        return f"{kind}_{subject_code}_unit{unit}_{input_hash[:16]}.pdf"
+
+    # ---------- entries ----------
+
+    def get(self, input_hash: str) -> Optional[Dict]:
+        """Artifact for input_hash if its file still exists"""
+        row = self._conn().execute("SELECT * FROM pdf_artifacts WHERE input_hash = ?", (input_hash,)).fetchone()
+        if row is None:
+            return None
+        if not os.path.exists(self.path(row['filename'])):
+            self._conn().execute("DELETE FROM pdf_artifacts WHERE input_hash = ?", (input_hash,))
+            return None
+        self._conn().execute("UPDATE pdf_artifacts SET last_used_at = ? WHERE input_hash = ?",
+                             (time.time(), input_hash))
+        return self._entry(row)
+
+    def published(self, kind: str, subject_code: str, unit: int) -> Optional[Dict]:
+        """Artifact currently published (linked from the notes table) for a unit"""
+        row = self._conn().execute(
+            """SELECT * FROM pdf_artifacts WHERE kind = ? AND subject_code = ? AND unit = ?
+               AND published_at IS NOT NULL ORDER BY published_at DESC LIMIT 1""",
+            (kind, str(subject_code), int(unit))
+        ).fetchone()
+        return self._entry(row) if row else None
+
+    @contextmanager
+    def writing(self, filename: str):
+        """Yield a temporary path to render into; renamed into place on success"""
+        final = self.path(filename)
+        partial = f"{final}.{os.getpid()}{PARTIAL_SUFFIX}"
+        try:
+            yield partial
+            os.replace(partial, final)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+
+    def put(self, input_hash: str, kind: str, subject_code: str, unit: int, filename: str,
+            meta: Optional[Dict] = None) -> Dict:
+        now = time.time()
+        self._conn().execute(
+            """INSERT INTO pdf_artifacts
+               (input_hash, kind, subject_code, unit, filename, size, meta, created_at, last_used_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (input_hash) DO UPDATE SET
+               filename = excluded.filename, size = excluded.size, meta = excluded.meta,
+               created_at = excluded.created_at, last_used_at = excluded.last_used_at""",
+            (input_hash, kind, str(subject_code), int(unit), filename, os.path.getsize(self.path(filename)),
+             json.dumps(meta or {}), now, now)
+        )
+        return self.get(input_hash)
+
+    def mark_published(self, input_hash: str):
+        self._conn().execute("UPDATE pdf_artifacts SET published_at = ? WHERE input_hash = ?",
+                             (time.time(), input_hash))
+
+    def _entry(self, row) -> Dict:
+        entry = dict(row)
+        entry['meta'] = json.loads(entry['meta'])
+        return entry
+
+    # ---------- garbage collection ----------
+
+    def gc(self, grace: float = PDF_GC_GRACE, dry_run: bool = False) -> Dict:
+        """
+        Delete superseded artifacts unused for `grace` seconds, forget entries
+        whose file is gone and remove orphaned guide files. The published
+        artifact of every unit is always kept.
+        """
+        conn = self._conn()
+        now = time.time()
+        stats = {'removed': 0, 'missing': 0, 'orphans': 0, 'bytes_freed': 0, 'kept': 0}
+
+        rows = conn.execute("SELECT * FROM pdf_artifacts").fetchall()
+        published = {}
+        for row in rows:
+            unit_key = (row['kind'], row['subject_code'], row['unit'])
+            if row['published_at'] and row['published_at'] > published.get(unit_key, (0, None))[0]:
+                published[unit_key] = (row['published_at'], row['input_hash'])
+        keep = {input_hash for _, input_hash in published.values()}
+
+        removable, missing = [], []
+        for row in rows:
+            path = self.path(row['filename'])
+            if not os.path.exists(path):
+                missing.append(row['input_hash'])
+            elif row['input_hash'] not in keep and now - row['last_used_at'] > grace:
+                removable.append(row)
+            else:
+                stats['kept'] += 1
+
+        referenced = {row['filename'] for row in rows}
+        orphans = []
+        for name in os.listdir(self.pdf_dir):
+            if not name.startswith(GUIDE_PREFIX) or name in referenced:
+                continue
+            # A recent file may be a render in progress or not yet in the manifest
+            min_age = 3600 if name.endswith(PARTIAL_SUFFIX) else grace
+            path = self.path(name)
+            if now - os.path.getmtime(path) > min_age:
+                orphans.append(path)
+
+        stats['missing'] = len(missing)
+        stats['removed'] = len(removable)
+        stats['orphans'] = len(orphans)
+        stats['bytes_freed'] = sum(row['size'] for row in removable) + sum(os.path.getsize(p) for p in orphans)
+        if dry_run:
+            return stats
+
+        with transaction(conn):
+            conn.executemany("DELETE FROM pdf_artifacts WHERE input_hash = ?",
+                             [(h,) for h in missing] + [(row['input_hash'],) for row in removable])
+        for path in [self.path(row['filename']) for row in removable] + orphans:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        logger.info(f"PDF cache GC: {stats}")
+        return stats
+
+    def stats(self) -> Dict:
+        row = self._conn().execute(
+            "SELECT COUNT(*) AS artifacts, COALESCE(SUM(size), 0) AS bytes FROM pdf_artifacts"
+        ).fetchone()
+        return {'artifacts': row['artifacts'], 'bytes': row['bytes'], 'pdf_dir': self.pdf_dir}
+
+
+# Singleton instance
+_pdf_cache = None
+
+
+def get_pdf_cache() -> PDFCache:
+    """Get or create PDF cache singleton"""
+    global _pdf_cache
+    if _pdf_cache is None:
+        _pdf_cache = PDFCache()
+    return _pdf_cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Garbage-collect generated PDFs in PDF_DIR")
+    parser.add_argument('--grace', type=float, default=PDF_GC_GRACE,
+                        help="Seconds a superseded or orphaned PDF is kept")
+    parser.add_argument('--dry-run', action='store_true', help="Report, do not delete")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s %(message)s')
+    cache = get_pdf_cache()
+    stats = cache.gc(grace=args.grace, dry_run=args.dry_run)
+    print(f"🧹 {'Would remove' if args.dry_run else 'Removed'} {stats['removed']} superseded and "
+          f"{stats['orphans']} orphaned PDFs ({stats['bytes_freed'] / 1e6:.1f} MB), "
+          f"forgot {stats['missing']} missing, kept {stats['kept']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,16 +5,18 @@ Generates AI-powered comprehensive study guides from scraped content
 
 import os
 from datetime import datetime
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
-from reportlab.lib import colors
+from backend.pdf_render import render_guide
 from backend.supabase_client import supabase
-from backend.ai import ai_processor
-import hashlib
-import json
+from backend.ai import ai_processor, is_error_response
+from backend.pdf_cache import get_pdf_cache, unit_input_hash
+from backend.artifact_store import get_pdf_store
+
+# Bump when the synthesis prompt below / the layout in pdf_render.py changes: every unit's guide
+# gets a new input hash and is regenerated on its next request
+GUIDE_PROMPT_VERSION = 1
+GUIDE_TEMPLATE_VERSION = 2
+GUIDE_KIND = "unit_guide"
+AI_GUIDE_SOURCE = "AI-Generated (GTU Exam Prep)"
 
 
 def fetch_unit_data(subject_code, unit_number):
@@ -50,7 +52,8 @@ def fetch_unit_data(subject_code, unit_number):
         # 4. Get Notes (using subject_code as per existing schema)
         # We fetch existing notes to use as "scraped data" source
         notes_res = supabase.table("notes").select("*").eq("subject_code", subject_code).eq("unit", unit_number).execute()
-        data["notes"] = notes_res.data
+        # Our own earlier guide is not a source (and would change the input hash on every publish)
+        data["notes"] = [n for n in notes_res.data or [] if n.get("source_name") != AI_GUIDE_SOURCE]
         
         return data
     except Exception as e:
@@ -183,7 +186,7 @@ Assume this content will be converted directly into a PDF with minimal formattin
     context = "You are an expert academic writer creating study materials for engineering students."
     
     try:
-        synthesized_content = ai_processor.generate_response(prompt, context)
+        synthesized_content = ai_processor.generate_response(prompt, context, task="study_guide")
         return synthesized_content
     except Exception as e:
         print(f"Error synthesizing content with AI: {e}")
@@ -194,214 +197,183 @@ def create_formatted_pdf(content, title, subject_code, unit_number, sources_coun
     """
     Create a well-formatted PDF from markdown-style content
     """
-    doc = SimpleDocTemplate(file_path, pagesize=letter,
-                            rightMargin=72, leftMargin=72,
-                            topMargin=72, bottomMargin=18)
-    
-    # Container for the 'Flowable' objects
-    elements = []
-    
-    # Define styles
-    styles = getSampleStyleSheet()
-    
-    # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#1e40af'),
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        fontName='Helvetica-Bold'
-    )
-    
-    subtitle_style = ParagraphStyle(
-        'Subtitle',
-        parent=styles['Normal'],
-        fontSize=12,
-        textColor=colors.gray,
-        spaceAfter=20,
-        alignment=TA_CENTER
-    )
-    
-    heading1_style = ParagraphStyle(
-        'CustomHeading1',
-        parent=styles['Heading1'],
-        fontSize=16,
-        textColor=colors.HexColor('#1e40af'),
-        spaceAfter=12,
-        spaceBefore=12,
-        fontName='Helvetica-Bold'
-    )
-    
-    heading2_style = ParagraphStyle(
-        'CustomHeading2',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.HexColor('#3b82f6'),
-        spaceAfter=10,
-        spaceBefore=10,
-        fontName='Helvetica-Bold'
-    )
-    
-    body_style = ParagraphStyle(
-        'CustomBody',
-        parent=styles['BodyText'],
-        fontSize=11,
-        alignment=TA_JUSTIFY,
-        spaceAfter=12,
-        leading=16
+    render_guide(
+        file_path,
+        title,
+        [f"Subject Code: {subject_code} | Unit {unit_number}",
+         f"Compiled from {sources_count} source(s)",
+         f"Generated on {datetime.now().strftime('%B %d, %Y')}"],
+        content,
+        note="This study guide was generated using AI to synthesize content from multiple educational sources."
     )
+    return file_path
+
+
+def _store_pdf(filename):
+    """Put a rendered guide in the artifact store (a HEAD if it already holds these bytes); returns its link"""
+    store = get_pdf_store()
+    path = get_pdf_cache().path(filename)
+    if os.path.exists(path):
+        store.put_file(path, filename)
+    return store.url(filename)
+
+
+def _cached_artifact(input_hash, filename):
+    """Existing guide for these inputs: the local cache, else the artifact store (which outlives a redeploy)"""
+    cached = get_pdf_cache().get(input_hash)
+    if cached is None:
+        stored = get_pdf_store().stat(filename)
+        if stored:
+            cached = {"input_hash": input_hash, "filename": filename, "created_at": stored["modified"]}
+    return cached
+
+
+def _publish_note(subject_code, subject_name, unit_number, title, pdf_url):
+    """Point the unit's AI-generated notes row at pdf_url"""
+    note_data = {
+        "subject_code": subject_code,
+        "subject_name": subject_name,
+        "unit": unit_number,
+        "title": title,
+        "description": f"AI-generated comprehensive study guide. Covers syllabus, theory, and questions.",
+        "file_url": pdf_url,
+        "source_url": pdf_url,
+        "source_name": AI_GUIDE_SOURCE,
+        "is_verified": True,
+        "downloads": 0,
+        "views": 0
+    }
     
-    # Title page
-    elements.append(Spacer(1, 1*inch))
-    elements.append(Paragraph(title, title_style))
-    elements.append(Paragraph(f"Subject Code: {subject_code} | Unit {unit_number}", subtitle_style))
-    elements.append(Paragraph(f"Compiled from {sources_count} source(s)", subtitle_style))
-    elements.append(Paragraph(f"Generated on {datetime.now().strftime('%B %d, %Y')}", subtitle_style))
-    elements.append(Spacer(1, 0.5*inch))
+    # Check if AI-generated guide already exists
+    existing = supabase.table("notes").select("id").eq("subject_code", subject_code).eq("unit", unit_number).eq("source_name", AI_GUIDE_SOURCE).execute()
     
-    # AI attribution
-    ai_text = Paragraph(
-        "<i>This study guide was generated using AI to synthesize content from multiple educational sources.</i>",
-        subtitle_style
+    if existing.data:
+        # Update existing
+        supabase.table("notes").update(note_data).eq("id", existing.data[0]['id']).execute()
+    else:
+        # Insert new
+        supabase.table("notes").insert(note_data).execute()
+
+
+def prepare_unit(subject_code, unit_number, refresh=False):
+    """
+    Fetch a unit's sources and hash them. Returns the unit's job dict; its
+    "cached" entry is the existing artifact for the same inputs (None when
+    the unit has to be synthesized, or refresh is set).
+    """
+    data = fetch_unit_data(subject_code, unit_number)
+    subject_name = (data.get("subject") or {}).get("subject_name", f'Subject {subject_code}')
+    # Same syllabus, notes, questions, prompt and template -> same PDF
+    input_hash = unit_input_hash(data, subject_code, unit_number,
+                                 {"prompt": GUIDE_PROMPT_VERSION, "template": GUIDE_TEMPLATE_VERSION})
+    filename = get_pdf_cache().filename(GUIDE_KIND, subject_code, unit_number, input_hash)
+    return {
+        "subject_code": subject_code,
+        "unit_number": unit_number,
+        "data": data,
+        "subject_name": subject_name,
+        "title": f"{subject_name} - Unit {unit_number} Study Guide",
+        "sources_count": len(data.get("notes", [])) + len(data.get("syllabus", [])) + len(data.get("questions", [])),
+        "input_hash": input_hash,
+        "filename": filename,
+        "cached": None if refresh else _cached_artifact(input_hash, filename),
+    }
+
+
+def reuse_unit_pdf(unit):
+    """Result for a prepared unit whose PDF already exists; republishes it if another one is linked"""
+    cache = get_pdf_cache()
+    cached = unit["cached"]
+    pdf_url = _store_pdf(cached["filename"])
+    published = cache.published(GUIDE_KIND, unit["subject_code"], unit["unit_number"])
+    if not published or published["input_hash"] != unit["input_hash"]:
+        _publish_note(unit["subject_code"], unit["subject_name"], unit["unit_number"], unit["title"], pdf_url)
+        cache.mark_published(unit["input_hash"])
+    return {
+        "success": True,
+        "pdf_url": pdf_url,
+        "title": unit["title"],
+        "sources_count": unit["sources_count"],
+        "filename": cached["filename"],
+        "generated_at": datetime.fromtimestamp(cached["created_at"]).isoformat(),
+        "input_hash": unit["input_hash"],
+        "cached": True
+    }
+
+
+def render_unit_pdf(unit, content, file_path):
+    """Render synthesized content for a prepared unit to file_path (no network, CPU only)"""
+    return create_formatted_pdf(
+        content=content,
+        title=unit["title"],
+        subject_code=unit["subject_code"],
+        unit_number=unit["unit_number"],
+        sources_count=unit["sources_count"],
+        file_path=file_path
     )
-    elements.append(ai_text)
-    elements.append(PageBreak())
-    
-    # Process content - convert markdown-style to PDF
-    lines = content.split('\n')
-    
-    for line in lines:
-        line = line.strip()
-        if not line:
-            elements.append(Spacer(1, 0.1*inch))
-            continue
-            
-        # Main headings (# Heading)
-        if line.startswith('# '):
-            heading_text = line[2:].strip()
-            elements.append(Paragraph(heading_text, heading1_style))
-            
-        # Subheadings (## Subheading)
-        elif line.startswith('## '):
-            heading_text = line[3:].strip()
-            elements.append(Paragraph(heading_text, heading2_style))
-            
-        # Bullet points
-        elif line.startswith('- ') or line.startswith('* '):
-            bullet_text = line[2:].strip()
-            elements.append(Paragraph(f"• {bullet_text}", body_style))
-            
-        # Numbered lists
-        elif line and line[0].isdigit() and '. ' in line:
-            elements.append(Paragraph(line, body_style))
-            
-        # Bold text
-        elif line.startswith('**') and line.endswith('**'):
-            bold_text = line[2:-2]
-            elements.append(Paragraph(f"<b>{bold_text}</b>", body_style))
-            
-        # Regular paragraph
-        else:
-            elements.append(Paragraph(line, body_style))
-    
-    # Build PDF
-    doc.build(elements)
-    return file_path
 
 
-def generate_unit_pdf(subject_code, unit_number):
+def publish_unit_pdf(unit):
+    """Record a freshly rendered PDF in the cache and link it from the notes table"""
+    cache = get_pdf_cache()
+    filename = unit["filename"]
+    cache.put(unit["input_hash"], GUIDE_KIND, unit["subject_code"], unit["unit_number"], filename,
+              {"title": unit["title"], "sources_count": unit["sources_count"]})
+    pdf_url = _store_pdf(filename)
+    _publish_note(unit["subject_code"], unit["subject_name"], unit["unit_number"], unit["title"], pdf_url)
+    cache.mark_published(unit["input_hash"])
+    return {
+        "success": True,
+        "pdf_url": pdf_url,
+        "title": unit["title"],
+        "sources_count": unit["sources_count"],
+        "filename": filename,
+        "generated_at": datetime.now().isoformat(),
+        "input_hash": unit["input_hash"],
+        "cached": False
+    }
+
+
+def generate_unit_pdf(subject_code, unit_number, progress=None, refresh=False):
     """
     Main function to generate a comprehensive PDF for a subject unit
+    progress: optional callback(fraction, message) used by the job system
+    refresh: regenerate even if a guide for the same inputs exists
     Returns: dict with success status, pdf_url, title, and metadata
     """
+    def report(fraction, message):
+        if progress:
+            progress(fraction, message)
+
     try:
-        # 1. Fetch comprehensive unit data
-        data = fetch_unit_data(subject_code, unit_number)
-        
-        # Check if we have enough data to proceed? 
-        # Even if we don't have notes, we might have syllabus/questions.
-        # So we proceed if we at least have subject info.
-        if not data.get("subject"):
-             # Try to proceed with just subject code if subject not found in DB
-             pass
+        # 1. Fetch comprehensive unit data (proceeds even without notes - syllabus/questions may do)
+        report(0.05, "Fetching unit data")
+        unit = prepare_unit(subject_code, unit_number, refresh=refresh)
+        if unit["cached"]:
+            report(0.9, "Unchanged unit - reusing existing PDF")
+            return reuse_unit_pdf(unit)
         
         # 2. Synthesize content with AI
-        synthesized_content = synthesize_content_with_ai(data, subject_code, unit_number)
+        report(0.2, "Synthesizing content with AI")
+        synthesized_content = synthesize_content_with_ai(unit["data"], subject_code, unit_number)
         
-        if not synthesized_content:
+        # A provider outage comes back as an apology string, not an exception; never
+        # render it - the content-addressed PDF would be cached and served until the inputs change
+        if is_error_response(synthesized_content):
             return {
                 "success": False,
                 "error": "Failed to synthesize content"
             }
         
-        # 3. Generate a unique filename
-        content_hash = hashlib.md5(f"{subject_code}_{unit_number}_{datetime.now().date()}".encode()).hexdigest()[:8]
-        filename = f"unit_guide_{subject_code}_unit{unit_number}_{content_hash}.pdf"
-        
-        # 4. Create PDF directory if it doesn't exist
-        pdf_dir = "/tmp/gtu_pdfs"
-        os.makedirs(pdf_dir, exist_ok=True)
-        file_path = os.path.join(pdf_dir, filename)
-        
-        # 5. Generate title
-        subject_name = data.get("subject", {}).get("subject_name", f'Subject {subject_code}')
-        title = f"{subject_name} - Unit {unit_number} Study Guide"
-        
-        # 6. Create formatted PDF
-        sources_count = len(data.get("notes", [])) + len(data.get("syllabus", [])) + len(data.get("questions", []))
-        create_formatted_pdf(
-            content=synthesized_content,
-            title=title,
-            subject_code=subject_code,
-            unit_number=unit_number,
-            sources_count=sources_count,
-            file_path=file_path
-        )
-        
-        # 7. For local development, use localhost URL
-        # In production, this would be uploaded to Supabase Storage or S3
-        if os.getenv('FLASK_ENV') == 'production':
-            # Production: would upload to Supabase Storage here
-            pdf_url = f"/api/pdf/{filename}"  # Served by backend
-        else:
-            # Development
-            pdf_url = f"http://localhost:5001/api/pdf/{filename}"
+        # 3. Create formatted PDF (rendered to a temp file, renamed into place)
+        # under a content-addressed filename: the hash of the inputs, not the date
+        report(0.8, "Rendering PDF")
+        with get_pdf_cache().writing(unit["filename"]) as file_path:
+            render_unit_pdf(unit, synthesized_content, file_path)
         
-        # 8. Save metadata to database
-        note_data = {
-            "subject_code": subject_code,
-            "subject_name": subject_name,
-            "unit": unit_number,
-            "title": title,
-            "description": f"AI-generated comprehensive study guide. Covers syllabus, theory, and questions.",
-            "file_url": pdf_url,
-            "source_url": pdf_url,
-            "source_name": "AI-Generated (GTU Exam Prep)",
-            "is_verified": True,
-            "downloads": 0,
-            "views": 0
-        }
-        
-        # Check if AI-generated guide already exists
-        existing = supabase.table("notes").select("id").eq("subject_code", subject_code).eq("unit", unit_number).eq("source_name", "AI-Generated (GTU Exam Prep)").execute()
-        
-        if existing.data:
-            # Update existing
-            supabase.table("notes").update(note_data).eq("id", existing.data[0]['id']).execute()
-        else:
-            # Insert new
-            supabase.table("notes").insert(note_data).execute()
-        
-        return {
-            "success": True,
-            "pdf_url": pdf_url,
-            "title": title,
-            "sources_count": sources_count,
-            "filename": filename,
-            "generated_at": datetime.now().isoformat()
-        }
+        # 4. Save metadata to database
+        report(0.95, "Saving metadata")
+        return publish_unit_pdf(unit)
         
     except Exception as e:
         print(f"Error generating PDF: {e}")
@@ -0,0 +1,573 @@
+"""
+PDF Rendering (reportlab)
+The one rendering engine behind every generated PDF: unit study guides
+(pdf_generator.py, bulk_pdf.py) and the scraper generators in scraper/
+
+This module implements:
+1. Themes - page size, margins, colours, fonts and page decoration per
+   theme, looked up by name; register_theme() adds new ones
+2. A style registry compiled once per process and theme, with TrueType
+   fonts registered once, instead of a sample stylesheet and a set of
+   ParagraphStyles (or FPDF fonts) set up for every PDF
+3. A single-pass markdown -> flowables converter: headings, bullet and
+   numbered lists (nested by indentation), **bold** / *italic* / `code` /
+   [links](url), pipe tables, fenced code blocks, block quotes and rules.
+   Text is XML-escaped, so "a < b" in generated content no longer breaks
+   reportlab's paragraph parser
+4. A common input model - a Document of markdown Sections (with optional
+   headings, page breaks and highlighted "tones") that every generator
+   builds instead of driving a PDF library itself
+5. A reusable page template: an optional cover page, then body pages with
+   a running header and page numbers
+6. Batch rendering on a process pool whose workers compile the styles once,
+   so bulk regeneration uses every core
+
+Bump GUIDE_TEMPLATE_VERSION in pdf_generator.py when the output changes.
+"""
+
+import os
+import re
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT
+from reportlab.lib.fonts import ps2tt, tt2ps
+from reportlab.lib.pagesizes import A4, letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import (BaseDocTemplate, Frame, HRFlowable, NextPageTemplate, PageBreak,
+                                PageTemplate, Paragraph, Preformatted, Spacer, Table, TableStyle)
+from reportlab.platypus.paraparser import ParaParser
+
+logger = logging.getLogger(__name__)
+
+# Concurrent renders in render_batch (one process each)
+PDF_RENDER_WORKERS = int(os.environ.get('PDF_RENDER_WORKERS', min(4, os.cpu_count() or 1)))
+CODE_LINE_LENGTH = 88
+LIST_INDENT = 14
+
+
+# ---------- themes ----------
+
+@dataclass(frozen=True)
+class Theme:
+    name: str
+    page_size: Tuple[float, float] = letter
+    # left, right, top, bottom (points)
+    margins: Tuple[float, float, float, float] = (72, 72, 72, 54)
+    accent: str = '#1e40af'
+    accent_light: str = '#3b82f6'
+    font: str = 'Helvetica'
+    mono_font: str = 'Courier'
+    # TrueType files for `font`: (('normal', path), ('bold', path), ('italic', path), ('boldItalic', path))
+    font_files: Tuple[Tuple[str, str], ...] = ()
+    body_size: float = 11
+    cover_page: bool = True
+    running_header: bool = True
+    # Background of sections rendered with Section(tone=...)
+    tones: Tuple[Tuple[str, str], ...] = (('highlight', '#fefce8'), ('example', '#f0fdf4'), ('note', '#eff6ff'))
+
+
+THEMES: Dict[str, Theme] = {theme.name: theme for theme in (
+    # Unit study guides: cover page, running header
+    Theme('guide'),
+    # Scraper guides: title on the first page, A4
+    Theme('classic', page_size=A4, accent='#1a56db', accent_light='#1e40af', cover_page=False,
+          running_header=False),
+)}
+
+_styles: Dict[Tuple[str, Optional[str]], Dict[str, ParagraphStyle]] = {}
+_styles_lock = threading.RLock()
+_registered_fonts: Dict[str, str] = {}
+
+
+def register_theme(theme: Theme):
+    """Add or replace a theme; its styles are recompiled on next use"""
+    with _styles_lock:
+        THEMES[theme.name] = theme
+        for key in [k for k in _styles if k[0] == theme.name]:
+            del _styles[key]
+
+
+def get_theme(name: str) -> Theme:
+    try:
+        return THEMES[name]
+    except KeyError:
+        raise ValueError(f"Unknown PDF theme: {name}") from None
+
+
+def _font_family(theme: Theme) -> str:
+    """Register the theme's TrueType fonts once per process; falls back to Helvetica if they fail to load"""
+    if not theme.font_files:
+        return theme.font
+    if theme.font not in _registered_fonts:
+        files = dict(theme.font_files)
+        try:
+            names = {}
+            for variant in ('normal', 'bold', 'italic', 'boldItalic'):
+                path = files.get(variant) or files['normal']
+                names[variant] = theme.font if variant == 'normal' else f"{theme.font}-{variant}"
+                pdfmetrics.registerFont(TTFont(names[variant], path))
+            pdfmetrics.registerFontFamily(theme.font, **names)
+            _registered_fonts[theme.font] = theme.font
+        except Exception as e:
+            logger.warning(f"Theme {theme.name}: cannot load fonts {theme.font_files} ({e}), using Helvetica")
+            _registered_fonts[theme.font] = 'Helvetica'
+    return _registered_fonts[theme.font]
+
+
+def _compile_styles(theme: Theme) -> Dict[str, ParagraphStyle]:
+    base = getSampleStyleSheet()
+    family = _font_family(theme)
+    regular, bold, italic = tt2ps(family, 0, 0), tt2ps(family, 1, 0), tt2ps(family, 0, 1)
+    accent, accent_light = colors.HexColor(theme.accent), colors.HexColor(theme.accent_light)
+    size = theme.body_size
+    name = theme.name
+
+    body = ParagraphStyle(f'{name}.body', parent=base['BodyText'], fontName=regular, fontSize=size,
+                          leading=size + 5, alignment=TA_JUSTIFY, spaceAfter=12)
+    return {
+        'title': ParagraphStyle(f'{name}.title', parent=base['Heading1'], fontName=bold, fontSize=24,
+                                leading=30, textColor=accent, alignment=TA_CENTER, spaceAfter=30),
+        'subtitle': ParagraphStyle(f'{name}.subtitle', parent=base['Normal'], fontName=regular, fontSize=12,
+                                   leading=16, textColor=colors.gray, alignment=TA_CENTER, spaceAfter=20),
+        'h1': ParagraphStyle(f'{name}.h1', parent=base['Heading1'], fontName=bold, fontSize=size + 5,
+                             leading=size + 9, textColor=accent, spaceBefore=12, spaceAfter=12),
+        'h2': ParagraphStyle(f'{name}.h2', parent=base['Heading2'], fontName=bold, fontSize=size + 3,
+                             leading=size + 7, textColor=accent_light, spaceBefore=10, spaceAfter=10),
+        'h3': ParagraphStyle(f'{name}.h3', parent=base['Heading3'], fontName=bold, fontSize=size + 1,
+                             leading=size + 5, spaceBefore=8, spaceAfter=6),
+        'body': body,
+        'bullet': ParagraphStyle(f'{name}.bullet', parent=body, alignment=TA_LEFT, spaceAfter=6),
+        'quote': ParagraphStyle(f'{name}.quote', parent=body, leftIndent=18, textColor=colors.HexColor('#374151'),
+                                fontName=italic),
+        'code': ParagraphStyle(f'{name}.code', parent=base['Code'], fontName=theme.mono_font, fontSize=size - 2,
+                               leading=size + 1, backColor=colors.HexColor('#f3f4f6'), borderPadding=6,
+                               spaceBefore=4, spaceAfter=10),
+        'cell': ParagraphStyle(f'{name}.cell', parent=body, fontSize=size - 1.5, leading=size + 1,
+                               alignment=TA_LEFT, spaceAfter=0),
+        'header_cell': ParagraphStyle(f'{name}.header_cell', parent=body, fontName=bold, fontSize=size - 1.5,
+                                      leading=size + 1, alignment=TA_LEFT, spaceAfter=0, textColor=colors.white),
+    }
+
+
+def _compile_tone(theme: Theme, tone: str, styles: Dict[str, ParagraphStyle]) -> Dict[str, ParagraphStyle]:
+    """Variant of a theme's styles with a shaded background for body text"""
+    background = dict(theme.tones).get(tone)
+    if background is None:
+        raise ValueError(f"Theme {theme.name} has no tone {tone!r}")
+    toned = dict(styles)
+    for key in ('body', 'bullet', 'quote'):
+        toned[key] = ParagraphStyle(f'{theme.name}.{tone}.{key}', parent=styles[key],
+                                    backColor=colors.HexColor(background), borderPadding=4,
+                                    leftIndent=styles[key].leftIndent + 4, rightIndent=4)
+    return toned
+
+
+def get_styles(theme: str = 'guide', tone: Optional[str] = None) -> Dict[str, ParagraphStyle]:
+    """Process-wide style registry per theme (and tone), compiled on first use"""
+    key = (theme, tone)
+    styles = _styles.get(key)
+    if styles is None:
+        with _styles_lock:
+            styles = _styles.get(key)
+            if styles is None:
+                if tone is None:
+                    styles = _compile_styles(get_theme(theme))
+                else:
+                    styles = _compile_tone(get_theme(theme), tone, get_styles(theme))
+                _styles[key] = styles
+    return styles
+
+
+# ---------- inline markup ----------
+
+CODE_SPAN_RE = re.compile(r"`([^`]+)`")
+LINK_RE = re.compile(r"\[([^\]]+)\]\((https?://[^)\s]+)\)")
+BOLD_RE = re.compile(r"\*\*(.+?)\*\*|__(.+?)__")
+ITALIC_RE = re.compile(r"(?<![\w*])\*(?!\s)(.+?)(?<!\s)\*(?!\*)|(?<!\w)_(?!\s)(.+?)(?<!\s)_(?!\w)")
+BOLD, ITALIC, CODE = 1, 2, 4
+
+
+EMPHASIS = ((BOLD_RE, BOLD), (ITALIC_RE, ITALIC))
+
+
+def _emphasis(text: str, flags: int, rules=EMPHASIS):
+    """Yield (text, flags) runs, applying bold then italic"""
+    if not rules:
+        yield text, flags
+        return
+    (pattern, flag), rest = rules[0], rules[1:]
+    pos = 0
+    for match in pattern.finditer(text):
+        if match.start() > pos:
+            yield from _emphasis(text[pos:match.start()], flags, rest)
+        yield from _emphasis(match.group(1) or match.group(2), flags | flag, rest)
+        pos = match.end()
+    if pos < len(text):
+        yield from _emphasis(text[pos:], flags, rest)
+
+
+def inline_runs(text: str) -> List[Tuple[str, int]]:
+    """Markdown inline markup -> [(plain text, BOLD|ITALIC|CODE flags)]; code spans are literal"""
+    runs = []
+    for n, part in enumerate(CODE_SPAN_RE.split(text)):
+        if n % 2:
+            runs.append((part, CODE))
+        elif part:
+            runs.extend(_emphasis(part, 0))
+    return runs
+
+
+def _markup(run: str, flags: int) -> str:
+    run = escape(run)
+    if flags & CODE:
+        return f'<font face="Courier">{run}</font>'
+    if flags & ITALIC:
+        run = f"<i>{run}</i>"
+    return f"<b>{run}</b>" if flags & BOLD else run
+
+
+def inline(text: str) -> str:
+    """Markdown inline markup -> reportlab paragraph markup (XML-escaped)"""
+    parts = []
+    pos = 0
+    for match in LINK_RE.finditer(text):
+        parts += [_markup(*run) for run in inline_runs(text[pos:match.start()])]
+        parts.append(f'<link href="{escape(match.group(2), {chr(34): "&quot;"})}" color="blue">'
+                     f'{escape(match.group(1))}</link>')
+        pos = match.end()
+    parts += [_markup(*run) for run in inline_runs(text[pos:])]
+    return ''.join(parts)
+
+
+_frag_protos: Dict = {}
+
+
+def _frags(runs: List[Tuple[str, int]], style: ParagraphStyle) -> List:
+    """Paragraph fragments built directly, skipping reportlab's per-paragraph markup parser"""
+    proto = _frag_protos.get(style.name)
+    if proto is None:
+        proto = _frag_protos[style.name] = ParaParser().parse('x', style)[1][0]
+    family, bold, italic = ps2tt(style.fontName)
+    frags = []
+    for run, flags in runs:
+        run_bold, run_italic = bold or bool(flags & BOLD), italic or bool(flags & ITALIC)
+        font = tt2ps('courier' if flags & CODE else family, run_bold, run_italic)
+        frags.append(proto.clone(text=run, fontName=font, bold=int(run_bold), italic=int(run_italic)))
+    return frags
+
+
+def paragraph(text: str, style: ParagraphStyle, bullet: Optional[str] = None) -> Paragraph:
+    """Paragraph for one block of markdown text"""
+    if not LINK_RE.search(text):
+        runs = inline_runs(text)
+        if runs:
+            return Paragraph(text, style, bulletText=bullet, frags=_frags(runs, style))
+    return Paragraph(inline(text), style, bulletText=bullet)
+
+
+# ---------- block structure ----------
+
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*$")
+BULLET_RE = re.compile(r"^(\s*)[-*+]\s+(.*)$")
+NUMBERED_RE = re.compile(r"^(\s*)(\d+)[.)]\s+(.*)$")
+RULE_RE = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+TABLE_SEPARATOR_RE = re.compile(r"^\s*\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?\s*$")
+
+
+def _table_cells(line: str) -> List[str]:
+    line = line.strip()
+    if line.startswith('|'):
+        line = line[1:]
+    if line.endswith('|') and not line.endswith('\\|'):
+        line = line[:-1]
+    return [cell.strip().replace('\\|', '|') for cell in re.split(r"(?<!\\)\|", line)]
+
+
+def _table(rows: List[List[str]], styles: Dict[str, ParagraphStyle], width: float, theme: Theme) -> Table:
+    columns = max(len(row) for row in rows)
+    data = [
+        [paragraph(cell, styles['header_cell' if r == 0 else 'cell'])
+         for cell in row + [''] * (columns - len(row))]
+        for r, row in enumerate(rows)
+    ]
+    table = Table(data, colWidths=[width / columns] * columns, repeatRows=1, hAlign='LEFT')
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(theme.accent)),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#eff6ff')]),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#cbd5e1')),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('TOPPADDING', (0, 0), (-1, -1), 4),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+    ]))
+    return table
+
+
+def markdown_to_flowables(text: str, styles: Optional[Dict[str, ParagraphStyle]] = None,
+                          width: Optional[float] = None, theme: str = 'guide') -> List:
+    """Convert markdown to reportlab flowables in one pass over the lines"""
+    styles = styles or get_styles(theme)
+    theme_ = get_theme(theme)
+    width = width or (theme_.page_size[0] - theme_.margins[0] - theme_.margins[1])
+    flowables: List = []
+    # Blocks being collected: running text lines, a list item, a quote, table rows
+    lines_: List[str] = []
+    item: List = []
+    quote: List[str] = []
+    table: List[List[str]] = []
+    code: Optional[List[str]] = None
+
+    def flush():
+        if lines_:
+            flowables.append(paragraph(' '.join(lines_), styles['body']))
+            lines_.clear()
+        if item:
+            style, bullet, parts = item
+            flowables.append(paragraph(' '.join(parts), style, bullet))
+            item.clear()
+        if quote:
+            flowables.append(paragraph(' '.join(quote), styles['quote']))
+            quote.clear()
+        if table:
+            flowables.append(_table(table, styles, width, theme_))
+            flowables.append(Spacer(1, 8))
+            table.clear()
+
+    lines = text.replace('\r\n', '\n').split('\n')
+    for i, line in enumerate(lines):
+        if code is not None:
+            if line.strip().startswith('```'):
+                flowables.append(Preformatted('\n'.join(code) or ' ', styles['code'],
+                                              maxLineLength=CODE_LINE_LENGTH, newLineChars=''))
+                code = None
+            else:
+                code.append(line.rstrip())
+            continue
+
+        stripped = line.strip()
+        if not stripped:
+            flush()
+            continue
+        if stripped.startswith('```'):
+            flush()
+            code = []
+            continue
+
+        if '|' in stripped and (table or (i + 1 < len(lines) and '|' in lines[i + 1]
+                                          and TABLE_SEPARATOR_RE.match(lines[i + 1]))):
+            if not table:
+                flush()
+            if not TABLE_SEPARATOR_RE.match(stripped):
+                table.append(_table_cells(stripped))
+            continue
+        if table:
+            flush()
+
+        heading = HEADING_RE.match(stripped) if stripped[0] == '#' else None
+        if heading:
+            flush()
+            level = min(len(heading.group(1)), 3)
+            flowables.append(paragraph(heading.group(2), styles[f'h{level}']))
+            continue
+        if stripped[0] in '-*_' and RULE_RE.match(stripped):
+            flush()
+            flowables.append(HRFlowable(width='100%', thickness=0.5, color=colors.HexColor('#cbd5e1'),
+                                        spaceBefore=4, spaceAfter=8))
+            continue
+        if stripped[0] == '>':
+            if not quote:
+                flush()
+            quote.append(stripped.lstrip('>').strip())
+            continue
+
+        bullet = BULLET_RE.match(line)
+        numbered = None if bullet else NUMBERED_RE.match(line)
+        if bullet or numbered:
+            flush()
+            level = min(len((bullet or numbered).group(1).expandtabs(4)) // 2, 4)
+            left = LIST_INDENT * (level + 1) + (6 if numbered else 0)
+            item[:] = [_list_style(styles['bullet'], left), '•' if bullet else f"{numbered.group(2)}.",
+                       [bullet.group(2) if bullet else numbered.group(3)]]
+            continue
+
+        # Indented lines continue the open list item; others start (or continue) a paragraph
+        if item and line[0].isspace():
+            item[2].append(stripped)
+            continue
+        if item or quote:
+            flush()
+        lines_.append(stripped)
+
+    if code is not None:
+        flowables.append(Preformatted('\n'.join(code) or ' ', styles['code'],
+                                      maxLineLength=CODE_LINE_LENGTH, newLineChars=''))
+    flush()
+    return flowables
+
+
+_list_styles: Dict = {}
+
+
+def _list_style(style: ParagraphStyle, left: float) -> ParagraphStyle:
+    """Per-indent variant of a list style, compiled once"""
+    key = (style.name, left)
+    cached = _list_styles.get(key)
+    if cached is None:
+        cached = _list_styles[key] = ParagraphStyle(f"{style.name}{int(left)}", parent=style,
+                                                    leftIndent=style.leftIndent + left,
+                                                    bulletIndent=style.leftIndent + left - LIST_INDENT + 2)
+    return cached
+
+
+# ---------- document model ----------
+
+@dataclass
+class Section:
+    """A block of markdown, optionally under its own heading"""
+    markdown: str = ''
+    heading: str = ''
+    level: int = 1
+    # Name of a theme tone ('highlight', 'example', 'note') to shade the body text
+    tone: Optional[str] = None
+    new_page: bool = False
+
+
+@dataclass
+class Document:
+    """Everything a generator hands to the renderer; plain data, so it pickles to render workers"""
+    title: str
+    subtitle_lines: List[str] = field(default_factory=list)
+    sections: List[Section] = field(default_factory=list)
+    note: Optional[str] = None
+    theme: str = 'guide'
+    running_title: Optional[str] = None
+
+    @classmethod
+    def from_markdown(cls, title: str, markdown: str, **kwargs) -> 'Document':
+        return cls(title, sections=[Section(markdown)], **kwargs)
+
+
+# ---------- page template ----------
+
+class GuideDocTemplate(BaseDocTemplate):
+    """Optional cover page followed by body pages with a running header and page number"""
+
+    def __init__(self, filename, running_title: str = '', theme: str = 'guide', **kwargs):
+        self.theme = get_theme(theme)
+        left, right, top, bottom = self.theme.margins
+        super().__init__(filename, pagesize=self.theme.page_size, leftMargin=left, rightMargin=right,
+                         topMargin=top, bottomMargin=bottom, **kwargs)
+        self.running_title = running_title
+        frame = Frame(self.leftMargin, self.bottomMargin, self.width, self.height, id='content')
+        body = PageTemplate(id='body', frames=[frame], onPage=self._decorate)
+        self.addPageTemplates([PageTemplate(id='cover', frames=[frame]), body] if self.theme.cover_page
+                              else [body])
+
+    def _decorate(self, canvas, doc):
+        width, height = self.theme.page_size
+        left, right, top, bottom = self.theme.margins
+        canvas.saveState()
+        canvas.setFont('Helvetica', 8)
+        canvas.setFillColor(colors.gray)
+        if self.theme.running_header:
+            y = height - top + 24
+            canvas.drawString(left, y, self.running_title[:110])
+            canvas.setStrokeColor(colors.HexColor('#cbd5e1'))
+            canvas.setLineWidth(0.5)
+            canvas.line(left, y - 6, width - right, y - 6)
+        canvas.drawRightString(width - right, bottom - 24, f"Page {doc.page}")
+        canvas.restoreState()
+
+
+def render_document(document: Document, file_path: str) -> int:
+    """Render a Document to file_path; returns the page count"""
+    theme = get_theme(document.theme)
+    styles = get_styles(document.theme)
+    doc = GuideDocTemplate(file_path, running_title=document.running_title or document.title,
+                           theme=document.theme, title=document.title)
+
+    elements: List = [Spacer(1, 1 * inch)] if theme.cover_page else []
+    elements.append(Paragraph(escape(document.title), styles['title']))
+    elements += [Paragraph(escape(line), styles['subtitle']) for line in document.subtitle_lines]
+    if document.note:
+        elements += [Spacer(1, 0.5 * inch) if theme.cover_page else Spacer(1, 6),
+                     Paragraph(f"<i>{escape(document.note)}</i>", styles['subtitle'])]
+    if theme.cover_page:
+        elements += [NextPageTemplate('body'), PageBreak()]
+
+    for section in document.sections:
+        if section.new_page and not isinstance(elements[-1], PageBreak):
+            elements.append(PageBreak())
+        if section.heading:
+            elements.append(paragraph(section.heading, styles[f'h{min(max(section.level, 1), 3)}']))
+        if section.markdown:
+            section_styles = get_styles(document.theme, section.tone) if section.tone else styles
+            elements += markdown_to_flowables(section.markdown, section_styles, doc.width, document.theme)
+    doc.build(elements)
+    return doc.page
+
+
+def render_guide(file_path: str, title: str, subtitle_lines: Sequence[str], markdown: str,
+                 note: Optional[str] = None) -> int:
+    """Render a study guide (cover + markdown body) to file_path; returns the page count"""
+    return render_document(Document.from_markdown(title, markdown, subtitle_lines=list(subtitle_lines), note=note),
+                           file_path)
+
+
+# ---------- batch rendering ----------
+
+def _init_worker(themes: Tuple[Theme, ...]):
+    """Render worker start-up: bring over the parent's themes and compile their styles and fonts"""
+    for theme in themes:
+        if THEMES.get(theme.name) != theme:
+            register_theme(theme)
+        get_styles(theme.name)
+
+
+def render_pool(workers: int = PDF_RENDER_WORKERS, processes: bool = True):
+    """Executor for render jobs: worker processes with every registered theme pre-compiled, or threads"""
+    if processes:
+        # spawn: forking a process that already runs LLM or HTTP threads can deadlock on their locks
+        return ProcessPoolExecutor(max_workers=max(1, workers), mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_init_worker, initargs=(tuple(THEMES.values()),))
+    return ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='pdf-render')
+
+
+def render_batch(jobs: Sequence[Tuple[Document, str]], workers: int = PDF_RENDER_WORKERS,
+                 processes: bool = True) -> List[Union[int, Exception]]:
+    """
+    Render (document, file_path) jobs in parallel. Returns, in job order,
+    each job's page count or the exception it raised.
+    """
+    jobs = list(jobs)
+    results: List[Union[int, Exception]] = [None] * len(jobs)
+    if len(jobs) < 2 or workers < 2:
+        # A pool's start-up costs more than it saves here
+        for i, (document, file_path) in enumerate(jobs):
+            try:
+                results[i] = render_document(document, file_path)
+            except Exception as e:
+                logger.error(f"Rendering {file_path} failed: {e}")
+                results[i] = e
+        return results
+
+    with render_pool(min(workers, len(jobs)), processes) as pool:
+        futures = {pool.submit(render_document, document, file_path): i
+                   for i, (document, file_path) in enumerate(jobs)}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                logger.error(f"Rendering {jobs[i][1]} failed: {e}")
+                results[i] = e
+    return results
@@ -0,0 +1,465 @@
+"""
+Precomputed AI Artifacts
+Topic explanations and unit summaries generated ahead of time for every
+topic in syllabus_content, so /ai-chat/explain-topic and /summarize-unit
+can answer without an LLM call.
+
+This module implements:
+1. A versioned artifact store (local SQLite) keyed by kind, subject, unit,
+   topic and prompt version
+2. Source content hashing - items are only regenerated when their inputs
+   (subject, topic, syllabus content) or the prompt version changed
+3. A batch pipeline with bounded parallelism that packs several short items
+   into each LLM call (backend/batching.py) and paces itself through the
+   shared rate limiter
+4. Run records, so an interrupted run simply resumes on the next invocation
+
+Bump EXPLANATION_PROMPT_VERSION / SUMMARY_PROMPT_VERSION when the prompts
+below change; old artifacts are then ignored and regenerated.
+"""
+
+import os
+import json
+import time
+import uuid
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+
+from backend.local_store import connect, get_db_path, transaction
+from backend.batching import BatchTask, PromptBatcher
+
+logger = logging.getLogger(__name__)
+
+EXPLANATION = 'explanation'
+UNIT_SUMMARY = 'unit_summary'
+
+EXPLANATION_PROMPT_VERSION = 1
+SUMMARY_PROMPT_VERSION = 1
+PROMPT_VERSIONS = {EXPLANATION: EXPLANATION_PROMPT_VERSION, UNIT_SUMMARY: SUMMARY_PROMPT_VERSION}
+
+PRECOMPUTE_CONCURRENCY = int(os.environ.get('PRECOMPUTE_CONCURRENCY', 3))
+# Items of one kind/subject packed into a single LLM call (1 disables batching)
+PRECOMPUTE_BATCH_SIZE = int(os.environ.get('PRECOMPUTE_BATCH_SIZE', 4))
+# Per-kind cap on the above. A comprehensive explanation alone fills most of
+# the provider's max_tokens, so packing several per call truncates them
+KIND_BATCH_LIMITS = {
+    EXPLANATION: int(os.environ.get('PRECOMPUTE_EXPLANATION_BATCH_SIZE', 1)),
+}
+# Model route (backend/model_routing.py) per kind; a batched call gets the
+# route's max_tokens once per item, up to PRECOMPUTE_BATCH_MAX_TOKENS
+KIND_TASKS = {EXPLANATION: 'explanation', UNIT_SUMMARY: 'summary'}
+PRECOMPUTE_BATCH_MAX_TOKENS = int(os.environ.get('PRECOMPUTE_BATCH_MAX_TOKENS', 8000))
+# Longest a worker waits for a 'precompute' rate limit token before giving up on an item
+PRECOMPUTE_MAX_WAIT = float(os.environ.get('PRECOMPUTE_MAX_WAIT', 300))
+PAGE_SIZE = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ai_artifacts (
+    kind TEXT NOT NULL,
+    subject_code TEXT NOT NULL,
+    unit INTEGER NOT NULL,
+    topic_key TEXT NOT NULL,
+    prompt_version INTEGER NOT NULL,
+    topic TEXT,
+    source_hash TEXT NOT NULL,
+    content TEXT NOT NULL,
+    revision INTEGER NOT NULL DEFAULT 1,
+    generated_at REAL NOT NULL,
+    PRIMARY KEY (kind, subject_code, unit, topic_key, prompt_version)
+);
+CREATE INDEX IF NOT EXISTS idx_ai_artifacts_topic
+    ON ai_artifacts(kind, subject_code, topic_key, prompt_version);
+CREATE TABLE IF NOT EXISTS precompute_runs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0,
+    generated INTEGER NOT NULL DEFAULT 0,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    last_error TEXT
+);
+"""
+
+
+def normalize_topic(topic: Optional[str]) -> str:
+    """Lookup key for a topic: case and whitespace insensitive"""
+    return ' '.join((topic or '').lower().split())
+
+
+def source_hash(*parts) -> str:
+    """Stable hash of the inputs an artifact was generated from"""
+    encoded = json.dumps(parts, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+# ---------- prompts (shared with the live endpoints) ----------
+
+def explanation_prompt(subject_code: str, subject_name: str, topic: str) -> Tuple[str, str]:
+    """Return (prompt, context) for a detailed topic explanation"""
+    context = f"""You are an expert educator explaining concepts from {subject_name} ({subject_code}).
+
+Your goal is to provide a comprehensive, well-structured explanation that helps students learn effectively.
+
+Format your response with:
+- Clear headings (use ** for bold)
+- Bullet points for key concepts
+- Examples where relevant
+- Simple, student-friendly language"""
+
+    prompt = f"""Provide a detailed explanation of '{topic}' in the context of {subject_name}.
+
+Include:
+1. **Definition and Core Concepts**: What is {topic}? What are the fundamental principles?
+2. **Key Points to Remember**: The most important facts and concepts students should memorize
+3. **Real-World Applications**: Where and how is this used in practice?
+4. **Common Exam Questions**: Types of questions students might face about this topic
+5. **Study Tips**: How to best understand and remember this concept
+
+Make it comprehensive but easy to understand."""
+    return prompt, context
+
+
+def unit_summary_prompt(subject_code: str, unit: int, content: str) -> Tuple[str, str]:
+    """Return (prompt, context) for a unit summary"""
+    prompt = f"Please provide a concise summary of the following unit content for Subject {subject_code}, Unit {unit}:\n\n{content[:2000]}"
+    context = "You are an expert academic summarizer. Create a clear, bulleted summary of the key concepts in this unit."
+    return prompt, context
+
+
+def unit_summary_source(notes_rows: List[Dict], syllabus_rows: List[Dict]) -> str:
+    """Text a unit summary is generated from: note descriptions, else syllabus topics"""
+    content = "\n".join(n.get('description') or '' for n in notes_rows).strip()
+    if not content:
+        content = "\n".join(
+            ' - '.join(filter(None, [s.get('topic'), s.get('content')])) for s in syllabus_rows
+        ).strip()
+    return content
+
+
+# ---------- artifact store ----------
+
+class ArtifactStore:
+    """Versioned precomputed artifacts in the local SQLite store"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.environ.get('ARTIFACTS_DB_PATH') or get_db_path('artifacts')
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        return connect(self.db_path)
+
+    def get(self, kind: str, subject_code: str, unit: Optional[int] = None,
+            topic: Optional[str] = None) -> Optional[Dict]:
+        """
+        Latest artifact for the current prompt version.
+        unit may be omitted for explanations (topics are matched across units).
+        """
+        sql = "SELECT * FROM ai_artifacts WHERE kind = ? AND subject_code = ? AND topic_key = ? AND prompt_version = ?"
+        args = [kind, str(subject_code), normalize_topic(topic), PROMPT_VERSIONS[kind]]
+        if unit is not None:
+            sql += " AND unit = ?"
+            args.append(int(unit))
+        row = self._conn().execute(sql + " ORDER BY generated_at DESC LIMIT 1", args).fetchone()
+        return dict(row) if row else None
+
+    def current_hash(self, kind: str, subject_code: str, unit: int, topic: Optional[str] = None) -> Optional[str]:
+        row = self._conn().execute(
+            """SELECT source_hash FROM ai_artifacts
+               WHERE kind = ? AND subject_code = ? AND unit = ? AND topic_key = ? AND prompt_version = ?""",
+            (kind, str(subject_code), int(unit), normalize_topic(topic), PROMPT_VERSIONS[kind])
+        ).fetchone()
+        return row['source_hash'] if row else None
+
+    def put(self, kind: str, subject_code: str, unit: int, topic: Optional[str],
+            content: str, content_hash: str):
+        """Insert or replace an artifact, bumping its revision"""
+        conn = self._conn()
+        with transaction(conn):
+            conn.execute(
+                """INSERT INTO ai_artifacts (kind, subject_code, unit, topic_key, prompt_version, topic,
+                                             source_hash, content, revision, generated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1, ?)
+                   ON CONFLICT (kind, subject_code, unit, topic_key, prompt_version) DO UPDATE SET
+                       topic = excluded.topic,
+                       source_hash = excluded.source_hash,
+                       content = excluded.content,
+                       revision = ai_artifacts.revision + 1,
+                       generated_at = excluded.generated_at""",
+                (kind, str(subject_code), int(unit), normalize_topic(topic), PROMPT_VERSIONS[kind],
+                 topic, content_hash, content, time.time())
+            )
+
+    # ---------- runs ----------
+
+    def start_run(self) -> str:
+        run_id = uuid.uuid4().hex
+        self._conn().execute(
+            "INSERT INTO precompute_runs (id, status, started_at) VALUES (?, 'running', ?)",
+            (run_id, time.time())
+        )
+        return run_id
+
+    def update_run(self, run_id: str, **fields):
+        if not fields:
+            return
+        assignments = ', '.join(f"{name} = ?" for name in fields)
+        self._conn().execute(
+            f"UPDATE precompute_runs SET {assignments} WHERE id = ?",
+            (*fields.values(), run_id)
+        )
+
+    def last_run(self) -> Optional[Dict]:
+        row = self._conn().execute(
+            "SELECT * FROM precompute_runs ORDER BY started_at DESC LIMIT 1"
+        ).fetchone()
+        return dict(row) if row else None
+
+
+# ---------- pipeline ----------
+
+class PrecomputeItem:
+    """One artifact to (re)generate"""
+
+    def __init__(self, kind: str, subject_code: str, unit: int, topic: Optional[str],
+                 prompt: str, context: str, content_hash: str):
+        self.kind = kind
+        self.subject_code = subject_code
+        self.unit = unit
+        self.topic = topic
+        self.prompt = prompt
+        self.context = context
+        self.content_hash = content_hash
+
+    def __repr__(self):
+        return f"<{self.kind} {self.subject_code} u{self.unit} {self.topic or ''}>"
+
+
+def _fetch_all(table: str, columns: str, subject_codes: Optional[List[str]] = None) -> List[Dict]:
+    """Page through a Supabase table"""
+    from backend.supabase_client import supabase
+
+    rows, offset = [], 0
+    while True:
+        query = supabase.table(table).select(columns)
+        if subject_codes:
+            query = query.in_("subject_code", subject_codes)
+        page = query.range(offset, offset + PAGE_SIZE - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        offset += PAGE_SIZE
+
+
+def build_items(syllabus_rows: List[Dict], notes_rows: List[Dict],
+                subject_names: Optional[Dict[str, str]] = None) -> List[PrecomputeItem]:
+    """Turn syllabus/notes rows into explanation and unit summary work items"""
+    subject_names = subject_names or {}
+    items = []
+    units: Dict[Tuple[str, int], List[Dict]] = {}
+    notes_by_unit: Dict[Tuple[str, int], List[Dict]] = {}
+
+    for note in notes_rows:
+        try:
+            key = (str(note['subject_code']), int(note['unit']))
+        except (KeyError, TypeError, ValueError):
+            continue
+        notes_by_unit.setdefault(key, []).append(note)
+
+    seen_topics = set()
+    for row in syllabus_rows:
+        subject_code, topic = str(row.get('subject_code') or ''), row.get('topic')
+        try:
+            unit = int(row.get('unit'))
+        except (TypeError, ValueError):
+            continue
+        if not subject_code:
+            continue
+        units.setdefault((subject_code, unit), []).append(row)
+
+        if not normalize_topic(topic) or (subject_code, unit, normalize_topic(topic)) in seen_topics:
+            continue
+        seen_topics.add((subject_code, unit, normalize_topic(topic)))
+
+        subject_name = subject_names.get(subject_code) or row.get('subject_name') or subject_code
+        prompt, context = explanation_prompt(subject_code, subject_name, topic)
+        items.append(PrecomputeItem(
+            EXPLANATION, subject_code, unit, topic, prompt, context,
+            source_hash(EXPLANATION_PROMPT_VERSION, subject_code, subject_name, topic, row.get('content'))
+        ))
+
+    for (subject_code, unit), rows in sorted(units.items()):
+        content = unit_summary_source(notes_by_unit.get((subject_code, unit), []), rows)
+        if not content:
+            continue
+        prompt, context = unit_summary_prompt(subject_code, unit, content)
+        items.append(PrecomputeItem(
+            UNIT_SUMMARY, subject_code, unit, None, prompt, context,
+            source_hash(SUMMARY_PROMPT_VERSION, subject_code, unit, content)
+        ))
+    return items
+
+
+class Precomputer:
+    """
+    Walks every work item, skips those whose source hash is unchanged and
+    generates the rest with bounded parallelism.
+    """
+
+    def __init__(self, store: Optional[ArtifactStore] = None,
+                 generate: Optional[Callable[..., str]] = None,
+                 concurrency: int = PRECOMPUTE_CONCURRENCY,
+                 batch_size: int = PRECOMPUTE_BATCH_SIZE,
+                 pace: bool = True):
+        self.store = store or get_artifact_store()
+        self._generate = generate
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size)
+        self.pace = pace
+
+    def generate(self, prompt: str, context: str, task: Optional[str] = None,
+                 max_tokens: Optional[int] = None) -> str:
+        """generate(prompt, context, task=..., max_tokens=...) -> text (ai_processor.generate_response by default)"""
+        if self._generate is None:
+            from backend.ai import ai_processor
+            self._generate = ai_processor.generate_response
+        return self._generate(prompt, context, task=task, max_tokens=max_tokens)
+
+    def load_items(self, subject_codes: Optional[List[str]] = None) -> List[PrecomputeItem]:
+        """Read syllabus_content / notes / subjects from Supabase"""
+        syllabus_rows = _fetch_all("syllabus_content", "subject_code, subject_name, unit, topic, content", subject_codes)
+        notes_rows = _fetch_all("notes", "subject_code, unit, description", subject_codes)
+        subjects = _fetch_all("subjects", "subject_code, subject_name")
+        names = {str(s.get('subject_code')): s.get('subject_name') for s in subjects if s.get('subject_name')}
+        return build_items(syllabus_rows, notes_rows, names)
+
+    def pending(self, items: List[PrecomputeItem], force: bool = False) -> List[PrecomputeItem]:
+        """Items whose artifact is missing or was generated from different content"""
+        if force:
+            return list(items)
+        return [
+            item for item in items
+            if self.store.current_hash(item.kind, item.subject_code, item.unit, item.topic) != item.content_hash
+        ]
+
+    def _complete(self, prompt: str, context: str, kind: str, items: int = 1) -> Optional[str]:
+        """
+        One paced provider call on kind's model route; None if the provider
+        fell back to an error message. A call answering several items gets
+        the route's token budget once per item.
+        """
+        from backend.ai import is_error_response
+
+        task = KIND_TASKS.get(kind)
+        max_tokens = None
+        if items > 1:
+            from backend.model_routing import resolve_route
+            max_tokens = min(resolve_route(task).max_tokens * items, PRECOMPUTE_BATCH_MAX_TOKENS)
+        if self.pace:
+            from backend.rate_limit import get_rate_limiter
+            get_rate_limiter().wait_for_token('precompute', 'batch', max_wait=PRECOMPUTE_MAX_WAIT,
+                                              max_waiters=self.concurrency + 1)
+        content = self.generate(prompt, context, task=task, max_tokens=max_tokens)
+        return None if is_error_response(content) else content
+
+    def _batches(self, todo: List[PrecomputeItem]) -> List[List[PrecomputeItem]]:
+        """Chunk items of the same kind and subject into batches of batch_size (capped per kind)"""
+        batches = []
+        ordered = sorted(todo, key=lambda item: (item.kind, item.subject_code, item.unit))
+        for item in ordered:
+            last = batches[-1] if batches else None
+            limit = max(1, min(self.batch_size, KIND_BATCH_LIMITS.get(item.kind, self.batch_size)))
+            if (last and len(last) < limit and last[0].kind == item.kind
+                    and last[0].subject_code == item.subject_code):
+                last.append(item)
+            else:
+                batches.append([item])
+        return batches
+
+    def _process(self, batch: List[PrecomputeItem]) -> List[Optional[str]]:
+        """Generate and store a batch; returns an error (or None) per item"""
+        from backend.telemetry import current_route
+
+        token = current_route.set(f"precompute:{batch[0].kind}")
+        try:
+            kind = batch[0].kind
+            if len(batch) == 1:
+                content = self._complete(batch[0].prompt, batch[0].context, kind)
+                outputs = [(content, None if content else 'generation failed')]
+            else:
+                tasks = [
+                    BatchTask(task_id=str(i), kind=item.kind, instruction=f"{item.context}\n\n{item.prompt}",
+                              output_format='a markdown string')
+                    for i, item in enumerate(batch)
+                ]
+                complete = lambda prompt, context: self._complete(prompt, context, kind, len(batch))  # noqa: E731
+                results = PromptBatcher(complete, max_items=self.batch_size).run(tasks)
+                outputs = [(result.output, result.error) for result in results]
+        finally:
+            current_route.reset(token)
+
+        errors = []
+        for item, (content, error) in zip(batch, outputs):
+            if error is None:
+                self.store.put(item.kind, item.subject_code, item.unit, item.topic, content, item.content_hash)
+            errors.append(error)
+        return errors
+
+    def run(self, items: Optional[List[PrecomputeItem]] = None, subject_codes: Optional[List[str]] = None,
+            force: bool = False, progress: Optional[Callable[[float, str], None]] = None) -> Dict:
+        """
+        Generate every stale artifact. Safe to interrupt: finished items are
+        stored as they complete, so the next run only picks up the rest.
+        """
+        if items is None:
+            items = self.load_items(subject_codes)
+        todo = self.pending(items, force=force)
+
+        run_id = self.store.start_run()
+        counts = {'total': len(items), 'generated': 0, 'skipped': len(items) - len(todo), 'failed': 0}
+        self.store.update_run(run_id, **counts)
+        logger.info(f"Precompute run {run_id}: {len(todo)} of {len(items)} items stale")
+
+        last_error = None
+        done = 0
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='precompute') as pool:
+            futures = {pool.submit(self._process, batch): batch for batch in self._batches(todo)}
+            for future in as_completed(futures):
+                batch = futures[future]
+                done += len(batch)
+                try:
+                    errors = future.result()
+                except Exception as e:
+                    errors = [str(e)] * len(batch)
+
+                for item, error in zip(batch, errors):
+                    if error is None:
+                        counts['generated'] += 1
+                    else:
+                        counts['failed'] += 1
+                        last_error = f"{item!r}: {error}"
+                        logger.warning(f"Precompute failed for {item!r}: {error}")
+
+                self.store.update_run(run_id, generated=counts['generated'], failed=counts['failed'],
+                                      last_error=last_error)
+                if progress:
+                    progress(done / len(todo), f"{done}/{len(todo)} artifacts")
+
+        status = 'completed' if counts['failed'] == 0 else 'partial'
+        self.store.update_run(run_id, status=status, finished_at=time.time())
+        return {'run_id': run_id, 'status': status, **counts}
+
+
+# Singleton instance
+_artifact_store = None
+
+
+def get_artifact_store() -> ArtifactStore:
+    """Get or create artifact store singleton"""
+    global _artifact_store
+    if _artifact_store is None:
+        _artifact_store = ArtifactStore()
+    return _artifact_store
@@ -0,0 +1,290 @@
+"""
+Predicted Paper Cache
+Versioned cache of predicted semester papers, keyed by a hash of the inputs
+the prediction was made from
+
+This module implements:
+1. Input hashing - previous papers, question bank fingerprint and the
+   prediction version; new papers or questions change the hash
+2. Stale-while-revalidate - a stale entry (inputs changed or older than
+   PREDICTION_MAX_AGE) is still served while a background job refreshes it
+3. Single-flight generation per key via a lease row, so concurrent misses
+   across workers produce one generation, not many
+4. Cache metadata (age, staleness) for API responses
+5. Shared storage - with PREDICTION_CACHE_BACKEND=db (the default) entries
+   and leases live in Supabase, so they survive deploys and are shared by the
+   Flask app and the agent service; the local store is a per-host L1 in front
+"""
+
+import os
+import json
+import math
+import time
+import uuid
+import hashlib
+import logging
+import sqlite3
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from backend.local_store import connect, get_db_path, transaction
+
+logger = logging.getLogger(__name__)
+
+# Bump when the prediction prompt or engine changes: every entry becomes stale
+PREDICTION_VERSION = 2
+PREDICTION_MAX_AGE = float(os.environ.get('PREDICTION_MAX_AGE', 7 * 24 * 3600))
+# A generation lease expires after this long (crashed worker)
+PREDICTION_LEASE_SECONDS = float(os.environ.get('PREDICTION_LEASE_SECONDS', 300))
+# How long a concurrent miss waits for the leader's result
+PREDICTION_WAIT_SECONDS = float(os.environ.get('PREDICTION_WAIT_SECONDS', 120))
+# "db" shares entries and leases through Supabase (run
+# backend/db/add_prediction_cache_columns.sql); "local" keeps them on this host
+PREDICTION_CACHE_BACKEND = os.environ.get('PREDICTION_CACHE_BACKEND', 'db').lower()
+
+FRESH = 'fresh'
+STALE = 'stale'
+MISS = 'miss'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prediction_cache (
+    subject_id TEXT PRIMARY KEY,
+    input_hash TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    paper TEXT NOT NULL,
+    source TEXT,
+    generated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS prediction_leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+def prediction_input_hash(papers: List[Dict], question_bank: Dict, version: int = PREDICTION_VERSION) -> str:
+    """Hash of everything a prediction depends on (order of papers does not matter)"""
+    paper_keys = sorted(
+        json.dumps({k: p.get(k) for k in ('id', 'year', 'exam_type', 'paper_pdf_url')}, sort_keys=True, default=str)
+        for p in papers
+    )
+    encoded = json.dumps({'version': version, 'papers': paper_keys, 'bank': question_bank},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class SupabasePredictionStore:
+    """Entries in predicted_papers and leases in prediction_leases (shared by every host)"""
+
+    def __init__(self, client=None):
+        self.client = client
+
+    def _client(self):
+        if self.client is None:
+            from backend.supabase_client import supabase
+            self.client = supabase
+        return self.client
+
+    def get(self, subject_id) -> Optional[Dict]:
+        rows = self._client().table('predicted_papers') \
+            .select('subject_id, input_hash, version, paper_data, source, generated_at') \
+            .eq('subject_id', subject_id).execute().data
+        # Rows written before the cache columns existed carry no hash: a miss
+        if not rows or not rows[0].get('input_hash'):
+            return None
+        row = rows[0]
+        return {
+            'subject_id': str(row['subject_id']),
+            'input_hash': row['input_hash'],
+            'version': row['version'],
+            'paper': row['paper_data'],
+            'source': row.get('source'),
+            'generated_at': float(row['generated_at'])
+        }
+
+    def put(self, entry: Dict):
+        self._client().table('predicted_papers').upsert({
+            'subject_id': entry['subject_id'], 'input_hash': entry['input_hash'], 'version': entry['version'],
+            'paper_data': entry['paper'], 'source': entry['source'], 'generated_at': entry['generated_at']
+        }, on_conflict='subject_id').execute()
+
+    def acquire(self, key: str, owner: str, lease: float) -> bool:
+        result = self._client().rpc('try_prediction_lease', {
+            'lease_key': key, 'lease_owner': owner, 'ttl_seconds': max(1, math.ceil(lease))
+        }).execute()
+        return bool(result.data)
+
+    def release(self, key: str, owner: str):
+        self._client().rpc('release_prediction_lease', {'lease_key': key, 'lease_owner': owner}).execute()
+
+    def is_leased(self, key: str) -> bool:
+        now = datetime.now(timezone.utc).isoformat()
+        rows = self._client().table('prediction_leases').select('key').eq('key', key) \
+            .gte('expires_at', now).execute().data
+        return bool(rows)
+
+
+class PredictionCache:
+    """Latest prediction per subject plus generation leases"""
+
+    def __init__(self, db_path: Optional[str] = None, max_age: float = PREDICTION_MAX_AGE, shared=None):
+        """shared: a SupabasePredictionStore-like L2; None keeps everything in the local store"""
+        self.db_path = db_path or get_db_path('predictions')
+        self.max_age = max_age
+        self.shared = shared
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        return connect(self.db_path)
+
+    def _shared(self, operation: str, *args):
+        """Run an operation on the shared store; None (after a warning) when it is unreachable"""
+        try:
+            return getattr(self.shared, operation)(*args)
+        except Exception as e:
+            logger.warning(f"Shared prediction cache {operation} failed, using the local store: {e}")
+            return None
+
+    # ---------- entries ----------
+
+    def get(self, subject_id, input_hash: Optional[str] = None) -> Optional[Dict]:
+        """
+        Latest entry for a subject. With input_hash, a fresh local entry for
+        that hash is served without asking the shared store.
+        """
+        entry = self._get_local(subject_id)
+        if self.shared is None or (input_hash and self.status(entry, input_hash) == FRESH):
+            return entry
+        remote = self._shared('get', subject_id)
+        if remote and (entry is None or remote['generated_at'] > entry['generated_at']):
+            self._put_local(remote)
+            return remote
+        return entry
+
+    def put(self, subject_id, input_hash: str, paper: Dict, source: str = 'ai'):
+        entry = {'subject_id': str(subject_id), 'input_hash': input_hash, 'version': PREDICTION_VERSION,
+                 'paper': paper, 'source': source, 'generated_at': time.time()}
+        self._put_local(entry)
+        if self.shared is not None:
+            self._shared('put', entry)
+
+    def _get_local(self, subject_id) -> Optional[Dict]:
+        row = self._conn().execute("SELECT * FROM prediction_cache WHERE subject_id = ?",
+                                   (str(subject_id),)).fetchone()
+        if row is None:
+            return None
+        entry = dict(row)
+        entry['paper'] = json.loads(entry['paper'])
+        return entry
+
+    def _put_local(self, entry: Dict):
+        self._conn().execute(
+            """INSERT OR REPLACE INTO prediction_cache
+               (subject_id, input_hash, version, paper, source, generated_at)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            (str(entry['subject_id']), entry['input_hash'], entry['version'], json.dumps(entry['paper']),
+             entry['source'], entry['generated_at'])
+        )
+
+    def status(self, entry: Optional[Dict], input_hash: str) -> str:
+        """fresh, stale (servable, needs refresh) or miss"""
+        if entry is None:
+            return MISS
+        if (entry['input_hash'] != input_hash or entry['version'] != PREDICTION_VERSION
+                or time.time() - entry['generated_at'] > self.max_age):
+            return STALE
+        return FRESH
+
+    def describe(self, entry: Optional[Dict], status: str, refreshing: bool = False) -> Dict:
+        """Cache metadata attached to responses"""
+        if entry is None:
+            return {'status': status, 'age_seconds': 0, 'generated_at': None, 'refreshing': refreshing}
+        return {
+            'status': status,
+            'age_seconds': round(time.time() - entry['generated_at']),
+            'generated_at': entry['generated_at'],
+            'source': entry['source'],
+            'refreshing': refreshing
+        }
+
+    # ---------- single flight ----------
+
+    def acquire(self, key: str, owner: str, lease: float = PREDICTION_LEASE_SECONDS) -> bool:
+        """Take the generation lease for key (expired leases are taken over)"""
+        if self.shared is not None:
+            acquired = self._shared('acquire', key, owner, lease)
+            if acquired is not None:
+                return acquired
+        conn = self._conn()
+        now = time.time()
+        with transaction(conn):
+            conn.execute("DELETE FROM prediction_leases WHERE key = ? AND expires_at < ?", (key, now))
+            try:
+                conn.execute("INSERT INTO prediction_leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                             (key, owner, now + lease))
+                return True
+            except sqlite3.IntegrityError:
+                return False
+
+    def release(self, key: str, owner: str):
+        if self.shared is not None:
+            self._shared('release', key, owner)
+        self._conn().execute("DELETE FROM prediction_leases WHERE key = ? AND owner = ?", (key, owner))
+
+    def is_leased(self, key: str) -> bool:
+        if self.shared is not None and self._shared('is_leased', key):
+            return True
+        row = self._conn().execute("SELECT 1 FROM prediction_leases WHERE key = ? AND expires_at >= ?",
+                                   (key, time.time())).fetchone()
+        return row is not None
+
+    def single_flight(self, subject_id, input_hash: str, generate: Callable[[], Optional[Dict]],
+                      source: str = 'ai', wait: float = PREDICTION_WAIT_SECONDS,
+                      poll: float = 0.5, force: bool = False) -> Optional[Dict]:
+        """
+        Generate and store a prediction unless another caller already is; in
+        that case wait for its result. Returns the cache entry (or None if
+        generation failed or the wait timed out).
+
+        force (an explicit user refresh) ignores a fresh entry generated
+        before this call, but still shares one generation with concurrent
+        forced callers through the lease.
+        """
+        key = f"{subject_id}:{input_hash}"
+        owner = uuid.uuid4().hex
+        started = time.time()
+        deadline = started + wait
+        while True:
+            entry = self.get(subject_id)
+            if (entry and entry['input_hash'] == input_hash and self.status(entry, input_hash) == FRESH
+                    and (not force or entry['generated_at'] >= started)):
+                return entry
+
+            if self.acquire(key, owner):
+                try:
+                    paper = generate()
+                    if not paper:
+                        return None
+                    self.put(subject_id, input_hash, paper, paper.get('engine') or source)
+                    return self._get_local(subject_id)
+                finally:
+                    self.release(key, owner)
+
+            if time.time() >= deadline:
+                logger.warning(f"Timed out waiting for prediction {key}")
+                return None
+            time.sleep(poll)
+
+
+# Singleton instance
+_prediction_cache = None
+
+
+def get_prediction_cache() -> PredictionCache:
+    """Get the singleton prediction cache instance"""
+    global _prediction_cache
+    if _prediction_cache is None:
+        shared = SupabasePredictionStore() if PREDICTION_CACHE_BACKEND == 'db' else None
+        _prediction_cache = PredictionCache(shared=shared)
+    return _prediction_cache
@@ -0,0 +1,247 @@
+"""
+Previous Paper Ingestion
+Turns the previous year paper corpus into rows of the questions table
+
+This module implements:
+1. Paper collection - the local pyqs directory plus every
+   previous_papers.paper_pdf_url (downloaded once, by URL hash)
+2. Parallel, sha256-cached text extraction and parsing (backend/pyq_parser.py)
+3. Question rows keyed by a hash of subject + normalized text:
+   paper_count is the number of papers the question appeared in and
+   last_asked_year/session the latest of them
+4. Batched upserts into the questions table (conflict key content_hash,
+   see backend/db/add_question_ingest_columns.sql). Columns owned by
+   others - the curated unit_number and is_important, and the cluster
+   frequency_count written by backend/question_dedup.py - are only set
+   for new rows; re-ingesting keeps their current values
+
+Run: python -m backend.pyq_ingest [--remote] [--workers N] [--dry-run]
+"""
+
+import os
+import re
+import sys
+import time
+import hashlib
+import logging
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+from backend.pyq_parser import PYQ_DIR, PYQ_WORKERS, extract_texts, parse_paper_text
+from backend.question_stats import exam_time
+
+logger = logging.getLogger(__name__)
+
+PYQ_DOWNLOAD_DIR = os.environ.get('PYQ_DOWNLOAD_DIR', '/tmp/gtu_pyqs')
+PYQ_UPSERT_BATCH = int(os.environ.get('PYQ_UPSERT_BATCH', 500))
+PAGE_SIZE = 1000
+
+# Set on insert only: curated later (unit mapping, importance) or owned by
+# the dedup write-back (frequency_count = cluster frequency)
+PRESERVED_COLUMNS = ('unit_number', 'frequency_count', 'is_important')
+
+
+def normalize_question(text: str) -> str:
+    """Case, punctuation and whitespace insensitive form of a question"""
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', text.lower()).split())
+
+
+def content_hash(subject_id, text: str) -> str:
+    return hashlib.sha256(f"{subject_id}:{normalize_question(text)}".encode('utf-8')).hexdigest()
+
+
+def _fetch_all(client, table: str, columns: str) -> List[Dict]:
+    rows, offset = [], 0
+    while True:
+        page = client.table(table).select(columns).range(offset, offset + PAGE_SIZE - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        offset += PAGE_SIZE
+
+
+def download_papers(rows: List[Dict], directory: str = PYQ_DOWNLOAD_DIR,
+                    timeout: float = 30) -> List[Tuple[str, Dict]]:
+    """Fetch previous_papers PDFs not downloaded yet; returns (path, row) pairs"""
+    import requests
+
+    os.makedirs(directory, exist_ok=True)
+    downloaded = []
+    for row in rows:
+        url = row.get('paper_pdf_url')
+        if not url or not url.lower().startswith('http'):
+            continue
+        path = os.path.join(directory, hashlib.sha1(url.encode('utf-8')).hexdigest()[:20] + '.pdf')
+        if not os.path.exists(path):
+            try:
+                response = requests.get(url, timeout=timeout)
+                response.raise_for_status()
+                if not response.content.startswith(b'%PDF'):
+                    raise ValueError("not a PDF")
+            except Exception as e:
+                logger.warning(f"Could not download {url}: {e}")
+                continue
+            tmp = path + '.part'
+            with open(tmp, 'wb') as f:
+                f.write(response.content)
+            os.replace(tmp, path)
+        downloaded.append((path, row))
+    return downloaded
+
+
+def question_rows(papers: List[Dict]) -> List[Dict]:
+    """
+    One questions-table row per distinct question per subject. Each paper
+    needs a subject_id; an OR alternative is a question like any other.
+    """
+    rows: Dict[str, Dict] = {}
+    for paper in papers:
+        subject_id = paper.get('subject_id')
+        if subject_id is None:
+            continue
+        when = exam_time(paper.get('year'), paper.get('session'))
+        for q in paper['questions']:
+            key = content_hash(subject_id, q['text'])
+            row = rows.get(key)
+            if row is None:
+                row = rows[key] = {
+                    'subject_id': subject_id,
+                    'unit_number': 0,  # unknown until mapped to the syllabus
+                    'question_text': q['text'],
+                    'marks': q['marks'],
+                    'question_type': 'Short' if q['marks'] <= 4 else 'Long',
+                    'gtu_section': f"Q{q['q_number']}",
+                    'paper_count': 0,
+                    'content_hash': key,
+                    'last_asked_year': None,
+                    'last_asked_session': None,
+                    '_papers': set(),
+                    '_when': -1.0
+                }
+            row['_papers'].add(paper.get('sha256') or paper.get('source'))
+            if when > row['_when']:
+                row.update(question_text=q['text'], last_asked_year=paper.get('year'),
+                           last_asked_session=paper.get('session'), _when=when)
+
+    result = []
+    for row in rows.values():
+        row['paper_count'] = len(row.pop('_papers'))
+        # Initial values for a new row (see PRESERVED_COLUMNS)
+        row['frequency_count'] = row['paper_count']
+        row['is_important'] = row['paper_count'] > 1
+        row.pop('_when')
+        result.append(row)
+    return result
+
+
+def upsert_questions(rows: List[Dict], client, batch_size: int = PYQ_UPSERT_BATCH) -> Dict:
+    """
+    Upsert rows in batches; a failed batch is logged and counted, not fatal.
+    Rows that already exist keep their PRESERVED_COLUMNS: the current values
+    are read back and sent unchanged, so the upsert only refreshes the
+    ingest-owned columns (NOT NULL columns rule out a partial upsert).
+    """
+    upserted, failed, existing = 0, 0, 0
+    for i in range(0, len(rows), batch_size):
+        batch = rows[i:i + batch_size]
+        try:
+            current = client.table("questions").select("content_hash, " + ", ".join(PRESERVED_COLUMNS)) \
+                .in_("content_hash", [row['content_hash'] for row in batch]).execute().data or []
+            current = {row['content_hash']: row for row in current}
+            payload = []
+            for row in batch:
+                kept = current.get(row['content_hash'])
+                if kept:
+                    row = dict(row, **{column: kept[column] for column in PRESERVED_COLUMNS if column in kept})
+                payload.append(row)
+            client.table("questions").upsert(payload, on_conflict="content_hash").execute()
+            upserted += len(batch)
+            existing += len(current)
+        except Exception as e:
+            failed += len(batch)
+            logger.error(f"Question upsert batch {i // batch_size + 1} failed: {e}")
+    return {'upserted': upserted, 'existing': existing, 'upsert_failed': failed,
+            'batches': -(-len(rows) // batch_size)}
+
+
+def ingest(directory: Optional[str] = PYQ_DIR, remote: bool = False, workers: int = PYQ_WORKERS,
+           client=None, dry_run: bool = False, batch_size: int = PYQ_UPSERT_BATCH) -> Dict:
+    """Collect, extract, parse and (unless dry_run) upsert previous paper questions"""
+    if client is None and (remote or not dry_run):
+        from backend.supabase_client import supabase as client
+
+    start = time.perf_counter()
+    subject_ids = {}
+    if client is not None:
+        subject_ids = {str(s['subject_code']): s['id'] for s in _fetch_all(client, "subjects", "id, subject_code")
+                       if s.get('subject_code')}
+
+    # path -> previous_papers row (None for local files)
+    sources: Dict[str, Optional[Dict]] = {}
+    if directory and os.path.isdir(directory):
+        for name in sorted(os.listdir(directory)):
+            if name.lower().endswith('.pdf'):
+                sources[os.path.join(directory, name)] = None
+    if remote:
+        rows = _fetch_all(client, "previous_papers", "id, subject_id, year, exam_type, paper_pdf_url")
+        sources.update(download_papers(rows))
+
+    texts, extraction = extract_texts(list(sources), workers)
+
+    papers, unmatched = [], 0
+    for path, extracted in texts.items():
+        paper = parse_paper_text(extracted['text'], source=os.path.basename(path))
+        paper['sha256'] = extracted['sha256']
+        row = sources[path]
+        paper['subject_id'] = row['subject_id'] if row else subject_ids.get(paper['subject_code'])
+        if paper['subject_id'] is None and not dry_run:
+            unmatched += 1
+            logger.warning(f"No subject for {path} (code {paper['subject_code']})")
+        papers.append(paper)
+
+    if dry_run:
+        # Group by subject code so the output is meaningful without Supabase
+        for paper in papers:
+            paper['subject_id'] = paper['subject_id'] or paper['subject_code']
+    rows = question_rows(papers)
+    written = ({'upserted': 0, 'existing': 0, 'upsert_failed': 0, 'batches': 0} if dry_run
+               else upsert_questions(rows, client, batch_size))
+
+    return {
+        **extraction,
+        'papers': len(papers),
+        'unmatched_papers': unmatched,
+        'questions': sum(len(p['questions']) for p in papers),
+        'rows': len(rows),
+        **written,
+        'dry_run': dry_run,
+        'total_seconds': round(time.perf_counter() - start, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract previous year papers into the questions table")
+    parser.add_argument('--dir', default=PYQ_DIR, help="Directory of local paper PDFs")
+    parser.add_argument('--remote', action='store_true', help="Also download previous_papers.paper_pdf_url")
+    parser.add_argument('--workers', type=int, default=PYQ_WORKERS)
+    parser.add_argument('--batch-size', type=int, default=PYQ_UPSERT_BATCH)
+    parser.add_argument('--dry-run', action='store_true', help="Parse and report, do not write")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s %(message)s')
+    stats = ingest(args.dir, remote=args.remote, workers=args.workers, dry_run=args.dry_run,
+                   batch_size=args.batch_size)
+    print(f"📄 {stats['files']} PDFs, {stats['pages']} pages: {stats['cached']} cached, "
+          f"{stats['extracted']} extracted with {stats['workers']} workers"
+          + (f" at {stats['pages_per_second']} pages/s" if stats['pages_per_second'] else "")
+          + (f", {stats['failed']} failed" if stats['failed'] else ""))
+    print(f"📝 {stats['questions']} questions from {stats['papers']} papers -> {stats['rows']} distinct rows")
+    if not stats['dry_run']:
+        print(f"💾 Upserted {stats['upserted']} rows ({stats['existing']} already known) in {stats['batches']} batches"
+              + (f", {stats['upsert_failed']} failed" if stats['upsert_failed'] else ""))
+    print(f"⏱️ {stats['total_seconds']}s")
+    return 0 if not (stats['failed'] or stats['upsert_failed']) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
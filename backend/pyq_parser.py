@@ -0,0 +1,295 @@
+"""
+Previous Year Question Paper Parser
+Turns GTU question paper PDFs (data/pyqs_sem3) into structured questions
+
+This module implements:
+1. Header parsing - subject code/name, exam session and year
+2. Question parsing - Q number, part (a/b/c), marks and OR alternatives
+   from the text layout GTU papers share
+3. Parallel text extraction - PDFs are read on a process pool across CPU
+   cores and the text is cached by file sha256, so re-runs only hash files
+4. A loader for a directory of papers, memoised by file path and mtime
+"""
+
+import io
+import os
+import re
+import glob
+import time
+import hashlib
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+from backend.local_store import connect, get_db_path
+
+logger = logging.getLogger(__name__)
+
+PYQ_DIR = os.environ.get('PYQ_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                  'data', 'pyqs_sem3'))
+# Extraction processes (default: one per CPU core)
+PYQ_WORKERS = int(os.environ.get('PYQ_WORKERS', 0)) or os.cpu_count() or 1
+
+SUBJECT_CODE_RE = re.compile(r'Subject\s*Code\s*:\s*(\d{6,7})', re.IGNORECASE)
+SUBJECT_NAME_RE = re.compile(r'Subject\s*Name\s*:\s*(.+?)\s*$', re.IGNORECASE | re.MULTILINE)
+SESSION_RE = re.compile(r'\b(SUMMER|WINTER)\s*[-–]?\s*(20\d{2})\b', re.IGNORECASE)
+QUESTION_RE = re.compile(r'^Q\s*\.?\s*(\d{1,2})\b\s*(.*)$', re.IGNORECASE)
+PART_RE = re.compile(r'^\(([a-f])\)\s*(.*)$', re.IGNORECASE)
+# GTU prints marks right-aligned with a leading zero: 03, 04, 07 (14 for whole questions).
+# 10-13 are left out on purpose - they are almost always numeric data at the end of a line.
+MARKS_RE = re.compile(r'^(.*?)(?:^|\s)(0[1-9]|14)\s*$')
+PAGE_RE = re.compile(r'^(?:\d+\s*/\s*\d+|[1-9])$')
+OR_RE = re.compile(r'^OR$', re.IGNORECASE)
+END_RE = re.compile(r'^\*{3,}')
+
+
+# Symbol-font bullets extracted as private use characters
+PRIVATE_USE_RE = re.compile('[\ue000-\uf8ff]')
+
+
+def _clean(text: str) -> str:
+    return ' '.join(PRIVATE_USE_RE.sub(' ', text).split())
+
+
+def parse_header(text: str) -> Dict:
+    code = SUBJECT_CODE_RE.search(text)
+    name = SUBJECT_NAME_RE.search(text)
+    session = SESSION_RE.search(text)
+    return {
+        'subject_code': code.group(1) if code else None,
+        'subject_name': _clean(name.group(1)) if name else None,
+        'session': session.group(1).title() if session else None,
+        'year': int(session.group(2)) if session else None
+    }
+
+
+def parse_questions(text: str) -> List[Dict]:
+    """
+    Parse question parts in paper order. Each part is
+    {q_number, part, marks, text, alternative} where alternative=True marks
+    the OR option of a slot that was already printed.
+    """
+    questions = []
+    seen = set()
+    q_number, part, buffer = None, None, []
+
+    def finish(marks: int, tail: str):
+        nonlocal part, buffer
+        body = _clean(' '.join(buffer + [tail]))
+        if q_number is not None and body:
+            slot = (q_number, part or '')
+            questions.append({
+                'q_number': q_number,
+                'part': part or '',
+                'marks': marks,
+                'text': body,
+                'alternative': slot in seen
+            })
+            seen.add(slot)
+        buffer = []
+
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line or PAGE_RE.match(line):
+            continue
+        if END_RE.match(line):
+            break
+        if OR_RE.match(line):
+            continue
+
+        match = QUESTION_RE.match(line)
+        if match:
+            q_number, line = int(match.group(1)), match.group(2).strip()
+            part, buffer = None, []
+        if q_number is None:
+            continue  # still in the header / instructions
+
+        # "(b) ..." only starts a new part between questions; mid-question it is
+        # an inline list such as "(a) Change, (b) Grow"
+        match = PART_RE.match(line)
+        if match and not buffer:
+            part, line, buffer = match.group(1).lower(), match.group(2).strip(), []
+
+        match = MARKS_RE.match(line)
+        if match and (buffer or match.group(1).strip() or part is not None):
+            finish(int(match.group(2)), match.group(1))
+        elif line:
+            buffer.append(line)
+    return questions
+
+
+def parse_paper_text(text: str, source: Optional[str] = None) -> Dict:
+    """Structured paper: header fields plus its questions"""
+    paper = parse_header(text)
+    paper['source'] = source
+    paper['questions'] = parse_questions(text)
+    return paper
+
+
+def read_pdf_text(path: str) -> str:
+    """Extract the text of every page (pypdf)"""
+    return extract_pdf(path)[1]
+
+
+def extract_pdf(path: str) -> Tuple[str, str, int]:
+    """(sha256, text, page count) of one PDF - runs inside pool workers"""
+    from pypdf import PdfReader
+    with open(path, 'rb') as f:
+        data = f.read()
+    reader = PdfReader(io.BytesIO(data))
+    text = '\n'.join(page.extract_text() or '' for page in reader.pages)
+    return hashlib.sha256(data).hexdigest(), text, len(reader.pages)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PdfTextCache:
+    """Extracted text keyed by the sha256 of the PDF bytes"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or get_db_path('pyq_text')
+        connect(self.db_path).execute(
+            """CREATE TABLE IF NOT EXISTS pdf_text (
+                   sha256 TEXT PRIMARY KEY,
+                   text TEXT NOT NULL,
+                   pages INTEGER NOT NULL,
+                   extracted_at REAL NOT NULL
+               )"""
+        )
+
+    def get_many(self, hashes: List[str]) -> Dict[str, Tuple[str, int]]:
+        conn = connect(self.db_path)
+        found = {}
+        for i in range(0, len(hashes), 500):
+            chunk = hashes[i:i + 500]
+            rows = conn.execute(f"SELECT sha256, text, pages FROM pdf_text WHERE sha256 IN "
+                                f"({','.join('?' * len(chunk))})", chunk).fetchall()
+            found.update({row['sha256']: (row['text'], row['pages']) for row in rows})
+        return found
+
+    def put(self, sha256: str, text: str, pages: int):
+        connect(self.db_path).execute(
+            "INSERT OR REPLACE INTO pdf_text (sha256, text, pages, extracted_at) VALUES (?, ?, ?, ?)",
+            (sha256, text, pages, time.time())
+        )
+
+
+def extract_texts(paths: List[str], workers: int = PYQ_WORKERS,
+                  cache: Optional[PdfTextCache] = None) -> Tuple[Dict[str, Dict], Dict]:
+    """
+    Text of many PDFs. Cached files cost one hash; the rest are extracted on
+    a process pool. Returns ({path: {sha256, text, pages}}, stats) where
+    stats reports cache hits, failures and pages/sec of the extraction.
+    """
+    cache = cache or get_text_cache()
+    start = time.perf_counter()
+    hashes = {}
+    for path in paths:
+        try:
+            hashes[path] = file_sha256(path)
+        except OSError as e:
+            logger.warning(f"Could not read {path}: {e}")
+    cached = cache.get_many(sorted(set(hashes.values())))
+
+    results = {}
+    misses = []
+    for path, sha in hashes.items():
+        if sha in cached:
+            text, pages = cached[sha]
+            results[path] = {'sha256': sha, 'text': text, 'pages': pages}
+        else:
+            misses.append(path)
+    hits = len(results)
+
+    failed = len(paths) - len(hashes)
+    pages_extracted = 0
+    extract_start = time.perf_counter()
+
+    def store(path, extracted):
+        nonlocal pages_extracted
+        sha, text, pages = extracted
+        cache.put(sha, text, pages)
+        results[path] = {'sha256': sha, 'text': text, 'pages': pages}
+        pages_extracted += pages
+
+    workers = max(1, min(workers, len(misses)))
+    if workers == 1:
+        for path in misses:
+            try:
+                store(path, extract_pdf(path))
+            except Exception as e:
+                failed += 1
+                logger.warning(f"Could not extract {path}: {e}")
+    else:
+        # spawn, not fork: callers (API workers, the scheduler) are multi-threaded
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = {pool.submit(extract_pdf, path): path for path in misses}
+            for future in as_completed(futures):
+                try:
+                    store(futures[future], future.result())
+                except Exception as e:
+                    failed += 1
+                    logger.warning(f"Could not extract {futures[future]}: {e}")
+
+    extract_seconds = time.perf_counter() - extract_start
+    stats = {
+        'files': len(paths),
+        'cached': hits,
+        'extracted': len(results) - hits,
+        'failed': failed,
+        'workers': workers if misses else 0,
+        'pages': sum(r['pages'] for r in results.values()),
+        'pages_extracted': pages_extracted,
+        'pages_per_second': round(pages_extracted / extract_seconds, 1) if pages_extracted else None,
+        'seconds': round(time.perf_counter() - start, 3)
+    }
+    return results, stats
+
+
+_paper_memo: Dict[str, tuple] = {}
+
+
+def load_pyqs(directory: str = PYQ_DIR, workers: int = PYQ_WORKERS) -> List[Dict]:
+    """Parse every PDF in a directory (re-parsing only files that changed)"""
+    paths = sorted(glob.glob(os.path.join(directory, '*.pdf')))
+    stale = [p for p in paths if _paper_memo.get(p, (None,))[0] != os.path.getmtime(p)]
+    if stale:
+        texts, stats = extract_texts(stale, workers)
+        if stats['extracted']:
+            logger.info(f"Extracted {stats['pages_extracted']} pages from {stats['extracted']} PDFs "
+                        f"({stats['pages_per_second']} pages/s, {stats['cached']} cached)")
+        for path, extracted in texts.items():
+            paper = parse_paper_text(extracted['text'], source=os.path.basename(path))
+            paper['sha256'] = extracted['sha256']
+            paper['pages'] = extracted['pages']
+            _paper_memo[path] = (os.path.getmtime(path), paper)
+    return [_paper_memo[p][1] for p in paths if p in _paper_memo]
+
+
+def pyqs_for_subject(subject_code: str, directory: str = PYQ_DIR) -> List[Dict]:
+    return [p for p in load_pyqs(directory) if p['subject_code'] == str(subject_code)]
+
+
+def pyq_fingerprint(directory: str = PYQ_DIR) -> List[List]:
+    """Names, sizes and mtimes of the local papers (part of the prediction cache key)"""
+    return [[os.path.basename(p), os.path.getsize(p), int(os.path.getmtime(p))]
+            for p in sorted(glob.glob(os.path.join(directory, '*.pdf')))]
+
+
+# Singleton instance
+_text_cache = None
+
+
+def get_text_cache() -> PdfTextCache:
+    """Get the singleton extracted-text cache instance"""
+    global _text_cache
+    if _text_cache is None:
+        _text_cache = PdfTextCache()
+    return _text_cache
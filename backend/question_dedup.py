@@ -0,0 +1,584 @@
+"""
+Near-Duplicate Question Detection
+MinHash signatures and LSH banding across every question source, so one exam
+question worded slightly differently is stored and counted once
+
+This module implements:
+1. Shingling (character 5-grams of normalized text) and MinHash signatures,
+   computed for hundreds of questions at a time with NumPy
+2. LSH banding - only questions that share a band bucket become candidate
+   pairs, which are verified on estimated Jaccard similarity (sub-quadratic
+   instead of comparing every pair)
+3. Union-find clustering with a canonical member per cluster and a true
+   frequency count: distinct exam papers the question appeared in (parsed
+   papers, or the ingested paper_count of questions rows), or the number of
+   copies when no paper evidence exists
+4. A persistent index (local SQLite) so new questions are matched against
+   existing buckets incrementally instead of re-clustering everything;
+   changed texts are re-clustered and deleted source rows evicted
+5. Write-back of canonical ids and frequency counts to Supabase
+   (questions.canonical_question_id / frequency_count, important_questions.frequency);
+   a question left alone in its cluster gets canonical_question_id = NULL
+
+Items are dicts: {key, source, source_id, text, paper, paper_count, subject}.
+Sources are the questions table, scraped important_questions and parsed pyqs
+(paper = the PDF's sha256). subject is the subject code - the one key all
+three sources share - and is mixed into every LSH bucket, so questions only
+cluster with questions of the same subject.
+
+Run: python -m backend.question_dedup [--rebuild] [--dry-run]
+"""
+
+import os
+import sys
+import time
+import hashlib
+import logging
+import argparse
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from backend.local_store import connect, get_db_path, transaction
+from backend.pyq_ingest import normalize_question, _fetch_all
+
+logger = logging.getLogger(__name__)
+
+DEDUP_NUM_PERM = int(os.environ.get('DEDUP_NUM_PERM', 128))
+DEDUP_BANDS = int(os.environ.get('DEDUP_BANDS', 16))
+# Estimated Jaccard similarity of shingle sets above which two questions are duplicates
+DEDUP_THRESHOLD = float(os.environ.get('DEDUP_THRESHOLD', 0.6))
+SHINGLE_SIZE = 5
+SIGNATURE_CHUNK = 512
+WRITE_BATCH = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dedup_items (
+    key TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    source_id TEXT,
+    text TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    paper TEXT,
+    signature BLOB NOT NULL,
+    cluster TEXT NOT NULL,
+    added_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_dedup_items_cluster ON dedup_items(cluster);
+CREATE TABLE IF NOT EXISTS dedup_buckets (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (band, bucket, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_dedup_buckets_key ON dedup_buckets(key);
+"""
+
+# Canonical member preference: a questions row first, then scraped, then pyqs
+SOURCE_RANK = {'questions': 0, 'important_questions': 1, 'pyq': 2}
+
+
+class MinHasher:
+    """MinHash signatures and LSH band keys"""
+
+    def __init__(self, num_perm: int = DEDUP_NUM_PERM, bands: int = DEDUP_BANDS, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = np.random.RandomState(seed)
+        # Multiply-shift hash family: h(x) = (a*x + b) mod 2^64 >> 32 with odd a
+        self._a = rng.randint(0, 1 << 62, size=num_perm, dtype=np.int64).astype(np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.randint(0, 1 << 62, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self._band_mix = rng.randint(1, 1 << 62, size=self.rows, dtype=np.int64).astype(np.uint64)
+
+    @staticmethod
+    def shingle_hashes(texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Hashed character shingles of many texts at once: (hashes, offsets)
+        where text i owns hashes[offsets[i]:offsets[i + 1]]. Each shingle is
+        read as a 40-bit integer straight from the UTF-8 bytes and mixed
+        with a multiplicative hash - no per-shingle Python work.
+        """
+        encoded = [normalize_question(t).encode('utf-8').ljust(SHINGLE_SIZE) for t in texts]
+        lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+        data = np.frombuffer(b''.join(encoded), dtype=np.uint8).astype(np.uint64)
+        windows = len(data) - SHINGLE_SIZE + 1
+        codes = np.zeros(windows, dtype=np.uint64)
+        for j in range(SHINGLE_SIZE):
+            codes |= data[j:j + windows] << np.uint64(8 * j)
+
+        # Window positions that stay inside their own text
+        counts = lengths - SHINGLE_SIZE + 1
+        ends = np.cumsum(counts)
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        positions = np.arange(ends[-1]) + np.repeat(starts - (ends - counts), counts)
+        with np.errstate(over='ignore'):
+            hashes = (codes[positions] * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(32)
+        return hashes, np.concatenate(([0], ends[:-1]))
+
+    def signatures(self, texts: List[str]) -> np.ndarray:
+        """(n, num_perm) uint32 signatures; each chunk is one vectorized min-reduce"""
+        out = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        for start in range(0, len(texts), SIGNATURE_CHUNK):
+            chunk = texts[start:start + SIGNATURE_CHUNK]
+            hashes, offsets = self.shingle_hashes(chunk)
+            # (num_perm, shingles) so every per-text min reduces over contiguous memory
+            with np.errstate(over='ignore'):
+                permuted = ((self._a[:, None] * hashes + self._b[:, None]) >> np.uint64(32)).astype(np.uint32)
+            out[start:start + len(chunk)] = np.minimum.reduceat(permuted, offsets, axis=1).T
+        return out
+
+    def band_keys(self, signatures: np.ndarray, subjects: Optional[List[Optional[str]]] = None) -> np.ndarray:
+        """
+        (n, bands) int64 bucket keys (63 bits so they fit SQLite integers).
+        With subjects, the same rows under another subject land in another
+        bucket, so they are never even candidates.
+        """
+        banded = signatures.astype(np.uint64).reshape(len(signatures), self.bands, self.rows)
+        # uint64 arithmetic wraps, which is what a multiplicative hash wants
+        with np.errstate(over='ignore'):
+            mixed = (banded * self._band_mix).sum(axis=2, dtype=np.uint64)
+        mixed += np.arange(self.bands, dtype=np.uint64)  # same rows in another band is another bucket
+        if subjects is not None:
+            mixed ^= np.fromiter((_subject_hash(s) for s in subjects), dtype=np.uint64, count=len(subjects))[:, None]
+        return (mixed >> np.uint64(1)).astype(np.int64)
+
+    @staticmethod
+    def similarity(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """Estimated Jaccard similarity of signature rows"""
+        return (a == b).mean(axis=-1)
+
+
+class UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, x: int) -> int:
+        root = x
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[x] != root:
+            self.parent[x], x = root, self.parent[x]
+        return root
+
+    def union(self, a: int, b: int):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def candidate_pairs(band_keys: np.ndarray) -> np.ndarray:
+    """
+    (m, 2) index pairs that share a bucket in some band. Within a bucket each
+    member is paired with the bucket's first member and its predecessor, so
+    a bucket of k questions costs 2k comparisons, not k^2/2.
+    """
+    pairs = []
+    for band in range(band_keys.shape[1]):
+        keys = band_keys[:, band]
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        same = sorted_keys[1:] == sorted_keys[:-1]
+        if not same.any():
+            continue
+        # First index of the run each position belongs to
+        run_start = np.maximum.accumulate(np.where(np.concatenate(([False], same)), 0, np.arange(len(order))))
+        members = np.flatnonzero(np.concatenate(([False], same)))
+        pairs.append(np.stack([order[members - 1], order[members]], axis=1))
+        firsts = members[run_start[members] != members - 1]
+        if len(firsts):
+            pairs.append(np.stack([order[run_start[firsts]], order[firsts]], axis=1))
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    pairs = np.sort(np.concatenate(pairs), axis=1)
+    return np.unique(pairs, axis=0)
+
+
+def cluster_signatures(signatures: np.ndarray, band_keys: np.ndarray,
+                       threshold: float = DEDUP_THRESHOLD) -> Tuple[np.ndarray, Dict]:
+    """Cluster labels (smallest member index) plus candidate/match counts"""
+    pairs = candidate_pairs(band_keys)
+    matched = np.zeros(len(pairs), dtype=bool)
+    for start in range(0, len(pairs), 100_000):
+        chunk = pairs[start:start + 100_000]
+        matched[start:start + len(chunk)] = MinHasher.similarity(signatures[chunk[:, 0]],
+                                                                 signatures[chunk[:, 1]]) >= threshold
+    uf = UnionFind(len(signatures))
+    for a, b in pairs[matched]:
+        uf.union(int(a), int(b))
+    labels = np.fromiter((uf.find(i) for i in range(len(signatures))), dtype=np.int64, count=len(signatures))
+    return labels, {'candidate_pairs': int(len(pairs)), 'matched_pairs': int(matched.sum())}
+
+
+def summarize_cluster(members: List[Dict], paper_counts: Optional[Dict[str, int]] = None) -> Dict:
+    """
+    Canonical member and true frequency of one cluster. paper_counts maps
+    questions row keys to the number of papers the ingest found them in;
+    parsed papers and ingested rows usually describe the same exams, so
+    the larger of the two counts is used rather than their sum.
+    """
+    canonical = min(members, key=lambda m: (SOURCE_RANK.get(m['source'], 9), _id_order(m['source_id']), m['key']))
+    papers = {m['paper'] for m in members if m.get('paper')}
+    counted = sum((paper_counts or {}).get(m['key']) or 0 for m in members)
+    return {
+        'canonical': canonical['key'],
+        'canonical_source': canonical['source'],
+        'canonical_source_id': canonical['source_id'],
+        'question': canonical['text'],
+        'frequency': max(len(papers), counted) or len(members),
+        'papers': len(papers),
+        'from_papers': bool(papers or counted),
+        'members': members
+    }
+
+
+def _id_order(source_id):
+    try:
+        return (0, int(source_id))
+    except (TypeError, ValueError):
+        return (1, str(source_id))
+
+
+def _subject_hash(subject: Optional[str]) -> int:
+    """64-bit bucket salt for a subject; 0 (no salt) when the subject is unknown"""
+    if not subject:
+        return 0
+    return int.from_bytes(hashlib.sha1(str(subject).encode('utf-8')).digest()[:8], 'little')
+
+
+def _text_hash(text: str, subject: Optional[str] = None) -> str:
+    """Change detector: a new text or a move to another subject re-clusters the item"""
+    key = normalize_question(text) if not subject else f"{subject}\n{normalize_question(text)}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def _item_hash(item: Dict) -> str:
+    return _text_hash(item['text'], item.get('subject'))
+
+
+class DedupIndex:
+    """Persistent MinHash/LSH index with cluster assignments"""
+
+    def __init__(self, db_path: Optional[str] = None, hasher: Optional[MinHasher] = None,
+                 threshold: float = DEDUP_THRESHOLD):
+        self.db_path = db_path or get_db_path('question_dedup')
+        self.hasher = hasher or MinHasher()
+        self.threshold = threshold
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        return connect(self.db_path)
+
+    def _signature(self, blob: bytes) -> np.ndarray:
+        return np.frombuffer(blob, dtype=np.uint32)
+
+    # ---------- full rebuild ----------
+
+    def rebuild(self, items: List[Dict]) -> Dict:
+        """Re-cluster everything from scratch (vectorized, in memory)"""
+        start = time.perf_counter()
+        items = _unique_items(items)
+        signatures = self.hasher.signatures([item['text'] for item in items])
+        band_keys = self.hasher.band_keys(signatures, [item.get('subject') for item in items])
+        labels, stats = cluster_signatures(signatures, band_keys, self.threshold)
+
+        now = time.time()
+        conn = self._conn()
+        with transaction(conn):
+            conn.execute("DELETE FROM dedup_items")
+            conn.execute("DELETE FROM dedup_buckets")
+            conn.executemany(
+                "INSERT INTO dedup_items (key, source, source_id, text, text_hash, paper, signature, cluster, added_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ((item['key'], item['source'], _str(item.get('source_id')), item['text'], _item_hash(item),
+                  item.get('paper'), signatures[i].tobytes(), items[labels[i]]['key'], now)
+                 for i, item in enumerate(items))
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO dedup_buckets (band, bucket, key) VALUES (?, ?, ?)",
+                ((band, int(band_keys[i, band]), item['key'])
+                 for i, item in enumerate(items) for band in range(self.hasher.bands))
+            )
+        clusters = len(set(labels.tolist()))
+        return {**stats, 'items': len(items), 'clusters': clusters, 'duplicates': len(items) - clusters,
+                'seconds': round(time.perf_counter() - start, 3)}
+
+    # ---------- incremental ----------
+
+    def add(self, items: Iterable[Dict]) -> Dict:
+        """
+        Index new or changed items against the existing buckets. Returns
+        stats plus the ids of every cluster that gained members or merged.
+        """
+        start = time.perf_counter()
+        conn = self._conn()
+        items = _unique_items(items)
+        known = {}
+        keys = [item['key'] for item in items]
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            for row in conn.execute(f"SELECT key, text_hash FROM dedup_items WHERE key IN "
+                                    f"({','.join('?' * len(chunk))})", chunk):
+                known[row['key']] = row['text_hash']
+        new_items = [item for item in items if known.get(item['key']) != _item_hash(item)]
+        if not new_items:
+            return {'items': 0, 'matched': 0, 'affected_clusters': [], 'seconds': 0.0}
+
+        signatures = self.hasher.signatures([item['text'] for item in new_items])
+        band_keys = self.hasher.band_keys(signatures, [item.get('subject') for item in new_items])
+        affected: Set[str] = set()
+        matched = 0
+        now = time.time()
+        with transaction(conn):
+            for i, item in enumerate(new_items):
+                if item['key'] in known:
+                    # The cluster it leaves loses a member: its frequency changes too
+                    old_cluster = self._remove(conn, item['key'])
+                    if old_cluster:
+                        affected.add(old_cluster)
+                clusters = self._matching_clusters(conn, item['key'], signatures[i], band_keys[i])
+                cluster = min(clusters) if clusters else item['key']
+                if clusters:
+                    matched += 1
+                    if len(clusters) > 1:
+                        others = sorted(clusters - {cluster})
+                        conn.execute(f"UPDATE dedup_items SET cluster = ? WHERE cluster IN "
+                                     f"({','.join('?' * len(others))})", [cluster] + others)
+                        affected.update(others)
+                conn.execute(
+                    "INSERT INTO dedup_items (key, source, source_id, text, text_hash, paper, signature, cluster, added_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (item['key'], item['source'], _str(item.get('source_id')), item['text'], _item_hash(item),
+                     item.get('paper'), signatures[i].tobytes(), cluster, now)
+                )
+                conn.executemany("INSERT OR IGNORE INTO dedup_buckets (band, bucket, key) VALUES (?, ?, ?)",
+                                 [(band, int(band_keys[i, band]), item['key']) for band in range(self.hasher.bands)])
+                affected.add(cluster)
+        return {'items': len(new_items), 'matched': matched, 'affected_clusters': sorted(affected),
+                'seconds': round(time.perf_counter() - start, 3)}
+
+    def _matching_clusters(self, conn, key: str, signature: np.ndarray, band_keys: np.ndarray) -> Set[str]:
+        # One OR term per band: each is a primary key lookup
+        where = ' OR '.join(['(b.band = ? AND b.bucket = ?)'] * len(band_keys))
+        params = [v for band, bucket in enumerate(band_keys) for v in (band, int(bucket))]
+        rows = conn.execute(
+            f"SELECT DISTINCT i.key, i.signature, i.cluster FROM dedup_buckets b JOIN dedup_items i ON i.key = b.key "
+            f"WHERE {where}", params
+        ).fetchall()
+        rows = [row for row in rows if row['key'] != key]
+        if not rows:
+            return set()
+        candidates = np.stack([self._signature(row['signature']) for row in rows])
+        similar = MinHasher.similarity(candidates, signature) >= self.threshold
+        return {row['cluster'] for row, ok in zip(rows, similar) if ok}
+
+    def remove(self, keys: Iterable[str]) -> Dict:
+        """Evict items whose source rows are gone. Returns the clusters that lost members"""
+        conn = self._conn()
+        keys = list(keys)
+        affected: Set[str] = set()
+        with transaction(conn):
+            for key in keys:
+                cluster = self._remove(conn, key)
+                if cluster:
+                    affected.add(cluster)
+        return {'removed': len(keys), 'affected_clusters': sorted(affected)}
+
+    def keys(self, sources: Iterable[str]) -> Set[str]:
+        """Keys of every indexed item from the given sources"""
+        sources = list(sources)
+        rows = self._conn().execute(f"SELECT key FROM dedup_items WHERE source IN "
+                                    f"({','.join('?' * len(sources))})", sources)
+        return {row['key'] for row in rows}
+
+    def _remove(self, conn, key: str) -> Optional[str]:
+        """
+        Drop an item (its text changed or its row is gone); the rest of its
+        cluster stays together. Returns the id the rest of the cluster now
+        has, None when nothing is left.
+        """
+        conn.execute("DELETE FROM dedup_buckets WHERE key = ?", (key,))
+        row = conn.execute("SELECT cluster FROM dedup_items WHERE key = ?", (key,)).fetchone()
+        conn.execute("DELETE FROM dedup_items WHERE key = ?", (key,))
+        if not row:
+            return None
+        if row['cluster'] != key:
+            return row['cluster']
+        rest = conn.execute("SELECT key FROM dedup_items WHERE cluster = ? ORDER BY key LIMIT 1", (key,)).fetchone()
+        if not rest:
+            return None
+        conn.execute("UPDATE dedup_items SET cluster = ? WHERE cluster = ?", (rest['key'], key))
+        return rest['key']
+
+    # ---------- results ----------
+
+    def clusters(self, cluster_ids: Optional[List[str]] = None, min_size: int = 1,
+                 paper_counts: Optional[Dict[str, int]] = None) -> List[Dict]:
+        """Cluster summaries (all, or only the given cluster ids)"""
+        conn = self._conn()
+        columns = "key, source, source_id, text, paper, cluster"
+        if cluster_ids is None:
+            rows = conn.execute(f"SELECT {columns} FROM dedup_items ORDER BY cluster").fetchall()
+        else:
+            rows = []
+            for i in range(0, len(cluster_ids), 500):
+                chunk = cluster_ids[i:i + 500]
+                rows.extend(conn.execute(f"SELECT {columns} FROM dedup_items WHERE cluster IN "
+                                         f"({','.join('?' * len(chunk))})", chunk).fetchall())
+        grouped = defaultdict(list)
+        for row in rows:
+            grouped[row['cluster']].append(dict(row))
+        return [dict(summarize_cluster(members, paper_counts), cluster=cluster_id)
+                for cluster_id, members in grouped.items() if len(members) >= min_size]
+
+    def stats(self) -> Dict:
+        row = self._conn().execute(
+            "SELECT COUNT(*) AS items, COUNT(DISTINCT cluster) AS clusters FROM dedup_items").fetchone()
+        return {'items': row['items'], 'clusters': row['clusters'], 'duplicates': row['items'] - row['clusters']}
+
+
+def _str(value):
+    return None if value is None else str(value)
+
+
+def _unique_items(items: Iterable[Dict]) -> List[Dict]:
+    """Last item wins per key; items without text are skipped"""
+    unique = {}
+    for item in items:
+        if item.get('text') and item['text'].strip():
+            unique[item['key']] = item
+    return list(unique.values())
+
+
+# ---------- sources and write-back ----------
+
+def load_items(client=None, include_pyqs: bool = True) -> List[Dict]:
+    """Questions, scraped important questions and parsed pyqs as dedup items"""
+    items = []
+    if client is not None:
+        # questions rows carry a subject id; the other sources a subject code
+        codes = {row['id']: row.get('subject_code') for row in _fetch_all(client, "subjects", "id, subject_code")}
+        for row in _fetch_all(client, "questions", "id, question_text, paper_count, subject_id"):
+            items.append({'key': f"questions:{row['id']}", 'source': 'questions', 'source_id': row['id'],
+                          'text': row.get('question_text') or '', 'paper': None,
+                          'paper_count': row.get('paper_count'), 'subject': _str(codes.get(row.get('subject_id')))})
+        for row in _fetch_all(client, "important_questions", "id, question_text, subject_code"):
+            items.append({'key': f"important_questions:{row['id']}", 'source': 'important_questions',
+                          'source_id': row['id'], 'text': row.get('question_text') or '', 'paper': None,
+                          'subject': _str(row.get('subject_code'))})
+    if include_pyqs:
+        from backend.pyq_parser import load_pyqs
+        for paper in load_pyqs():
+            for i, q in enumerate(paper['questions']):
+                items.append({'key': f"pyq:{paper['sha256']}:{i}", 'source': 'pyq',
+                              'source_id': f"{paper['source']}#{i}", 'text': q['text'], 'paper': paper['sha256'],
+                              'subject': paper.get('subject_code')})
+    return items
+
+
+def write_back(clusters: List[Dict], client, batch_size: int = WRITE_BATCH) -> Dict:
+    """
+    Store canonical ids and frequencies. Rows that share an update are
+    written with one in_() filter, so a run costs a handful of requests
+    instead of one per row.
+    """
+    questions = defaultdict(list)
+    important = defaultdict(list)
+    for cluster in clusters:
+        if len(cluster['members']) < 2:
+            # A unique question (possibly one that just left a cluster): it is
+            # nobody's duplicate, and its frequency is only rewritten when
+            # papers back it - otherwise its own count stands
+            member = cluster['members'][0]
+            if member['source'] == 'questions':
+                frequency = cluster['frequency'] if cluster['from_papers'] else None
+                questions[(None, frequency)].append(int(member['source_id']))
+            continue
+        canonical_id = cluster['canonical_source_id'] if cluster['canonical_source'] == 'questions' else None
+        for member in cluster['members']:
+            if member['source'] == 'questions':
+                questions[(canonical_id, cluster['frequency'])].append(int(member['source_id']))
+            elif member['source'] == 'important_questions':
+                important[cluster['frequency']].append(int(member['source_id']))
+
+    requests, failed = 0, 0
+    updates = [("questions", {'canonical_question_id': canonical and int(canonical),
+                              **({'frequency_count': frequency} if frequency is not None else {})}, ids)
+               for (canonical, frequency), ids in questions.items()]
+    updates += [("important_questions", {'frequency': frequency}, ids) for frequency, ids in important.items()]
+    for table, values, ids in updates:
+        for i in range(0, len(ids), batch_size):
+            requests += 1
+            try:
+                client.table(table).update(values).in_("id", ids[i:i + batch_size]).execute()
+            except Exception as e:
+                failed += len(ids[i:i + batch_size])
+                logger.error(f"Dedup write-back to {table} failed: {e}")
+    return {'requests': requests, 'failed_rows': failed}
+
+
+def run(rebuild: bool = False, client=None, dry_run: bool = False, index: Optional[DedupIndex] = None,
+        rewrite_duplicates: bool = False) -> Dict:
+    """
+    Index all sources (incrementally unless rebuild) and write back the
+    clusters that changed. rewrite_duplicates also rewrites every existing
+    duplicate cluster, e.g. after frequency_count was edited by hand.
+    """
+    if client is None and not dry_run:
+        from backend.supabase_client import supabase as client
+    index = index or get_dedup_index()
+    items = load_items(client)
+    paper_counts = {item['key']: item['paper_count'] for item in items if item.get('paper_count')}
+    if rebuild:
+        stats = index.rebuild(items)
+        clusters = index.clusters(paper_counts=paper_counts)
+    else:
+        # Rows deleted at the source since the last run leave their clusters
+        sources = ['pyq'] + (['questions', 'important_questions'] if client is not None else [])
+        gone = index.remove(sorted(index.keys(sources) - {item['key'] for item in _unique_items(items)}))
+        stats = index.add(items)
+        stats['removed'] = gone['removed']
+        affected = sorted(set(stats.pop('affected_clusters')) | set(gone['affected_clusters']))
+        if rewrite_duplicates:
+            clusters = index.clusters(min_size=2, paper_counts=paper_counts)
+            seen = {c['cluster'] for c in clusters}
+            clusters += [c for c in index.clusters(affected, paper_counts=paper_counts) if c['cluster'] not in seen]
+        else:
+            clusters = index.clusters(affected, paper_counts=paper_counts)
+    written = {'requests': 0, 'failed_rows': 0} if dry_run else write_back(clusters, client)
+    return {**stats, 'index': index.stats(), 'written_clusters': len(clusters), **written}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find near-duplicate questions and write back canonical ids")
+    parser.add_argument('--rebuild', action='store_true', help="Re-cluster everything instead of adding new items")
+    parser.add_argument('--dry-run', action='store_true', help="Index and report, do not write to Supabase")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s %(message)s')
+    stats = run(rebuild=args.rebuild, dry_run=args.dry_run)
+    totals = stats['index']
+    print(f"🔎 {stats['items']} items (re)indexed in {stats['seconds']}s; index holds {totals['items']} items, "
+          f"{totals['clusters']} distinct questions, {totals['duplicates']} duplicates")
+    print(f"💾 {stats['written_clusters']} clusters written in {stats['requests']} requests"
+          + (f", {stats['failed_rows']} rows failed" if stats['failed_rows'] else ""))
+    return 1 if stats['failed_rows'] else 0
+
+
+# Singleton instance
+_dedup_index = None
+
+
+def get_dedup_index() -> DedupIndex:
+    """Get the singleton dedup index instance"""
+    global _dedup_index
+    if _dedup_index is None:
+        _dedup_index = DedupIndex()
+    return _dedup_index
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,345 @@
+"""
+Question Frequency Engine for Paper Prediction
+Predicts a GTU semester paper from real previous-year questions instead of
+asking an LLM to guess
+
+This module implements:
+1. Grouping of repeated questions across papers (TF-IDF cosine similarity,
+   vectorized with NumPy)
+2. Recency-weighted repeat statistics per question group - a question asked
+   in Winter 2024 counts more than one asked in Summer 2021
+3. Unit coverage and marks distribution of past papers
+4. A ranked 70-mark paper in the standard Q1-Q5 (a)/(b)/(c) + OR layout,
+   filled slot by slot with a vectorized score (repeat weight x marks fit x
+   question position x unit balance)
+5. Optional LLM polishing of the question wording (structure is kept)
+
+Input records are plain dicts: {text, marks, year, session, unit, weight,
+q_number}. Sources are the parsed pyqs PDFs (backend/pyq_parser.py) and
+the questions table (frequency_count becomes the weight).
+"""
+
+import os
+import re
+import json
+import logging
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Weight of a paper halves every this many years
+RECENCY_HALF_LIFE = float(os.environ.get('PREDICTION_HALF_LIFE_YEARS', 1.5))
+# Cosine similarity above which two questions count as the same question
+SIMILARITY_THRESHOLD = float(os.environ.get('PREDICTION_SIMILARITY', 0.6))
+
+# Standard GTU 70-mark layout: (question, part, marks, is OR alternative)
+GTU_LAYOUT = (
+    [(1, 'a', 3, False), (1, 'b', 4, False), (1, 'c', 7, False),
+     (2, 'a', 3, False), (2, 'b', 4, False), (2, 'c', 7, False), (2, 'c', 7, True)]
+    + [(q, part, marks, alt) for q in (3, 4, 5) for alt in (False, True)
+       for part, marks in (('a', 3), ('b', 4), ('c', 7))]
+)
+
+STOPWORDS = set("""
+a an the and or of to in on for with by from as at is are be was were this that these those it its
+what which how why when where who whom explain define describe discuss write short note notes give
+state list enlist briefly brief detail details suitable example examples neat diagram sketch using
+following given find also any two three between draw differentiate difference compare their your
+do does can will should must into about each all various type types term terms show prove
+""".split())
+TOKEN_RE = re.compile(r"[a-z][a-z0-9+#]*")
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        if token in STOPWORDS or len(token) < 2:
+            continue
+        if len(token) > 4 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def exam_time(year: Optional[int], session: Optional[str]) -> float:
+    """Exam date as a number: Summer 2023 -> 2023.0, Winter 2023 -> 2023.5"""
+    if not year:
+        return 0.0
+    return float(year) + (0.5 if (session or '').lower().startswith('w') else 0.0)
+
+
+def records_from_pyqs(papers: List[Dict]) -> List[Dict]:
+    """Flatten parsed papers (backend/pyq_parser.py) into question records"""
+    records = []
+    for paper in papers:
+        for q in paper['questions']:
+            records.append({
+                'text': q['text'], 'marks': q['marks'], 'year': paper['year'], 'session': paper['session'],
+                'unit': None, 'weight': 1.0, 'q_number': q['q_number'], 'paper': paper.get('source')
+            })
+    return records
+
+
+def records_from_question_bank(rows: List[Dict]) -> List[Dict]:
+    """Question table rows -> records (frequency_count is the weight, near-duplicates are skipped)"""
+    records = []
+    for row in rows:
+        text = row.get('question_text')
+        if not text:
+            continue
+        canonical = row.get('canonical_question_id')
+        if canonical is not None and canonical != row.get('id'):
+            continue  # near-duplicate; its canonical row carries the frequency
+        records.append({
+            'text': text, 'marks': row.get('marks') or 0,
+            'year': row.get('year') or row.get('last_asked_year'),
+            'session': row.get('session') or row.get('last_asked_session'),
+            'unit': row.get('unit_number'), 'weight': float(row.get('frequency_count') or 1),
+            'q_number': None, 'paper': None
+        })
+    return records
+
+
+class QuestionFrequencyModel:
+    """Repeat statistics of past questions for one subject"""
+
+    def __init__(self, half_life: float = RECENCY_HALF_LIFE, threshold: float = SIMILARITY_THRESHOLD):
+        self.half_life = half_life
+        self.threshold = threshold
+        self.records: List[Dict] = []
+        self.groups: List[Dict] = []
+        self.paper_count = 0
+
+    # ---------- fitting ----------
+
+    def fit(self, records: List[Dict], syllabus_units: Optional[Dict[int, str]] = None) -> 'QuestionFrequencyModel':
+        self.records = [r for r in records if r.get('text') and tokenize(r['text'])]
+        n = len(self.records)
+        if not n:
+            self.groups = []
+            self.paper_count = 0
+            self._arrays()
+            return self
+
+        matrix, vocab = self._tfidf([r['text'] for r in self.records])
+        labels = self._cluster(matrix)
+
+        times = np.array([exam_time(r.get('year'), r.get('session')) for r in self.records])
+        dated = times > 0
+        latest = times[dated].max() if dated.any() else 0.0
+        # Undated bank questions count like the oldest dated paper
+        oldest = times[dated].min() if dated.any() else 0.0
+        times = np.where(dated, times, oldest)
+        recency = 0.5 ** ((latest - times) / self.half_life)
+        weights = np.array([float(r.get('weight') or 1.0) for r in self.records])
+
+        # Recency-weighted share of papers a group appears in
+        paper_times = {r['paper']: t for r, t in zip(self.records, times) if r.get('paper')}
+        paper_mass = sum(0.5 ** ((latest - t) / self.half_life) for t in paper_times.values()) or 1.0
+        self.paper_count = len(paper_times)
+
+        group_count = labels.max() + 1
+        weighted = np.bincount(labels, weights=recency * weights, minlength=group_count)
+        counts = np.bincount(labels, weights=weights, minlength=group_count)
+
+        unit_centroids = self._unit_centroids(syllabus_units, vocab) if syllabus_units else None
+        centroids = np.zeros((group_count, matrix.shape[1]))
+        np.add.at(centroids, labels, matrix)
+
+        self.groups = []
+        for g in range(group_count):
+            members = np.flatnonzero(labels == g)
+            # Representative wording: the most recent member
+            rep = self.records[members[np.argmax(times[members])]]
+            marks = Counter(self.records[i]['marks'] for i in members if self.records[i].get('marks'))
+            units = Counter(self.records[i]['unit'] for i in members if self.records[i].get('unit'))
+            q_numbers = [self.records[i]['q_number'] for i in members if self.records[i].get('q_number')]
+            distinct_papers = {self.records[i].get('paper') for i in members if self.records[i].get('paper')}
+
+            unit = units.most_common(1)[0][0] if units else None
+            if unit is None and unit_centroids is not None:
+                unit = unit_centroids[0][int(np.argmax(unit_centroids[1] @ centroids[g]))]
+
+            terms = np.argsort(-centroids[g])[:3]
+            self.groups.append({
+                'id': g,
+                'question': rep['text'],
+                'marks': marks.most_common(1)[0][0] if marks else 0,
+                'unit': unit,
+                'keywords': [vocab[t] for t in terms if centroids[g][t] > 0],
+                'times_asked': int(round(counts[g])),
+                'papers': len(distinct_papers),
+                'last_asked': rep.get('year') and f"{rep.get('session') or ''} {rep.get('year')}".strip(),
+                'recency_weight': float(weighted[g]),
+                'repeat_probability': float(min(1.0, weighted[g] / paper_mass)) if self.paper_count else 0.0,
+                'position': float(np.mean(q_numbers)) if q_numbers else 0.0
+            })
+        self._arrays()
+        return self
+
+    def _tfidf(self, texts: List[str]):
+        docs = [tokenize(t) for t in texts]
+        vocab = sorted({t for doc in docs for t in doc})
+        index = {t: i for i, t in enumerate(vocab)}
+        matrix = np.zeros((len(docs), len(vocab)))
+        for row, doc in enumerate(docs):
+            for token, count in Counter(doc).items():
+                matrix[row, index[token]] = count
+        df = (matrix > 0).sum(axis=0)
+        matrix *= np.log((1 + len(docs)) / (1 + df)) + 1
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+        self._index = index
+        self._idf = np.log((1 + len(docs)) / (1 + df)) + 1
+        return matrix, vocab
+
+    def _cluster(self, matrix: np.ndarray) -> np.ndarray:
+        """Leader clustering on the cosine similarity matrix"""
+        similarity = matrix @ matrix.T
+        labels = np.full(len(matrix), -1)
+        next_label = 0
+        for i in range(len(matrix)):
+            if labels[i] >= 0:
+                continue
+            members = (similarity[i] >= self.threshold) & (labels < 0)
+            members[i] = True
+            labels[members] = next_label
+            next_label += 1
+        return labels
+
+    def _unit_centroids(self, syllabus_units: Dict[int, str], vocab: List[str]):
+        units = sorted(syllabus_units)
+        vectors = np.zeros((len(units), len(vocab)))
+        for row, unit in enumerate(units):
+            for token, count in Counter(tokenize(syllabus_units[unit])).items():
+                col = self._index.get(token)
+                if col is not None:
+                    vectors[row, col] = count * self._idf[col]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return units, vectors / np.where(norms == 0, 1, norms)
+
+    def _arrays(self):
+        groups = self.groups
+        self._weight = np.array([g['recency_weight'] for g in groups])
+        self._marks = np.array([g['marks'] for g in groups])
+        self._position = np.array([g['position'] for g in groups])
+        self._unit = np.array([g['unit'] if g['unit'] is not None else -1 for g in groups])
+
+    # ---------- analytics ----------
+
+    def marks_distribution(self) -> Dict[int, int]:
+        return dict(sorted(Counter(r['marks'] for r in self.records if r.get('marks')).items()))
+
+    def unit_coverage(self) -> Dict[int, float]:
+        """Share of past marks per unit (only units that are known)"""
+        totals = Counter()
+        for r in self.records:
+            if r.get('unit'):
+                totals[r['unit']] += r.get('marks') or 0
+        total = sum(totals.values())
+        return {unit: round(marks / total, 3) for unit, marks in sorted(totals.items())} if total else {}
+
+    def top_questions(self, limit: int = 10) -> List[Dict]:
+        order = np.argsort(-self._weight)[:limit]
+        return [self.groups[i] for i in order]
+
+    # ---------- prediction ----------
+
+    def predict_paper(self, subject_name: str = "", subject_code: str = "", layout=GTU_LAYOUT) -> Dict:
+        """
+        Fill every slot of the layout with the best remaining question group.
+        A model fitted on no usable questions predicts an empty paper.
+        """
+        coverage = self.unit_coverage()
+        used = np.zeros(len(self.groups), dtype=bool)
+        unit_marks = Counter()
+        filled_marks = 0
+        weight = self._weight / (self._weight.max(initial=0.0) or 1.0)
+        high_cut = np.quantile(self._weight, 0.85) if len(self._weight) > 1 else 0
+
+        questions = []
+        for q_number, part, marks, alternative in (layout if self.groups else ()):
+            marks_fit = np.where(self._marks == marks, 1.0, np.where(np.abs(self._marks - marks) <= 1, 0.5, 0.15))
+            # Papers tend to keep a topic at the same question number
+            position_fit = np.where(self._position > 0, 1.0 / (1.0 + 0.35 * np.abs(self._position - q_number)), 0.6)
+            score = (0.2 + weight) * marks_fit * position_fit
+
+            if coverage:
+                # Damp units that already have more than their historical share of marks
+                target = {u: share * (filled_marks + marks) for u, share in coverage.items()}
+                excess = np.array([max(0.0, unit_marks[u] - target.get(u, 0)) if u != -1 else 0.0
+                                   for u in self._unit])
+                score = score * np.exp(-excess / 7.0)
+
+            score[used] = -1
+            best = int(np.argmax(score))
+            if score[best] < 0:
+                break
+            used[best] = True
+            group = self.groups[best]
+            if group['unit'] is not None:
+                unit_marks[group['unit']] += marks
+            filled_marks += marks
+
+            questions.append({
+                'q_number': f"{q_number}({part})" + (" OR" if alternative else ""),
+                'question': group['question'],
+                'marks': marks,
+                'unit': f"Unit {group['unit']}" if group['unit'] is not None else None,
+                'chapter': ', '.join(group['keywords']),
+                'probability': 'High' if group['recency_weight'] >= high_cut and group['papers'] > 1
+                               else 'Medium' if group['papers'] > 1 or group['times_asked'] > 1 else 'Low',
+                'times_asked': group['times_asked'],
+                'last_asked': group['last_asked'],
+                'repeat_probability': round(group['repeat_probability'], 2)
+            })
+
+        years = sorted({r['year'] for r in self.records if r.get('year')})
+        return {
+            'subject_name': subject_name,
+            'subject_code': subject_code,
+            'engine': 'stats',
+            'questions': questions,
+            'analysis': {
+                'papers_analyzed': self.paper_count,
+                'questions_analyzed': len(self.records),
+                'distinct_questions': len(self.groups),
+                'years': years,
+                'marks_distribution': self.marks_distribution(),
+                'unit_coverage': coverage,
+                'most_repeated': [
+                    {'question': g['question'], 'times_asked': g['times_asked'], 'last_asked': g['last_asked']}
+                    for g in self.top_questions(5)
+                ]
+            }
+        }
+
+
+def polish_paper(paper: Dict, complete: Callable[[str, Optional[str]], Optional[str]]) -> Dict:
+    """
+    Optionally rewrite question wording with an LLM. Only the text changes;
+    on any failure the statistical paper is returned unchanged.
+    """
+    from backend.batching import strip_code_fences
+
+    texts = [q['question'] for q in paper['questions']]
+    prompt = ("Rewrite each GTU exam question below in clear, exam-style English. Keep the meaning, "
+              "numbers and data exactly. Return ONLY a JSON array of strings, same order, same length.\n\n"
+              + json.dumps(texts, ensure_ascii=False))
+    output = complete(prompt, "You edit exam papers. You never add or remove questions.")
+    try:
+        rewritten = json.loads(strip_code_fences(output or ''))
+    except (ValueError, TypeError):
+        rewritten = None
+    if not isinstance(rewritten, list) or len(rewritten) != len(texts) \
+            or not all(isinstance(t, str) and t.strip() for t in rewritten):
+        logger.warning("Paper polishing returned an unusable result - keeping original wording")
+        return paper
+
+    polished = dict(paper)
+    polished['questions'] = [dict(q, question=t.strip()) for q, t in zip(paper['questions'], rewritten)]
+    polished['polished'] = True
+    return polished
@@ -0,0 +1,388 @@
+"""
+Rate Limiting for AI Routes
+Admission control that keeps one client from draining the shared
+Bytez/Groq quota
+
+This module implements:
+1. Token buckets keyed by user (JWT identity) or client IP, where only
+   X-Forwarded-For entries added by trusted proxies are believed
+2. Global per-provider concurrency limits (leased slots)
+3. A short bounded wait queue instead of failing immediately
+4. Flask decorator and FastAPI dependency that answer 429 + Retry-After
+
+State lives in the local SQLite store so all workers on a host share it.
+"""
+
+import os
+import time
+import uuid
+import math
+import logging
+import contextvars
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, Optional, Tuple
+
+from backend.local_store import connect, get_db_path, transaction
+
+logger = logging.getLogger(__name__)
+
+# scope -> (tokens per second, burst capacity)
+RATE_LIMITS: Dict[str, Tuple[float, float]] = {
+    'ai': (float(os.environ.get('AI_RATE_PER_MINUTE', 20)) / 60.0,
+           float(os.environ.get('AI_RATE_BURST', 10))),
+    # PDF / paper generation submits - expensive even when queued
+    'ai_heavy': (float(os.environ.get('AI_HEAVY_RATE_PER_MINUTE', 4)) / 60.0,
+                 float(os.environ.get('AI_HEAVY_RATE_BURST', 3))),
+    # Nightly precompute batch - paced so live traffic keeps provider headroom
+    'precompute': (float(os.environ.get('PRECOMPUTE_RATE_PER_MINUTE', 30)) / 60.0,
+                   float(os.environ.get('PRECOMPUTE_RATE_BURST', 3))),
+    # Bulk study guide generation (backend/bulk_pdf.py) - one long synthesis per token
+    'bulk_pdf': (float(os.environ.get('BULK_PDF_RATE_PER_MINUTE', 6)) / 60.0,
+                 float(os.environ.get('BULK_PDF_RATE_BURST', 2))),
+}
+
+# provider -> max concurrent in-flight calls across all workers
+PROVIDER_CONCURRENCY: Dict[str, int] = {
+    'bytez': int(os.environ.get('PROVIDER_MAX_CONCURRENCY_BYTEZ', 4)),
+    'groq': int(os.environ.get('PROVIDER_MAX_CONCURRENCY_GROQ', 8)),
+    'lightning': int(os.environ.get('PROVIDER_MAX_CONCURRENCY_LIGHTNING', 4)),
+}
+
+MAX_WAIT_SECONDS = float(os.environ.get('AI_QUEUE_MAX_WAIT', 10))
+MAX_WAITERS = int(os.environ.get('AI_QUEUE_MAX_WAITERS', 50))
+SLOT_LEASE_SECONDS = float(os.environ.get('PROVIDER_SLOT_LEASE_SECONDS', 120))
+POLL_INTERVAL = 0.1
+
+# Reverse proxies in front of the app (Render's router counts as one). Only that
+# many X-Forwarded-For entries, counted from the right, are trusted - anything
+# further left was written by the client and would let it pick a fresh bucket
+TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', 0))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS provider_slots (
+    id TEXT PRIMARY KEY,
+    provider TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_provider_slots ON provider_slots(provider);
+CREATE TABLE IF NOT EXISTS waiters (
+    id TEXT PRIMARY KEY,
+    queue TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_waiters_queue ON waiters(queue);
+"""
+
+# Set when a provider limit rejected a call deep inside a route, so the
+# route decorator can turn the route's generic error into a 429
+_rejection: contextvars.ContextVar = contextvars.ContextVar('rate_limit_rejection', default=None)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request could not be admitted within the wait budget"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """Token buckets, provider slots and wait queues over a shared SQLite file"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.environ.get('RATE_LIMIT_DB_PATH') or get_db_path('ratelimit')
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        return connect(self.db_path)
+
+    # ---------- token buckets ----------
+
+    def try_acquire_token(self, key: str, rate: float, capacity: float) -> Tuple[bool, float]:
+        """
+        Take one token from the bucket for key.
+        Returns (allowed, seconds until a token is available).
+        """
+        now = time.time()
+        conn = self._conn()
+        with transaction(conn):
+            row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                tokens = capacity
+            else:
+                tokens = min(capacity, row['tokens'] + (now - row['updated_at']) * rate)
+
+            if tokens >= 1:
+                tokens -= 1
+                allowed, retry_after = True, 0.0
+            else:
+                allowed, retry_after = False, (1 - tokens) / rate if rate > 0 else float('inf')
+
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                (key, tokens, now)
+            )
+        return allowed, retry_after
+
+    # ---------- provider concurrency ----------
+
+    def try_acquire_slot(self, provider: str, limit: int) -> Optional[str]:
+        """Lease one in-flight slot for a provider. Returns slot id or None."""
+        now = time.time()
+        conn = self._conn()
+        with transaction(conn):
+            conn.execute("DELETE FROM provider_slots WHERE expires_at < ?", (now,))
+            in_use = conn.execute(
+                "SELECT COUNT(*) FROM provider_slots WHERE provider = ?", (provider,)
+            ).fetchone()[0]
+            if in_use >= limit:
+                return None
+            slot_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO provider_slots (id, provider, expires_at) VALUES (?, ?, ?)",
+                (slot_id, provider, now + SLOT_LEASE_SECONDS)
+            )
+        return slot_id
+
+    def release_slot(self, slot_id: str):
+        self._conn().execute("DELETE FROM provider_slots WHERE id = ?", (slot_id,))
+
+    def slots_in_use(self, provider: str) -> int:
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM provider_slots WHERE provider = ? AND expires_at >= ?",
+            (provider, time.time())
+        ).fetchone()[0]
+
+    # ---------- bounded wait queue ----------
+
+    def _join_queue(self, queue: str, max_waiters: int, max_wait: float) -> Optional[str]:
+        now = time.time()
+        conn = self._conn()
+        with transaction(conn):
+            conn.execute("DELETE FROM waiters WHERE expires_at < ?", (now,))
+            waiting = conn.execute("SELECT COUNT(*) FROM waiters WHERE queue = ?", (queue,)).fetchone()[0]
+            if waiting >= max_waiters:
+                return None
+            waiter_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO waiters (id, queue, expires_at) VALUES (?, ?, ?)",
+                (waiter_id, queue, now + max_wait + 5)
+            )
+        return waiter_id
+
+    def _leave_queue(self, waiter_id: str):
+        self._conn().execute("DELETE FROM waiters WHERE id = ?", (waiter_id,))
+
+    # ---------- blocking helpers ----------
+
+    def wait_for_token(self, scope: str, identity: str,
+                       max_wait: float = MAX_WAIT_SECONDS, max_waiters: int = MAX_WAITERS):
+        """Take a token for identity in scope, waiting briefly if the bucket is empty"""
+        rate, capacity = RATE_LIMITS[scope]
+        key = f"{scope}:{identity}"
+
+        allowed, retry_after = self.try_acquire_token(key, rate, capacity)
+        if allowed:
+            return
+        if retry_after > max_wait:
+            raise RateLimitExceeded(f"Rate limit exceeded for {scope}", retry_after)
+
+        waiter_id = self._join_queue(f"bucket:{scope}", max_waiters, max_wait)
+        if waiter_id is None:
+            raise RateLimitExceeded(f"Too many queued requests for {scope}", retry_after)
+        try:
+            deadline = time.time() + max_wait
+            while True:
+                time.sleep(min(retry_after, max(0.0, deadline - time.time())))
+                allowed, retry_after = self.try_acquire_token(key, rate, capacity)
+                if allowed:
+                    return
+                if time.time() + retry_after > deadline:
+                    raise RateLimitExceeded(f"Rate limit exceeded for {scope}", retry_after)
+        finally:
+            self._leave_queue(waiter_id)
+
+    def wait_for_slot(self, provider: str, max_wait: float = MAX_WAIT_SECONDS,
+                      max_waiters: int = MAX_WAITERS) -> str:
+        """Lease a provider slot, waiting in a bounded queue while all are busy"""
+        limit = PROVIDER_CONCURRENCY.get(provider, 4)
+        slot_id = self.try_acquire_slot(provider, limit)
+        if slot_id:
+            return slot_id
+
+        waiter_id = self._join_queue(f"provider:{provider}", max_waiters, max_wait)
+        if waiter_id is None:
+            raise RateLimitExceeded(f"{provider} is saturated", 1.0)
+        try:
+            deadline = time.time() + max_wait
+            while time.time() < deadline:
+                time.sleep(POLL_INTERVAL)
+                slot_id = self.try_acquire_slot(provider, limit)
+                if slot_id:
+                    return slot_id
+            raise RateLimitExceeded(f"{provider} is saturated", 1.0)
+        finally:
+            self._leave_queue(waiter_id)
+
+
+# Singleton instance
+_rate_limiter = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Get or create rate limiter singleton"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter()
+    return _rate_limiter
+
+
+@contextmanager
+def provider_slot(provider: str, max_wait: float = MAX_WAIT_SECONDS):
+    """
+    Hold one of the provider's global concurrency slots for the duration
+    of a call. Raises RateLimitExceeded if none frees up within max_wait.
+    """
+    limiter = get_rate_limiter()
+    slot_id = limiter.wait_for_slot(provider, max_wait=max_wait)
+    try:
+        yield
+    finally:
+        limiter.release_slot(slot_id)
+
+
+def note_rejection(retry_after: float):
+    """
+    Record that every provider was saturated for the current request, so the
+    route decorator answers 429 instead of the route's own error payload.
+    """
+    _rejection.set(retry_after)
+
+
+def _retry_after_header(seconds: float) -> str:
+    return str(max(1, int(math.ceil(seconds))))
+
+
+def client_ip(forwarded: str, peer: Optional[str], hops: int = TRUSTED_PROXY_HOPS) -> str:
+    """
+    Client address as reported by the outermost trusted proxy - the same
+    rule werkzeug's ProxyFix applies. With no trusted hops the header is
+    ignored and the socket peer is used.
+    """
+    values = [v.strip() for v in forwarded.split(',') if v.strip()] if forwarded and hops > 0 else []
+    if len(values) >= hops > 0:
+        return values[-hops]
+    return peer or 'unknown'
+
+
+def install_proxy_fix(app):
+    """Make request.remote_addr the trusted client address behind TRUSTED_PROXY_HOPS proxies"""
+    if TRUSTED_PROXY_HOPS > 0:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS, x_proto=TRUSTED_PROXY_HOPS)
+    return app
+
+
+def _flask_identity() -> str:
+    """JWT identity when a valid token is sent, otherwise client IP (see install_proxy_fix)"""
+    from flask import request
+    try:
+        from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+        if identity:
+            return f"user:{identity}"
+    except Exception:
+        pass
+
+    return f"ip:{request.remote_addr or 'unknown'}"
+
+
+def bearer_identity(authorization: str) -> Optional[str]:
+    """
+    User id from an access token issued by the Flask auth routes (same
+    JWT_SECRET_KEY), or None for a missing, forged or non-access token
+    """
+    scheme, _, token = (authorization or '').partition(' ')
+    if scheme.lower() != 'bearer' or not token.strip():
+        return None
+    try:
+        import jwt
+        from backend.config import Config
+        claims = jwt.decode(token.strip(), Config.JWT_SECRET_KEY, algorithms=['HS256'])
+    except Exception:
+        return None
+    if claims.get('type', 'access') != 'access' or not claims.get('sub'):
+        return None
+    return str(claims['sub'])
+
+
+def request_identity(authorization: str, forwarded: str, peer: Optional[str]) -> str:
+    """Rate limit key for a FastAPI request: JWT user first, then trusted client IP"""
+    user = bearer_identity(authorization)
+    if user:
+        return f"user:{user}"
+    return f"ip:{client_ip(forwarded, peer)}"
+
+
+def rate_limited(scope: str = 'ai'):
+    """
+    Flask route decorator: per-user token bucket with a short wait queue.
+    Provider saturation raised inside the route is also reported as 429.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            from flask import jsonify
+
+            try:
+                get_rate_limiter().wait_for_token(scope, _flask_identity())
+            except RateLimitExceeded as e:
+                response = jsonify({'error': str(e), 'retry_after': math.ceil(e.retry_after)})
+                response.status_code = 429
+                response.headers['Retry-After'] = _retry_after_header(e.retry_after)
+                return response
+
+            token = _rejection.set(None)
+            try:
+                result = view(*args, **kwargs)
+                retry_after = _rejection.get()
+            finally:
+                _rejection.reset(token)
+
+            if retry_after is not None:
+                response = jsonify({'error': 'AI providers are busy, please retry shortly',
+                                    'retry_after': math.ceil(retry_after)})
+                response.status_code = 429
+                response.headers['Retry-After'] = _retry_after_header(retry_after)
+                return response
+            return result
+        return wrapper
+    return decorator
+
+
+def fastapi_rate_limit(scope: str = 'ai'):
+    """FastAPI dependency equivalent of rate_limited (waits off the event loop)"""
+    import asyncio
+    from fastapi import HTTPException, Request
+
+    async def dependency(request: Request):
+        identity = request_identity(request.headers.get('authorization', ''),
+                                    request.headers.get('x-forwarded-for', ''),
+                                    request.client.host if request.client else None)
+        try:
+            await asyncio.to_thread(get_rate_limiter().wait_for_token, scope, identity)
+        except RateLimitExceeded as e:
+            raise HTTPException(
+                status_code=429,
+                detail=str(e),
+                headers={'Retry-After': _retry_after_header(e.retry_after)}
+            )
+
+    return dependency
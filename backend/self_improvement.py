@@ -20,6 +20,9 @@ import statistics
 
 from dotenv import load_dotenv
 
+from backend.telemetry import get_telemetry
+from backend.batching import BatchTask, PromptBatcher
+
 # Try to import Bytez for content generation
 try:
     from bytez import Bytez
@@ -69,6 +72,16 @@ class ContentVariantGenerator:
             self.llm = None
             logger.warning("Bytez not available - variant generation disabled")
     
+    def _run_llm(self, messages: List[Dict]):
+        """Run one Bytez call with telemetry (latency, tokens, cost)"""
+        with get_telemetry().llm_call('bytez', 'openai/gpt-4o', messages) as call:
+            response = self.llm.run(messages)
+            if response.error:
+                call.set_error()
+            else:
+                call.set_output(response.output)
+        return response
+    
     def generate_study_note_variants(self, 
                                      topic: str,
                                      context: str = "",
@@ -144,31 +157,11 @@ Format: Clear headings, lists, emphasis on visual organization."""
             }
         ]
         
-        variants = []
-        
-        for i, template in enumerate(templates[:num_variants]):
-            try:
-                # Generate content
-                messages = [{"role": "user", "content": template['prompt']}]
-                response = self.llm.run(messages)
-                
-                if not response.error:
-                    variant = ContentVariant(
-                        variant_id=f"variant_{template['name']}_{datetime.now().timestamp()}",
-                        content=response.output,
-                        prompt_template=template['prompt'],
-                        generation_params={'model': 'gpt-4o', 'temperature': 0.7},
-                        created_at=datetime.now()
-                    )
-                    variants.append(variant)
-                    logger.info(f"✅ Generated variant {i+1}/{num_variants}: {template['name']}")
-                else:
-                    logger.error(f"Error generating variant {i+1}: {response.error}")
-                    
-            except Exception as e:
-                logger.error(f"Exception generating variant: {e}")
-        
-        return variants
+        return self._generate_variants_from_templates(
+            templates[:num_variants],
+            id_prefix='variant_',
+            generation_params={'model': 'gpt-4o', 'temperature': 0.7}
+        )
     
     def generate_quiz_variants(self,
                               topic: str,
@@ -213,29 +206,44 @@ Focus on: Application, problem-solving, explanation skills."""
         
         return self._generate_variants_from_templates(templates)
     
-    def _generate_variants_from_templates(self, templates: List[Dict]) -> List[ContentVariant]:
-        """Helper to generate variants from templates"""
-        variants = []
+    def _complete(self, prompt: str, system: str) -> Optional[str]:
+        """Text completion for PromptBatcher: output text, or None on failure"""
+        response = self._run_llm([
+            {"role": "system", "content": system},
+            {"role": "user", "content": prompt}
+        ])
+        if response.error:
+            logger.error(f"Variant batch failed: {response.error}")
+            return None
+        output = response.output
+        return output.get('content', '') if isinstance(output, dict) else output
+    
+    def _generate_variants_from_templates(self, templates: List[Dict], id_prefix: str = '',
+                                          generation_params: Optional[Dict] = None) -> List[ContentVariant]:
+        """Helper to generate variants from templates - all templates share one batched call"""
+        if not self.llm or not templates:
+            return []
         
-        for template in templates:
-            if not self.llm:
-                break
-                
-            try:
-                messages = [{"role": "user", "content": template['prompt']}]
-                response = self.llm.run(messages)
-                
-                if not response.error:
-                    variant = ContentVariant(
-                        variant_id=f"{template['name']}_{int(datetime.now().timestamp())}",
-                        content=response.output,
-                        prompt_template=template['prompt'],
-                        generation_params={'model': 'gpt-4o'},
-                        created_at=datetime.now()
-                    )
-                    variants.append(variant)
-            except Exception as e:
-                logger.error(f"Error in variant generation: {e}")
+        tasks = [
+            BatchTask(task_id=template['name'], kind='variant', instruction=template['prompt'],
+                      output_format='a markdown string')
+            for template in templates
+        ]
+        results = PromptBatcher(self._complete).run(tasks)
+        
+        variants = []
+        for i, (template, result) in enumerate(zip(templates, results)):
+            if not result.ok:
+                logger.error(f"Error generating variant {i+1}: {result.error}")
+                continue
+            variants.append(ContentVariant(
+                variant_id=f"{id_prefix}{template['name']}_{int(datetime.now().timestamp())}",
+                content=result.output,
+                prompt_template=template['prompt'],
+                generation_params=generation_params or {'model': 'gpt-4o'},
+                created_at=datetime.now()
+            ))
+            logger.info(f"✅ Generated variant {i+1}/{len(templates)}: {template['name']}")
         
         return variants
 
@@ -0,0 +1,330 @@
+"""
+Session Memory for the GTU Agent
+Per-session conversation context and feedback, bounded in memory and
+optionally persisted so context survives restarts and is shared by workers
+
+This module implements:
+1. A ring buffer of recent turns per session id (oldest turns fall off)
+2. LRU eviction of idle sessions, capped by session count, total bytes and
+   an idle TTL - memory stays flat no matter how many users come and go
+3. Write-through persistence to the local SQLite store; a session evicted
+   from memory is reloaded on its next request, and a cached one catches up
+   on turns other workers wrote since (one indexed query per access)
+4. Feedback with running totals, so analytics never scans the full history;
+   the persisted feedback rows are bounded like the turn lists
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+
+from backend.local_store import connect, get_db_path, transaction
+
+logger = logging.getLogger(__name__)
+
+SESSION_MAX_TURNS = int(os.environ.get('SESSION_MAX_TURNS', 20))
+SESSION_MAX_SESSIONS = int(os.environ.get('SESSION_MAX_SESSIONS', 5000))
+SESSION_MEMORY_MAX_BYTES = int(os.environ.get('SESSION_MEMORY_MAX_BYTES', 32 * 1024 * 1024))
+SESSION_IDLE_TTL = float(os.environ.get('SESSION_IDLE_TTL', 6 * 3600))
+SESSION_MAX_TURN_CHARS = int(os.environ.get('SESSION_MAX_TURN_CHARS', 4000))
+SESSION_FEEDBACK_LIMIT = int(os.environ.get('SESSION_FEEDBACK_LIMIT', 1000))
+SESSION_RETENTION_DAYS = float(os.environ.get('SESSION_RETENTION_DAYS', 30))
+SESSION_PERSIST = os.environ.get('SESSION_PERSIST', '1').lower() in ('1', 'true', 'yes')
+
+# Rough per-turn bookkeeping cost (dict, deque slot, strings) on top of the text
+TURN_OVERHEAD_BYTES = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS session_turns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_session_turns_session ON session_turns(session_id, id);
+CREATE INDEX IF NOT EXISTS idx_session_turns_created ON session_turns(created_at);
+CREATE TABLE IF NOT EXISTS session_feedback (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT,
+    user_input TEXT,
+    agent_response TEXT,
+    rating INTEGER NOT NULL,
+    comment TEXT,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS feedback_totals (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    count INTEGER NOT NULL,
+    rating_sum INTEGER NOT NULL
+);
+"""
+
+
+class Session:
+    """Recent turns of one conversation"""
+
+    __slots__ = ('turns', 'size', 'last_seen', 'last_id')
+
+    def __init__(self, max_turns: int):
+        self.turns = deque(maxlen=max_turns)
+        self.size = 0
+        self.last_seen = time.time()
+        # Highest persisted turn id already in `turns` (persisted sessions only)
+        self.last_id = 0
+
+    def append(self, turn: Dict) -> int:
+        """Add a turn and return the change in size (the oldest turn may drop off)"""
+        delta = len(turn['content']) + TURN_OVERHEAD_BYTES
+        if len(self.turns) == self.turns.maxlen:
+            delta -= len(self.turns[0]['content']) + TURN_OVERHEAD_BYTES
+        self.turns.append(turn)
+        self.size += delta
+        self.last_seen = time.time()
+        return delta
+
+
+class SessionMemory:
+    """Bounded, LRU-evicted store of per-session conversation memory"""
+
+    def __init__(self, db_path: Optional[str] = None, persist: bool = SESSION_PERSIST,
+                 max_turns: int = SESSION_MAX_TURNS, max_sessions: int = SESSION_MAX_SESSIONS,
+                 max_bytes: int = SESSION_MEMORY_MAX_BYTES, idle_ttl: float = SESSION_IDLE_TTL):
+        self.persist = persist
+        self.db_path = db_path or (get_db_path('sessions') if persist else None)
+        self.max_turns = max_turns
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+
+        self._lock = threading.Lock()
+        self._sessions: 'OrderedDict[str, Session]' = OrderedDict()
+        self._bytes = 0
+        self._evictions = 0
+        self._feedback = deque(maxlen=SESSION_FEEDBACK_LIMIT)
+        self._feedback_count = 0
+        self._rating_sum = 0
+
+        if self.persist:
+            conn = self._conn()
+            conn.executescript(SCHEMA)
+            # Stores created before feedback_totals existed start from their rows
+            conn.execute("""INSERT OR IGNORE INTO feedback_totals (id, count, rating_sum)
+                            SELECT 1, COUNT(*), COALESCE(SUM(rating), 0) FROM session_feedback""")
+
+    def _conn(self):
+        return connect(self.db_path)
+
+    # ---------- turns ----------
+
+    def add_turn(self, session_id: str, role: str, content) -> None:
+        """Append a turn to a session (evicts idle sessions if over budget)"""
+        turn = {'role': role, 'content': str(content)[:SESSION_MAX_TURN_CHARS], 'timestamp': time.time()}
+        # Persisted turns reach the buffer through _session's catch-up, in store
+        # order, together with any turns other workers added in between
+        if self.persist and self._persist_turn(session_id, turn):
+            self._session(session_id)
+            return
+
+        session = self._session(session_id)
+        with self._lock:
+            self._bytes += session.append(turn)
+            self._evict()
+
+    def recent(self, session_id: Optional[str], limit: int = 4) -> List[Dict]:
+        """Last `limit` turns of a session (oldest first)"""
+        if not session_id:
+            return []
+        session = self._session(session_id)
+        with self._lock:
+            turns = list(session.turns)
+        return turns[-limit:] if limit else turns
+
+    def context(self, session_id: Optional[str], limit: int = 4, chars: int = 80) -> str:
+        """Recent turns formatted for a prompt"""
+        return "\n".join(f"{t['role']}: {t['content'][:chars]}..." for t in self.recent(session_id, limit))
+
+    def clear(self, session_id: str) -> None:
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session:
+                self._bytes -= session.size
+        if self.persist:
+            self._conn().execute("DELETE FROM session_turns WHERE session_id = ?", (session_id,))
+
+    def _session(self, session_id: str) -> Session:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                session.last_seen = time.time()
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(session_id)
+                if session is None:
+                    session = self._sessions[session_id] = Session(self.max_turns)
+                self._sessions.move_to_end(session_id)
+        if self.persist:
+            self._catch_up(session_id, session)
+        return session
+
+    def _catch_up(self, session_id: str, session: Session):
+        """Append turns persisted (by any worker) after the newest one this session holds"""
+        rows = self._load_turns(session_id, after_id=session.last_id)
+        if not rows:
+            return
+        with self._lock:
+            cached = self._sessions.get(session_id) is session
+            for row in rows:
+                if row['id'] <= session.last_id:  # another thread caught up first
+                    continue
+                delta = session.append({'role': row['role'], 'content': row['content'],
+                                        'timestamp': row['created_at']})
+                session.last_id = row['id']
+                if cached:
+                    self._bytes += delta
+            self._evict()
+
+    def _evict(self):
+        """Drop least recently used sessions while over a cap (caller holds the lock)"""
+        cutoff = time.time() - self.idle_ttl
+        while self._sessions:
+            oldest_id, oldest = next(iter(self._sessions.items()))
+            over = len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes
+            if not over and oldest.last_seen >= cutoff:
+                break
+            self._sessions.popitem(last=False)
+            self._bytes -= oldest.size
+            self._evictions += 1
+
+    # ---------- persistence ----------
+
+    def _persist_turn(self, session_id: str, turn: Dict) -> bool:
+        try:
+            conn = self._conn()
+            with transaction(conn):
+                conn.execute(
+                    "INSERT INTO session_turns (session_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                    (session_id, turn['role'], turn['content'], turn['timestamp'])
+                )
+                # Keep the table bounded the same way as the ring buffer
+                conn.execute(
+                    """DELETE FROM session_turns WHERE session_id = ? AND id <= (
+                           SELECT id FROM session_turns WHERE session_id = ?
+                           ORDER BY id DESC LIMIT 1 OFFSET ?)""",
+                    (session_id, session_id, self.max_turns)
+                )
+            return True
+        except Exception as e:
+            logger.warning(f"Could not persist session turn: {e}")
+            return False
+
+    def _load_turns(self, session_id: str, after_id: int = 0) -> List:
+        """Newest turns (at most max_turns) with an id above after_id, oldest first"""
+        try:
+            rows = self._conn().execute(
+                """SELECT id, role, content, created_at FROM session_turns WHERE session_id = ? AND id > ?
+                   ORDER BY id DESC LIMIT ?""",
+                (session_id, after_id, self.max_turns)
+            ).fetchall()
+        except Exception as e:
+            logger.warning(f"Could not load session {session_id}: {e}")
+            return []
+        return list(reversed(rows))
+
+    def purge_expired(self, retention_days: float = SESSION_RETENTION_DAYS) -> int:
+        """Delete persisted turns older than the retention period"""
+        if not self.persist:
+            return 0
+        cutoff = time.time() - retention_days * 86400
+        return self._conn().execute("DELETE FROM session_turns WHERE created_at < ?", (cutoff,)).rowcount
+
+    # ---------- feedback ----------
+
+    def add_feedback(self, feedback: Dict, session_id: Optional[str] = None) -> None:
+        with self._lock:
+            self._feedback.append(feedback)
+            self._feedback_count += 1
+            self._rating_sum += feedback['rating']
+        if self.persist:
+            try:
+                conn = self._conn()
+                with transaction(conn):
+                    conn.execute(
+                        """INSERT INTO session_feedback
+                           (session_id, user_input, agent_response, rating, comment, created_at)
+                           VALUES (?, ?, ?, ?, ?, ?)""",
+                        (session_id, feedback.get('user_input'), feedback.get('agent_response'),
+                         feedback['rating'], feedback.get('comment'), time.time())
+                    )
+                    conn.execute(
+                        """INSERT INTO feedback_totals (id, count, rating_sum) VALUES (1, 1, ?)
+                           ON CONFLICT (id) DO UPDATE SET count = count + 1,
+                                                          rating_sum = rating_sum + excluded.rating_sum""",
+                        (feedback['rating'],)
+                    )
+                    # Only the newest rows are kept; count/average live in feedback_totals
+                    conn.execute(
+                        """DELETE FROM session_feedback WHERE id <= (
+                               SELECT id FROM session_feedback ORDER BY id DESC LIMIT 1 OFFSET ?)""",
+                        (SESSION_FEEDBACK_LIMIT,)
+                    )
+            except Exception as e:
+                logger.warning(f"Could not persist feedback: {e}")
+
+    def feedback_summary(self, low_rating: int = 2, examples: int = 3) -> Dict:
+        """
+        Count, average rating and recent low-rated examples (across workers
+        when persisted). low_rated counts the last SESSION_FEEDBACK_LIMIT entries.
+        """
+        if self.persist:
+            try:
+                conn = self._conn()
+                totals = conn.execute("SELECT count, rating_sum FROM feedback_totals WHERE id = 1").fetchone()
+                count, rating_sum = (totals['count'], totals['rating_sum']) if totals else (0, 0)
+                low = conn.execute("SELECT COUNT(*) FROM session_feedback WHERE rating <= ?", (low_rating,)).fetchone()[0]
+                recent_low = conn.execute(
+                    """SELECT user_input, comment FROM session_feedback WHERE rating <= ?
+                       ORDER BY id DESC LIMIT ?""",
+                    (low_rating, examples)
+                ).fetchall()
+                return {'count': count, 'avg_rating': rating_sum / count if count else 0, 'low_rated': low,
+                        'low_rated_examples': [dict(r) for r in recent_low]}
+            except Exception as e:
+                logger.warning(f"Feedback summary from local store failed: {e}")
+
+        with self._lock:
+            low_rated = [f for f in self._feedback if f['rating'] <= low_rating]
+            return {
+                'count': self._feedback_count,
+                'avg_rating': self._rating_sum / self._feedback_count if self._feedback_count else 0,
+                'low_rated': len(low_rated),
+                'low_rated_examples': [{'user_input': f['user_input'], 'comment': f.get('comment')}
+                                       for f in reversed(low_rated[-examples:])]
+            }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'turns': sum(len(s.turns) for s in self._sessions.values()),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'evictions': self._evictions,
+                'persist': self.persist
+            }
+
+
+# Singleton instance
+_session_memory = None
+
+
+def get_session_memory() -> SessionMemory:
+    """Get the singleton session memory instance"""
+    global _session_memory
+    if _session_memory is None:
+        _session_memory = SessionMemory()
+    return _session_memory
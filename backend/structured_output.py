@@ -0,0 +1,649 @@
+"""
+Structured JSON Output for LLM Responses
+Turns the planner decision, predicted paper and GTU answer JSON into
+validated dicts, repairing broken output locally instead of paying for
+another 10-30s generation
+
+This module implements:
+1. TolerantJSONParser - an incremental single-pass parser (feed chunks, then
+   finish) that repairs what LLMs typically get wrong: code fences and prose
+   around the JSON, trailing or missing commas, Python literals, single
+   quotes, unquoted keys, raw newlines and stray quotes inside strings,
+   invalid escapes, comments, and output truncated mid-way (open strings and
+   brackets are closed, a dangling key or partial value is dropped)
+2. A small JSON-schema subset (type, properties, required, items, enum,
+   minItems, default, anyOf) with safe coercions ("7" -> 7, "high" -> "High",
+   a list of points -> one answer string)
+3. parse_structured - parse + repair + validate in one call, recording
+   clean / repaired / failed outcomes and repair kinds in telemetry
+   (gtu_structured_outputs_total, gtu_structured_repairs_total)
+
+Provider JSON modes are requested by EnhancedGTUAgent._run_messages(json_mode=True);
+this layer is what makes providers without one safe as well.
+"""
+
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CLEAN, REPAIRED, FAILED = 'clean', 'repaired', 'failed'
+
+LITERALS = {'true': 'true', 'false': 'false', 'null': 'null', 'True': 'true', 'False': 'false',
+            'None': 'null', 'NaN': 'null', 'Infinity': 'null', 'undefined': 'null'}
+VALID_ESCAPES = set('"\\/bfnrtu')
+CLOSERS = {'{': '}', '[': ']'}
+
+
+class StructuredOutputError(ValueError):
+    """Output could not be turned into a valid object, even after repair"""
+
+    def __init__(self, message: str, errors: Optional[List[str]] = None, raw: Any = None):
+        super().__init__(message)
+        self.errors = errors or []
+        self.raw = raw
+
+
+# ---------- tolerant parser ----------
+
+class TolerantJSONParser:
+    """
+    Incremental repairing JSON parser.
+
+        parser = TolerantJSONParser()
+        for chunk in stream:
+            parser.feed(chunk)
+        value = parser.finish()        # or parser.snapshot() mid-stream
+
+    Only the first top-level object/array is parsed; text before and after it
+    is ignored. `repairs` lists what had to be fixed ([] for clean JSON).
+    """
+
+    def __init__(self, root: str = '{['):
+        self.root = root          # characters allowed to open the top-level value
+        self.text = ''
+        self.pos = 0
+        self.out: List[str] = []
+        self.stack: List[Dict] = []  # {'open': '{'|'[', 'expect': 'key'|'colon'|'value'|'comma'}
+        self.string: Optional[Dict] = None  # open string: {'quote', 'role', 'start'}
+        self.safe: Tuple[int, str] = (0, '')  # (len(out), closers) where the output can be cut and closed
+        self.started = False
+        self.done = False
+        self.repairs: List[str] = []
+
+    # ---- public ----
+
+    def feed(self, chunk: str) -> 'TolerantJSONParser':
+        self.text += chunk
+        self._scan(final=False)
+        return self
+
+    def finish(self) -> Any:
+        self._scan(final=True)
+        return self._value(final=True)
+
+    def snapshot(self) -> Any:
+        """Best-effort value of everything fed so far (stream preview)"""
+        return self._value(final=False)
+
+    # ---- helpers ----
+
+    def _repair(self, kind: str):
+        if kind not in self.repairs:
+            self.repairs.append(kind)
+
+    def _closers(self) -> str:
+        return ''.join(CLOSERS[frame['open']] for frame in reversed(self.stack))
+
+    def _mark_safe(self):
+        self.safe = (len(self.out), self._closers())
+
+    def _last_significant(self) -> str:
+        for ch in reversed(self.out):
+            if not ch.isspace():
+                return ch
+        return ''
+
+    def _value_done(self):
+        """A complete value was emitted at the current position"""
+        if not self.stack:
+            self.done = True
+            return
+        frame = self.stack[-1]
+        frame['expect'] = 'comma'
+        self._mark_safe()
+
+    def _before_value(self) -> bool:
+        """Insert a missing comma / colon so a value (or key) can start here"""
+        if not self.stack:
+            return True
+        frame = self.stack[-1]
+        if frame['expect'] == 'comma':
+            self.out.append(',')
+            self._repair('missing_comma')
+            frame['expect'] = 'key' if frame['open'] == '{' else 'value'
+        elif frame['expect'] == 'colon':
+            self.out.append(':')
+            self._repair('missing_colon')
+            frame['expect'] = 'value'
+        return True
+
+    def _role(self) -> str:
+        if self.stack and self.stack[-1]['open'] == '{' and self.stack[-1]['expect'] == 'key':
+            return 'key'
+        return 'value'
+
+    # ---- scanner ----
+
+    def _scan(self, final: bool):
+        text = self.text
+        while self.pos < len(text) and not self.done:
+            if self.string is not None:
+                if not self._scan_string(final):
+                    return
+                continue
+
+            ch = text[self.pos]
+            if not self.started:
+                if ch in self.root:
+                    self.started = True
+                    if self.pos and text[:self.pos].strip():
+                        self._repair('surrounding_text')
+                    continue
+                self.pos += 1
+                continue
+
+            if ch.isspace():
+                self.out.append(ch)
+                self.pos += 1
+            elif ch in '{[':
+                self._before_value()
+                self.out.append(ch)
+                self.stack.append({'open': ch, 'expect': 'key' if ch == '{' else 'value'})
+                self._mark_safe()
+                self.pos += 1
+            elif ch in '}]':
+                self.pos += 1
+                if not self.stack:
+                    continue
+                if self._last_significant() == ',':
+                    while self.out and self.out[-1].isspace():
+                        self.out.pop()
+                    self.out.pop()
+                    self._repair('trailing_comma')
+                frame = self.stack[-1]
+                if frame['expect'] == 'value' and frame['open'] == '{':
+                    # {"a": } - value missing
+                    self.out.append('null')
+                    self._repair('missing_value')
+                if CLOSERS[frame['open']] != ch:
+                    self._repair('mismatched_bracket')
+                self.stack.pop()
+                self.out.append(CLOSERS[frame['open']])
+                self._value_done()
+            elif ch == ',':
+                self.pos += 1
+                frame = self.stack[-1] if self.stack else None
+                if frame is None or frame['expect'] != 'comma':
+                    self._repair('extra_comma')
+                    continue
+                self.out.append(',')
+                frame['expect'] = 'key' if frame['open'] == '{' else 'value'
+            elif ch == ':':
+                self.pos += 1
+                frame = self.stack[-1] if self.stack else None
+                if frame is None or frame['expect'] != 'colon':
+                    self._repair('stray_text')
+                    continue
+                self.out.append(':')
+                frame['expect'] = 'value'
+            elif ch in '"\'':
+                if ch == "'":
+                    self._repair('single_quotes')
+                self._before_value()
+                self.string = {'quote': ch, 'role': self._role(), 'start': len(self.out)}
+                self.out.append('"')
+                self.pos += 1
+            elif ch == '/' and text[self.pos + 1:self.pos + 2] in ('/', '*'):
+                closing = '\n' if text[self.pos + 1] == '/' else '*/'
+                end = text.find(closing, self.pos + 2)
+                if end < 0:
+                    if not final:
+                        return
+                    end = len(text)
+                self.pos = end + len(closing)
+                self._repair('comments')
+            elif ch == '`':
+                # Code fence inside or right after the JSON
+                self.pos += 1
+                self._repair('code_fence')
+            elif ch.isalnum() or ch in '-+._':
+                if not self._scan_bare(final):
+                    return
+            else:
+                self.pos += 1
+                self._repair('stray_text')
+
+    def _scan_bare(self, final: bool) -> bool:
+        """Number, literal or unquoted key"""
+        text = self.text
+        end = self.pos
+        while end < len(text) and (text[end].isalnum() or text[end] in '-+._$'):
+            end += 1
+        if end == len(text) and not final:
+            return False
+        token = text[self.pos:end]
+        self.pos = end
+        role = self._role()
+        self._before_value()
+        if role == 'key':
+            self.out.append(json.dumps(token))
+            self.stack[-1]['expect'] = 'colon'
+            self._repair('unquoted_key')
+            return True
+        if token in LITERALS:
+            if LITERALS[token] != token:
+                self._repair('python_literal')
+            self.out.append(LITERALS[token])
+        else:
+            try:
+                number = json.loads(token)
+                if not isinstance(number, (int, float)):
+                    raise ValueError
+                self.out.append(token)
+            except ValueError:
+                if end == len(text):
+                    # Truncated number or literal at the very end: dropped by finish()
+                    self.out.append(token)
+                    return True
+                self.out.append(json.dumps(token))
+                self._repair('unquoted_value')
+        self._value_done()
+        return True
+
+    def _scan_string(self, final: bool) -> bool:
+        text, string = self.text, self.string
+        quote = string['quote']
+        while self.pos < len(text):
+            ch = text[self.pos]
+            if ch == '\\':
+                if self.pos + 1 >= len(text):
+                    if not final:
+                        return False
+                    self.pos += 1
+                    continue
+                nxt = text[self.pos + 1]
+                if nxt == "'" and quote == "'":
+                    self.out.append("'")
+                elif nxt in VALID_ESCAPES and not (nxt == 'u' and not self._valid_unicode(self.pos + 2, final)):
+                    self.out.append('\\' + nxt)
+                else:
+                    if nxt == 'u' and not final and self.pos + 6 > len(text):
+                        return False
+                    self.out.append('\\\\' + (nxt if nxt != '"' else '\\"'))
+                    self._repair('invalid_escape')
+                self.pos += 2
+            elif ch == quote:
+                if not self._string_ends(self.pos + 1, final):
+                    if self._string_ends(self.pos + 1, final) is None:
+                        return False
+                    # "a "quoted" word" - an inner quote, not the end of the string
+                    self.out.append('\\"')
+                    self._repair('unescaped_quote')
+                    self.pos += 1
+                    continue
+                self.out.append('"')
+                self.pos += 1
+                self.string = None
+                if string['role'] == 'key':
+                    self.stack[-1]['expect'] = 'colon'
+                else:
+                    self._value_done()
+                return True
+            elif ch == '"':  # inside a single-quoted string
+                self.out.append('\\"')
+                self.pos += 1
+            elif ch in '\n\r\t' or ord(ch) < 0x20:
+                self.out.append({'\n': '\\n', '\r': '\\r', '\t': '\\t'}.get(ch, f'\\u{ord(ch):04x}'))
+                self._repair('control_character')
+                self.pos += 1
+            else:
+                # Copy the run of ordinary characters in one go
+                end = self.pos + 1
+                while end < len(text) and text[end] not in ('\\', quote, '"', '\n', '\r', '\t') \
+                        and ord(text[end]) >= 0x20:
+                    end += 1
+                self.out.append(text[self.pos:end])
+                self.pos = end
+        return not final and False
+
+    def _valid_unicode(self, start: int, final: bool) -> bool:
+        digits = self.text[start:start + 4]
+        return len(digits) == 4 and all(c in '0123456789abcdefABCDEF' for c in digits)
+
+    def _string_ends(self, after: int, final: bool) -> Optional[bool]:
+        """Does a quote followed by the text at `after` close the string? None = need more input"""
+        text = self.text
+        i = after
+        while i < len(text) and text[i] in ' \t':
+            i += 1
+        if i >= len(text):
+            return True if final else None
+        nxt = text[i]
+        if self.string['role'] == 'key':
+            return nxt == ':' or nxt in '\r\n'
+        if nxt in ',}]\r\n':
+            return True
+        if nxt == '`':
+            return True
+        if nxt == '"':
+            # "b" "c": 1 or ["x" "y"] - another key (or array item) follows,
+            # so this quote closes the value and a comma is missing
+            end = self._string_close(i + 1)
+            if end is None:
+                return False if final else None
+            while end < len(text) and text[end] in ' \t':
+                end += 1
+            if end >= len(text):
+                return False if final else None
+            in_array = self.stack[-1]['open'] == '['
+            return text[end] == ':' or (in_array and text[end] in ',]')
+        return False
+
+    def _string_close(self, start: int) -> Optional[int]:
+        """Index just past the '"' closing a string whose text starts at `start`; None if not in the input yet"""
+        text = self.text
+        i = start
+        while i < len(text):
+            if text[i] == '\\':
+                i += 2
+            elif text[i] == '"':
+                return i + 1
+            else:
+                i += 1
+        return None
+
+    # ---- result ----
+
+    def _value(self, final: bool) -> Any:
+        if not self.started:
+            raise StructuredOutputError("No JSON found")
+        if self.done:
+            return json.loads(''.join(self.out))
+
+        if final:
+            self._repair('truncated')
+        out = list(self.out)
+        if self.string is not None and self.string['role'] == 'value':
+            # Keep the partial text: a truncated answer is still an answer
+            text = ''.join(out)
+            if text.endswith('\\') and not text.endswith('\\\\'):
+                text = text[:-1]
+            candidate = text + '"' + self._closers()
+            try:
+                return json.loads(candidate)
+            except ValueError:
+                pass
+        position, closers = self.safe
+        candidate = ''.join(out[:position]).rstrip()
+        if candidate.endswith(','):
+            candidate = candidate[:-1]
+        return json.loads(candidate + closers)
+
+
+def repair_json(text: Any, root: str = '{[') -> Tuple[Any, List[str]]:
+    """Parse text leniently; returns (value, repairs). Raises StructuredOutputError."""
+    if isinstance(text, dict):
+        # Bytez returns {"role", "content"} (or the object itself)
+        if 'content' not in text:
+            return text, []
+        text = text['content']
+    if isinstance(text, (list, tuple)) and text and isinstance(text[0], dict):
+        text = text[-1].get('content', '')
+    if not isinstance(text, str):
+        raise StructuredOutputError(f"Unexpected output type {type(text).__name__}")
+
+    stripped = text.strip()
+    if stripped[:1] in root:
+        try:
+            return json.loads(stripped), []
+        except ValueError:
+            pass
+
+    parser = TolerantJSONParser(root)
+    parser.feed(text)
+    try:
+        value = parser.finish()
+    except StructuredOutputError:
+        raise
+    except ValueError as e:
+        raise StructuredOutputError(f"Unrepairable JSON: {e}", raw=text)
+    return value, parser.repairs
+
+
+# ---------- schema validation ----------
+
+TYPE_CHECKS = {
+    'object': lambda v: isinstance(v, dict),
+    'array': lambda v: isinstance(v, list),
+    'string': lambda v: isinstance(v, str),
+    'integer': lambda v: isinstance(v, int) and not isinstance(v, bool),
+    'number': lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    'boolean': lambda v: isinstance(v, bool),
+    'null': lambda v: v is None,
+}
+
+
+def _coerce(value: Any, kind: str) -> Tuple[bool, Any]:
+    """Lossless-enough conversions LLM output commonly needs"""
+    if kind in ('integer', 'number') and isinstance(value, str):
+        try:
+            number = float(value.strip().split()[0])
+            if kind == 'integer' and number.is_integer():
+                return True, int(number)
+            if kind == 'number':
+                return True, number
+        except (ValueError, IndexError):
+            pass
+    if kind == 'integer' and isinstance(value, float) and value.is_integer():
+        return True, int(value)
+    if kind == 'string':
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return True, str(value)
+        if isinstance(value, list) and all(isinstance(v, str) for v in value):
+            return True, '\n'.join(value)
+    if kind == 'array' and isinstance(value, dict):
+        return True, [value]
+    if kind == 'boolean' and isinstance(value, str) and value.lower() in ('true', 'false'):
+        return True, value.lower() == 'true'
+    return False, value
+
+
+def validate(value: Any, schema: Dict, path: str = '$') -> Tuple[Any, List[str], bool]:
+    """Validate (and coerce) value against a schema subset; returns (value, errors, coerced)"""
+    if 'anyOf' in schema:
+        best = None
+        for option in schema['anyOf']:
+            result = validate(value, option, path)
+            if not result[1]:
+                return result
+            if best is None or len(result[1]) < len(best[1]):
+                best = result
+        return best
+
+    errors: List[str] = []
+    coerced = False
+    kinds = schema.get('type')
+    if kinds:
+        kinds = kinds if isinstance(kinds, list) else [kinds]
+        if not any(TYPE_CHECKS[k](value) for k in kinds):
+            for kind in kinds:
+                ok, converted = _coerce(value, kind)
+                if ok:
+                    value, coerced = converted, True
+                    break
+            else:
+                return value, [f"{path}: expected {'/'.join(kinds)}, got {type(value).__name__}"], coerced
+
+    if 'enum' in schema and value not in schema['enum']:
+        match = next((e for e in schema['enum'] if isinstance(value, str) and isinstance(e, str)
+                      and e.lower() == value.strip().lower()), None)
+        if match is None:
+            errors.append(f"{path}: {value!r} not in {schema['enum']}")
+        else:
+            value, coerced = match, True
+
+    if isinstance(value, dict):
+        properties = schema.get('properties', {})
+        value = dict(value)
+        for key in schema.get('required', []):
+            if key not in value or value[key] is None and 'null' not in str(properties.get(key, {}).get('type')):
+                if key in properties and 'default' in properties[key]:
+                    value[key] = properties[key]['default']
+                    coerced = True
+                else:
+                    errors.append(f"{path}.{key}: required")
+        for key, sub in properties.items():
+            if key in value:
+                value[key], sub_errors, sub_coerced = validate(value[key], sub, f"{path}.{key}")
+                errors.extend(sub_errors)
+                coerced = coerced or sub_coerced
+            elif 'default' in sub:
+                value[key] = sub['default']
+
+    if isinstance(value, list):
+        if len(value) < schema.get('minItems', 0):
+            errors.append(f"{path}: needs at least {schema['minItems']} items, got {len(value)}")
+        if 'items' in schema:
+            items = []
+            for index, item in enumerate(value):
+                item, sub_errors, sub_coerced = validate(item, schema['items'], f"{path}[{index}]")
+                if sub_errors and schema.get('dropInvalidItems'):
+                    # One broken question should not cost the whole paper
+                    coerced = True
+                    continue
+                errors.extend(sub_errors)
+                coerced = coerced or sub_coerced
+                items.append(item)
+            value = items
+            if len(value) < schema.get('minItems', 0) and not any('needs at least' in e for e in errors):
+                errors.append(f"{path}: needs at least {schema['minItems']} valid items, got {len(value)}")
+    return value, errors, coerced
+
+
+# ---------- schemas ----------
+
+PLANNER_DECISION = {
+    'title': 'planner_decision',
+    'anyOf': [
+        {
+            'type': 'object',
+            'required': ['action'],
+            'properties': {
+                'action': {'type': 'string'},
+                'parameters': {'type': 'object', 'default': {}},
+                'reasoning': {'type': 'string', 'default': ''},
+                'confidence': {'type': 'number', 'default': 0.5},
+            },
+        },
+        {
+            'type': 'object',
+            'required': ['steps'],
+            'properties': {
+                'steps': {'type': 'array', 'minItems': 1, 'items': {
+                    'type': 'object',
+                    'required': ['action'],
+                    'properties': {
+                        'id': {'type': 'string'},
+                        'action': {'type': 'string'},
+                        'parameters': {'type': 'object', 'default': {}},
+                        'depends_on': {'type': 'array', 'items': {'type': 'string'}, 'default': []},
+                    },
+                }},
+                'reasoning': {'type': 'string', 'default': ''},
+                'confidence': {'type': 'number', 'default': 0.5},
+            },
+        },
+    ],
+}
+
+PREDICTED_PAPER = {
+    'title': 'predicted_paper',
+    'type': 'object',
+    'required': ['questions'],
+    'properties': {
+        'subject_name': {'type': 'string'},
+        'questions': {'type': 'array', 'minItems': 1, 'dropInvalidItems': True, 'items': {
+            'type': 'object',
+            'required': ['q_number', 'question'],
+            'properties': {
+                'q_number': {'type': 'string'},
+                'question': {'type': 'string'},
+                'marks': {'type': 'integer'},
+                'unit': {'type': 'string'},
+                'chapter': {'type': 'string'},
+                'probability': {'type': 'string', 'enum': ['High', 'Medium', 'Low']},
+            },
+        }},
+    },
+}
+
+GTU_ANSWER = {
+    'title': 'gtu_answer',
+    'type': 'object',
+    'required': ['answer'],
+    'properties': {
+        'answer': {'type': 'string'},
+        'unit': {'type': ['string', 'null']},
+        'chapter': {'type': ['string', 'null']},
+        'diagram_suggestion': {'type': ['string', 'null']},
+    },
+}
+
+
+# ---------- entry point ----------
+
+def parse_structured(output: Any, schema: Dict, text_field: Optional[str] = None) -> Any:
+    """
+    Parse, repair and validate an LLM response against schema.
+
+    text_field: when the response contains no JSON at all, use the whole
+    text as this field (e.g. a plain-prose answer becomes {"answer": text}).
+    Raises StructuredOutputError when nothing valid can be recovered.
+    """
+    name = schema.get('title', 'structured')
+    root = '{' if schema.get('type') == 'object' or 'anyOf' in schema else '{['
+    repairs: List[str] = []
+    try:
+        try:
+            value, repairs = repair_json(output, root)
+        except StructuredOutputError as e:
+            text = output.get('content') if isinstance(output, dict) else output
+            if not (text_field and isinstance(text, str) and text.strip() and str(e) == "No JSON found"):
+                raise
+            value, repairs = {text_field: text.strip()}, ['plain_text']
+
+        value, errors, coerced = validate(value, schema)
+        if errors:
+            raise StructuredOutputError(f"{name} failed validation: {'; '.join(errors[:3])}",
+                                        errors=errors, raw=output)
+        if coerced:
+            repairs.append('coerced')
+    except StructuredOutputError as e:
+        _record(name, FAILED, repairs)
+        logger.warning(f"Structured output {name} unusable: {e}")
+        raise
+
+    _record(name, REPAIRED if repairs else CLEAN, repairs)
+    if repairs:
+        logger.info(f"Structured output {name} repaired locally: {', '.join(repairs)}")
+    return value
+
+
+def _record(name: str, outcome: str, repairs: List[str]):
+    try:
+        from backend.telemetry import get_telemetry
+        get_telemetry().record_structured_output(name, outcome, repairs)
+    except Exception as e:
+        logger.debug(f"Structured output telemetry failed: {e}")
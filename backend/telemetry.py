@@ -0,0 +1,404 @@
+"""
+LLM Call Telemetry for GTU App
+Answers "which endpoint burns our GPT-4o budget" and "what is Groq's p95"
+
+This module implements:
+1. Latency histograms per route/provider/model, call counts per task/tier
+2. Prompt and completion token counters with estimated cost
+3. Fallback and cache-hit counters
+4. Structured-output counters (clean / locally repaired / failed JSON)
+5. Prometheus text exposition merged across worker processes
+6. Rolling summary (p50/p95/p99, cost per route) over a recent window
+
+/metrics and the summaries expose per-route cost and token counts, so they
+need "Authorization: Bearer $METRICS_TOKEN"; without a token they are only
+served when METRICS_PUBLIC=1 (e.g. behind a private network).
+
+Each process keeps its own registry and periodically writes a snapshot to
+the local SQLite store; /metrics merges the snapshots of live processes so
+counters are consistent no matter which gunicorn worker answers the scrape.
+"""
+
+import os
+import hmac
+import json
+import math
+import time
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from backend.local_store import connect, get_db_path
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+# USD per 1M tokens (input, output) - estimates for budgeting, not billing
+MODEL_PRICES = {
+    'openai/gpt-4o': (2.50, 10.00),
+    'gpt-4o': (2.50, 10.00),
+    'gpt-4o-mini': (0.15, 0.60),
+    'openai/gpt-4o-mini': (0.15, 0.60),
+    'llama-3.3-70b-versatile': (0.59, 0.79),
+    'llama-3.1-8b-instant': (0.05, 0.08),
+}
+
+SUMMARY_WINDOW_SECONDS = int(os.environ.get('TELEMETRY_SUMMARY_WINDOW', 900))
+FLUSH_INTERVAL_SECONDS = 2.0
+# Snapshots of processes that stopped flushing (restarted workers) age out after a day
+SNAPSHOT_TTL_SECONDS = 24 * 3600
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_PUBLIC = os.environ.get('METRICS_PUBLIC', '0') == '1'
+
+# Route label for the current request/job; set by Flask/FastAPI hooks
+current_route: contextvars.ContextVar = contextvars.ContextVar('telemetry_route', default='unknown')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metric_snapshots (
+    process TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+def estimate_tokens(text) -> int:
+    """Rough token estimate (~4 chars/token) when the provider gives no usage"""
+    if not text:
+        return 0
+    if not isinstance(text, str):
+        text = json.dumps(text, default=str)
+    return max(1, math.ceil(len(text) / 4))
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    price_in, price_out = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * price_in + completion_tokens * price_out) / 1_000_000
+
+
+def metrics_access_denied(authorization: Optional[str], token: Optional[str] = None,
+                          public: Optional[bool] = None) -> Optional[int]:
+    """HTTP status to refuse a metrics request with (401 bad token, 404 disabled), or None to serve it"""
+    token = METRICS_TOKEN if token is None else token
+    public = METRICS_PUBLIC if public is None else public
+    if token:
+        return None if hmac.compare_digest(authorization or '', f"Bearer {token}") else 401
+    return None if public else 404
+
+
+def _key(*labels) -> str:
+    return '\x1f'.join(str(label) for label in labels)
+
+
+def _unkey(key: str) -> List[str]:
+    return key.split('\x1f')
+
+
+class LLMCall:
+    """Handle yielded by Telemetry.llm_call; callers report output/usage on it"""
+
+    def __init__(self, provider: str, model: str, messages):
+        self.provider = provider
+        self.model = model
+        self.prompt_tokens = estimate_tokens(
+            "".join(m.get('content', '') if isinstance(m, dict) else str(m) for m in (messages or []))
+        )
+        self.completion_tokens = 0
+        self.status = 'ok'
+
+    def set_output(self, output, usage: Optional[Dict] = None, finish_reason: Optional[str] = None):
+        """Record the completion; prefer provider-reported usage when present"""
+        if usage:
+            self.prompt_tokens = usage.get('prompt_tokens', self.prompt_tokens) or self.prompt_tokens
+            self.completion_tokens = usage.get('completion_tokens') or estimate_tokens(output)
+        else:
+            self.completion_tokens = estimate_tokens(output)
+        if not output:
+            self.status = 'empty'
+        elif finish_reason == 'length':
+            # Cut off at max_tokens - the quality signal for a too-tight model route
+            self.status = 'truncated'
+
+    def set_error(self):
+        self.status = 'error'
+
+
+class Telemetry:
+    """Per-process metric registry"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.environ.get('TELEMETRY_DB_PATH') or get_db_path('telemetry')
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+        self.counters: Dict[str, Dict[str, float]] = {
+            'llm_calls_total': {},
+            'llm_prompt_tokens_total': {},
+            'llm_completion_tokens_total': {},
+            'llm_cost_usd_total': {},
+            'llm_fallbacks_total': {},
+            'llm_task_calls_total': {},
+            'cache_hits_total': {},
+            'cache_misses_total': {},
+            'structured_outputs_total': {},
+            'structured_repairs_total': {},
+        }
+        # key -> [bucket counts..., +Inf count], sum
+        self.histograms: Dict[str, Dict] = {}
+        self.recent = deque(maxlen=5000)
+        try:
+            connect(self.db_path).executescript(SCHEMA)
+        except Exception as e:
+            logger.warning(f"Telemetry snapshot store unavailable: {e}")
+
+    # ---------- recording ----------
+
+    def _inc(self, name: str, key: str, value: float = 1.0):
+        series = self.counters[name]
+        series[key] = series.get(key, 0.0) + value
+
+    @contextmanager
+    def llm_call(self, provider: str, model: str, messages=None, route: Optional[str] = None,
+                 task: Optional[str] = None, tier: Optional[str] = None):
+        """Time a provider call and record tokens/cost when it finishes"""
+        call = LLMCall(provider, model, messages)
+        started = time.perf_counter()
+        try:
+            yield call
+        except Exception:
+            call.set_error()
+            raise
+        finally:
+            self.record_llm_call(
+                route or current_route.get(), provider, model,
+                time.perf_counter() - started,
+                call.prompt_tokens, call.completion_tokens, call.status, task, tier
+            )
+
+    def record_llm_call(self, route: str, provider: str, model: str, latency: float,
+                        prompt_tokens: int = 0, completion_tokens: int = 0, status: str = 'ok',
+                        task: Optional[str] = None, tier: Optional[str] = None):
+        cost = estimate_cost(model, prompt_tokens, completion_tokens)
+        key = _key(route, provider, model)
+        task, tier = task or 'default', tier or 'large'
+        with self._lock:
+            self._inc('llm_calls_total', _key(route, provider, model, status))
+            self._inc('llm_task_calls_total', _key(task, tier, model, status))
+            self._inc('llm_prompt_tokens_total', key, prompt_tokens)
+            self._inc('llm_completion_tokens_total', key, completion_tokens)
+            self._inc('llm_cost_usd_total', key, cost)
+
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = {'buckets': [0] * (len(LATENCY_BUCKETS) + 1), 'sum': 0.0}
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    hist['buckets'][i] += 1
+                    break
+            else:
+                hist['buckets'][-1] += 1
+            hist['sum'] += latency
+
+            self.recent.append((time.time(), route, provider, model, latency, cost, status, task, tier))
+        self._maybe_flush()
+
+    def record_fallback(self, from_provider: str, to_provider: str, route: Optional[str] = None):
+        with self._lock:
+            self._inc('llm_fallbacks_total', _key(route or current_route.get(), from_provider, to_provider))
+        self._maybe_flush()
+
+    def record_cache(self, cache: str, hit: bool, route: Optional[str] = None):
+        name = 'cache_hits_total' if hit else 'cache_misses_total'
+        with self._lock:
+            self._inc(name, _key(route or current_route.get(), cache))
+        self._maybe_flush()
+
+    def record_structured_output(self, schema: str, outcome: str, repairs: Optional[List[str]] = None,
+                                 route: Optional[str] = None):
+        """Outcome of parsing an LLM JSON response: clean, repaired (locally) or failed"""
+        route = route or current_route.get()
+        with self._lock:
+            self._inc('structured_outputs_total', _key(route, schema, outcome))
+            for repair in repairs or ():
+                self._inc('structured_repairs_total', _key(route, schema, repair))
+        self._maybe_flush()
+
+    # ---------- cross-process snapshots ----------
+
+    @property
+    def process_id(self) -> str:
+        # Evaluated lazily so a registry created before a fork is keyed per worker
+        return f"{os.uname().nodename}:{os.getpid()}"
+
+    def _snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                'counters': {name: dict(series) for name, series in self.counters.items()},
+                'histograms': {k: {'buckets': list(v['buckets']), 'sum': v['sum']}
+                               for k, v in self.histograms.items()},
+                'recent': [r for r in self.recent if r[0] >= time.time() - SUMMARY_WINDOW_SECONDS],
+            }
+
+    def _maybe_flush(self, force: bool = False):
+        now = time.time()
+        if not force and now - self._last_flush < FLUSH_INTERVAL_SECONDS:
+            return
+        self._last_flush = now
+        try:
+            connect(self.db_path).execute(
+                "INSERT OR REPLACE INTO metric_snapshots (process, data, updated_at) VALUES (?, ?, ?)",
+                (self.process_id, json.dumps(self._snapshot()), now)
+            )
+        except Exception as e:
+            logger.debug(f"Telemetry flush failed: {e}")
+
+    def _merged(self) -> Dict:
+        """Merge snapshots of all processes that flushed recently"""
+        self._maybe_flush(force=True)
+        merged = {'counters': {name: {} for name in self.counters}, 'histograms': {}, 'recent': []}
+        try:
+            rows = connect(self.db_path).execute(
+                "SELECT data FROM metric_snapshots WHERE updated_at >= ?",
+                (time.time() - SNAPSHOT_TTL_SECONDS,)
+            ).fetchall()
+            snapshots = [json.loads(row['data']) for row in rows]
+        except Exception:
+            snapshots = [self._snapshot()]
+
+        for snap in snapshots:
+            for name, series in snap['counters'].items():
+                target = merged['counters'].setdefault(name, {})
+                for key, value in series.items():
+                    target[key] = target.get(key, 0.0) + value
+            for key, hist in snap['histograms'].items():
+                target = merged['histograms'].get(key)
+                if target is None:
+                    merged['histograms'][key] = {'buckets': list(hist['buckets']), 'sum': hist['sum']}
+                else:
+                    target['buckets'] = [a + b for a, b in zip(target['buckets'], hist['buckets'])]
+                    target['sum'] += hist['sum']
+            merged['recent'].extend(snap['recent'])
+        return merged
+
+    # ---------- exposition ----------
+
+    def render_prometheus(self) -> str:
+        """Prometheus text format (version 0.0.4)"""
+        data = self._merged()
+        lines = []
+
+        def labels(names, values):
+            pairs = [f'{n}="{str(v).replace(chr(34), chr(39))}"' for n, v in zip(names, values)]
+            return '{' + ','.join(pairs) + '}'
+
+        counter_labels = {
+            'llm_calls_total': ('route', 'provider', 'model', 'status'),
+            'llm_prompt_tokens_total': ('route', 'provider', 'model'),
+            'llm_completion_tokens_total': ('route', 'provider', 'model'),
+            'llm_cost_usd_total': ('route', 'provider', 'model'),
+            'llm_fallbacks_total': ('route', 'from_provider', 'to_provider'),
+            'llm_task_calls_total': ('task', 'tier', 'model', 'status'),
+            'cache_hits_total': ('route', 'cache'),
+            'cache_misses_total': ('route', 'cache'),
+            'structured_outputs_total': ('route', 'schema', 'outcome'),
+            'structured_repairs_total': ('route', 'schema', 'repair'),
+        }
+        for name, series in data['counters'].items():
+            names = counter_labels.get(name, ())
+            lines.append(f"# TYPE gtu_{name} counter")
+            for key, value in sorted(series.items()):
+                lines.append(f"gtu_{name}{labels(names, _unkey(key))} {value:g}")
+
+        lines.append("# TYPE gtu_llm_latency_seconds histogram")
+        for key, hist in sorted(data['histograms'].items()):
+            route, provider, model = _unkey(key)
+            cumulative = 0
+            for bound, count in zip(list(LATENCY_BUCKETS) + ['+Inf'], hist['buckets']):
+                cumulative += count
+                lines.append(
+                    f"gtu_llm_latency_seconds_bucket"
+                    f"{labels(('route', 'provider', 'model', 'le'), (route, provider, model, bound))} {cumulative}"
+                )
+            base = labels(('route', 'provider', 'model'), (route, provider, model))
+            lines.append(f"gtu_llm_latency_seconds_sum{base} {hist['sum']:.6f}")
+            lines.append(f"gtu_llm_latency_seconds_count{base} {cumulative}")
+
+        return "\n".join(lines) + "\n"
+
+    def summary(self, window_seconds: int = SUMMARY_WINDOW_SECONDS) -> Dict:
+        """Rolling summary over the recent window, merged across processes"""
+        data = self._merged()
+        cutoff = time.time() - window_seconds
+        recent = [r for r in data['recent'] if r[0] >= cutoff]
+
+        def percentiles(values):
+            if not values:
+                return {'p50': None, 'p95': None, 'p99': None}
+            ordered = sorted(values)
+            pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+            return {'p50': pick(0.50), 'p95': pick(0.95), 'p99': pick(0.99)}
+
+        by_provider, by_route, by_task = {}, {}, {}
+        for record in recent:
+            # Snapshots written before task routing have no task/tier
+            _, route, provider, model, latency, cost, status, task, tier = (list(record) + ['default', 'large'])[:9]
+            p = by_provider.setdefault(provider, {'calls': 0, 'errors': 0, 'latencies': []})
+            p['calls'] += 1
+            p['errors'] += status not in ('ok', 'truncated')
+            p['latencies'].append(latency)
+            r = by_route.setdefault(route, {'calls': 0, 'cost_usd': 0.0, 'latencies': []})
+            r['calls'] += 1
+            r['cost_usd'] += cost
+            r['latencies'].append(latency)
+            t = by_task.setdefault(task, {'tier': tier, 'calls': 0, 'truncated': 0, 'cost_usd': 0.0, 'latencies': []})
+            t['calls'] += 1
+            t['truncated'] += status == 'truncated'
+            t['cost_usd'] += cost
+            t['latencies'].append(latency)
+
+        for group in (by_provider, by_route, by_task):
+            for stats in group.values():
+                stats.update(percentiles(stats.pop('latencies')))
+                if 'cost_usd' in stats:
+                    stats['cost_usd'] = round(stats['cost_usd'], 6)
+
+        hits = sum(data['counters'].get('cache_hits_total', {}).values())
+        misses = sum(data['counters'].get('cache_misses_total', {}).values())
+        structured = {}
+        for key, value in data['counters'].get('structured_outputs_total', {}).items():
+            _, schema, outcome = _unkey(key)
+            counts = structured.setdefault(schema, {'clean': 0, 'repaired': 0, 'failed': 0})
+            counts[outcome] = counts.get(outcome, 0) + int(value)
+        for counts in structured.values():
+            total = sum(counts.values())
+            counts['failure_rate'] = round(counts['failed'] / total, 4) if total else None
+        return {
+            'window_seconds': window_seconds,
+            'total_calls': len(recent),
+            'total_cost_usd': round(sum(r[5] for r in recent), 6),
+            'latency': percentiles([r[4] for r in recent]),
+            'by_provider': by_provider,
+            'by_route': by_route,
+            'by_task': by_task,
+            'fallbacks_total': sum(data['counters'].get('llm_fallbacks_total', {}).values()),
+            'cache_hit_rate': round(hits / (hits + misses), 3) if hits + misses else None,
+            'structured_outputs': structured,
+        }
+
+
+# Singleton instance
+_telemetry = None
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry() -> Telemetry:
+    """Get or create telemetry singleton"""
+    global _telemetry
+    if _telemetry is None:
+        with _telemetry_lock:
+            if _telemetry is None:
+                _telemetry = Telemetry()
+    return _telemetry
@@ -0,0 +1,269 @@
+"""
+Multi-Tool Plans for the GTU Agent
+Lets one chat request run several tools ("flashcards and a PDF for unit 3")
+instead of one tool per chat turn
+
+This module implements:
+1. Plan parsing - the planner's JSON becomes a small DAG of PlanSteps
+   (id, action, parameters, depends_on); the old single-action decision is
+   a one-step plan. Unknown tools, unknown dependencies and cycles are rejected.
+2. Result passing - a parameter value "$s1" is replaced by the result of step s1
+3. A concurrent executor - steps whose dependencies are done run in parallel
+   on a shared thread pool, each with its own timeout; a failed or timed-out
+   step skips only its dependents, so the caller always gets partial results
+4. Streaming - PlanExecutor.iter_results yields each step as it finishes
+
+A plan takes as long as its slowest dependency chain, not the sum of its steps.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PLAN_MAX_STEPS = int(os.environ.get('PLAN_MAX_STEPS', 6))
+PLAN_WORKERS = int(os.environ.get('PLAN_WORKERS', 8))
+# Per-step timeout; the whole chat request is bounded by AGENT_REQUEST_TIMEOUT
+PLAN_TOOL_TIMEOUT = float(os.environ.get('PLAN_TOOL_TIMEOUT', 60))
+
+# Tools that legitimately take longer than PLAN_TOOL_TIMEOUT
+TOOL_TIMEOUTS = {
+    'summarize_video': 85.0,
+}
+
+STEP_REFERENCE = re.compile(r'\$([A-Za-z_][\w-]*)')
+
+OK, FAILED, TIMEOUT, SKIPPED = 'ok', 'failed', 'timeout', 'skipped'
+
+
+class PlanError(ValueError):
+    """The planner's output is not a runnable plan"""
+
+
+class PlanStep:
+    def __init__(self, step_id: str, action: str, parameters: Optional[Dict] = None,
+                 depends_on: Optional[List[str]] = None):
+        self.id = step_id
+        self.action = action
+        self.parameters = parameters or {}
+        self.depends_on = list(depends_on or [])
+
+    def to_dict(self) -> Dict:
+        return {'id': self.id, 'action': self.action, 'parameters': self.parameters,
+                'depends_on': self.depends_on}
+
+
+def parse_plan(decision: Dict, tools=None, max_steps: int = PLAN_MAX_STEPS) -> List[PlanStep]:
+    """
+    Steps of a planner decision in dependency order.
+
+    Accepts {"steps": [{"id", "action", "parameters", "depends_on"}, ...]} or the
+    single-action shape {"action", "parameters"}. References to other steps in
+    parameters ("$s1") count as dependencies.
+    """
+    if not isinstance(decision, dict):
+        raise PlanError("Decision is not an object")
+    raw_steps = decision.get('steps')
+    if raw_steps is None:
+        if not decision.get('action'):
+            raise PlanError("Decision has neither steps nor an action")
+        raw_steps = [{'id': 's1', 'action': decision['action'], 'parameters': decision.get('parameters')}]
+    if not isinstance(raw_steps, list) or not raw_steps:
+        raise PlanError("Plan has no steps")
+    if len(raw_steps) > max_steps:
+        raise PlanError(f"Plan has {len(raw_steps)} steps (max {max_steps})")
+
+    steps: Dict[str, PlanStep] = {}
+    for index, raw in enumerate(raw_steps, 1):
+        if not isinstance(raw, dict) or not raw.get('action'):
+            raise PlanError(f"Step {index} has no action")
+        step_id = str(raw.get('id') or f"s{index}")
+        if step_id in steps:
+            raise PlanError(f"Duplicate step id {step_id}")
+        if tools is not None and raw['action'] not in tools:
+            raise PlanError(f"Unknown action: {raw['action']}")
+        parameters = raw.get('parameters') or {}
+        if not isinstance(parameters, dict):
+            raise PlanError(f"Step {step_id} parameters are not an object")
+        depends_on = raw.get('depends_on') or []
+        if isinstance(depends_on, str):
+            depends_on = [depends_on]
+        referenced = [ref for value in parameters.values() if isinstance(value, str)
+                      for ref in STEP_REFERENCE.findall(value)]
+        depends_on = list(dict.fromkeys([str(d) for d in depends_on] + referenced))
+        steps[step_id] = PlanStep(step_id, raw['action'], parameters, depends_on)
+
+    for step in steps.values():
+        for dependency in step.depends_on:
+            if dependency not in steps:
+                raise PlanError(f"Step {step.id} depends on unknown step {dependency}")
+
+    # Kahn's algorithm: dependency order, and proof there is no cycle
+    remaining = {step_id: len(step.depends_on) for step_id, step in steps.items()}
+    ordered = []
+    ready = [step_id for step_id, count in remaining.items() if count == 0]
+    while ready:
+        step_id = ready.pop(0)
+        ordered.append(steps[step_id])
+        for other in steps.values():
+            if step_id in other.depends_on:
+                remaining[other.id] -= 1
+                if remaining[other.id] == 0:
+                    ready.append(other.id)
+    if len(ordered) != len(steps):
+        raise PlanError("Plan dependencies contain a cycle")
+    return ordered
+
+
+def resolve_parameters(parameters: Dict, results: Dict[str, Dict]) -> Dict:
+    """Replace "$step" references with that step's result"""
+    resolved = {}
+    for key, value in parameters.items():
+        if isinstance(value, str) and STEP_REFERENCE.search(value):
+            whole = STEP_REFERENCE.fullmatch(value.strip())
+            if whole:
+                value = results[whole.group(1)]['result']
+            else:
+                value = STEP_REFERENCE.sub(lambda m: str(results[m.group(1)]['result']), value)
+        resolved[key] = value
+    return resolved
+
+
+class PlanExecutor:
+    """Runs plan steps concurrently with per-step timeouts"""
+
+    def __init__(self, max_workers: int = PLAN_WORKERS, default_timeout: float = PLAN_TOOL_TIMEOUT,
+                 timeouts: Optional[Dict[str, float]] = None):
+        self.default_timeout = default_timeout
+        self.timeouts = dict(TOOL_TIMEOUTS if timeouts is None else timeouts)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='plan')
+        self._lock = threading.Lock()
+        self._stats = {'plans': 0, 'steps': 0, OK: 0, FAILED: 0, TIMEOUT: 0, SKIPPED: 0}
+
+    def timeout_for(self, action: str) -> float:
+        return self.timeouts.get(action, self.default_timeout)
+
+    def iter_results(self, steps: List[PlanStep], tools: Dict[str, Callable]) -> Iterator[Dict]:
+        """
+        Yield {"id", "action", "status", "result"/"error", "seconds"} per step
+        as it finishes (ok / failed / timeout) or is skipped because a
+        dependency did not succeed.
+        """
+        results: Dict[str, Dict] = {}
+        pending = {step.id: step for step in steps}
+        running = {}  # future -> (step, started, deadline)
+        with self._lock:
+            self._stats['plans'] += 1
+            self._stats['steps'] += len(steps)
+
+        def finish(step, status, started, result=None, error=None):
+            entry = {'id': step.id, 'action': step.action, 'status': status,
+                     'seconds': round(time.perf_counter() - started, 3) if started else 0.0}
+            if status == OK:
+                entry['result'] = result
+            else:
+                entry['error'] = error
+            results[step.id] = entry
+            with self._lock:
+                self._stats[status] += 1
+            return entry
+
+        while pending or running:
+            # Start every step whose dependencies are settled; skip those with a failed one
+            for step in list(pending.values()):
+                states = [results[d]['status'] if d in results else None for d in step.depends_on]
+                if any(state not in (None, OK) for state in states):
+                    del pending[step.id]
+                    failed = [d for d in step.depends_on if d in results and results[d]['status'] != OK]
+                    yield finish(step, SKIPPED, None, error=f"Skipped: {', '.join(failed)} did not complete")
+                elif all(state == OK for state in states):
+                    del pending[step.id]
+                    try:
+                        params = resolve_parameters(step.parameters, results)
+                    except Exception as e:
+                        yield finish(step, FAILED, None, error=f"Bad step reference: {e}")
+                        continue
+                    context = contextvars.copy_context()
+                    future = self._executor.submit(context.run, tools[step.action], **params)
+                    started = time.perf_counter()
+                    running[future] = (step, started, started + self.timeout_for(step.action))
+            if not running:
+                continue
+
+            now = time.perf_counter()
+            next_deadline = min(deadline for _, _, deadline in running.values())
+            done, _ = wait(list(running), timeout=max(0.0, next_deadline - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                step, started, _ = running.pop(future)
+                try:
+                    yield finish(step, OK, started, result=future.result())
+                except Exception as e:
+                    logger.warning(f"Plan step {step.id} ({step.action}) failed: {e}")
+                    yield finish(step, FAILED, started, error=str(e))
+
+            now = time.perf_counter()
+            for future, (step, started, deadline) in list(running.items()):
+                if now >= deadline:
+                    # Threads cannot be stopped; a queued step is cancelled, a running one is abandoned
+                    future.cancel()
+                    del running[future]
+                    logger.warning(f"Plan step {step.id} ({step.action}) timed out")
+                    yield finish(step, TIMEOUT, started,
+                                 error=f"Timed out after {self.timeout_for(step.action):.0f}s")
+
+    def run(self, steps: List[PlanStep], tools: Dict[str, Callable],
+            on_result: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """Run a whole plan; on_result is called with each step as it finishes"""
+        started = time.perf_counter()
+        finished = []
+        for entry in self.iter_results(steps, tools):
+            finished.append(entry)
+            if on_result:
+                on_result(entry)
+        by_id = {entry['id']: entry for entry in finished}
+        ordered = [by_id[step.id] for step in steps]
+        succeeded = sum(entry['status'] == OK for entry in ordered)
+        return {
+            'status': OK if succeeded == len(ordered) else ('partial' if succeeded else FAILED),
+            'steps': ordered,
+            'seconds': round(time.perf_counter() - started, 3)
+        }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+def format_plan_result(plan: Dict) -> str:
+    """Chat reply for a multi-step plan: every step's result or why it is missing"""
+    if not plan['steps']:
+        return f"I couldn't run that plan: {plan.get('error', 'no steps')}"
+    labels = {OK: '✅', FAILED: '❌', TIMEOUT: '⏱️', SKIPPED: '⏭️'}
+    sections = []
+    for entry in plan['steps']:
+        body = entry['result'] if entry['status'] == OK else entry['error']
+        if not isinstance(body, str):
+            body = str(body)
+        sections.append(f"{labels[entry['status']]} **{entry['action']}**\n{body}")
+    return "\n\n".join(sections)
+
+
+# Singleton instance
+_plan_executor = None
+
+
+def get_plan_executor() -> PlanExecutor:
+    """Get or create plan executor singleton"""
+    global _plan_executor
+    if _plan_executor is None:
+        _plan_executor = PlanExecutor()
+    return _plan_executor
@@ -0,0 +1,333 @@
+"""
+Video Summarization Pipeline
+Map-reduce summaries of YouTube lectures for the agent's summarize_video tool
+
+This module implements:
+1. A transcript cache keyed by video_id (local SQLite) - YouTube is only
+   asked once per video
+2. Token-sized chunking on transcript segment boundaries, with timestamps
+3. Concurrent chunk summaries (bounded parallelism), stored per chunk and
+   reused on later runs - an interrupted run resumes where it stopped
+4. A hierarchical reduce: partial summaries are merged fan_in at a time
+   until one final, student-facing summary is left
+
+Bump VIDEO_PROMPT_VERSION when the prompts below change; stored chunk and
+final summaries of older versions are then ignored.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from backend.local_store import connect, get_db_path, transaction
+from backend.telemetry import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+VIDEO_PROMPT_VERSION = 1
+VIDEO_CHUNK_TOKENS = int(os.environ.get('VIDEO_CHUNK_TOKENS', 1500))
+VIDEO_CONCURRENCY = int(os.environ.get('VIDEO_CONCURRENCY', 4))
+# Partial summaries merged per reduce call
+VIDEO_REDUCE_FAN_IN = int(os.environ.get('VIDEO_REDUCE_FAN_IN', 6))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS video_transcripts (
+    video_id TEXT PRIMARY KEY,
+    segments TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS video_chunk_summaries (
+    video_id TEXT NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    prompt_version INTEGER NOT NULL,
+    chunk_hash TEXT NOT NULL,
+    start_seconds REAL,
+    end_seconds REAL,
+    summary TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (video_id, chunk_index, prompt_version)
+);
+CREATE TABLE IF NOT EXISTS video_final_summaries (
+    video_id TEXT NOT NULL,
+    prompt_version INTEGER NOT NULL,
+    text_hash TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    chunk_count INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (video_id, prompt_version)
+);
+"""
+
+CHUNK_SYSTEM = "You summarize one section of a GTU lecture transcript for students. Be factual and concise."
+CHUNK_PROMPT = """Summarize this section ({start} - {end}) of a lecture transcript.
+
+List the topics covered, key concepts, and any formulas or algorithms mentioned.
+Use short bullet points (at most 120 words).
+
+Transcript section:
+{text}"""
+
+MERGE_PROMPT = """Merge these consecutive partial summaries of one lecture into a single summary.
+Keep every distinct topic, drop repetition, keep bullet points (at most 200 words).
+
+{parts}"""
+
+FINAL_PROMPT = """Summarize this GTU lecture video for students.
+
+{label}:
+{text}
+
+Provide:
+1. Main topics covered (bullet points)
+2. Key concepts explained
+3. Important formulas/algorithms mentioned
+4. Study tips based on content
+
+Keep it concise (200-300 words)."""
+
+
+class VideoSummaryError(Exception):
+    """Raised when a video cannot be summarized (no transcript, every chunk failed, ...)"""
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def format_timestamp(seconds: Optional[float]) -> str:
+    seconds = int(seconds or 0)
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}" if seconds >= 3600 \
+        else f"{seconds // 60}:{seconds % 60:02d}"
+
+
+def youtube_transcript(video_id: str) -> List[Dict]:
+    """Default transcript source: [{'text', 'start', 'duration'}, ...] from YouTube"""
+    from youtube_transcript_api import YouTubeTranscriptApi
+    return YouTubeTranscriptApi.get_transcript(video_id)
+
+
+def chunk_segments(segments: List[Dict], max_tokens: int = VIDEO_CHUNK_TOKENS) -> List[Dict]:
+    """Group transcript segments into chunks of at most ~max_tokens (segments are never split)"""
+    chunks, texts, tokens, start = [], [], 0, None
+    end = None
+
+    def flush():
+        text = " ".join(texts)
+        chunks.append({'index': len(chunks), 'text': text, 'start': start, 'end': end, 'hash': text_hash(text)})
+
+    for segment in segments:
+        text = ' '.join(str(segment.get('text', '')).split())
+        if not text:
+            continue
+        seg_tokens = estimate_tokens(text)
+        if texts and tokens + seg_tokens > max_tokens:
+            flush()
+            texts, tokens, start = [], 0, None
+        if start is None:
+            start = segment.get('start', 0)
+        texts.append(text)
+        tokens += seg_tokens
+        end = segment.get('start', 0) + segment.get('duration', 0)
+    if texts:
+        flush()
+    return chunks
+
+
+class VideoStore:
+    """Transcripts, per-chunk summaries and final summaries in the local store"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or get_db_path('videos')
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        return connect(self.db_path)
+
+    def get_transcript(self, video_id: str) -> Optional[List[Dict]]:
+        row = self._conn().execute("SELECT segments FROM video_transcripts WHERE video_id = ?",
+                                   (video_id,)).fetchone()
+        return json.loads(row['segments']) if row else None
+
+    def put_transcript(self, video_id: str, segments: List[Dict]):
+        encoded = json.dumps(segments)
+        self._conn().execute(
+            """INSERT OR REPLACE INTO video_transcripts (video_id, segments, text_hash, fetched_at)
+               VALUES (?, ?, ?, ?)""",
+            (video_id, encoded, text_hash(encoded), time.time())
+        )
+
+    def chunk_summaries(self, video_id: str, version: int = VIDEO_PROMPT_VERSION) -> Dict[int, Dict]:
+        rows = self._conn().execute(
+            "SELECT * FROM video_chunk_summaries WHERE video_id = ? AND prompt_version = ? ORDER BY chunk_index",
+            (video_id, version)
+        ).fetchall()
+        return {row['chunk_index']: dict(row) for row in rows}
+
+    def put_chunk_summary(self, video_id: str, chunk: Dict, summary: str, version: int = VIDEO_PROMPT_VERSION):
+        self._conn().execute(
+            """INSERT OR REPLACE INTO video_chunk_summaries
+               (video_id, chunk_index, prompt_version, chunk_hash, start_seconds, end_seconds, summary, created_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            (video_id, chunk['index'], version, chunk['hash'], chunk['start'], chunk['end'], summary, time.time())
+        )
+
+    def final_summary(self, video_id: str, version: int = VIDEO_PROMPT_VERSION) -> Optional[Dict]:
+        row = self._conn().execute(
+            "SELECT * FROM video_final_summaries WHERE video_id = ? AND prompt_version = ?",
+            (video_id, version)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def put_final_summary(self, video_id: str, hash_: str, summary: str, chunk_count: int,
+                          version: int = VIDEO_PROMPT_VERSION):
+        conn = self._conn()
+        with transaction(conn):
+            conn.execute(
+                """INSERT OR REPLACE INTO video_final_summaries
+                   (video_id, prompt_version, text_hash, summary, chunk_count, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (video_id, version, hash_, summary, chunk_count, time.time())
+            )
+            # Chunks beyond the current count belong to an older transcript
+            conn.execute(
+                "DELETE FROM video_chunk_summaries WHERE video_id = ? AND prompt_version = ? AND chunk_index >= ?",
+                (video_id, version, chunk_count)
+            )
+
+
+class VideoSummarizer:
+    """Map-reduce summarizer over cached transcripts"""
+
+    def __init__(self, complete: Callable[[str, Optional[str]], Optional[str]],
+                 store: Optional[VideoStore] = None,
+                 fetch_transcript: Callable[[str], List[Dict]] = youtube_transcript,
+                 chunk_tokens: int = VIDEO_CHUNK_TOKENS, concurrency: int = VIDEO_CONCURRENCY,
+                 fan_in: int = VIDEO_REDUCE_FAN_IN):
+        self.complete = complete
+        self.store = store or get_video_store()
+        self.fetch_transcript = fetch_transcript
+        self.chunk_tokens = chunk_tokens
+        self.concurrency = max(1, concurrency)
+        self.fan_in = max(2, fan_in)
+
+    def transcript(self, video_id: str, refresh: bool = False) -> List[Dict]:
+        """Transcript segments, fetched once per video"""
+        if not refresh:
+            cached = self.store.get_transcript(video_id)
+            if cached:
+                return cached
+        segments = self.fetch_transcript(video_id)
+        if not segments:
+            raise VideoSummaryError(f"No transcript available for {video_id}")
+        segments = [{'text': s.get('text', ''), 'start': s.get('start', 0), 'duration': s.get('duration', 0)}
+                    for s in segments]
+        self.store.put_transcript(video_id, segments)
+        return segments
+
+    def summarize(self, video_id: str, force: bool = False) -> Dict:
+        """
+        Summarize a video. Returns a dict with the summary and what was reused:
+        {summary, cached, chunks, chunks_reused, chunks_generated, chunks_failed, transcript_chars}
+        """
+        segments = self.transcript(video_id, refresh=force)
+        chunks = chunk_segments(segments, self.chunk_tokens)
+        if not chunks:
+            raise VideoSummaryError(f"Transcript for {video_id} is empty")
+        full_hash = text_hash("".join(c['hash'] for c in chunks))
+        transcript_chars = sum(len(c['text']) for c in chunks)
+
+        final = self.store.final_summary(video_id)
+        if final and not force and final['text_hash'] == full_hash:
+            return {'summary': final['summary'], 'cached': True, 'chunks': len(chunks), 'chunks_reused': len(chunks),
+                    'chunks_generated': 0, 'chunks_failed': 0, 'transcript_chars': transcript_chars}
+
+        if len(chunks) == 1:
+            # Short video: one call over the whole transcript, no map step
+            summary = self.complete(FINAL_PROMPT.format(label="Transcript", text=chunks[0]['text']), None)
+            if not summary:
+                raise VideoSummaryError("Summary generation failed")
+            self.store.put_final_summary(video_id, full_hash, summary, 1)
+            return {'summary': summary, 'cached': False, 'chunks': 1, 'chunks_reused': 0,
+                    'chunks_generated': 1, 'chunks_failed': 0, 'transcript_chars': transcript_chars}
+
+        partials, reused, generated = self._map(video_id, chunks, force)
+        failed = len(chunks) - len(partials)
+        if not partials:
+            raise VideoSummaryError("Every chunk summary failed")
+
+        ordered = [partials[i] for i in sorted(partials)]
+        summary = self._reduce(ordered)
+        if not summary:
+            raise VideoSummaryError("Final summary generation failed")
+        if not failed:
+            # With gaps the final summary is not stored, so the next call fills them in
+            self.store.put_final_summary(video_id, full_hash, summary, len(chunks))
+        return {'summary': summary, 'cached': False, 'chunks': len(chunks), 'chunks_reused': reused,
+                'chunks_generated': generated, 'chunks_failed': failed, 'transcript_chars': transcript_chars}
+
+    def _map(self, video_id: str, chunks: List[Dict], force: bool):
+        """Summarize chunks not already stored; returns ({index: labelled summary}, reused, generated)"""
+        stored = {} if force else self.store.chunk_summaries(video_id)
+        partials, todo = {}, []
+        for chunk in chunks:
+            row = stored.get(chunk['index'])
+            if row and row['chunk_hash'] == chunk['hash']:
+                partials[chunk['index']] = self._label(chunk, row['summary'])
+            else:
+                todo.append(chunk)
+
+        def run(chunk):
+            prompt = CHUNK_PROMPT.format(start=format_timestamp(chunk['start']),
+                                         end=format_timestamp(chunk['end']), text=chunk['text'])
+            summary = self.complete(prompt, CHUNK_SYSTEM)
+            if summary:
+                self.store.put_chunk_summary(video_id, chunk, summary)
+            return chunk, summary
+
+        generated = 0
+        if todo:
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(todo))) as pool:
+                for chunk, summary in pool.map(run, todo):
+                    if summary:
+                        partials[chunk['index']] = self._label(chunk, summary)
+                        generated += 1
+                    else:
+                        logger.warning(f"Chunk {chunk['index']} of {video_id} failed to summarize")
+        return partials, len(chunks) - len(todo), generated
+
+    @staticmethod
+    def _label(chunk: Dict, summary: str) -> str:
+        return f"[{format_timestamp(chunk['start'])} - {format_timestamp(chunk['end'])}]\n{summary}"
+
+    def _reduce(self, partials: List[str]) -> Optional[str]:
+        """Merge partial summaries fan_in at a time until they fit in one final call"""
+        level = partials
+        while len(level) > self.fan_in:
+            groups = [level[i:i + self.fan_in] for i in range(0, len(level), self.fan_in)]
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(groups))) as pool:
+                merged = list(pool.map(self._merge, groups))
+            # A failed merge keeps its inputs concatenated rather than losing them
+            level = [m or "\n\n".join(g) for m, g in zip(merged, groups)]
+        return self.complete(FINAL_PROMPT.format(label="Section summaries", text="\n\n".join(level)), None)
+
+    def _merge(self, group: List[str]) -> Optional[str]:
+        if len(group) == 1:
+            return group[0]
+        return self.complete(MERGE_PROMPT.format(parts="\n\n".join(group)), None)
+
+
+# Singleton instance
+_video_store = None
+
+
+def get_video_store() -> VideoStore:
+    """Get the singleton video store instance"""
+    global _video_store
+    if _video_store is None:
+        _video_store = VideoStore()
+    return _video_store
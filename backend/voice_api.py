@@ -5,6 +5,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from backend.api import api_bp
 from backend.voice import voice_processor
 from backend.ai import ai_processor
+from backend.rate_limit import rate_limited
 from backend.supabase_client import supabase
 import logging
 
@@ -55,6 +56,7 @@ def transcribe_voice():
         return jsonify({'error': f'Transcription failed: {str(e)}'}), 500
 
 @api_bp.route('/voice/question', methods=['POST'])
+@rate_limited('ai')
 def ask_voice_question():
     """
     Ask a question via voice and get an AI-generated answer
@@ -82,7 +84,7 @@ def ask_voice_question():
             
             # Generate AI response using GPT-4o
             context = "You are an AI tutor helping GTU students prepare for their exams. Provide clear, concise, and accurate explanations."
-            ai_response = ai_processor.generate_response(question_text, context)
+            ai_response = ai_processor.generate_response(question_text, context, task="voice")
             
             # Convert response to speech
             # Note: In production, you might want to stream this or handle it differently
@@ -0,0 +1,119 @@
+"""
+Benchmark: parallel /agent/chat requests against the FastAPI agent service
+Fires N chats at once and compares the wall time with the slowest single
+request (what a concurrent service should take) and with the sum of all
+request latencies (what a service that serialises on the event loop takes).
+
+Everything runs in-process against the fake provider, so no quota is spent:
+
+    python evaluation/benchmark_agent_concurrency.py --requests 16 --latency fixed:1.0
+
+Requires the agent service dependencies (fastapi, uvicorn, apscheduler, ...).
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.fake_llm_server import start_in_thread
+
+TOPICS = ["Deadlock", "Paging", "Normalization", "Binary Search Tree", "TCP Handshake",
+          "Process Scheduling", "Hashing", "Graph Traversal", "Semaphores", "B+ Tree"]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_agent_service(port: int):
+    import uvicorn
+    from backend.agent_service import app
+    server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=port, log_level='warning'))
+    threading.Thread(target=server.run, name='agent-service', daemon=True).start()
+    deadline = time.time() + 30
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("agent service did not start")
+        time.sleep(0.05)
+    return server
+
+
+def chat(base_url: str, index: int, results: list, timeout: float):
+    topic = TOPICS[index % len(TOPICS)].replace(' ', '+')
+    req = urllib.request.Request(f"{base_url}/agent/chat?user_input=Explain+{topic}+in+detail",
+                                 data=b'', method='POST',
+                                 headers={'X-Forwarded-For': f"10.1.0.{index % 250 + 1}"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = 0
+    results[index] = (status, time.perf_counter() - start)
+
+
+def run_wave(base_url: str, count: int, timeout: float):
+    results = [None] * count
+    threads = [threading.Thread(target=chat, args=(base_url, i, results, timeout)) for i in range(count)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel chat benchmark for the agent service")
+    parser.add_argument('--requests', type=int, default=16, help="Parallel chats per wave")
+    parser.add_argument('--waves', type=int, default=3)
+    parser.add_argument('--latency', default='fixed:1.0', help="Fake provider latency spec")
+    parser.add_argument('--timeout', type=float, default=60)
+    args = parser.parse_args()
+
+    fake = start_in_thread(latency=args.latency)
+    # Must be set before the service modules are imported
+    os.environ['AI_OFFLINE'] = '1'
+    os.environ['FAKE_LLM_URL'] = f"http://127.0.0.1:{fake.server_address[1]}/v1"
+    os.environ.setdefault('AI_RATE_PER_MINUTE', '100000')
+    os.environ.setdefault('AI_RATE_BURST', '100000')
+    os.environ.setdefault('PROVIDER_MAX_CONCURRENCY_LIGHTNING', str(args.requests))
+    os.environ.setdefault('AGENT_POOL_SIZE', str(args.requests))
+
+    port = free_port()
+    start_agent_service(port)
+    base_url = f"http://127.0.0.1:{port}"
+    run_wave(base_url, 2, args.timeout)  # warm up clients and imports
+
+    print(f"🔥 {args.waves} waves x {args.requests} parallel chats (provider latency {args.latency})")
+    print(f"\n{'wave':>4} {'ok':>4} {'wall':>7} {'max':>7} {'sum':>8} {'wall/max':>9} {'speedup':>8}")
+    for wave in range(1, args.waves + 1):
+        wall, results = run_wave(base_url, args.requests, args.timeout)
+        latencies = [seconds for _, seconds in results]
+        ok = sum(1 for status, _ in results if status == 200)
+        slowest, total = max(latencies), sum(latencies)
+        print(f"{wave:>4} {ok:>4} {wall:>6.2f}s {slowest:>6.2f}s {total:>7.2f}s "
+              f"{wall / slowest:>9.2f} {total / wall:>7.1f}x")
+
+    stats = fake.provider.snapshot()
+    print(f"\nFake provider: {stats['requests']} calls, peak in-flight {stats['peak_in_flight']}")
+    print("wall/max close to 1.0 means the chats ran concurrently; "
+          "a serialised service shows wall close to the sum.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Benchmark: prompt batching vs one call per item
+Simulates a provider with fixed per-call overhead (network, queueing, prompt
+prefill) plus per-item generation time, then compares wall time and call
+count for the same bulk workload.
+
+Usage: python evaluation/benchmark_batching.py [items] [overhead_s] [per_item_s]
+"""
+
+import re
+import sys
+import json
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.batching import BatchTask, PromptBatcher
+
+
+def make_provider(overhead, per_item, stats):
+    def complete(prompt, system):
+        ids = re.findall(r'### Task id: (\S+)', prompt)
+        stats['calls'] += 1
+        time.sleep(overhead + per_item * len(ids))
+        return json.dumps([{"id": i, "output": f"explanation {i}"} for i in ids])
+    return complete
+
+
+def run(items, overhead, per_item, batch_size, parallel):
+    stats = {'calls': 0}
+    tasks = [BatchTask(str(i), 'short_explanation', f"Explain topic {i} in 3 sentences") for i in range(items)]
+    batcher = PromptBatcher(make_provider(overhead, per_item, stats), max_items=batch_size, max_parallel=parallel)
+
+    start = time.perf_counter()
+    results = batcher.run(tasks)
+    elapsed = time.perf_counter() - start
+    assert all(r.ok for r in results)
+    return elapsed, stats['calls']
+
+
+def main():
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 48
+    overhead = float(sys.argv[2]) if len(sys.argv) > 2 else 0.25
+    per_item = float(sys.argv[3]) if len(sys.argv) > 3 else 0.05
+
+    print(f"\n{items} items, {overhead}s per-call overhead, {per_item}s per item, 4 parallel calls")
+    print(f"{'batch size':>10} {'calls':>6} {'wall (s)':>9} {'items/s':>8} {'speedup':>8}")
+    baseline = None
+    for batch_size in (1, 4, 8):
+        elapsed, calls = run(items, overhead, per_item, batch_size, parallel=4)
+        baseline = baseline or elapsed
+        print(f"{batch_size:>10} {calls:>6} {elapsed:>9.2f} {items / elapsed:>8.1f} {baseline / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Benchmark: study guide PDF render throughput
+Renders a synthetic ~20-page unit guide (headings, paragraphs, lists, tables,
+code, inline markup - the shape the study guide prompt produces) with:
+- before: the previous create_formatted_pdf (sample stylesheet and
+  ParagraphStyles built per call, line-by-line startswith parsing)
+- after: backend/pdf_render.py (compiled style registry, single-pass
+  markdown converter, reusable page template)
+and reports pages per second and milliseconds per guide for each, on the
+guides as generated and on the same guides without inline markup. The old
+renderer printed **bold** literally as one plain text run; rendering it as
+real bold text puts those paragraphs on reportlab's slower mixed-font path.
+
+Usage: python evaluation/benchmark_pdf_render.py [--guides 20] [--sections 14]
+"""
+
+import os
+import re
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
+
+from backend.pdf_render import render_guide
+
+WORDS = ("relation schema attribute tuple key dependency normal form decomposition lossless join closure "
+         "transaction schedule serializable lock deadlock index query optimizer cost page buffer").split()
+
+
+def sentence(rng, n=None):
+    words = [rng.choice(WORDS) for _ in range(n or rng.randint(8, 18))]
+    if rng.random() < 0.3:
+        i = rng.randrange(len(words))
+        words[i] = f"**{words[i]}**"
+    return ' '.join(words).capitalize() + '.'
+
+
+def synthetic_guide(rng, sections):
+    parts = ["# Unit 3: Relational Database Design\n", ' '.join(sentence(rng) for _ in range(5)), ""]
+    for s in range(1, sections + 1):
+        parts += [f"## {s}. {sentence(rng, 4).rstrip('.')}", ""]
+        for _ in range(3):
+            parts += [' '.join(sentence(rng) for _ in range(rng.randint(3, 6))), ""]
+        parts += [f"- {sentence(rng)}" for _ in range(5)] + [""]
+        parts += [f"{i}. {sentence(rng)}" for i in range(1, 5)] + [""]
+        if s % 3 == 0:
+            parts += ["| Term | Meaning |", "|------|---------|"]
+            parts += [f"| {rng.choice(WORDS)} | {sentence(rng)} |" for _ in range(4)] + [""]
+        if s % 4 == 0:
+            parts += ["```sql", "SELECT name FROM student WHERE marks > 40;", "```", ""]
+        parts += [f"**Exam tip:** {sentence(rng)}", ""]
+    return '\n'.join(parts)
+
+
+def legacy_render(content, title, subject_code, unit_number, sources_count, file_path):
+    """create_formatted_pdf as it was before backend/pdf_render.py"""
+    doc = SimpleDocTemplate(file_path, pagesize=letter, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+    elements = []
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=24,
+                                 textColor=colors.HexColor('#1e40af'), spaceAfter=30, alignment=TA_CENTER,
+                                 fontName='Helvetica-Bold')
+    subtitle_style = ParagraphStyle('Subtitle', parent=styles['Normal'], fontSize=12, textColor=colors.gray,
+                                    spaceAfter=20, alignment=TA_CENTER)
+    heading1_style = ParagraphStyle('CustomHeading1', parent=styles['Heading1'], fontSize=16,
+                                    textColor=colors.HexColor('#1e40af'), spaceAfter=12, spaceBefore=12,
+                                    fontName='Helvetica-Bold')
+    heading2_style = ParagraphStyle('CustomHeading2', parent=styles['Heading2'], fontSize=14,
+                                    textColor=colors.HexColor('#3b82f6'), spaceAfter=10, spaceBefore=10,
+                                    fontName='Helvetica-Bold')
+    body_style = ParagraphStyle('CustomBody', parent=styles['BodyText'], fontSize=11, alignment=TA_JUSTIFY,
+                                spaceAfter=12, leading=16)
+    elements.append(Spacer(1, 1 * inch))
+    elements.append(Paragraph(title, title_style))
+    elements.append(Paragraph(f"Subject Code: {subject_code} | Unit {unit_number}", subtitle_style))
+    elements.append(Paragraph(f"Compiled from {sources_count} source(s)", subtitle_style))
+    elements.append(Paragraph(f"Generated on {datetime.now().strftime('%B %d, %Y')}", subtitle_style))
+    elements.append(PageBreak())
+    for line in content.split('\n'):
+        line = line.strip()
+        if not line:
+            elements.append(Spacer(1, 0.1 * inch))
+        elif line.startswith('# '):
+            elements.append(Paragraph(line[2:].strip(), heading1_style))
+        elif line.startswith('## '):
+            elements.append(Paragraph(line[3:].strip(), heading2_style))
+        elif line.startswith('- ') or line.startswith('* '):
+            elements.append(Paragraph(f"• {line[2:].strip()}", body_style))
+        elif line[0].isdigit() and '. ' in line:
+            elements.append(Paragraph(line, body_style))
+        elif line.startswith('**') and line.endswith('**'):
+            elements.append(Paragraph(f"<b>{line[2:-2]}</b>", body_style))
+        else:
+            elements.append(Paragraph(line, body_style))
+    doc.build(elements)
+    return file_path
+
+
+def new_render(content, title, subject_code, unit_number, sources_count, file_path):
+    return render_guide(file_path, title, [f"Subject Code: {subject_code} | Unit {unit_number}",
+                                           f"Compiled from {sources_count} source(s)"], content)
+
+
+def count_pages(path):
+    with open(path, 'rb') as f:
+        return len(re.findall(rb"/Type\s*/Page[^s]", f.read()))
+
+
+def bench(name, render, guides, directory):
+    pages = 0
+    start = time.perf_counter()
+    for i, content in enumerate(guides):
+        path = os.path.join(directory, f"{name}_{i}.pdf")
+        render(content, "Database Management Systems - Unit 3 Study Guide", "3130703", 3, 12, path)
+        pages += count_pages(path)
+    elapsed = time.perf_counter() - start
+    print(f"{name:>7}: {len(guides)} guides, {pages / len(guides):.1f} pages avg, "
+          f"{pages / elapsed:,.1f} pages/s, {elapsed / len(guides) * 1000:,.0f} ms/guide")
+    return pages / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark study guide PDF rendering")
+    parser.add_argument('--guides', type=int, default=20)
+    parser.add_argument('--sections', type=int, default=14, help="Sections per guide (14 ~ 20 pages)")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    guides = [synthetic_guide(rng, args.sections) for _ in range(args.guides)]
+    with tempfile.TemporaryDirectory() as tmp:
+        # Warm-up: font metrics and (for the new renderer) the style registry
+        legacy_render(guides[0], "warm-up", "0", 1, 1, os.path.join(tmp, 'warm_legacy.pdf'))
+        new_render(guides[0], "warm-up", "0", 1, 1, os.path.join(tmp, 'warm_new.pdf'))
+
+        for label, docs in (("plain text", [g.replace('**', '') for g in guides]), ("inline markup", guides)):
+            print(f"-- {label}")
+            before = bench('before', legacy_render, docs, tmp)
+            after = bench('after', new_render, docs, tmp)
+            print(f"Speed-up: {after / before:.2f}x pages/s")
+
+if __name__ == '__main__':
+    main()
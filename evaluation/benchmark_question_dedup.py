@@ -0,0 +1,130 @@
+"""
+Benchmark: MinHash/LSH near-duplicate detection on a synthetic question bank
+Generates N questions (default 100k) as distinct base questions plus reworded
+copies (case, punctuation, a prefix, a dropped or added word), then reports:
+- signature and clustering time, candidate pairs vs all n^2/2 pairs
+- pair precision / recall against the known duplicate groups
+- incremental matching of new questions against the persisted index
+
+Usage: python evaluation/benchmark_question_dedup.py [--n 100000] [--incremental 1000]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from backend.question_dedup import MinHasher, DedupIndex, cluster_signatures, DEDUP_THRESHOLD
+
+STEMS = ["Explain", "Describe", "Discuss", "Write a short note on", "What is", "Define", "Differentiate",
+         "Compare", "Illustrate", "Derive"]
+TAILS = ["", " with example", " with suitable example", " in detail", " with neat diagram", " briefly"]
+
+
+def make_vocab(rng, size=6000):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return list({''.join(rng.choice(letters) for _ in range(rng.randint(4, 10))) for _ in range(size)})
+
+
+def base_question(rng, vocab):
+    topic = ' '.join(rng.choice(vocab) for _ in range(rng.randint(3, 7)))
+    return f"{rng.choice(STEMS)} {topic}{rng.choice(TAILS)}."
+
+
+def reword(rng, text, vocab):
+    words = text.rstrip('.').split()
+    change = rng.randrange(5)
+    if change == 0:
+        return text.upper()
+    if change == 1:
+        return text.rstrip('.') + " ?"
+    if change == 2 and len(words) > 5:
+        del words[rng.randrange(2, len(words))]
+    elif change == 3:
+        words.insert(rng.randrange(1, len(words)), rng.choice(vocab))
+    else:
+        return "Q. " + text.lower()
+    return ' '.join(words) + '.'
+
+
+def synthetic_bank(n, rng):
+    vocab = make_vocab(rng)
+    texts, truth = [], []
+    group = 0
+    while len(texts) < n:
+        base = base_question(rng, vocab)
+        copies = rng.choice([1, 1, 1, 2, 3, 4, 6])
+        for c in range(copies):
+            texts.append(base if c == 0 else reword(rng, base, vocab))
+            truth.append(group)
+        group += 1
+    return texts[:n], np.array(truth[:n]), vocab
+
+
+def pair_scores(predicted, truth):
+    """Pair precision / recall from the contingency table (no n^2 loop)"""
+    def pairs(counts):
+        return int((counts * (counts - 1) // 2).sum())
+
+    _, joint = np.unique(np.stack([predicted, truth], axis=1), axis=0, return_counts=True)
+    tp = pairs(joint)
+    predicted_pairs = pairs(np.unique(predicted, return_counts=True)[1])
+    truth_pairs = pairs(np.unique(truth, return_counts=True)[1])
+    return tp / max(predicted_pairs, 1), tp / max(truth_pairs, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark near-duplicate question detection")
+    parser.add_argument('--n', type=int, default=100_000)
+    parser.add_argument('--incremental', type=int, default=1000, help="New questions matched against the index")
+    parser.add_argument('--threshold', type=float, default=DEDUP_THRESHOLD)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    texts, truth, vocab = synthetic_bank(args.n, rng)
+    print(f"Synthetic bank: {len(texts)} questions, {len(set(truth.tolist()))} distinct")
+
+    hasher = MinHasher()
+    t0 = time.perf_counter()
+    signatures = hasher.signatures(texts)
+    band_keys = hasher.band_keys(signatures)
+    t1 = time.perf_counter()
+    labels, stats = cluster_signatures(signatures, band_keys, args.threshold)
+    t2 = time.perf_counter()
+
+    all_pairs = len(texts) * (len(texts) - 1) // 2
+    precision, recall = pair_scores(labels, truth)
+    print(f"Signatures + bands: {t1 - t0:.2f}s ({len(texts) / (t1 - t0):,.0f} questions/s)")
+    print(f"LSH + verify + cluster: {t2 - t1:.2f}s, {stats['candidate_pairs']:,} candidate pairs "
+          f"({stats['candidate_pairs'] / all_pairs:.5%} of {all_pairs:,})")
+    print(f"Clusters: {len(set(labels.tolist()))}; pair precision {precision:.3f}, recall {recall:.3f}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = DedupIndex(os.path.join(tmp, 'dedup.sqlite3'), hasher=hasher, threshold=args.threshold)
+        items = [{'key': f"q:{i}", 'source': 'questions', 'source_id': i, 'text': t} for i, t in enumerate(texts)]
+        t0 = time.perf_counter()
+        index.rebuild(items)
+        print(f"Persisted rebuild: {time.perf_counter() - t0:.2f}s")
+
+        # Half rewordings of existing questions, half brand new
+        new_items = []
+        for j in range(args.incremental):
+            text = reword(rng, rng.choice(texts), vocab) if j % 2 == 0 else base_question(rng, vocab)
+            new_items.append({'key': f"new:{j}", 'source': 'questions', 'source_id': args.n + j, 'text': text})
+        t0 = time.perf_counter()
+        result = index.add(new_items)
+        elapsed = time.perf_counter() - t0
+        print(f"Incremental: {result['items']} new questions in {elapsed:.2f}s "
+              f"({elapsed / max(result['items'], 1) * 1000:.2f}ms each), {result['matched']} matched existing clusters")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Evaluation: local intent router vs the labelled corpus
+Reports how many requests are resolved without the LLM planner, how often
+those local routes are right (action and parameters), how often ambiguous
+requests are correctly deferred, and routing latency.
+
+Corpus format (evaluation/intent_corpus.jsonl), one object per line:
+  {"text": "...", "action": "<tool name> | llm", "parameters": {expected subset}}
+"llm" marks requests that are ambiguous and should go to the planner.
+
+Usage: python evaluation/evaluate_intent_router.py [--verbose]
+"""
+
+import sys
+import json
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.intent_router import IntentRouter
+
+CORPUS = Path(__file__).parent / "intent_corpus.jsonl"
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def params_match(expected, actual):
+    for key, value in expected.items():
+        got = actual.get(key)
+        if isinstance(value, str) and isinstance(got, str):
+            if value.lower() != got.lower():
+                return False
+        elif value != got:
+            return False
+    return True
+
+
+def main():
+    verbose = '--verbose' in sys.argv
+    corpus = [json.loads(line) for line in CORPUS.read_text().splitlines() if line.strip()]
+    router = IntentRouter()
+
+    # Warm up, then time each route call over several repetitions
+    for item in corpus:
+        router.route(item['text'])
+    latencies = []
+    decisions = []
+    for item in corpus:
+        start = time.perf_counter()
+        for _ in range(20):
+            decision = router.route(item['text'])
+        latencies.append((time.perf_counter() - start) / 20 * 1e6)
+        decisions.append(decision)
+
+    routed = correct = params_ok = 0
+    should_defer = deferred_ok = wrong = 0
+    print(f"\n{'label':<20} {'routed as':<20} {'src':<6} {'ok':<3} text")
+    for item, decision in zip(corpus, decisions):
+        label = item['action']
+        if label == 'llm':
+            should_defer += 1
+        if decision is None:
+            deferred_ok += label == 'llm'
+            ok = label == 'llm'
+        else:
+            routed += 1
+            ok = decision['action'] == label
+            correct += ok
+            wrong += not ok
+            if ok and params_match(item.get('parameters', {}), decision['parameters']):
+                params_ok += 1
+            elif ok:
+                ok = False
+        if verbose or not ok:
+            got = decision['action'] if decision else '-> llm'
+            src = decision['router'] if decision else ''
+            extra = f" {decision['parameters']}" if decision and verbose else ''
+            print(f"{label:<20} {got:<20} {src:<6} {'✓' if ok else '✗':<3} {item['text']}{extra}")
+
+    total = len(corpus)
+    actionable = total - should_defer
+    print(f"\nCorpus: {total} requests ({actionable} with a clear tool, {should_defer} ambiguous)")
+    print(f"Resolved locally:        {routed}/{total} ({routed / total:.0%}) - LLM planner calls saved")
+    print(f"Local route precision:   {correct}/{routed} ({correct / max(routed, 1):.1%}) action correct")
+    print(f"Parameters correct:      {params_ok}/{correct} ({params_ok / max(correct, 1):.1%}) of correct routes")
+    print(f"Recall on clear intents: {correct}/{actionable} ({correct / max(actionable, 1):.0%})")
+    print(f"Ambiguous deferred:      {deferred_ok}/{should_defer} ({deferred_ok / max(should_defer, 1):.0%})")
+    print(f"Wrong local routes:      {wrong}")
+    print(f"Latency per request:     p50 {percentile(latencies, 50):.0f}µs, p95 {percentile(latencies, 95):.0f}µs, "
+          f"p99 {percentile(latencies, 99):.0f}µs (planner round trip is typically 1-3 s)")
+
+
+if __name__ == "__main__":
+    main()
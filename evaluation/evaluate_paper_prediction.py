@@ -0,0 +1,93 @@
+"""
+Evaluation: statistical paper prediction backtest on data/pyqs_sem3
+For every subject, each of the latest sessions is held out in turn: the
+model is fitted on the papers before it, a paper is predicted, and the
+held-out questions are checked against the prediction.
+
+Reports per subject:
+- hit rate: share of held-out questions that also appear in the predicted
+  paper (cosine similarity >= the engine's grouping threshold)
+- baseline: the same for a paper of questions picked at random from history
+- fit + predict latency
+
+Usage: python evaluation/evaluate_paper_prediction.py [--holdouts 2] [--dir data/pyqs_sem3]
+"""
+
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from backend.pyq_parser import load_pyqs, PYQ_DIR
+from backend.question_stats import (QuestionFrequencyModel, records_from_pyqs, exam_time,
+                                    tokenize, SIMILARITY_THRESHOLD)
+
+
+def vectorize(texts, vocab):
+    index = {t: i for i, t in enumerate(vocab)}
+    matrix = np.zeros((len(texts), len(vocab)))
+    for row, text in enumerate(texts):
+        for token in tokenize(text):
+            if token in index:
+                matrix[row, index[token]] += 1
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def hit_rate(predicted, actual):
+    vocab = sorted({t for text in predicted + actual for t in tokenize(text)})
+    similarity = vectorize(actual, vocab) @ vectorize(predicted, vocab).T
+    return float((similarity.max(axis=1) >= SIMILARITY_THRESHOLD).mean()) if actual else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the statistical paper predictor")
+    parser.add_argument('--dir', default=PYQ_DIR)
+    parser.add_argument('--holdouts', type=int, default=2, help="Latest sessions held out per subject")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    papers = load_pyqs(args.dir)
+    print(f"Parsed {len(papers)} papers in {time.perf_counter() - start:.1f}s")
+
+    by_subject = {}
+    for paper in papers:
+        by_subject.setdefault((paper['subject_code'], paper['subject_name']), []).append(paper)
+
+    rng = random.Random(7)
+    totals = {'hit': [], 'base': [], 'ms': []}
+    print(f"\n{'subject':<34} {'held out':<12} {'train':>5} {'hit':>6} {'random':>7} {'ms':>7}")
+    for (code, name), subject_papers in sorted(by_subject.items()):
+        subject_papers.sort(key=lambda p: exam_time(p['year'], p['session']))
+        for held in subject_papers[-args.holdouts:]:
+            train = [p for p in subject_papers if exam_time(p['year'], p['session']) < exam_time(held['year'], held['session'])]
+            if len(train) < 2:
+                continue
+            records = records_from_pyqs(train)
+            t0 = time.perf_counter()
+            paper = QuestionFrequencyModel().fit(records).predict_paper(name, code)
+            ms = (time.perf_counter() - t0) * 1000
+
+            predicted = [q['question'] for q in paper['questions']]
+            actual = [q['text'] for q in held['questions']]
+            baseline = [r['text'] for r in rng.sample(records, min(len(predicted), len(records)))]
+            hit, base = hit_rate(predicted, actual), hit_rate(baseline, actual)
+            totals['hit'].append(hit)
+            totals['base'].append(base)
+            totals['ms'].append(ms)
+            label = f"{(name or '')[:24]} ({code})"
+            print(f"{label:<34} {held['session']} {held['year']:<5} {len(train):>5} {hit:>6.0%} {base:>7.0%} {ms:>7.1f}")
+
+    if totals['hit']:
+        print(f"\nMean hit rate {np.mean(totals['hit']):.0%} vs random history {np.mean(totals['base']):.0%}; "
+              f"fit + predict p50 {np.median(totals['ms']):.1f}ms, max {max(totals['ms']):.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
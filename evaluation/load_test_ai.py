@@ -0,0 +1,198 @@
+"""
+Load Test for AI Endpoints
+Drives the Flask (gunicorn) and FastAPI (agent) AI routes with concurrent
+virtual users and reports throughput, latency percentiles and saturation.
+
+Run the backends against the fake provider so no quota is spent:
+
+    python -m backend.fake_llm_server --latency lognormal:0.8,0.5 &
+    AI_OFFLINE=1 AI_RATE_PER_MINUTE=100000 gunicorn -w 4 -b :5001 'backend.app:create_app()' &
+    AI_OFFLINE=1 uvicorn backend.agent_service:app --port 8000 &
+    python evaluation/load_test_ai.py --users 32 --duration 60 --workers 4
+
+Saturation is reported two ways:
+- server side: mean concurrent requests (Little's law: throughput x mean
+  latency) divided by --workers
+- upstream: in-flight / peak concurrency sampled from the fake provider's /_stats
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+TOPICS = ["Deadlock", "Paging", "Normalization", "Binary Search Tree", "TCP Handshake",
+          "Process Scheduling", "Hashing", "Graph Traversal", "Semaphores", "B+ Tree"]
+
+# name -> (service, method, path, body builder)
+SCENARIOS = {
+    'flask_ai_assistant': ('flask', 'POST', '/api/ai-assistant',
+                           lambda rng: {"prompt": f"Explain {rng.choice(TOPICS)}"}),
+    'flask_chat_stream': ('flask', 'POST', '/api/chat',
+                          lambda rng: {"messages": [{"role": "user", "content": f"What is {rng.choice(TOPICS)}?"}]}),
+    'flask_generate_answer': ('flask', 'POST', '/api/agent/generate-answer',
+                              lambda rng: {"question": f"Explain {rng.choice(TOPICS)} with diagram"}),
+    'agent_chat': ('agent', 'POST', lambda rng: f"/agent/chat?user_input=Explain+{rng.choice(TOPICS).replace(' ', '+')}",
+                   None),
+    'agent_flashcards': ('agent', 'POST', lambda rng: f"/agent/flashcards?topic={rng.choice(TOPICS).replace(' ', '+')}&count=5",
+                         None),
+}
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p / 100.0
+    lower, upper = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples: Dict[str, List[tuple]] = {}
+
+    def add(self, scenario: str, status: int, seconds: float):
+        with self.lock:
+            self.samples.setdefault(scenario, []).append((status, seconds))
+
+
+def request_once(base_url: str, scenario: str, rng: random.Random, timeout: float, client_ip: str):
+    _, method, path, body = SCENARIOS[scenario]
+    url = base_url + (path(rng) if callable(path) else path)
+    data = json.dumps(body(rng)).encode('utf-8') if body else b''
+    req = urllib.request.Request(url, data=data, method=method, headers={
+        'Content-Type': 'application/json',
+        # One identity per virtual user, so per-user rate limits behave as in production
+        'X-Forwarded-For': client_ip
+    })
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()  # drain streams fully: latency includes the last chunk
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = 0  # connection error / timeout
+    return status, time.perf_counter() - start
+
+
+def virtual_user(user_id: int, scenarios: List[str], urls: Dict[str, str], deadline: float,
+                 results: Results, timeout: float, think_time: float):
+    rng = random.Random(user_id)
+    client_ip = f"10.0.{user_id // 250}.{user_id % 250 + 1}"
+    while time.time() < deadline:
+        scenario = rng.choice(scenarios)
+        status, seconds = request_once(urls[SCENARIOS[scenario][0]], scenario, rng, timeout, client_ip)
+        results.add(scenario, status, seconds)
+        if think_time:
+            time.sleep(rng.uniform(0, 2 * think_time))
+
+
+def fetch_json(url: str) -> Optional[Dict]:
+    try:
+        with urllib.request.urlopen(url, timeout=5) as resp:
+            return json.loads(resp.read())
+    except Exception:
+        return None
+
+
+def sample_upstream(fake_url: str, stop: threading.Event, samples: List[int]):
+    while not stop.is_set():
+        stats = fetch_json(fake_url.rstrip('/') + '/_stats')
+        if stats:
+            samples.append(stats['in_flight'])
+        stop.wait(0.25)
+
+
+def report(results: Results, elapsed: float, workers: int, upstream: List[int], fake_stats: Optional[Dict]):
+    print(f"\n{'scenario':<24} {'reqs':>6} {'ok':>6} {'429':>5} {'err':>5} {'req/s':>7} "
+          f"{'p50':>7} {'p95':>7} {'p99':>7} {'mean':>7}")
+    all_latencies, total_ok = [], 0
+    for scenario, samples in sorted(results.samples.items()):
+        latencies = [s for status, s in samples if 200 <= status < 300]
+        ok = len(latencies)
+        limited = sum(1 for status, _ in samples if status == 429)
+        errors = len(samples) - ok - limited
+        all_latencies.extend(s for _, s in samples)
+        total_ok += ok
+        mean = sum(latencies) / ok if ok else 0.0
+        print(f"{scenario:<24} {len(samples):>6} {ok:>6} {limited:>5} {errors:>5} {ok / elapsed:>7.2f} "
+              f"{percentile(latencies, 50):>7.2f} {percentile(latencies, 95):>7.2f} "
+              f"{percentile(latencies, 99):>7.2f} {mean:>7.2f}")
+
+    total = sum(len(s) for s in results.samples.values())
+    throughput = total / elapsed
+    mean_latency = sum(all_latencies) / len(all_latencies) if all_latencies else 0.0
+    concurrency = throughput * mean_latency  # Little's law
+    print(f"\nTotal: {total} requests in {elapsed:.1f}s - {throughput:.2f} req/s, {total_ok / elapsed:.2f} ok/s")
+    print(f"Mean concurrent requests in service: {concurrency:.1f}"
+          + (f" -> worker saturation {concurrency / workers * 100:.0f}% of {workers} workers" if workers else ""))
+    if upstream:
+        print(f"Upstream in-flight (fake provider): mean {sum(upstream) / len(upstream):.1f}, max {max(upstream)}")
+    if fake_stats:
+        print(f"Fake provider: {fake_stats['requests']} calls, peak in-flight {fake_stats['peak_in_flight']}, "
+              f"status {fake_stats['status']}, injected {fake_stats['injected']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the AI endpoints")
+    parser.add_argument('--flask-url', default='http://127.0.0.1:5001')
+    parser.add_argument('--agent-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--fake-url', default='http://127.0.0.1:8090', help="Fake provider (for upstream stats)")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help="Comma separated: " + ', '.join(SCENARIOS))
+    parser.add_argument('--users', type=int, default=16, help="Concurrent virtual users")
+    parser.add_argument('--duration', type=float, default=30, help="Seconds")
+    parser.add_argument('--think-time', type=float, default=0.0, help="Mean pause between a user's requests")
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--workers', type=int, default=4, help="Server workers, for the saturation estimate")
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {unknown}")
+    urls = {'flask': args.flask_url.rstrip('/'), 'agent': args.agent_url.rstrip('/')}
+
+    fake_url = args.fake_url.rstrip('/')
+    if fetch_json(fake_url + '/_stats') is not None:
+        # Reset so the final provider stats cover this run only
+        urllib.request.urlopen(urllib.request.Request(fake_url + '/_reset', data=b'{}', method='POST'), timeout=5).read()
+
+    print(f"🔥 {args.users} users x {args.duration:.0f}s on {', '.join(scenarios)}")
+    results = Results()
+    upstream: List[int] = []
+    stop = threading.Event()
+    sampler = threading.Thread(target=sample_upstream, args=(args.fake_url, stop, upstream), daemon=True)
+    sampler.start()
+
+    start = time.time()
+    deadline = start + args.duration
+    threads = [
+        threading.Thread(target=virtual_user, daemon=True,
+                         args=(i, scenarios, urls, deadline, results, args.timeout, args.think_time))
+        for i in range(args.users)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - start
+    stop.set()
+
+    report(results, elapsed, args.workers, upstream, fetch_json(fake_url + '/_stats'))
+
+
+if __name__ == "__main__":
+    main()
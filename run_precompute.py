@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+import os
+import sys
+import argparse
+import logging
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.precompute import Precomputer, PRECOMPUTE_CONCURRENCY, PRECOMPUTE_BATCH_SIZE
+
+logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+
+# Precompute topic explanations and unit summaries for every syllabus topic.
+# Re-running is cheap: items whose source content is unchanged are skipped,
+# so an interrupted run resumes where it stopped.
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute AI explanations and unit summaries")
+    parser.add_argument('subjects', nargs='*', help="Subject codes (default: all)")
+    parser.add_argument('--concurrency', type=int, default=PRECOMPUTE_CONCURRENCY)
+    parser.add_argument('--batch-size', type=int, default=PRECOMPUTE_BATCH_SIZE,
+                        help="Items per LLM call (1 disables batching)")
+    parser.add_argument('--force', action='store_true', help="Regenerate even if content is unchanged")
+    parser.add_argument('--dry-run', action='store_true', help="Only report how many items are stale")
+    args = parser.parse_args()
+
+    precomputer = Precomputer(concurrency=args.concurrency, batch_size=args.batch_size)
+    items = precomputer.load_items(args.subjects or None)
+
+    if args.dry_run:
+        stale = precomputer.pending(items, force=args.force)
+        print(f"{len(stale)} of {len(items)} items would be generated")
+        return
+
+    def progress(fraction, message):
+        print(f"  [{fraction * 100:5.1f}%] {message}")
+
+    result = precomputer.run(items=items, force=args.force, progress=progress)
+    print(f"Run {result['run_id']}: {result['status']} - generated {result['generated']}, "
+          f"skipped {result['skipped']}, failed {result['failed']} (of {result['total']})")
+    sys.exit(0 if result['failed'] == 0 else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+import os
+import sys
+import logging
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.jobs import get_job_queue, JobWorkerPool
+import backend.job_handlers  # noqa: F401  (registers handlers)
+
+logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+
+# Dedicated background job worker. When this runs, set JOB_WORKERS_IN_PROCESS=0
+# for the web processes so generation never competes with request handling.
+
+def main():
+    num_workers = int(os.environ.get('JOB_WORKERS', 4))
+    pool = JobWorkerPool(get_job_queue(), num_workers=num_workers)
+    print(f"Starting {num_workers} job workers (queue: {pool.queue.db_path})")
+    pool.run_forever()
+
+if __name__ == '__main__':
+    main()
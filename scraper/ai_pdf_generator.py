@@ -1,17 +1,18 @@
 import os
+import sys
 import requests
 from bs4 import BeautifulSoup
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
-from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
 from supabase import create_client
 from dotenv import load_dotenv
 import logging
 from urllib.parse import urljoin
 import shutil
 
+# Add the parent directory to sys.path to allow imports from backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.pdf_render import Document, render_batch
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -131,69 +132,10 @@ Format your response in clear sections with headers."""
         logger.error(f"Error with Bytez AI: {e}")
         return None
 
-def generate_pdf(subject_name, subject_code, unit, content, output_path):
-    """Generate PDF from AI-analyzed content"""
-    try:
-        doc = SimpleDocTemplate(output_path, pagesize=A4,
-                                rightMargin=72, leftMargin=72,
-                                topMargin=72, bottomMargin=18)
-        
-        # Container for the 'Flowable' objects
-        elements = []
-        
-        # Define styles
-        styles = getSampleStyleSheet()
-        styles.add(ParagraphStyle(name='Justify', alignment=TA_JUSTIFY))
-        
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor='#1a56db',
-            spaceAfter=30,
-            alignment=TA_CENTER
-        )
-        
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=16,
-            textColor='#1e40af',
-            spaceAfter=12,
-            spaceBefore=12
-        )
-        
-        # Add title
-        title = Paragraph(f"{subject_name}<br/>Unit {unit} Study Guide", title_style)
-        elements.append(title)
-        elements.append(Spacer(1, 12))
-        
-        # Add subject code
-        code = Paragraph(f"<b>Subject Code:</b> {subject_code}", styles['Normal'])
-        elements.append(code)
-        elements.append(Spacer(1, 20))
-        
-        # Add content sections
-        sections = content.split('\n\n')
-        for section in sections:
-            if section.strip():
-                # Check if it's a heading (starts with #, **, or is all caps)
-                if section.startswith('#') or section.startswith('**') or section.isupper():
-                    clean_section = section.replace('#', '').replace('**', '').strip()
-                    para = Paragraph(clean_section, heading_style)
-                else:
-                    para = Paragraph(section.strip(), styles['Justify'])
-                elements.append(para)
-                elements.append(Spacer(1, 12))
-        
-        # Build PDF
-        doc.build(elements)
-        logger.info(f"✓ PDF generated: {output_path}")
-        return True
-        
-    except Exception as e:
-        logger.error(f"Error generating PDF: {e}")
-        return False
+def study_document(subject_name, subject_code, unit, content):
+    """Markdown study guide content -> Document for the shared renderer"""
+    return Document.from_markdown(f"{subject_name} - Unit {unit} Study Guide", content,
+                                  subtitle_lines=[f"Subject Code: {subject_code}"], theme='classic')
 
 def process_subject(subject_code, subject_name, source_urls):
     """Process a subject: scrape, analyze with AI (or fallback), generate PDF"""
@@ -204,6 +146,9 @@ def process_subject(subject_code, subject_name, source_urls):
     # Ensure directory exists
     os.makedirs("/tmp/gtu_pdfs", exist_ok=True)
     
+    notes = []  # (note_data, index of its render job or None)
+    render_jobs = []
+    
     for unit, url in enumerate(source_urls, 1):
         logger.info(f"\n📖 Unit {unit}: Scraping from {url}")
         
@@ -254,12 +199,9 @@ def process_subject(subject_code, subject_name, source_urls):
                 *(Note: This content was scraped directly from {url} because AI summarization is currently unavailable)*
                 """
             
-            # Step 3: Generate PDF
-            logger.info(f"  📄 Generating PDF...")
-            if not generate_pdf(subject_name, subject_code, unit, ai_content, pdf_path):
-                continue
+            # Queue the PDF; the subject's units render in parallel in step 3
+            render_jobs.append((study_document(subject_name, subject_code, unit, ai_content), pdf_path))
             
-        # Step 4: Store in database
         note_data = {
             "subject_code": subject_code,
             "unit": unit,
@@ -270,12 +212,23 @@ def process_subject(subject_code, subject_name, source_urls):
             "source_name": source_name,
             "created_at": "now()"
         }
-        
+        notes.append((note_data, len(render_jobs) - 1 if result['type'] != 'pdf' else None))
+    
+    # Step 3: Generate PDFs
+    if render_jobs:
+        logger.info(f"\n📄 Generating {len(render_jobs)} PDFs...")
+    rendered = render_batch(render_jobs)
+    
+    # Step 4: Store in database
+    for note_data, job in notes:
+        if job is not None and isinstance(rendered[job], Exception):
+            logger.warning(f"  ⚠️  Unit {note_data['unit']}: PDF generation failed, not stored")
+            continue
         try:
             # Check if exists first to avoid duplicates (optional, but good practice)
             # For now, just insert/upsert logic if possible, or just insert
             supabase.table("notes").insert(note_data).execute()
-            logger.info(f"  ✓ Stored in database")
+            logger.info(f"  ✓ Unit {note_data['unit']} stored in database")
         except Exception as e:
             logger.warning(f"  ⚠️  Database insert failed (may be duplicate): {e}")
     
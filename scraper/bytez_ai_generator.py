@@ -3,14 +3,19 @@ AI-Powered PDF Generator using Bytez SDK (Correct Implementation)
 Uses GPT-2 model via Bytez to generate study content
 """
 import os
+import sys
 from bytez import Bytez
-from fpdf import FPDF
 from supabase import create_client
 from dotenv import load_dotenv
 import logging
 import requests
 from bs4 import BeautifulSoup
 
+# Add the parent directory to sys.path to allow imports from backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.pdf_render import Document, render_document
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -74,34 +79,12 @@ Based on: {scraped_content[:500]}"""
         return None
 
 def create_pdf(subject_name, subject_code, unit, content, output_path):
-    """Create PDF using fpdf"""
+    """Create PDF with the shared renderer"""
     try:
-        pdf = FPDF()
-        pdf.add_page()
-        
-        # Title
-        pdf.set_font("Arial", 'B', 20)
-        pdf.cell(0, 10, f"{subject_name}", ln=True, align='C')
-        
-        # Subtitle
-        pdf.set_font("Arial", 'I', 12)
-        pdf.cell(0, 10, f"Unit {unit} - AI Study Guide", ln=True, align='C')
-        pdf.cell(0, 10, f"Subject Code: {subject_code}", ln=True, align='C')
-        pdf.ln(10)
-        
-        # Content
-        pdf.set_font("Arial", size=11)
-        
-        # Clean content - remove problematic Unicode characters
-        import re
-        clean_content = content
-        # Remove common Unicode symbols that cause issues
-        clean_content = re.sub(r'[^\x00-\x7F]+', ' ', clean_content)  # Remove non-ASCII
-        clean_content = re.sub(r'\s+', ' ', clean_content)  # Normalize whitespace
-        
-        pdf.multi_cell(0, 6, clean_content)
-        
-        pdf.output(output_path)
+        document = Document.from_markdown(subject_name, content, theme='classic',
+                                          subtitle_lines=[f"Unit {unit} - AI Study Guide",
+                                                          f"Subject Code: {subject_code}"])
+        render_document(document, output_path)
         logger.info(f"  ✓ PDF created: {output_path}")
         return True
         
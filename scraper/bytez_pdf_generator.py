@@ -3,17 +3,19 @@ AI-Powered PDF Generator using Bytez Python SDK
 Scrapes content, uses Bytez AI to analyze and summarize, generates PDFs
 """
 import os
+import sys
 import requests
 from bs4 import BeautifulSoup
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
 from supabase import create_client
 from dotenv import load_dotenv
 from bytez import Bytez
 import logging
 
+# Add the parent directory to sys.path to allow imports from backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.pdf_render import Document, render_batch
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -91,73 +93,11 @@ Make it comprehensive but concise, suitable for exam preparation."""
         logger.error(f"Error with Bytez AI: {e}")
         return None
 
-def generate_pdf(subject_name, subject_code, unit, content, output_path):
-    """Generate PDF from AI-analyzed content"""
-    try:
-        doc = SimpleDocTemplate(output_path, pagesize=A4,
-                                rightMargin=72, leftMargin=72,
-                                topMargin=72, bottomMargin=18)
-        
-        elements = []
-        styles = getSampleStyleSheet()
-        
-        # Custom styles
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor='#1a56db',
-            spaceAfter=30,
-            alignment=TA_CENTER
-        )
-        
-        subtitle_style = ParagraphStyle(
-            'Subtitle',
-            parent=styles['Normal'],
-            fontSize=12,
-            textColor='#6b7280',
-            spaceAfter=20,
-            alignment=TA_CENTER
-        )
-        
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=16,
-            textColor='#1e40af',
-            spaceAfter=12,
-            spaceBefore=16
-        )
-        
-        # Title page
-        title = Paragraph(f"{subject_name}", title_style)
-        elements.append(title)
-        
-        subtitle = Paragraph(f"Unit {unit} - AI-Generated Study Guide<br/>Subject Code: {subject_code}", subtitle_style)
-        elements.append(subtitle)
-        elements.append(Spacer(1, 30))
-        
-        # Add AI-generated content
-        sections = content.split('\n\n')
-        for section in sections:
-            if section.strip():
-                # Check if it's a heading (contains **)
-                if '**' in section:
-                    clean_section = section.replace('**', '').strip()
-                    para = Paragraph(clean_section, heading_style)
-                else:
-                    para = Paragraph(section.strip(), styles['BodyText'])
-                elements.append(para)
-                elements.append(Spacer(1, 12))
-        
-        # Build PDF
-        doc.build(elements)
-        logger.info(f"✓ PDF generated: {output_path}")
-        return True
-        
-    except Exception as e:
-        logger.error(f"Error generating PDF: {e}")
-        return False
+def study_document(subject_name, subject_code, unit, content):
+    """AI study guide (markdown with ** headers) -> Document for the shared renderer"""
+    return Document.from_markdown(subject_name, content, theme='classic',
+                                  subtitle_lines=[f"Unit {unit} - AI-Generated Study Guide",
+                                                  f"Subject Code: {subject_code}"])
 
 def process_subject(subject_code, subject_name, source_urls):
     """Process a subject: scrape, analyze with Bytez AI, generate PDF"""
@@ -165,7 +105,8 @@ def process_subject(subject_code, subject_name, source_urls):
     logger.info(f"📚 Processing: {subject_name} ({subject_code})")
     logger.info(f"{'='*60}")
     
-    pdf_count = 0
+    render_jobs = []
+    notes = []
     
     for unit, url in enumerate(source_urls, 1):
         logger.info(f"\n📖 Unit {unit}: Scraping from {url}")
@@ -186,32 +127,37 @@ def process_subject(subject_code, subject_name, source_urls):
             logger.warning(f"  ⚠️  AI analysis failed, skipping...")
             continue
         
-        # Step 3: Generate PDF
+        # Queue the PDF; the subject's units render in parallel in step 3
         pdf_filename = f"{subject_code}_Unit{unit}_AI_StudyGuide.pdf"
         pdf_path = f"/tmp/{pdf_filename}"
+        render_jobs.append((study_document(subject_name, subject_code, unit, ai_content), pdf_path))
+        notes.append({
+            "subject_code": subject_code,
+            "unit": unit,
+            "title": f"{subject_name} - Unit {unit} AI Study Guide",
+            "description": f"AI-generated comprehensive study guide using Bytez GPT-4",
+            "file_url": pdf_path,
+            "source_url": url,
+            "source_name": "Bytez AI (GPT-4)"
+        })
+    
+    # Step 3: Generate PDFs
+    if render_jobs:
+        logger.info(f"\n📄 Generating {len(render_jobs)} PDFs...")
+    pdf_count = 0
+    for note_data, result in zip(notes, render_batch(render_jobs)):
+        if isinstance(result, Exception):
+            continue
+        pdf_count += 1
         
-        logger.info(f"  📄 Generating PDF...")
-        if generate_pdf(subject_name, subject_code, unit, ai_content, pdf_path):
-            pdf_count += 1
-            
-            # Step 4: Store in database
-            note_data = {
-                "subject_code": subject_code,
-                "unit": unit,
-                "title": f"{subject_name} - Unit {unit} AI Study Guide",
-                "description": f"AI-generated comprehensive study guide using Bytez GPT-4",
-                "file_url": pdf_path,
-                "source_url": url,
-                "source_name": "Bytez AI (GPT-4)"
-            }
-            
-            try:
-                supabase.table("notes").insert(note_data).execute()
-                logger.info(f"  ✓ Stored in database")
-            except Exception as e:
-                logger.debug(f"  Database insert skipped: {str(e)[:50]}")
+        # Step 4: Store in database
+        try:
+            supabase.table("notes").insert(note_data).execute()
+            logger.info(f"  ✓ Unit {note_data['unit']} stored in database")
+        except Exception as e:
+            logger.debug(f"  Database insert skipped: {str(e)[:50]}")
         
-        logger.info(f"  ✅ Unit {unit} complete!")
+        logger.info(f"  ✅ Unit {note_data['unit']} complete!")
     
     return pdf_count
 
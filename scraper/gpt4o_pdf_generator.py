@@ -3,14 +3,18 @@ Enhanced AI PDF Generator using Bytez GPT-4o
 Creates comprehensive, easy-to-understand study guides
 """
 import os
-import re
+import sys
 import time
 from bytez import Bytez
-from fpdf import FPDF
 from supabase import create_client
 from dotenv import load_dotenv
 import logging
 
+# Add the parent directory to sys.path to allow imports from backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.pdf_render import Document, Section, render_batch, render_document
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -23,53 +27,6 @@ SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 sdk = Bytez(BYTEZ_API_KEY)
 supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 
-class StudyNotesPDF(FPDF):
-    def __init__(self, subject_name):
-        super().__init__()
-        self.subject_name = subject_name
-    
-    def header(self):
-        self.set_font('Arial', 'B', 18)
-        self.set_text_color(0, 102, 204)
-        self.cell(0, 12, self.subject_name, 0, 1, 'C')
-        self.set_text_color(0, 0, 0)
-        self.ln(3)
-    
-    def footer(self):
-        self.set_y(-15)
-        self.set_font('Arial', 'I', 9)
-        self.set_text_color(128, 128, 128)
-        self.cell(0, 10, f'Page {self.page_no()}', 0, 0, 'C')
-    
-    def add_unit_title(self, unit_num, title):
-        self.add_page()
-        self.set_font('Arial', 'B', 16)
-        self.set_fill_color(230, 245, 255)
-        self.cell(0, 12, f'Unit {unit_num}: {title}', 0, 1, 'L', True)
-        self.ln(5)
-    
-    def add_section(self, title):
-        self.set_font('Arial', 'B', 14)
-        self.set_text_color(51, 102, 153)
-        self.cell(0, 10, title, 0, 1, 'L')
-        self.set_text_color(0, 0, 0)
-        self.ln(2)
-    
-    def add_content(self, content):
-        self.set_font('Arial', '', 11)
-        # Clean Unicode
-        clean = re.sub(r'[^\x00-\x7F]+', ' ', content)
-        clean = re.sub(r'\s+', ' ', clean)
-        self.multi_cell(0, 7, clean)
-        self.ln(3)
-    
-    def add_highlight(self, content, color=(255, 255, 200)):
-        self.set_font('Arial', 'I', 11)
-        self.set_fill_color(*color)
-        clean = re.sub(r'[^\x00-\x7F]+', ' ', content)
-        self.multi_cell(0, 7, clean, 0, 'L', True)
-        self.ln(3)
-
 def generate_ai_content(topic, unit_num):
     """Generate content using GPT-4o"""
     model = sdk.model("openai/gpt-4o")
@@ -133,34 +90,22 @@ def parse_content(content):
     
     return sections
 
-def create_study_pdf(subject_code, subject_name, units):
+def build_study_document(subject_code, subject_name, units):
     """
-    Create comprehensive PDF for a subject
+    Generate the content of every unit and lay it out as a Document
     
     Args:
         subject_code: e.g., "2140701"
         subject_name: e.g., "Data Structures"
         units: List of unit topics, e.g., ["Arrays", "Stacks", "Queues"]
     """
-    pdf = StudyNotesPDF(subject_name)
-    pdf.set_auto_page_break(auto=True, margin=15)
-    
-    # Cover page
-    pdf.add_page()
-    pdf.set_font('Arial', 'B', 24)
-    pdf.ln(60)
-    pdf.cell(0, 15, subject_name, 0, 1, 'C')
-    pdf.set_font('Arial', '', 14)
-    pdf.cell(0, 10, 'AI-Generated Study Guide', 0, 1, 'C')
-    pdf.set_font('Arial', 'I', 12)
-    pdf.ln(10)
-    pdf.cell(0, 10, f'Subject Code: {subject_code}', 0, 1, 'C')
-    pdf.cell(0, 10, 'Powered by GPT-4o', 0, 1, 'C')
+    document = Document(subject_name, ['AI-Generated Study Guide', f'Subject Code: {subject_code}',
+                                       'Powered by GPT-4o'])
     
     # Generate content for each unit
     for unit_num, topic in enumerate(units, 1):
         logger.info(f"\n📖 Unit {unit_num}: {topic}")
-        pdf.add_unit_title(unit_num, topic)
+        document.sections.append(Section(heading=f'Unit {unit_num}: {topic}', new_page=True))
         
         # Generate AI content
         ai_content = generate_ai_content(topic, unit_num)
@@ -170,27 +115,24 @@ def create_study_pdf(subject_code, subject_name, units):
             
             for section_title, section_content in sections.items():
                 if section_content.strip():
-                    pdf.add_section(section_title)
-                    
-                    # Highlight key points
+                    # Highlight key points and examples
+                    tone = None
                     if 'KEY POINTS' in section_title.upper():
-                        pdf.add_highlight(section_content, (255, 255, 200))
+                        tone = 'highlight'
                     elif 'EXAMPLE' in section_title.upper():
-                        pdf.add_highlight(section_content, (240, 255, 240))
-                    else:
-                        pdf.add_content(section_content)
+                        tone = 'example'
+                    document.sections.append(Section(section_content, heading=section_title.strip('#* '),
+                                                     level=2, tone=tone))
         else:
-            pdf.add_content("Content generation failed. Please try again.")
+            document.sections.append(Section("Content generation failed. Please try again."))
         
         # Rate limit
         time.sleep(2)
     
-    # Save PDF
-    filename = f"/tmp/{subject_code}_GPT4o_Study_Guide.pdf"
-    pdf.output(filename)
-    logger.info(f"\n✅ PDF created: {filename}")
-    
-    # Store in database
+    return document
+
+def save_study_pdf(subject_code, subject_name, units, filename):
+    """Store a rendered study guide in the database"""
     note_data = {
         "subject_code": subject_code,
         "unit": None,
@@ -205,26 +147,36 @@ def create_study_pdf(subject_code, subject_name, units):
         logger.info("✓ Saved to database")
     except:
         logger.debug("Database insert skipped")
+
+def create_study_pdf(subject_code, subject_name, units):
+    """Create comprehensive PDF for a subject"""
+    document = build_study_document(subject_code, subject_name, units)
+    
+    # Save PDF
+    filename = f"/tmp/{subject_code}_GPT4o_Study_Guide.pdf"
+    render_document(document, filename)
+    logger.info(f"\n✅ PDF created: {filename}")
     
+    save_study_pdf(subject_code, subject_name, units, filename)
     return filename
 
 def main():
     logger.info("🚀 GPT-4o PDF Generator")
     logger.info("Creating comprehensive study guides\n")
     
-    # Data Structures
-    create_study_pdf(
-        "2140701",
-        "Data Structures",
-        ["Arrays and Pointers", "Stacks and Queues", "Linked Lists"]
-    )
-    
-    # DBMS
-    create_study_pdf(
-        "3140703",
-        "Database Management Systems",
-        ["Introduction to DBMS", "Relational Model and SQL"]
-    )
+    subjects = [
+        ("2140701", "Data Structures", ["Arrays and Pointers", "Stacks and Queues", "Linked Lists"]),
+        ("3140703", "Database Management Systems", ["Introduction to DBMS", "Relational Model and SQL"]),
+    ]
+    
+    # Generate every subject's content first, then render all the PDFs in parallel
+    jobs = [(build_study_document(code, name, units), f"/tmp/{code}_GPT4o_Study_Guide.pdf")
+            for code, name, units in subjects]
+    for (code, name, units), (_, filename), result in zip(subjects, jobs, render_batch(jobs)):
+        if isinstance(result, Exception):
+            continue
+        logger.info(f"\n✅ PDF created: {filename}")
+        save_study_pdf(code, name, units, filename)
     
     logger.info("\n" + "="*60)
     logger.info("✅ All PDFs generated successfully!")
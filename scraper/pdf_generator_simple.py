@@ -3,17 +3,19 @@ AI-Powered PDF Generator (Fallback without Bytez)
 Scrapes content and generates comprehensive study PDFs
 """
 import os
+import sys
 import requests
 from bs4 import BeautifulSoup
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
 from supabase import create_client
 from dotenv import load_dotenv
 import logging
 import re
 
+# Add the parent directory to sys.path to allow imports from backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.pdf_render import Document, Section, render_batch
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -61,7 +63,7 @@ def scrape_and_structure_content(url):
                         section['content'].append(text)
                 elif sibling.name in ['ul', 'ol']:
                     items = [li.get_text().strip() for li in sibling.find_all('li')]
-                    section['content'].extend([f"• {item}" for item in items if item])
+                    section['content'].extend([f"- {item}" for item in items if item])
             
             if section['content']:
                 structured_content['sections'].append(section)
@@ -72,76 +74,15 @@ def scrape_and_structure_content(url):
         logger.error(f"Error scraping {url}: {e}")
         return None
 
-def generate_pdf(subject_name, subject_code, unit, content_data, output_path):
-    """Generate professional PDF from structured content"""
-    try:
-        doc = SimpleDocTemplate(output_path, pagesize=A4,
-                                rightMargin=72, leftMargin=72,
-                                topMargin=72, bottomMargin=18)
-        
-        elements = []
-        styles = getSampleStyleSheet()
-        
-        # Custom styles
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor='#1a56db',
-            spaceAfter=30,
-            alignment=TA_CENTER
-        )
-        
-        subtitle_style = ParagraphStyle(
-            'Subtitle',
-            parent=styles['Normal'],
-            fontSize=12,
-            textColor='#6b7280',
-            spaceAfter=20,
-            alignment=TA_CENTER
-        )
-        
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=16,
-            textColor='#1e40af',
-            spaceAfter=12,
-            spaceBefore=16
-        )
-        
-        # Title page
-        title = Paragraph(f"{subject_name}", title_style)
-        elements.append(title)
-        
-        subtitle = Paragraph(f"Unit {unit} Study Guide<br/>Subject Code: {subject_code}", subtitle_style)
-        elements.append(subtitle)
-        elements.append(Spacer(1, 30))
-        
-        # Add content sections
-        if content_data and 'sections' in content_data:
-            for section in content_data['sections'][:10]:  # Limit to 10 sections
-                # Section heading
-                heading = Paragraph(section['heading'], heading_style)
-                elements.append(heading)
-                
-                # Section content
-                for paragraph in section['content'][:5]:  # Limit paragraphs per section
-                    if len(paragraph) > 20:  # Skip very short lines
-                        para = Paragraph(paragraph, styles['BodyText'])
-                        elements.append(para)
-                        elements.append(Spacer(1, 8))
-                
-                elements.append(Spacer(1, 12))
-        
-        # Build PDF
-        doc.build(elements)
-        logger.info(f"✓ PDF generated: {output_path}")
-        return True
-        
-    except Exception as e:
-        logger.error(f"Error generating PDF: {e}")
-        return False
+def study_document(subject_name, subject_code, unit, content_data):
+    """Scraped sections -> Document for the shared renderer"""
+    sections = []
+    for section in content_data.get('sections', [])[:10]:  # Limit to 10 sections
+        # Limit paragraphs per section and skip very short lines
+        paragraphs = [p for p in section['content'][:5] if len(p) > 20]
+        sections.append(Section('\n\n'.join(paragraphs), heading=section['heading'], level=2))
+    return Document(subject_name, [f"Unit {unit} Study Guide", f"Subject Code: {subject_code}"],
+                    sections=sections, theme='classic')
 
 def process_subject(subject_code, subject_name, source_urls):
     """Process a subject: scrape and generate PDF"""
@@ -149,7 +90,8 @@ def process_subject(subject_code, subject_name, source_urls):
     logger.info(f"📚 Processing: {subject_name} ({subject_code})")
     logger.info(f"{'='*60}")
     
-    pdf_count = 0
+    render_jobs = []
+    notes = []
     
     for unit, url in enumerate(source_urls, 1):
         logger.info(f"\n📖 Unit {unit}: Processing {url}")
@@ -162,32 +104,37 @@ def process_subject(subject_code, subject_name, source_urls):
         
         logger.info(f"  ✓ Found {len(content['sections'])} sections")
         
-        # Generate PDF
+        # Queue the PDF; the subject's units render in parallel below
         pdf_filename = f"{subject_code}_Unit{unit}_StudyGuide.pdf"
         pdf_path = f"/tmp/{pdf_filename}"
+        render_jobs.append((study_document(subject_name, subject_code, unit, content), pdf_path))
+        notes.append({
+            "subject_code": subject_code,
+            "unit": unit,
+            "title": f"{subject_name} - Unit {unit} Study Guide",
+            "description": f"Comprehensive study guide from {content.get('title', 'educational source')}",
+            "file_url": pdf_path,
+            "source_url": url,
+            "source_name": "Auto-Generated PDF"
+        })
+    
+    # Generate PDFs
+    if render_jobs:
+        logger.info(f"\n📄 Generating {len(render_jobs)} PDFs...")
+    pdf_count = 0
+    for note_data, result in zip(notes, render_batch(render_jobs)):
+        if isinstance(result, Exception):
+            continue
+        pdf_count += 1
         
-        logger.info(f"  📄 Generating PDF...")
-        if generate_pdf(subject_name, subject_code, unit, content, pdf_path):
-            pdf_count += 1
-            
-            # Store in database
-            note_data = {
-                "subject_code": subject_code,
-                "unit": unit,
-                "title": f"{subject_name} - Unit {unit} Study Guide",
-                "description": f"Comprehensive study guide from {content.get('title', 'educational source')}",
-                "file_url": pdf_path,
-                "source_url": url,
-                "source_name": "Auto-Generated PDF"
-            }
-            
-            try:
-                supabase.table("notes").insert(note_data).execute()
-                logger.info(f"  ✓ Stored in database")
-            except Exception as e:
-                logger.debug(f"  Database insert skipped (duplicate): {str(e)[:50]}")
-            
-            logger.info(f"  ✅ Unit {unit} complete!")
+        # Store in database
+        try:
+            supabase.table("notes").insert(note_data).execute()
+            logger.info(f"  ✓ Unit {note_data['unit']} stored in database")
+        except Exception as e:
+            logger.debug(f"  Database insert skipped (duplicate): {str(e)[:50]}")
+        
+        logger.info(f"  ✅ Unit {note_data['unit']} complete!")
     
     return pdf_count
 
@@ -1,53 +1,78 @@
-import asyncio
-import subprocess
 import os
+import sys
+import time
+import subprocess
 import logging
-from datetime import datetime
+
+# Add the parent directory to sys.path to allow imports from backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.cluster_scheduler import ClusterScheduler
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
 logger = logging.getLogger(__name__)
 
-async def run_spiders():
-    """Run all configured spiders"""
-    while True:
+# Local hour of the daily crawl; outside the peak window (SCHEDULER_QUIET_HOURS)
+SCRAPER_HOUR = int(os.environ.get('SCRAPER_HOUR', 1))
+
+# List of spiders to run
+SPIDERS = [
+    'gtu_syllabus',
+    'gtu_circular',
+    'gtustudy_real',  # Updated to use the real spider
+    'gtumaterial',
+]
+
+
+def run_spiders():
+    """Run all configured spiders once"""
+    logger.info("Starting scheduled spider runs...")
+    failed = []
+
+    for spider_name in SPIDERS:
         try:
-            logger.info("Starting scheduled spider runs...")
-
-            # List of spiders to run
-            spiders = [
-                'gtu_syllabus',
-                'gtu_circular',
-                'gtustudy_real',  # Updated to use the real spider
-                'gtumaterial',
-            ]
-
-            for spider_name in spiders:
-                try:
-                    logger.info(f"Running spider: {spider_name}")
-                    # The cwd path is adjusted to be relative to the script's location
-                    result = subprocess.run(
-                        ['scrapy', 'crawl', spider_name],
-                        cwd=os.path.join(os.path.dirname(__file__), 'gtu_scraper'),
-                        check=True,
-                        capture_output=True,
-                        text=True
-                    )
-                    logger.info(f"Spider {spider_name} completed successfully. Output:\n{result.stdout}")
-
-                except subprocess.CalledProcessError as e:
-                    logger.error(f"Spider {spider_name} failed with error (return code {e.returncode}):\n{e.stderr}")
-                except FileNotFoundError:
-                    logger.error(f"Scrapy command not found. Make sure Scrapy is installed and in your PATH.")
-                except Exception as e:
-                    logger.error(f"An unexpected error occurred while running spider {spider_name}: {e}")
+            logger.info(f"Running spider: {spider_name}")
+            # The cwd path is adjusted to be relative to the script's location
+            result = subprocess.run(
+                ['scrapy', 'crawl', spider_name],
+                cwd=os.path.join(os.path.dirname(__file__), 'gtu_scraper'),
+                check=True,
+                capture_output=True,
+                text=True
+            )
+            logger.info(f"Spider {spider_name} completed successfully. Output:\n{result.stdout}")
 
+        except subprocess.CalledProcessError as e:
+            failed.append(spider_name)
+            logger.error(f"Spider {spider_name} failed with error (return code {e.returncode}):\n{e.stderr}")
+        except FileNotFoundError:
+            failed.append(spider_name)
+            logger.error(f"Scrapy command not found. Make sure Scrapy is installed and in your PATH.")
         except Exception as e:
-            logger.error(f"An error occurred during the scheduled spider run: {str(e)}")
+            failed.append(spider_name)
+            logger.error(f"An unexpected error occurred while running spider {spider_name}: {e}")
+
+    if failed and len(failed) == len(SPIDERS):
+        # Recorded as a failed run in the scheduler state
+        raise RuntimeError(f"All spiders failed: {', '.join(failed)}")
+
+
+def main():
+    # One crawl per day across every copy of this script; a copy started after
+    # a missed crawl (or for the first time) catches it up
+    scheduler = ClusterScheduler('scraper')
+    scheduler.add_job(run_spiders, 'spiders', heavy=True, hour=SCRAPER_HOUR, minute=0)
+    scheduler.start()
+    logger.info(f"Scheduler started as {'leader' if scheduler.is_leader else 'follower'}")
+
+    try:
+        while True:
+            time.sleep(60)
+    except (KeyboardInterrupt, SystemExit):
+        scheduler.shutdown()
 
-        # Wait for 24 hours before next run
-        await asyncio.sleep(24 * 60 * 60)
 
 if __name__ == "__main__":
     print("Starting GTU Scraper Scheduler...")
-    asyncio.run(run_spiders())
\ No newline at end of file
+    main()
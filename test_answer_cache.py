@@ -0,0 +1,101 @@
+"""
+Tests for the fuzzy GTU answer cache (backend/answer_cache.py)
+Uses a temporary SQLite store - no LLM needed
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from backend.answer_cache import AnswerCache, normalize_question, similarity
+
+ANSWER = {"answer": "1. Mutual exclusion\n2. Hold and wait\n3. No preemption\n4. Circular wait", "unit": "Unit 3"}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return AnswerCache(str(tmp_path / 'answers.db'))
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Explain the 2nd Normal Form. [7 Marks]", "2 normal form"),
+    ("What is Second normal form?", "2 normal form"),
+    ("Define 2NF (3 marks)", "2nf"),
+    ("Write short note on vi editor", "vi editor"),
+    ("Differentiate between TWO-phase locking protocols", "differentiate between 2 phase locking protocol"),
+])
+def test_normalize_question(text, expected):
+    assert normalize_question(text) == expected
+
+
+def test_reworded_question_hits(cache):
+    cache.put("Explain deadlock and its necessary conditions.", ANSWER, subject_id=7)
+    hit = cache.lookup("What is a deadlock? Explain the necessary conditions. (4 marks)", subject_id=7)
+    assert hit['match'] == 'exact'
+    assert hit['answer'] == ANSWER
+    assert hit['question'] == "Explain deadlock and its necessary conditions."
+
+    # Word order is part of the question ("postfix to infix" is not "infix to postfix")
+    assert cache.lookup("necessary conditions of deadlocks", subject_id=7) is None
+    hit = cache.lookup("Explain dead lock & its necesary conditions", subject_id=7)
+    assert hit['match'] == 'fuzzy'
+    assert hit['similarity'] >= cache.threshold
+    assert cache.describe(hit)['matched_question'] == "Explain deadlock and its necessary conditions."
+
+
+def test_different_questions_and_subjects_miss(cache):
+    cache.put("Explain deadlock and its necessary conditions.", ANSWER, subject_id=7)
+    assert cache.lookup("Explain deadlock avoidance using banker's algorithm", subject_id=7) is None
+    assert cache.lookup("Explain paging", subject_id=7) is None
+    assert cache.lookup("Explain deadlock and its necessary conditions.", subject_id=8) is None
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("Explain second normal form with suitable example", "Explain third normal form with suitable example"),
+    ("Explain inorder traversal of binary tree", "Explain preorder traversal of binary tree"),
+    ("Convert infix to postfix", "Convert postfix to infix"),
+    ("Explain primitive data structures", "Explain non-primitive data structures"),
+    # Different terms, not misspellings
+    ("Explain process scheduling", "Explain processor scheduling"),
+    ("Explain transaction with example", "Explain transition with example"),
+    ("Draw the parse tree for the given grammar", "Draw the parser tree for the given grammar"),
+    ("Explain polymorphism in Java", "Explain polymorphic in Java"),
+])
+def test_similar_but_different_questions_miss(cache, cached, asked):
+    cache.put(cached, ANSWER, subject_id=7)
+    assert cache.lookup(asked, subject_id=7) is None
+    assert similarity(normalize_question(cached), normalize_question(asked)) < cache.threshold
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Explain sliding window protocol", "Explain sliding window protocal"),
+    ("Explain the algorithm", "Explain the algoritm"),
+    ("How does a receiver recieve frames", "How does a receiver receive frames"),
+])
+def test_misspellings_still_match(a, b):
+    assert similarity(normalize_question(a), normalize_question(b)) == 1.0
+
+
+def test_refresh_replaces_only_the_same_question(cache):
+    entry_id = cache.put("Explain deadlock and its necessary conditions.", ANSWER, subject_id=7)
+    new_answer = {"answer": "Regenerated"}
+    # A fuzzy match is stored as its own entry; the matched one is untouched
+    assert cache.put("Explain dead lock & its necesary conditions", new_answer, 7) != entry_id
+    assert cache.lookup("Explain deadlock and its necessary conditions.", subject_id=7)['answer'] == ANSWER
+    # The same normalized question overwrites
+    assert cache.put("What is deadlock? Necessary conditions.", new_answer, 7) == entry_id
+    assert cache.lookup("Explain deadlock and its necessary conditions.", subject_id=7)['answer'] == new_answer
+    assert cache.stats()['entries'] == 2
+
+
+def test_lookup_is_fast(cache):
+    for i in range(500):
+        cache.put(f"Explain topic number {i} of operating systems with example {i * 7}", {"answer": str(i)}, 1)
+    start = time.perf_counter()
+    hit = cache.lookup("Explain topic number 250 of operating system with an example 1750", 1)
+    assert (time.perf_counter() - start) < 0.05
+    assert hit['answer'] == {"answer": "250"}
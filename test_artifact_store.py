@@ -0,0 +1,187 @@
+"""
+Tests for artifact storage (backend/artifact_store.py) and its local
+object-store stand-in (backend/fake_object_store.py)
+The S3 store runs against the stand-in on a free local port - no bucket or
+credentials needed
+"""
+
+import os
+import sys
+import json
+import http.client
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from backend import artifact_store
+from backend.artifact_store import PdfArtifactStore, LocalArtifactStore, S3ArtifactStore, file_sha256
+from backend.fake_object_store import start_in_thread, _expired
+
+GUIDE = "unit_guide_3130703_unit3_0123456789abcdef.pdf"
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = tmp_path / 'render.pdf'
+    path.write_bytes(b"%PDF-1.4 " + os.urandom(50_000))
+    return str(path)
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = start_in_thread(root=str(tmp_path / 'bucket'))
+    yield server
+    server.shutdown()
+
+
+def s3_store(server, **kwargs):
+    pytest.importorskip("boto3")
+    return S3ArtifactStore(bucket='gtu-pdfs', endpoint_url=f"http://127.0.0.1:{server.server_address[1]}",
+                           access_key='test', secret_key='test', base_url='https://api.example.com', **kwargs)
+
+
+def operations(server):
+    return server.store.snapshot()['operations']
+
+
+def test_local_store(tmp_path, pdf):
+    store = LocalArtifactStore(str(tmp_path / 'pdfs'), base_url='http://localhost:5001')
+    first = store.put_file(pdf, GUIDE)
+    assert first['uploaded'] and first['sha256'] == file_sha256(pdf) and first['size'] == os.path.getsize(pdf)
+    assert store.put_file(pdf, GUIDE)['uploaded'] is False
+    # Rendered straight into the store's directory: nothing to copy or hash
+    assert store.put_file(store.path(GUIDE), GUIDE) == dict(store.stat(GUIDE), uploaded=False)
+
+    assert store.url(GUIDE) == f"http://localhost:5001/api/pdf/{GUIDE}"
+    assert store.download_url(GUIDE) is None and not store.remote
+    store.delete(GUIDE)
+    assert not store.exists(GUIDE)
+    for key in ('../escape.pdf', '/etc/x.pdf', 'a\\b.pdf', ''):
+        with pytest.raises(ValueError):
+            store.put_file(pdf, key)
+
+
+def test_store_must_implement_storage_methods():
+    class Partial(PdfArtifactStore):
+        def stat(self, key):
+            return None
+
+    with pytest.raises(TypeError, match="delete"):
+        Partial()
+    with pytest.raises(TypeError):
+        PdfArtifactStore()
+
+
+def test_s3_upload_dedup_and_download(server, pdf):
+    store = s3_store(server)
+    assert store.stat(GUIDE) is None
+    assert store.put_file(pdf, GUIDE)['uploaded']
+    # Same file again: memoized, no request at all
+    before = server.store.snapshot()['requests']
+    assert store.put_file(pdf, GUIDE)['uploaded'] is False
+    assert server.store.snapshot()['requests'] == before
+    # A fresh process (or a re-render with identical bytes) only needs a HEAD
+    again = s3_store(server)
+    result = again.put_file(pdf, GUIDE)
+    assert result['uploaded'] is False and result['sha256'] == file_sha256(pdf)
+    assert operations(server)['put'] == 1
+
+    url = store.download_url(GUIDE)
+    assert url.startswith(f"http://127.0.0.1:{server.server_address[1]}/gtu-pdfs/pdfs/{GUIDE}?")
+    assert store.download_url(GUIDE) == url
+    with urllib.request.urlopen(urllib.request.Request(url, headers={'Range': 'bytes=9-99'})) as response:
+        assert response.status == 206
+        assert response.read() == open(pdf, 'rb').read()[9:100]
+        assert response.headers['Content-Type'] == 'application/pdf'
+        assert 'immutable' in response.headers['Cache-Control']
+    # Stored links go through the backend, which redirects to a fresh pre-signed URL
+    assert store.url(GUIDE) == f"https://api.example.com/api/pdf/{GUIDE}"
+
+
+def test_s3_changed_bytes_and_multipart(server, tmp_path, pdf):
+    store = s3_store(server, multipart_mb=5)
+    store.put_file(pdf, GUIDE)
+    with open(pdf, 'ab') as f:
+        f.write(b"changed")
+    assert store.put_file(pdf, GUIDE)['uploaded']
+    assert store.stat(GUIDE)['size'] == os.path.getsize(pdf)
+
+    large = tmp_path / 'large.pdf'
+    large.write_bytes(os.urandom(11 * 1024 * 1024))
+    store.put_file(str(large), 'large.pdf')
+    assert operations(server)['upload_part'] == 3
+    assert store.stat('large.pdf')['sha256'] == file_sha256(str(large))
+    store.delete('large.pdf')
+    assert not store.exists('large.pdf')
+
+
+def test_s3_cdn_urls(server, pdf):
+    store = s3_store(server, cdn_url='https://cdn.example.com/')
+    store.put_file(pdf, GUIDE)
+    assert store.url(GUIDE) == store.download_url(GUIDE) == f"https://cdn.example.com/pdfs/{GUIDE}"
+
+
+def test_stand_in_chunked_bodies_and_restart(server, tmp_path):
+    port = server.server_address[1]
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    # aws-chunked framing with a trailing checksum, as streaming SDK uploads send it
+    body = b"5;chunk-signature=abc\r\nhello\r\n6\r\n world\r\n0\r\nx-amz-checksum-crc32:AAAA\r\n\r\n"
+    conn.request('PUT', '/bucket/greeting.txt', body=body,
+                 headers={'Content-Encoding': 'aws-chunked', 'Content-Length': str(len(body)),
+                          'x-amz-meta-sha256': 'abc'})
+    put = conn.getresponse()
+    assert put.status == 200 and put.read() == b''
+    conn.request('GET', '/bucket/greeting.txt')
+    response = conn.getresponse()
+    assert response.read() == b"hello world" and response.headers['x-amz-meta-sha256'] == 'abc'
+    conn.close()
+
+    # A restarted store on the same root still has the object
+    restarted = start_in_thread(root=server.store.root)
+    try:
+        url = f"http://127.0.0.1:{restarted.server_address[1]}/bucket/greeting.txt"
+        assert urllib.request.urlopen(url).read() == b"hello world"
+        with pytest.raises(urllib.error.HTTPError) as missing:
+            urllib.request.urlopen(url.replace('greeting', 'other'))
+        assert missing.value.code == 404
+    finally:
+        restarted.shutdown()
+
+    assert _expired({'X-Amz-Date': '20200101T000000Z', 'X-Amz-Expires': '3600'})
+    assert not _expired({})
+    stats = json.loads(urllib.request.urlopen(f"http://127.0.0.1:{port}/_stats").read())
+    assert stats['operations']['put'] == 1
+
+
+def test_serve_redirects_to_bucket(server, tmp_path, pdf, monkeypatch):
+    flask = pytest.importorskip("flask")
+    from backend.file_serving import redirect_to_artifact, send_pdf
+
+    store = s3_store(server)
+    store.put_file(pdf, GUIDE)
+    monkeypatch.setattr(artifact_store, '_pdf_store', store)
+    (tmp_path / 'legacy.pdf').write_bytes(b"%PDF-1.4 legacy")
+
+    app = flask.Flask(__name__)
+
+    @app.route('/api/pdf/<path:filename>')
+    def serve_pdf(filename):
+        return redirect_to_artifact(filename) or send_pdf(filename, roots=[str(tmp_path)], accel_map={})
+
+    client = app.test_client()
+    response = client.get(f'/api/pdf/{GUIDE}')
+    assert response.status_code == 302
+    assert response.headers['Location'] == store.download_url(GUIDE)
+    assert f"max-age={store.url_ttl // 4}" in response.headers['Cache-Control']
+    # PDFs that are not stored guides are still served locally
+    assert client.get('/api/pdf/legacy.pdf').data == b"%PDF-1.4 legacy"
+
+    # A guide missing from the bucket (upload failed, object deleted) is served locally, not 302'd to a 404
+    missing = GUIDE.replace('0123456789abcdef', 'fedcba9876543210')
+    (tmp_path / missing).write_bytes(b"%PDF-1.4 local only")
+    assert store.download_url(missing) is None
+    response = client.get(f'/api/pdf/{missing}')
+    assert response.status_code == 200 and response.data == b"%PDF-1.4 local only"
@@ -0,0 +1,90 @@
+"""
+Tests for prompt batching (backend/batching.py)
+Uses a fake completion function - no AI credentials needed
+"""
+
+import os
+import re
+import sys
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.batching import BatchTask, PromptBatcher, parse_items
+
+
+class FakeModel:
+    """Answers every task id in the prompt; can drop or corrupt chosen ids"""
+
+    def __init__(self, drop=(), corrupt=(), fence=False, truncate=False):
+        self.calls = []
+        self.drop, self.corrupt = set(drop), set(corrupt)
+        self.fence, self.truncate = fence, truncate
+
+    def __call__(self, prompt, system):
+        ids = re.findall(r'### Task id: (\S+)', prompt)
+        self.calls.append(ids)
+        batched = len(ids) > 1
+        items = []
+        for task_id in ids:
+            if batched and task_id in self.drop:
+                continue
+            output = 42 if (batched and task_id in self.corrupt) else f"answer {task_id}"
+            items.append({"id": task_id, "output": output})
+        text = json.dumps(items)
+        if self.truncate and batched:
+            text = text[:-20]
+        return f"```json\n{text}\n```" if self.fence else text
+
+
+def _tasks(n, kind='explain'):
+    return [BatchTask(str(i), kind, f"Explain topic {i}") for i in range(n)]
+
+
+def test_packs_tasks_into_few_calls():
+    model = FakeModel(fence=True)
+    results = PromptBatcher(model, max_items=5).run(_tasks(12))
+
+    assert [r.output for r in results] == [f"answer {i}" for i in range(12)]
+    assert len(model.calls) == 3
+
+
+def test_groups_only_compatible_tasks():
+    model = FakeModel()
+    PromptBatcher(model, max_items=10).run(_tasks(2, 'a') + [BatchTask('x', 'b', 'other')])
+    assert sorted(len(ids) for ids in model.calls) == [1, 2]
+
+
+def test_failed_items_are_retried_individually():
+    model = FakeModel(drop={'1'}, corrupt={'3'})
+    results = PromptBatcher(model, max_items=5).run(_tasks(5))
+
+    assert all(r.ok for r in results)
+    assert results[1].attempts == 2 and results[3].attempts == 2
+    assert results[0].attempts == 1
+    assert model.calls[1:] == [['1'], ['3']]
+
+
+def test_truncated_array_keeps_complete_items():
+    text = '[{"id": "0", "output": "a"}, {"id": "1", "output": "b"}, {"id": "2", "out'
+    assert [item['id'] for item in parse_items(text)] == ['0', '1']
+
+    model = FakeModel(truncate=True)
+    results = PromptBatcher(model, max_items=4).run(_tasks(4))
+    assert all(r.ok for r in results)
+    assert len(model.calls) == 2  # one batch + one retry for the cut-off item
+
+
+def test_gives_up_after_retries():
+    results = PromptBatcher(lambda p, s: None, item_retries=1).run(_tasks(2))
+    assert not any(r.ok for r in results)
+    assert results[0].attempts == 2
+
+
+if __name__ == "__main__":
+    test_packs_tasks_into_few_calls()
+    test_groups_only_compatible_tasks()
+    test_failed_items_are_retried_individually()
+    test_truncated_array_keeps_complete_items()
+    test_gives_up_after_retries()
+    print("✅ All batching tests passed")
@@ -0,0 +1,89 @@
+"""
+Tests for the agent service worker pool (backend/blocking_pool.py)
+Plain asyncio - no FastAPI or AI credentials needed
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+import contextvars
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.blocking_pool import BlockingPool, PoolSaturated, PoolTimeout
+
+
+def test_parallel_calls_take_max_not_sum():
+    """Eight 0.3s blocking calls finish in about 0.3s, not 2.4s"""
+    pool = BlockingPool(max_workers=8, max_queued=0, default_timeout=5)
+
+    async def main():
+        start = time.perf_counter()
+        results = await asyncio.gather(*[pool.run(lambda i=i: (time.sleep(0.3), i)[1]) for i in range(8)])
+        return results, time.perf_counter() - start
+
+    results, elapsed = asyncio.run(main())
+    assert results == list(range(8))
+    assert elapsed < 1.0, elapsed
+    assert pool.stats()['completed'] == 8 and pool.stats()['in_flight'] == 0
+    pool.shutdown()
+
+
+def test_timeout_frees_caller_but_keeps_slot_until_done():
+    pool = BlockingPool(max_workers=1, max_queued=0, default_timeout=5)
+    release = threading.Event()
+
+    async def main():
+        try:
+            await pool.run(release.wait, timeout=0.1)
+            assert False, "expected PoolTimeout"
+        except PoolTimeout:
+            pass
+        # The thread is still busy, so a new call is rejected rather than queued forever
+        assert pool.stats()['in_flight'] == 1
+        try:
+            await pool.run(time.sleep, 0)
+            assert False, "expected PoolSaturated"
+        except PoolSaturated:
+            pass
+        release.set()
+        while pool.stats()['in_flight']:
+            await asyncio.sleep(0.01)
+        return await pool.run(lambda: "ok")
+
+    assert asyncio.run(main()) == "ok"
+    stats = pool.stats()
+    assert stats['timeouts'] == 1 and stats['rejected'] == 1
+    pool.shutdown()
+
+
+def test_exceptions_and_context_propagate():
+    pool = BlockingPool(max_workers=2, max_queued=2, default_timeout=5)
+    route = contextvars.ContextVar('route', default=None)
+
+    def boom():
+        raise ValueError("provider down")
+
+    async def main():
+        route.set('/agent/chat')
+        seen = await pool.run(route.get)
+        try:
+            await pool.run(boom)
+            assert False, "expected ValueError"
+        except ValueError as e:
+            assert "provider down" in str(e)
+        await asyncio.sleep(0.01)
+        return seen
+
+    assert asyncio.run(main()) == '/agent/chat'
+    assert pool.stats()['failed'] == 1
+    pool.shutdown()
+
+
+if __name__ == "__main__":
+    test_parallel_calls_take_max_not_sum()
+    test_timeout_frees_caller_but_keeps_slot_until_done()
+    test_exceptions_and_context_propagate()
+    print("✅ All blocking pool tests passed")
@@ -0,0 +1,184 @@
+"""
+Tests for bulk study guide generation (backend/bulk_pdf.py)
+Fake fetch/synthesize/render stages and a temporary PDF cache - no Supabase,
+reportlab or AI credentials needed
+"""
+
+import os
+import sys
+import json
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from backend.bulk_pdf import BulkPDFRunner, Checkpoint, load_units, GENERATED, CACHED, FAILED
+from backend.pdf_cache import PDFCache
+
+UNITS = [{"subject_code": "3130703", "unit_number": n} for n in (1, 2, 3)] + \
+        [{"subject_code": "3140705", "unit_number": 1}]
+
+
+class FakeStages:
+    """Stage functions keyed on (subject_code, unit); `inputs` changes a unit's hash"""
+
+    def __init__(self, cache, fail=()):
+        self.cache = cache
+        self.fail = set(fail)
+        self.inputs = {}
+        self.synthesized = []
+        self.published = []
+        self.lock = threading.Lock()
+
+    def prepare(self, subject_code, unit_number, refresh=False):
+        input_hash = f"{subject_code}-{unit_number}-{self.inputs.get((subject_code, unit_number), 0)}".ljust(64, '0')
+        return {"subject_code": subject_code, "unit_number": unit_number, "data": {"syllabus": []},
+                "title": f"{subject_code} Unit {unit_number}", "input_hash": input_hash,
+                "filename": self.cache.filename('unit_guide', subject_code, unit_number, input_hash),
+                "cached": None if refresh else self.cache.get(input_hash)}
+
+    def synthesize(self, data, subject_code, unit_number):
+        with self.lock:
+            self.synthesized.append((subject_code, unit_number))
+        if (subject_code, unit_number) in self.fail:
+            return "I'm sorry, the AI service is currently experiencing issues. Please try again in a moment."
+        return f"# Unit {unit_number}"
+
+    @staticmethod
+    def render(job, content, file_path):
+        assert 'data' not in job
+        with open(file_path, 'w') as f:
+            f.write(content)
+
+    def reuse(self, job):
+        return {"filename": job["cached"]["filename"]}
+
+    def publish(self, job):
+        self.cache.put(job["input_hash"], 'unit_guide', job["subject_code"], job["unit_number"], job["filename"])
+        self.published.append((job["subject_code"], job["unit_number"]))
+        return {"filename": job["filename"]}
+
+
+@pytest.fixture
+def env(tmp_path):
+    cache = PDFCache(str(tmp_path / 'pdfs'), str(tmp_path / 'manifest.db'))
+    return cache, FakeStages(cache), str(tmp_path / 'checkpoint.json')
+
+
+def make_runner(cache, stages, checkpoint_path, **kwargs):
+    runner = BulkPDFRunner(Checkpoint(checkpoint_path), llm_workers=3, render_workers=2, render_processes=False,
+                           pace=False, cache=cache, prepare=stages.prepare, synthesize=stages.synthesize,
+                           render=stages.render, reuse=stages.reuse, publish=stages.publish, **kwargs)
+    runner.retry_backoff = 0
+    return runner
+
+
+def test_generates_all_then_only_changed(env):
+    cache, stages, path = env
+    lines = []
+    result = make_runner(cache, stages, path).run(UNITS, progress=lines.append)
+    assert (result['status'], result[GENERATED], result[FAILED]) == ('completed', 4, 0)
+    assert len(lines) == 4 and lines[-1].startswith("4/4 | generated 4") and 'ETA 0s' in lines[-1]
+    assert len(os.listdir(cache.pdf_dir)) == 4
+    assert sorted(stages.published) == sorted((u['subject_code'], u['unit_number']) for u in UNITS)
+
+    stages.synthesized.clear()
+    stages.inputs[("3130703", 2)] = 1
+    result = make_runner(cache, stages, path).run(UNITS)
+    assert (result[GENERATED], result[CACHED]) == (1, 3)
+    assert stages.synthesized == [("3130703", 2)]
+
+    stages.synthesized.clear()
+    result = make_runner(cache, stages, path).run(UNITS, force=True)
+    assert result[GENERATED] == 4 and len(stages.synthesized) == 4
+
+
+def test_failures_are_retried_then_checkpointed(env):
+    cache, stages, path = env
+    stages.fail = {("3130703", 3)}
+    result = make_runner(cache, stages, path, max_attempts=2).run(UNITS)
+    assert (result['status'], result[GENERATED], result[FAILED]) == ('partial', 3, 1)
+    assert stages.synthesized.count(("3130703", 3)) == 2
+    assert not [n for n in os.listdir(cache.pdf_dir) if n.endswith('.partial')]
+
+    with open(path) as f:
+        state = json.load(f)
+    assert state['units']['3130703:3']['status'] == FAILED
+    assert 'error' in state['units']['3130703:3']
+
+    stages.fail = set()
+    stages.synthesized.clear()
+    result = make_runner(cache, stages, path).run(UNITS, retry_failed=True)
+    assert (result['processed'], result[GENERATED]) == (1, 1)
+    assert stages.synthesized == [("3130703", 3)]
+    assert Checkpoint(path).failed() == []
+
+
+def test_interrupted_run_resumes(env):
+    cache, stages, path = env
+    checkpoint = Checkpoint(path)
+    checkpoint.start_run()
+    checkpoint.record("3130703:1", GENERATED)
+    checkpoint.record("3130703:2", FAILED, error="boom")
+
+    runner = make_runner(cache, stages, path)
+    assert [u['unit_number'] for u in runner.select(UNITS)] == [2, 3, 1]
+    result = runner.run(UNITS)
+    assert result['processed'] == 3
+    assert ("3130703", 1) not in stages.synthesized
+    assert not Checkpoint(path).interrupted
+
+    # A finished run does not limit the next one
+    assert len(make_runner(cache, stages, path).select(UNITS)) == 4
+
+
+def test_render_failure_marks_unit_failed(env):
+    cache, stages, path = env
+
+    def broken_render(job, content, file_path):
+        open(file_path, 'w').close()
+        if job['unit_number'] == 2:
+            raise ValueError("bad markup")
+
+    runner = make_runner(cache, stages, path)
+    runner._stages['render'] = broken_render
+    result = runner.run(UNITS)
+    assert (result[GENERATED], result[FAILED]) == (3, 1)
+    assert Checkpoint(path).units['3130703:2']['error'] == "render: bad markup"
+    assert not [n for n in os.listdir(cache.pdf_dir) if n.endswith('.partial')]
+
+
+class PagedClient:
+    """Supabase stand-in that, like the real API, returns at most `cap` rows per request"""
+
+    def __init__(self, tables, cap=1000):
+        self.tables, self.cap = tables, cap
+
+    def table(self, name):
+        client, rows = self, self.tables[name]
+
+        class Query:
+            def select(self, columns):
+                return self
+
+            def range(self, start, end):
+                self.data = rows[start:min(end + 1, start + client.cap)]
+                return self
+
+            def execute(self):
+                return self
+        return Query()
+
+
+def test_load_units_reads_every_page():
+    subjects = [{'id': i, 'subject_code': str(3130000 + i), 'subject_name': f"S{i}"} for i in range(300)]
+    syllabus = [{'subject_id': i, 'unit_number': unit, 'unit_title': None}
+                for i in range(300) for unit in range(1, 6) for _topic in range(2)]
+    client = PagedClient({'subjects': subjects, 'syllabus': syllabus})
+
+    units = load_units(client=client)
+    assert len(units) == 300 * 5
+    assert units[-1] == {'subject_code': '3130299', 'subject_name': 'S299', 'unit_number': 5,
+                         'unit_title': 'Unit 5'}
+    assert [u['unit_number'] for u in load_units(['3130007'], client=client)] == [1, 2, 3, 4, 5]
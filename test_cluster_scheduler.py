@@ -0,0 +1,133 @@
+"""
+Tests for cluster-wide scheduling (backend/cluster_scheduler.py)
+Uses temporary lock files and job state - no Supabase, scheduler never started
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from backend.cluster_scheduler import (ClusterScheduler, FileLeaderLock, LocalJobState,
+                                       parse_windows, quiet_until)
+
+
+class FakeClock:
+    def __init__(self, now: datetime):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_scheduler(tmp, clock, lock=None, quiet_hours='08:00-23:00'):
+    return ClusterScheduler(
+        'test', scheduler=BackgroundScheduler(),
+        lock=lock or FileLeaderLock('test', os.path.join(tmp, 'test.lock')),
+        state=LocalJobState('test', os.path.join(tmp, 'scheduler.sqlite3')),
+        quiet_hours=quiet_hours, clock=clock
+    )
+
+
+def test_quiet_windows():
+    windows = parse_windows('08:00-12:30, 22:00-02:00')
+    assert windows == [(480, 750), (1320, 120)]
+    assert quiet_until(datetime(2024, 5, 1, 9, 15), windows) == datetime(2024, 5, 1, 12, 30)
+    assert quiet_until(datetime(2024, 5, 1, 13, 0), windows) is None
+    # Wrapping window: before and after midnight
+    assert quiet_until(datetime(2024, 5, 1, 23, 0), windows) == datetime(2024, 5, 2, 2, 0)
+    assert quiet_until(datetime(2024, 5, 2, 1, 0), windows) == datetime(2024, 5, 2, 2, 0)
+    assert parse_windows('') == []
+
+
+def test_only_one_leader_and_failover():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'test.lock')
+        first, second = FileLeaderLock('test', path), FileLeaderLock('test', path)
+        assert first.try_acquire() and first.try_acquire()  # renewal is a no-op
+        assert not second.try_acquire()
+        first.release()
+        assert second.try_acquire()
+        second.release()
+
+
+def test_follower_skips_and_leader_records_state():
+    with tempfile.TemporaryDirectory() as tmp:
+        clock = FakeClock(datetime(2024, 5, 1, 3, 0))
+        calls = []
+        leader, follower = make_scheduler(tmp, clock), make_scheduler(tmp, clock)
+        for s in (leader, follower):
+            s.add_job(lambda: calls.append(1), 'nightly', heavy=True, jitter=0, catch_up=0, hour=2)
+        leader.check_leadership()
+        follower.check_leadership()
+        assert leader.is_leader and not follower.is_leader
+
+        assert follower.run_job('nightly') == 'follower'
+        assert leader.run_job('nightly') == 'ok'
+        assert calls == [1]
+        state = leader.state.get('nightly')
+        assert state['last_status'] == 'ok' and state['runs'] == 1
+
+        def broken():
+            raise ValueError("boom")
+        leader.add_job(broken, 'broken', jitter=0, hour=2)
+        assert leader.run_job('broken') == 'failed'
+        assert leader.state.get('broken')['last_error'] == 'boom'
+        leader.lock.release()
+
+
+def test_heavy_job_deferred_out_of_quiet_window():
+    with tempfile.TemporaryDirectory() as tmp:
+        clock = FakeClock(datetime(2024, 5, 1, 10, 0))
+        calls = []
+        scheduler = make_scheduler(tmp, clock)
+        scheduler.add_job(lambda: calls.append('heavy'), 'heavy', heavy=True, jitter=0, hour=10)
+        scheduler.add_job(lambda: calls.append('light'), 'light', jitter=0, hour=10)
+        scheduler.check_leadership()
+
+        assert scheduler.run_job('heavy') == 'deferred'
+        assert scheduler.run_job('light') == 'ok'
+        assert calls == ['light']
+        deferred = scheduler.scheduler.get_job('heavy:deferred')
+        assert deferred.trigger.run_date.replace(tzinfo=None) == datetime(2024, 5, 1, 23, 0)
+        scheduler.lock.release()
+
+
+def test_missed_run_caught_up_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        clock = FakeClock(datetime(2024, 5, 1, 2, 0))
+        scheduler = make_scheduler(tmp, clock, quiet_hours='')
+        scheduler.add_job(lambda: None, 'daily', jitter=0, hour=0, minute=0)
+        job = scheduler.jobs['daily']
+
+        # No recorded run (first boot, or a wiped local state): nothing to catch up
+        assert scheduler.missed_run(job, clock.now) is None
+
+        # Ran yesterday: today's midnight run was missed
+        scheduler.state.record('daily', datetime(2024, 4, 30, 0, 1).timestamp(), 'ok', 1.0)
+        due = scheduler.missed_run(job, clock.now)
+        assert due.replace(tzinfo=None) == datetime(2024, 5, 1, 0, 0)
+
+        # Becoming leader schedules one catch-up run
+        scheduler.check_leadership()
+        assert scheduler.scheduler.get_job('daily:catch-up') is not None
+
+        # After it ran, nothing is missed until the next midnight has passed
+        scheduler.state.record('daily', datetime(2024, 5, 1, 2, 1).timestamp(), 'ok', 1.0)
+        assert scheduler.missed_run(job, datetime(2024, 5, 1, 23, 0)) is None
+        later = scheduler.missed_run(job, datetime(2024, 5, 2, 0, 30))
+        assert later.replace(tzinfo=None) == datetime(2024, 5, 2, 0, 0)
+        scheduler.lock.release()
+
+
+if __name__ == "__main__":
+    test_quiet_windows()
+    test_only_one_leader_and_failover()
+    test_follower_skips_and_leader_records_state()
+    test_heavy_job_deferred_out_of_quiet_window()
+    test_missed_run_caught_up_once()
+    print("✅ All cluster scheduler tests passed")
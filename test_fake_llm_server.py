@@ -0,0 +1,99 @@
+"""
+Tests for the fake LLM provider (backend/fake_llm_server.py)
+Starts the server on a free local port - no AI credentials needed
+"""
+
+import os
+import sys
+import json
+import time
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.fake_llm_server import start_in_thread, canned_completion, sample_latency
+
+PAPER_PROMPT = "Subject: Data Structures\nGenerate a PREDICTED GTU EXAM PAPER (70 Marks total)"
+
+
+def _post(server, path, body):
+    url = f"http://127.0.0.1:{server.server_address[1]}{path}"
+    req = urllib.request.Request(url, data=json.dumps(body).encode(), method='POST',
+                                 headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req, timeout=10) as resp:
+        return resp.status, resp.read().decode()
+
+
+def test_canned_outputs_are_deterministic_and_valid():
+    messages = [{"role": "user", "content": PAPER_PROMPT}]
+    assert canned_completion(messages) == canned_completion(messages)
+
+    paper = json.loads(canned_completion(messages))
+    assert paper['subject_name'] == "Data Structures"
+    assert sum(q['marks'] for q in paper['questions']) == 70
+
+    batch = json.loads(canned_completion([{"role": "user", "content": "### Task id: 0\nx\n### Task id: 1\ny"}]))
+    assert [item['id'] for item in batch] == ['0', '1']
+
+
+def test_chat_completion_and_stream():
+    server = start_in_thread(latency='fixed:0.01', first_token='fixed:0.01', chunk_interval=0.0)
+    try:
+        status, body = _post(server, '/v1/chat/completions',
+                             {"model": "m", "messages": [{"role": "user", "content": PAPER_PROMPT}]})
+        data = json.loads(body)
+        assert status == 200
+        assert json.loads(data['choices'][0]['message']['content'])['questions']
+        assert data['usage']['completion_tokens'] > 0
+
+        status, body = _post(server, '/v1/chat/completions',
+                             {"model": "m", "stream": True, "messages": [{"role": "user", "content": "hi"}]})
+        chunks = [line[6:] for line in body.splitlines() if line.startswith('data: ')]
+        assert chunks[-1] == '[DONE]'
+        streamed = ''.join(json.loads(c)['choices'][0]['delta']['content'] for c in chunks[:-1])
+        assert streamed == canned_completion([{"role": "user", "content": "hi"}])
+    finally:
+        server.shutdown()
+
+
+def test_error_injection_and_stats():
+    server = start_in_thread(latency='fixed:0', rate_limit_rate=1.0)
+    try:
+        try:
+            _post(server, '/v1/chat/completions', {"messages": [{"role": "user", "content": "hi"}]})
+            assert False, "expected 429"
+        except urllib.error.HTTPError as e:
+            assert e.code == 429 and e.headers['Retry-After'] == '1'
+
+        _post(server, '/_config', {"rate_limit_rate": 0.0})
+        status, _ = _post(server, '/v1/chat/completions', {"messages": [{"role": "user", "content": "hi"}]})
+        assert status == 200
+
+        # The handler records the status just after the response is flushed
+        deadline = time.time() + 2
+        while server.provider.snapshot()['in_flight'] and time.time() < deadline:
+            time.sleep(0.01)
+        stats = server.provider.snapshot()
+        assert stats['status'] == {'429': 1, '200': 1}
+        assert stats['injected'] == {'rate_limit': 1}
+        assert stats['in_flight'] == 0
+    finally:
+        server.shutdown()
+
+
+def test_latency_distributions():
+    import random
+    rng = random.Random(0)
+    assert sample_latency('fixed:0.5', rng) == 0.5
+    assert 0.2 <= sample_latency('uniform:0.2,0.4', rng) <= 0.4
+    samples = sorted(sample_latency('lognormal:0.8,0.5', rng) for _ in range(2000))
+    assert 0.7 < samples[1000] < 0.9
+
+
+if __name__ == "__main__":
+    test_canned_outputs_are_deterministic_and_valid()
+    test_chat_completion_and_stream()
+    test_error_injection_and_stats()
+    test_latency_distributions()
+    print("✅ All fake provider tests passed")
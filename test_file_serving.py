@@ -0,0 +1,125 @@
+"""
+Tests for PDF file serving (backend/file_serving.py)
+A bare Flask app over a temporary directory - no Supabase needed
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from backend.file_serving import resolve_pdf, is_content_addressed, parse_accel_map, send_pdf
+
+flask = pytest.importorskip("flask")
+
+GUIDE = "unit_guide_3130703_unit3_0123456789abcdef.pdf"
+BODY = b"%PDF-1.4 " + bytes(range(256)) * 40
+
+
+@pytest.fixture
+def roots(tmp_path):
+    pdfs, legacy = tmp_path / 'pdfs', tmp_path / 'legacy'
+    pdfs.mkdir()
+    legacy.mkdir()
+    (pdfs / GUIDE).write_bytes(BODY)
+    (legacy / 'old_notes.pdf').write_bytes(b"%PDF-1.4 old")
+    (legacy / 'jobs.sqlite3').write_bytes(b"secret")
+    (tmp_path / 'outside.pdf').write_bytes(b"%PDF-1.4 outside")
+    os.symlink(tmp_path / 'outside.pdf', pdfs / 'link.pdf')
+    return [str(pdfs), str(legacy)]
+
+
+@pytest.fixture
+def client(roots):
+    app = flask.Flask(__name__)
+    accel = {}
+
+    @app.route('/api/pdf/<path:filename>')
+    def serve_pdf(filename):
+        return send_pdf(filename, roots=roots, accel_map=accel)
+
+    app.testing = True
+    test_client = app.test_client()
+    test_client.accel = accel
+    return test_client
+
+
+def test_resolve_refuses_traversal(roots):
+    assert resolve_pdf(GUIDE, roots)[1].endswith(GUIDE)
+    assert resolve_pdf('old_notes.pdf', roots)[0] == os.path.realpath(roots[1])
+    for name in ('../outside.pdf', 'x/../../outside.pdf', '/etc/passwd.pdf', 'link.pdf',
+                 'jobs.sqlite3', 'missing.pdf', 'a\x00.pdf', '..\\outside.pdf'):
+        assert resolve_pdf(name, roots) is None, name
+
+
+def test_flat_root_serves_only_its_own_files(tmp_path, roots):
+    flat = tmp_path / 'flat'
+    (flat / 'cache').mkdir(parents=True)
+    (flat / 'legacy.pdf').write_bytes(b"%PDF-1.4 legacy")
+    (flat / 'cache' / 'private.pdf').write_bytes(b"%PDF-1.4 private")
+    os.symlink(flat / 'cache' / 'private.pdf', flat / 'alias.pdf')
+
+    assert resolve_pdf('legacy.pdf', roots, [str(flat)])[0] == os.path.realpath(flat)
+    for name in ('cache/private.pdf', 'alias.pdf', './cache/private.pdf'):
+        assert resolve_pdf(name, roots, [str(flat)]) is None, name
+    # Regular roots are searched first and keep their subdirectories
+    assert resolve_pdf(GUIDE, roots, [str(flat)])[0] == os.path.realpath(roots[0])
+    assert resolve_pdf('cache/private.pdf', [str(flat)], []) is not None
+
+
+def test_content_addressed_names():
+    assert is_content_addressed(GUIDE)
+    assert not is_content_addressed("unit_guide_3130703_unit3_2026-01-01.pdf")
+    assert not is_content_addressed("old_notes.pdf")
+
+
+def test_full_and_conditional(client):
+    response = client.get(f'/api/pdf/{GUIDE}')
+    assert response.status_code == 200 and response.data == BODY
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert 'immutable' in response.headers['Cache-Control']
+    assert 'max-age=31536000' in response.headers['Cache-Control']
+    etag = response.headers['ETag']
+    assert not etag.startswith('W/')
+
+    response = client.get(f'/api/pdf/{GUIDE}', headers={'If-None-Match': etag})
+    assert response.status_code == 304 and response.data == b''
+
+    response = client.get('/api/pdf/old_notes.pdf')
+    assert 'immutable' not in response.headers['Cache-Control']
+    assert response.headers['ETag'] != etag
+
+
+def test_range_requests(client):
+    response = client.get(f'/api/pdf/{GUIDE}', headers={'Range': 'bytes=100-199'})
+    assert response.status_code == 206
+    assert response.data == BODY[100:200]
+    assert response.headers['Content-Range'] == f"bytes 100-199/{len(BODY)}"
+
+    etag = client.get(f'/api/pdf/{GUIDE}').headers['ETag']
+    resumed = client.get(f'/api/pdf/{GUIDE}', headers={'Range': 'bytes=5000-', 'If-Range': etag})
+    assert resumed.status_code == 206 and resumed.data == BODY[5000:]
+    stale = client.get(f'/api/pdf/{GUIDE}', headers={'Range': 'bytes=5000-', 'If-Range': '"other"'})
+    assert stale.status_code == 200 and stale.data == BODY
+
+    assert client.get(f'/api/pdf/{GUIDE}', headers={'Range': f'bytes={len(BODY) + 10}-'}).status_code == 416
+
+
+def test_not_found_and_traversal(client):
+    assert client.get('/api/pdf/jobs.sqlite3').status_code == 404
+    assert client.get('/api/pdf/..%2Foutside.pdf').status_code == 404
+    assert client.get('/api/pdf/link.pdf').status_code == 404
+
+
+def test_accel_redirect(client, roots):
+    client.accel.update(parse_accel_map(f"{roots[0]}=_protected_pdfs"))
+    response = client.get(f'/api/pdf/{GUIDE}')
+    assert response.status_code == 200 and response.data == b''
+    assert response.headers['X-Accel-Redirect'] == f"/_protected_pdfs/{GUIDE}"
+    assert response.headers['Content-Type'] == 'application/pdf'
+    etag = response.headers['ETag']
+    assert client.get(f'/api/pdf/{GUIDE}', headers={'If-None-Match': etag}).status_code == 304
+    # Roots without an internal location are still served directly
+    assert client.get('/api/pdf/old_notes.pdf').data == b"%PDF-1.4 old"
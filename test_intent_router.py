@@ -0,0 +1,83 @@
+"""
+Tests for the local intent router (backend/intent_router.py)
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.intent_router import IntentRouter
+
+router = IntentRouter()
+
+
+def test_youtube_url_routes_to_video_summary():
+    decision = router.route("Summarize this lecture: https://youtube.com/watch?v=abc123")
+    assert decision['action'] == 'summarize_video'
+    assert decision['parameters'] == {'video_url': 'https://youtube.com/watch?v=abc123'}
+
+
+def test_flashcards_extract_topic_and_count():
+    decision = router.route("generate 15 flashcards about TCP congestion control")
+    assert decision['action'] == 'generate_flashcards'
+    assert decision['parameters'] == {'topic': 'TCP congestion control', 'count': 15}
+
+
+def test_pdf_needs_subject_and_unit():
+    decision = router.route("PDF for unit 3 of 3140705")
+    assert decision['parameters'] == {'subject_code': '3140705', 'unit_number': 3}
+    # Missing subject code: leave it to the planner
+    assert router.route("can I get a pdf for unit 2") is None
+
+
+def test_ambiguous_requests_are_deferred():
+    for text in ["hi", "help me", "I am confused", "3140705", ""]:
+        assert router.route(text) is None, text
+
+
+def test_model_handles_phrasing_without_rule():
+    action, confidence, source = router.classify("where do I need to improve in 3140705")
+    assert action == 'analyze_weak_topics' and source == 'model'
+
+
+def test_tool_requests_phrased_as_questions_are_not_study_questions():
+    """The question catch-all must not swallow tool requests that start with what/how"""
+    action, _, _ = router.classify("what topics am I weak in")
+    assert action == 'analyze_weak_topics'
+    action, _, _ = router.classify("how should i schedule revision before exams")
+    assert action == 'create_study_plan'
+    # Neither has its required parameters, so the planner asks for them
+    for text in ["what topics am I weak in", "how should i schedule revision before exams"]:
+        assert router.route(text) is None, text
+    assert router.route("what topics am I weak in for 3140705")['action'] == 'analyze_weak_topics'
+    # Genuine study questions still answer locally
+    assert router.route("what is a deadlock")['action'] == 'answer_question'
+
+
+def test_filler_words_are_not_a_topic():
+    assert router.route("How do I make flashcards?") is None
+    assert router.route("can you make a quiz for me") is None
+    assert router.route("How do I make flashcards on paging?")['parameters']['topic'] == 'paging'
+
+
+def test_questions_about_a_tool_are_study_questions():
+    """Mentioning flashcards or a quiz in a question is not asking for one"""
+    assert router.classify("What are flashcards good for?") == ('answer_question', 0.8, 'rules')
+    assert router.classify("How does a quiz help learning?") == ('answer_question', 0.8, 'rules')
+    assert router.tool_actions("Is a pdf better than handwritten notes?") == []
+    # Request phrasing inside a question still asks for the tool
+    assert router.route("can you make a quiz on graphs?")['action'] == 'create_quiz'
+    assert router.route("How do I make flashcards on paging?")['action'] == 'generate_flashcards'
+
+
+if __name__ == "__main__":
+    test_youtube_url_routes_to_video_summary()
+    test_flashcards_extract_topic_and_count()
+    test_pdf_needs_subject_and_unit()
+    test_ambiguous_requests_are_deferred()
+    test_model_handles_phrasing_without_rule()
+    test_tool_requests_phrased_as_questions_are_not_study_questions()
+    test_filler_words_are_not_a_topic()
+    test_questions_about_a_tool_are_study_questions()
+    print("✅ All intent router tests passed")
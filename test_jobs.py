@@ -0,0 +1,157 @@
+"""
+Tests for the background job system (backend/jobs.py)
+Uses a temporary SQLite queue - no Supabase or AI credentials needed
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend import jobs
+from backend.jobs import JobQueue, JobWorkerPool, register_handler, PermanentJobError
+from backend.job_handlers import public_job_params, MAX_FLASHCARDS
+
+
+def _queue():
+    return JobQueue(os.path.join(tempfile.mkdtemp(), "jobs.sqlite3"))
+
+
+@register_handler('test_echo')
+def _echo(ctx, value):
+    ctx.progress(0.5, "halfway")
+    return {"value": value}
+
+
+_flaky_calls = {"n": 0}
+
+
+@register_handler('test_flaky')
+def _flaky(ctx):
+    _flaky_calls["n"] += 1
+    if _flaky_calls["n"] < 2:
+        raise RuntimeError("transient")
+    return "ok"
+
+
+@register_handler('test_permanent')
+def _permanent(ctx):
+    raise PermanentJobError("bad input")
+
+
+def test_submit_and_run():
+    """A submitted job is claimed, run and its result stored"""
+    queue = _queue()
+    job = queue.submit('test_echo', {'value': 42})
+    assert job['status'] == jobs.PENDING
+
+    pool = JobWorkerPool(queue)
+    assert pool.run_once()
+
+    done = queue.get(job['id'])
+    assert done['status'] == jobs.SUCCEEDED
+    assert done['result'] == {"value": 42}
+    assert done['progress'] == 1
+    assert not pool.run_once()
+
+
+def test_deduplicates_identical_pending_jobs():
+    """Identical pending jobs share one id; different params do not"""
+    queue = _queue()
+    first = queue.submit('test_echo', {'value': 1})
+    second = queue.submit('test_echo', {'value': 1})
+    other = queue.submit('test_echo', {'value': 2})
+
+    assert second['id'] == first['id']
+    assert second['deduplicated']
+    assert other['id'] != first['id']
+
+    # Once finished, the same request creates a fresh job
+    pool = JobWorkerPool(queue)
+    while pool.run_once():
+        pass
+    third = queue.submit('test_echo', {'value': 1})
+    assert third['id'] != first['id']
+
+
+def test_retry_with_backoff():
+    """Transient failures are retried after a backoff delay"""
+    queue = _queue()
+    job = queue.submit('test_flaky', {})
+    pool = JobWorkerPool(queue)
+
+    _flaky_calls["n"] = 0
+    assert pool.run_once()
+    retried = queue.get(job['id'])
+    assert retried['status'] == jobs.PENDING
+    assert retried['run_after'] > retried['updated_at']
+    assert retried['error'] == "transient"
+
+    # Not runnable until the backoff has elapsed
+    assert queue.claim("w") is None
+    queue._conn().execute("UPDATE jobs SET run_after = 0 WHERE id = ?", (job['id'],))
+
+    assert pool.run_once()
+    assert queue.get(job['id'])['status'] == jobs.SUCCEEDED
+
+
+def test_permanent_failure_is_not_retried():
+    queue = _queue()
+    job = queue.submit('test_permanent', {})
+    JobWorkerPool(queue).run_once()
+
+    failed = queue.get(job['id'])
+    assert failed['status'] == jobs.FAILED
+    assert failed['attempts'] == 1
+
+
+def test_lost_lease_cannot_overwrite_new_owner():
+    """A worker whose stale job was reclaimed cannot complete or fail it"""
+    queue = _queue()
+    job = queue.submit('test_echo', {'value': 1})
+    stale = queue.claim("old")
+    queue._conn().execute("UPDATE jobs SET heartbeat_at = 0 WHERE id = ?", (job['id'],))
+    current = queue.claim("new")
+    assert current['id'] == job['id'] and current['attempts'] == 2
+
+    assert not queue.complete(job['id'], "old", stale['attempts'], {"value": "stale"})
+    assert queue.fail(job['id'], "old", stale['attempts'], "late error") is None
+    # Same worker id, earlier attempt: still not the current lease
+    assert not queue.complete(job['id'], "new", stale['attempts'], {"value": "stale"})
+    assert queue.get(job['id'])['status'] == jobs.RUNNING
+
+    assert queue.complete(job['id'], "new", current['attempts'], {"value": 1})
+    done = queue.get(job['id'])
+    assert done['status'] == jobs.SUCCEEDED and done['result'] == {"value": 1} and done['error'] is None
+
+
+def test_public_job_params_are_whitelisted_and_clamped():
+    assert public_job_params('generate_flashcards', {'topic': ' paging ', 'count': 10**6}) == \
+        {'topic': 'paging', 'count': MAX_FLASHCARDS}
+    assert public_job_params('generate_unit_pdf', {'subject_code': 3130703, 'unit_number': '2', 'refresh': True}) == \
+        {'subject_code': '3130703', 'unit_number': 2, 'refresh': True}
+    rejected = [
+        ('predict_paper', {'subject_id': 7, 'force': True}),    # force is not a client option
+        ('predict_paper', {}),
+        ('generate_flashcards', {'topic': 'x', 'count': 0}),
+        ('generate_flashcards', {'topic': {'$ne': 1}}),
+        ('generate_flashcards_batch', {'topics': ['t'] * 1000}),
+        ('generate_unit_pdf', {'subject_code': '3130703', 'unit_number': 1, 'refresh': 'yes'}),
+    ]
+    for job_type, params in rejected:
+        try:
+            public_job_params(job_type, params)
+        except ValueError:
+            continue
+        raise AssertionError(f"{job_type} accepted {params}")
+
+
+if __name__ == "__main__":
+    test_submit_and_run()
+    test_deduplicates_identical_pending_jobs()
+    test_retry_with_backoff()
+    test_permanent_failure_is_not_retried()
+    test_lost_lease_cannot_overwrite_new_owner()
+    test_public_job_params_are_whitelisted_and_clamped()
+    print("✅ All job system tests passed")
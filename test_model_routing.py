@@ -0,0 +1,81 @@
+"""
+Tests for task-based model routing (backend/model_routing.py)
+Routes are resolved and recorded locally - no LLM needed
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('TELEMETRY_DB_PATH', os.path.join(tempfile.mkdtemp(), 'telemetry.db'))
+
+from backend.model_routing import ModelRoute, ModelRouter, bytez_completion, parse_overrides, SMALL, LARGE
+from backend.telemetry import Telemetry
+
+
+def test_short_tasks_go_small_and_synthesis_large():
+    router = ModelRouter()
+    assert router.resolve('classify').tier == SMALL
+    assert router.resolve('voice').model('groq') == 'llama-3.1-8b-instant'
+    assert router.resolve('study_guide').tier == LARGE
+    assert router.resolve('study_guide').max_tokens > router.resolve('voice').max_tokens
+
+
+def test_unknown_task_keeps_old_behaviour():
+    route = ModelRouter().resolve('something_new')
+    assert (route.task, route.tier, route.max_tokens) == ('default', LARGE, 1000)
+    assert route.model('bytez') == 'openai/gpt-4o'
+
+
+def test_overrides_route_beats_task():
+    overrides = parse_overrides("voice=large, notes=:5000, api.voice_chat=small:120, bad=huge, x")
+    assert overrides == {'voice': {'tier': LARGE}, 'notes': {'max_tokens': 5000},
+                         'api.voice_chat': {'tier': SMALL, 'max_tokens': 120}}
+    router = ModelRouter(overrides=overrides)
+    assert router.resolve('voice').tier == LARGE
+    assert router.resolve('notes').max_tokens == 5000
+    route = router.resolve('voice', route='api.voice_chat')
+    assert (route.tier, route.max_tokens) == (SMALL, 120)
+
+
+def test_disabled_routing_uses_large_tier():
+    route = ModelRouter(enabled=False).resolve('classify')
+    assert route.tier == LARGE
+    assert route.max_tokens == 1000
+
+
+def test_planner_route_fits_a_full_plan():
+    """A PLAN_MAX_STEPS plan of JSON steps must not be cut off at max_tokens"""
+    from backend.tool_plan import PLAN_MAX_STEPS
+    step = '{"id": "s1", "action": "generate_flashcards", "parameters": {"topic": "DBMS Unit 3", "count": 10}, "depends_on": []}'
+    assert ModelRouter().resolve('classify').max_tokens > PLAN_MAX_STEPS * len(step) // 4 + 150
+
+
+def test_bytez_params_and_truncation():
+    class Response:
+        def __init__(self, output, provider=None):
+            self.output, self.error, self.provider = output, None, provider
+
+    route = ModelRoute('voice', SMALL, 10, 0.5)
+    assert route.bytez_params() == {'max_tokens': 10, 'temperature': 0.5}  # openai/gpt-4o-mini
+    provider = {'choices': [{'finish_reason': 'length'}], 'usage': {'completion_tokens': 10}}
+    assert bytez_completion(Response('x'), 'x', route) == (None, None)
+    assert bytez_completion(Response('x' * 40, provider), 'x' * 40, route) == (provider['usage'], 'length')
+    # No provider response: judged by the output length
+    assert bytez_completion(Response('x' * 40), {'role': 'assistant', 'content': 'x' * 40}, route) == (None, 'length')
+
+
+def test_telemetry_by_task(tmp_path):
+    telemetry = Telemetry(str(tmp_path / 'telemetry.db'))
+    telemetry.record_llm_call('/agent/chat', 'groq', 'llama-3.1-8b-instant', 0.4, 100, 50, task='voice', tier=SMALL)
+    telemetry.record_llm_call('/agent/chat', 'groq', 'llama-3.1-8b-instant', 0.6, 100, 250, 'truncated',
+                              task='voice', tier=SMALL)
+    telemetry.record_llm_call('api.generate_notes', 'groq', 'llama-3.3-70b-versatile', 8.0, 500, 2000,
+                              task='notes', tier=LARGE)
+    summary = telemetry.summary()
+    voice = summary['by_task']['voice']
+    assert voice['tier'] == SMALL and voice['calls'] == 2 and voice['truncated'] == 1
+    assert summary['by_provider']['groq']['errors'] == 0
+    assert summary['latency']['p50'] == 0.6
+    assert 'gtu_llm_task_calls_total{task="voice",tier="small"' in telemetry.render_prometheus()
@@ -0,0 +1,100 @@
+"""
+Tests for the content-addressed PDF cache (backend/pdf_cache.py)
+Fake PDFs in a temporary directory - no reportlab or Supabase needed
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from backend.pdf_cache import PDFCache, unit_input_hash
+
+VERSIONS = {"prompt": 1, "template": 1}
+UNIT = {
+    "subject": {"id": 1, "subject_name": "DBMS"},
+    "syllabus": [{"id": 10, "unit_title": "Normalization", "content": "1NF, 2NF, 3NF", "updated_at": "2026-01-01"}],
+    "questions": [{"id": 5, "question_text": "Explain 3NF", "marks": 7},
+                  {"id": 6, "question_text": "Explain BCNF", "marks": 4}],
+    "notes": [{"id": 3, "source_name": "GTUStudy", "title": "Unit 3", "description": "Normal forms", "views": 10}],
+}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PDFCache(str(tmp_path / 'pdfs'), str(tmp_path / 'manifest.db'))
+
+
+def render(cache, input_hash, unit=3):
+    filename = cache.filename('unit_guide', '3130703', unit, input_hash)
+    with cache.writing(filename) as path:
+        with open(path, 'wb') as f:
+            f.write(b'%PDF-1.4 fake')
+    return cache.put(input_hash, 'unit_guide', '3130703', unit, filename, {'title': 'DBMS Unit 3'})
+
+
+def test_hash_ignores_order_and_volatile_columns():
+    base = unit_input_hash(UNIT, '3130703', 3, VERSIONS)
+    shuffled = dict(UNIT, questions=list(reversed(UNIT['questions'])),
+                    notes=[dict(UNIT['notes'][0], views=99, id=4)])
+    assert unit_input_hash(shuffled, '3130703', 3, VERSIONS) == base
+
+
+def test_hash_changes_with_inputs_and_versions():
+    base = unit_input_hash(UNIT, '3130703', 3, VERSIONS)
+    edited = dict(UNIT, questions=UNIT['questions'] + [{"question_text": "Explain 4NF", "marks": 3}])
+    assert unit_input_hash(edited, '3130703', 3, VERSIONS) != base
+    assert unit_input_hash(UNIT, '3130703', 3, {"prompt": 2, "template": 1}) != base
+    assert unit_input_hash(UNIT, '3130703', 4, VERSIONS) != base
+
+
+def test_put_get_and_missing_file(cache):
+    input_hash = unit_input_hash(UNIT, '3130703', 3, VERSIONS)
+    assert cache.get(input_hash) is None
+    entry = render(cache, input_hash)
+    assert entry['filename'] == f"unit_guide_3130703_unit3_{input_hash[:16]}.pdf"
+    assert entry['meta'] == {'title': 'DBMS Unit 3'}
+    assert cache.get(input_hash)['size'] == len(b'%PDF-1.4 fake')
+    assert not [n for n in os.listdir(cache.pdf_dir) if n.endswith('.partial')]
+
+    os.remove(cache.path(entry['filename']))
+    assert cache.get(input_hash) is None
+
+
+def test_failed_render_leaves_no_file(cache):
+    with pytest.raises(RuntimeError):
+        with cache.writing('unit_guide_x_unit1_abc.pdf') as path:
+            open(path, 'wb').close()
+            raise RuntimeError("render failed")
+    assert os.listdir(cache.pdf_dir) == []
+
+
+def test_gc_keeps_published_and_recent(cache):
+    old, new = 'a' * 64, 'b' * 64
+    old_entry, new_entry = render(cache, old), render(cache, new)
+    cache.mark_published(old)
+    time.sleep(0.01)
+    cache.mark_published(new)
+    orphan = cache.path('unit_guide_3130703_unit3_2026-01-01.pdf')
+    open(orphan, 'wb').close()
+    other = cache.path('flashcards_dbms.pdf')
+    open(other, 'wb').close()
+
+    # Inside the grace period nothing goes
+    assert cache.gc(grace=3600)['removed'] == 0
+    assert os.path.exists(orphan)
+
+    stats = cache.gc(grace=-1, dry_run=True)
+    assert (stats['removed'], stats['orphans']) == (1, 1)
+    assert os.path.exists(cache.path(old_entry['filename']))
+
+    cache.gc(grace=-1)
+    assert not os.path.exists(cache.path(old_entry['filename']))
+    assert not os.path.exists(orphan)
+    assert os.path.exists(cache.path(new_entry['filename']))
+    assert os.path.exists(other)  # not a unit guide
+    assert cache.published('unit_guide', '3130703', 3)['input_hash'] == new
+    assert cache.stats()['artifacts'] == 1
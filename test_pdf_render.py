@@ -0,0 +1,146 @@
+"""
+Tests for the study guide PDF renderer (backend/pdf_render.py)
+Renders to a temporary directory - needs reportlab only
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+pytest.importorskip("reportlab")
+
+from reportlab.platypus import HRFlowable, Paragraph, Preformatted, Table
+
+from backend.pdf_render import (BOLD, CODE, ITALIC, Document, Section, Theme, get_styles, inline, inline_runs,
+                                markdown_to_flowables, register_theme, render_batch, render_document, render_guide)
+
+GUIDE = """# Unit 3: Normalization
+A relation is in 2NF when a < b holds
+for **every** key.
+
+## Functional dependencies
+- First item
+  continued here
+- Second with `X -> Y`
+  - nested item
+1. Step one
+2. Step two
+
+| Form | Rule |
+|------|------|
+| 1NF | Atomic **values** |
+| BCNF | X \\| Y |
+
+```sql
+SELECT * FROM t WHERE a < b;
+```
+> Exam tip: remember BCNF.
+
+---
+### Summary
+See [the docs](https://example.com/x?a=1&b=2).
+"""
+
+
+def test_inline_runs_and_markup():
+    assert inline_runs("a **b** *c* `d*e*`") == [("a ", 0), ("b", BOLD), (" ", 0), ("c", ITALIC), (" ", 0),
+                                                 ("d*e*", CODE)]
+    assert inline_runs("**bold _and italic_**")[1] == ("and italic", BOLD | ITALIC)
+    assert inline("x < y & **z**") == "x &lt; y &amp; <b>z</b>"
+    assert inline("snake_case_name and 2*3*4") == "snake_case_name and 2*3*4"
+    assert inline("[docs](https://e.com/?a=1&b=2)") == '<link href="https://e.com/?a=1&amp;b=2" color="blue">docs</link>'
+
+
+def test_markdown_to_flowables_structure():
+    flowables = markdown_to_flowables(GUIDE)
+    kinds = [type(f).__name__ for f in flowables]
+    assert kinds == ['Paragraph', 'Paragraph', 'Paragraph', 'Paragraph', 'Paragraph', 'Paragraph',
+                     'Paragraph', 'Paragraph', 'Table', 'Spacer', 'Preformatted', 'Paragraph', 'HRFlowable',
+                     'Paragraph', 'Paragraph']
+    styles = get_styles()
+    assert flowables[0].style is styles['h1'] and flowables[2].style is styles['h2']
+    # Soft-wrapped lines join into one paragraph; '<' stays literal text
+    assert flowables[1].getPlainText() == "A relation is in 2NF when a < b holds for every key."
+    assert [f.fontName for f in flowables[1].frags][-2:] == ['Helvetica-Bold', 'Helvetica']
+    items = flowables[3:8]
+    assert [i.bulletText for i in items] == ['•', '•', '•', '1.', '2.']
+    assert items[0].getPlainText() == "First item continued here"
+    assert items[2].style.leftIndent > items[0].style.leftIndent
+    table = flowables[8]
+    assert isinstance(table, Table) and len(table._cellvalues) == 3
+    assert table._cellvalues[2][1].getPlainText() == "X | Y"
+    assert isinstance(flowables[10], Preformatted) and isinstance(flowables[12], HRFlowable)
+    assert flowables[11].style is styles['quote']
+    assert flowables[14].getPlainText() == "See the docs."
+
+
+def test_unclosed_code_block_and_empty_input():
+    assert markdown_to_flowables("") == []
+    flowables = markdown_to_flowables("```\nprint('x')")
+    assert len(flowables) == 1 and isinstance(flowables[0], Preformatted)
+
+
+def test_styles_compiled_once():
+    assert get_styles() is get_styles()
+    assert get_styles('classic') is get_styles('classic') and get_styles('classic') is not get_styles()
+    toned = get_styles('guide', 'highlight')
+    assert toned is get_styles('guide', 'highlight') and toned['h1'] is get_styles()['h1']
+    assert toned['body'].backColor is not None and get_styles()['body'].backColor is None
+    with pytest.raises(ValueError):
+        get_styles('no-such-theme')
+
+
+def test_render_guide(tmp_path):
+    path = str(tmp_path / 'guide.pdf')
+    pages = render_guide(path, "DBMS - Unit 3 Study Guide", ["Subject Code: 3130703 | Unit 3"], GUIDE * 12,
+                         note="Generated with AI")
+    assert pages > 2
+    with open(path, 'rb') as f:
+        assert f.read(4) == b'%PDF'
+
+
+def count_pages(path):
+    import re
+    with open(path, 'rb') as f:
+        return len(re.findall(rb"/Type\s*/Page[^s]", f.read()))
+
+
+def test_render_document_sections(tmp_path):
+    document = Document("Data Structures", ["Subject Code: 3130702"], theme='classic', sections=[
+        Section("Arrays store elements in **contiguous** memory.", heading="Unit 1: Arrays"),
+        Section("- O(1) access\n- fixed size", heading="KEY POINTS", level=2, tone='highlight'),
+        Section(heading="Unit 2: Stacks", new_page=True),
+        Section("A stack is LIFO.", heading="EXAMPLE", level=2, tone='example'),
+    ])
+    path = str(tmp_path / 'ds.pdf')
+    # No cover page in the classic theme: title and unit 1 share page 1
+    assert render_document(document, path) == 2 == count_pages(path)
+
+
+def test_render_document_ttf_theme(tmp_path):
+    font = '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+    if not os.path.exists(font):
+        pytest.skip("DejaVu fonts not installed")
+    register_theme(Theme('test-dejavu', font='TestDejaVu', font_files=(('normal', font),)))
+    styles = get_styles('test-dejavu')
+    assert styles['body'].fontName == 'TestDejaVu' and styles['h1'].fontName == 'TestDejaVu-bold'
+    path = str(tmp_path / 'unicode.pdf')
+    render_document(Document.from_markdown("Δ-notation", "Θ(n log n) ≤ **O(n²)**", theme='test-dejavu'), path)
+    with open(path, 'rb') as f:
+        assert b'DejaVuSans' in f.read()
+
+
+def test_render_batch_processes(tmp_path):
+    # Themes registered in the parent are available in the spawned workers
+    register_theme(Theme('test-batch', accent='#047857', cover_page=False))
+    jobs = [(Document.from_markdown(f"Guide {i}", GUIDE * (i + 1), theme='test-batch'), str(tmp_path / f"{i}.pdf"))
+            for i in range(3)]
+    jobs.append((Document.from_markdown("Broken", GUIDE, theme='missing-theme'), str(tmp_path / 'broken.pdf')))
+    results = render_batch(jobs, workers=2)
+    assert [count_pages(path) for _, path in jobs[:3]] == results[:3]
+    assert results[0] < results[2]
+    assert isinstance(results[3], ValueError)
+    assert render_batch([]) == []
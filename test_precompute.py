@@ -0,0 +1,150 @@
+"""
+Tests for the nightly precompute pipeline (backend/precompute.py)
+Uses a temporary artifact store and a fake generator - no Supabase or AI
+credentials needed
+"""
+
+import os
+import sys
+import tempfile
+import re
+import json
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.precompute import ArtifactStore, Precomputer, build_items, EXPLANATION, UNIT_SUMMARY
+
+SYLLABUS = [
+    {'subject_code': '3140705', 'unit': 1, 'topic': 'Stacks', 'content': 'push, pop'},
+    {'subject_code': '3140705', 'unit': 1, 'topic': 'Queues', 'content': 'enqueue, dequeue'},
+    {'subject_code': '3140705', 'unit': 2, 'topic': 'Trees', 'content': 'binary trees'},
+]
+
+
+def _store():
+    return ArtifactStore(os.path.join(tempfile.mkdtemp(), "artifacts.sqlite3"))
+
+
+class FakeGenerator:
+    def __init__(self, fail_on=None):
+        self.calls = 0
+        self.fail_on = fail_on
+        self.lock = threading.Lock()
+
+    def __call__(self, prompt, context, **route):
+        with self.lock:
+            self.calls += 1
+        if self.fail_on and self.fail_on in prompt:
+            return "I'm sorry, the AI service is currently experiencing issues. Please try again in a moment."
+        return f"generated: {prompt[:40]}"
+
+
+class BatchModel:
+    """Answers batched prompts with a JSON array, single prompts with text"""
+
+    def __init__(self):
+        self.calls = []
+        self.routes = []
+
+    def __call__(self, prompt, context, task=None, max_tokens=None):
+        ids = re.findall(r'### Task id: (\S+)', prompt)
+        self.calls.append(ids)
+        self.routes.append((task, max_tokens))
+        if not ids:
+            return f"single: {prompt[:40]}"
+        return json.dumps([{"id": i, "output": f"batched {i}"} for i in ids])
+
+
+def test_build_items():
+    items = build_items(SYLLABUS, [], {'3140705': 'Data Structures'})
+    kinds = [item.kind for item in items]
+    assert kinds.count(EXPLANATION) == 3
+    assert kinds.count(UNIT_SUMMARY) == 2
+
+
+def test_run_stores_artifacts_and_skips_unchanged():
+    store, generator = _store(), FakeGenerator()
+    precomputer = Precomputer(store=store, generate=generator, concurrency=2, batch_size=1, pace=False)
+
+    result = precomputer.run(items=build_items(SYLLABUS, []))
+    assert result['generated'] == 5 and result['failed'] == 0
+
+    artifact = store.get(EXPLANATION, '3140705', topic='  stacks ')
+    assert artifact['content'].startswith('generated:')
+    assert store.get(UNIT_SUMMARY, '3140705', unit=2) is not None
+
+    # Second run: nothing changed, nothing regenerated
+    result = precomputer.run(items=build_items(SYLLABUS, []))
+    assert result['generated'] == 0 and result['skipped'] == 5
+    assert generator.calls == 5
+
+
+def test_changed_content_is_regenerated():
+    store, generator = _store(), FakeGenerator()
+    precomputer = Precomputer(store=store, generate=generator, batch_size=1, pace=False)
+    precomputer.run(items=build_items(SYLLABUS, []))
+
+    changed = [dict(row) for row in SYLLABUS]
+    changed[2]['content'] = 'binary trees, AVL trees'
+    result = precomputer.run(items=build_items(changed, []))
+
+    # Trees explanation and the unit 2 summary
+    assert result['generated'] == 2
+    assert store.get(EXPLANATION, '3140705', topic='Trees')['revision'] == 2
+
+
+def test_failed_items_are_retried_next_run():
+    store = _store()
+    precomputer = Precomputer(store=store, generate=FakeGenerator(fail_on="'Queues'"), batch_size=1, pace=False)
+    result = precomputer.run(items=build_items(SYLLABUS, []))
+    assert result['status'] == 'partial' and result['failed'] == 1
+    assert store.get(EXPLANATION, '3140705', topic='Queues') is None
+
+    # Resume: only the failed item is left
+    precomputer = Precomputer(store=store, generate=FakeGenerator(), batch_size=1, pace=False)
+    result = precomputer.run(items=build_items(SYLLABUS, []))
+    assert result['generated'] == 1 and result['status'] == 'completed'
+
+
+
+def test_batched_run_uses_fewer_calls():
+    batch_model = BatchModel()
+    store = _store()
+    result = Precomputer(store=store, generate=batch_model, batch_size=4, pace=False).run(
+        items=build_items(SYLLABUS, []))
+
+    assert result['generated'] == 5 and result['failed'] == 0
+    # Long explanations get a call each; the 2 unit summaries share one
+    assert sorted(len(ids) for ids in batch_model.calls) == [0, 0, 0, 2]
+    # Each kind runs on its own model route; the batch gets a budget per item
+    assert sorted(batch_model.routes, key=str) == [('explanation', None)] * 3 + [('summary', 2 * 1500)]
+    assert store.get(UNIT_SUMMARY, '3140705', unit=1)['content'].startswith('batched')
+    assert store.get(EXPLANATION, '3140705', topic='Trees')['content'].startswith('single')
+
+
+def test_hash_tracks_item_inputs_not_prompt_text():
+    """Batching or prompt wording does not change an item's hash; its inputs do"""
+    first = {(i.kind, i.unit, i.topic): i.content_hash for i in build_items(SYLLABUS, [])}
+    renamed = {(i.kind, i.unit, i.topic): i.content_hash
+               for i in build_items(SYLLABUS, [], {'3140705': 'Data Structures'})}
+    assert first[(EXPLANATION, 1, 'Stacks')] != renamed[(EXPLANATION, 1, 'Stacks')]
+    assert first[(UNIT_SUMMARY, 1, None)] == renamed[(UNIT_SUMMARY, 1, None)]
+
+    store = _store()
+    result = Precomputer(store=store, generate=BatchModel(), batch_size=4, pace=False).run(
+        items=build_items(SYLLABUS, []))
+    assert result['failed'] == 0
+    # A run with a different batch size finds nothing stale
+    assert Precomputer(store=store, generate=FakeGenerator(), batch_size=1, pace=False).pending(
+        build_items(SYLLABUS, [])) == []
+
+
+if __name__ == "__main__":
+    test_build_items()
+    test_run_stores_artifacts_and_skips_unchanged()
+    test_changed_content_is_regenerated()
+    test_failed_items_are_retried_next_run()
+    test_batched_run_uses_fewer_calls()
+    test_hash_tracks_item_inputs_not_prompt_text()
+    print("✅ All precompute tests passed")
@@ -0,0 +1,213 @@
+"""
+Tests for the predicted paper cache (backend/prediction_cache.py)
+Uses a temporary SQLite store and an in-memory shared store - no Supabase
+or AI credentials needed
+"""
+
+import os
+import sys
+import time
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.prediction_cache import (PredictionCache, prediction_input_hash,
+                                      FRESH, STALE, MISS, PREDICTION_VERSION)
+
+PAPERS = [{'id': 1, 'year': '2023', 'exam_type': 'Winter'}, {'id': 2, 'year': '2024', 'exam_type': 'Summer'}]
+BANK = {'count': 120, 'max_id': 987}
+
+
+def _cache(**kwargs):
+    return PredictionCache(os.path.join(tempfile.mkdtemp(), "predictions.sqlite3"), **kwargs)
+
+
+class FakeSharedStore:
+    """In-memory stand-in for SupabasePredictionStore"""
+
+    def __init__(self, down=False):
+        self.entries, self.leases, self.reads = {}, {}, 0
+        self.lock = threading.Lock()
+        self.down = down
+
+    def _check(self):
+        if self.down:
+            raise ConnectionError("supabase unreachable")
+
+    def get(self, subject_id):
+        self._check()
+        self.reads += 1
+        return self.entries.get(str(subject_id))
+
+    def put(self, entry):
+        self._check()
+        self.entries[entry['subject_id']] = dict(entry)
+
+    def acquire(self, key, owner, lease):
+        self._check()
+        with self.lock:
+            holder = self.leases.get(key)
+            if holder and holder[0] != owner and holder[1] > time.time():
+                return False
+            self.leases[key] = (owner, time.time() + lease)
+            return True
+
+    def release(self, key, owner):
+        self._check()
+        with self.lock:
+            if self.leases.get(key, (None,))[0] == owner:
+                del self.leases[key]
+
+    def is_leased(self, key):
+        self._check()
+        return key in self.leases and self.leases[key][1] > time.time()
+
+
+def test_input_hash_tracks_inputs():
+    base = prediction_input_hash(PAPERS, BANK)
+    assert prediction_input_hash(list(reversed(PAPERS)), BANK) == base
+    assert prediction_input_hash(PAPERS + [{'id': 3, 'year': '2025', 'exam_type': 'Winter'}], BANK) != base
+    assert prediction_input_hash(PAPERS, {'count': 121, 'max_id': 988}) != base
+    assert prediction_input_hash(PAPERS, BANK, version=PREDICTION_VERSION + 1) != base
+
+
+def test_fresh_stale_and_miss():
+    cache = _cache(max_age=60)
+    key = prediction_input_hash(PAPERS, BANK)
+    assert cache.status(cache.get(7), key) == MISS
+
+    cache.put(7, key, {'questions': [1]})
+    entry = cache.get(7)
+    assert cache.status(entry, key) == FRESH
+    assert cache.status(entry, prediction_input_hash(PAPERS[:1], BANK)) == STALE
+
+    meta = cache.describe(entry, STALE, refreshing=True)
+    assert meta['status'] == STALE and meta['refreshing'] and meta['age_seconds'] >= 0
+
+    aged = _cache(max_age=0.05)
+    aged.put(7, key, {'questions': [1]})
+    time.sleep(0.1)
+    assert aged.status(aged.get(7), key) == STALE
+
+
+def test_single_flight_generates_once():
+    cache = _cache()
+    key = prediction_input_hash(PAPERS, BANK)
+    calls = []
+
+    def generate():
+        calls.append(1)
+        time.sleep(0.3)
+        return {'questions': ['q']}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.single_flight(7, key, generate, poll=0.05)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(results) == 5 and all(r and r['paper'] == {'questions': ['q']} for r in results)
+    assert not cache.is_leased(f"7:{key}")
+
+
+def test_single_flight_failure_and_expired_lease():
+    cache = _cache()
+    key = prediction_input_hash(PAPERS, BANK)
+    assert cache.single_flight(7, key, lambda: None) is None
+    assert cache.get(7) is None
+
+    # A crashed worker's lease expires and is taken over
+    assert cache.acquire(f"7:{key}", "dead-worker", lease=0.05)
+    time.sleep(0.1)
+    entry = cache.single_flight(7, key, lambda: {'questions': ['new']}, wait=1)
+    assert entry['paper'] == {'questions': ['new']}
+
+
+def test_forced_refresh_regenerates_fresh_entry_once():
+    """refresh skips a fresh entry, but concurrent refreshes still share one generation"""
+    cache = _cache()
+    key = prediction_input_hash(PAPERS, BANK)
+    cache.put(7, key, {'questions': ['old']})
+    assert cache.single_flight(7, key, lambda: {'questions': ['unused']})['paper'] == {'questions': ['old']}
+
+    calls = []
+
+    def generate():
+        calls.append(1)
+        time.sleep(0.3)
+        return {'questions': ['new']}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        cache.single_flight(7, key, generate, poll=0.05, force=True))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert [r['paper'] for r in results] == [{'questions': ['new']}] * 3
+
+
+def test_shared_store_survives_local_loss():
+    """A fresh local store (new deploy, or the other service) reads the shared entry"""
+    shared = FakeSharedStore()
+    key = prediction_input_hash(PAPERS, BANK)
+    _cache(shared=shared).put(7, key, {'questions': ['q']})
+
+    other = _cache(shared=shared)
+    entry = other.get(7)
+    assert entry['paper'] == {'questions': ['q']} and other.status(entry, key) == FRESH
+
+    # The copy is kept locally: a fresh entry for the same inputs needs no shared read
+    reads = shared.reads
+    assert other.get(7, key)['paper'] == {'questions': ['q']}
+    assert shared.reads == reads
+
+
+def test_single_flight_is_shared_across_hosts():
+    shared = FakeSharedStore()
+    key = prediction_input_hash(PAPERS, BANK)
+    calls = []
+
+    def generate():
+        calls.append(1)
+        time.sleep(0.3)
+        return {'questions': ['q']}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        _cache(shared=shared).single_flight(7, key, generate, poll=0.05))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert [r['paper'] for r in results] == [{'questions': ['q']}] * 3
+    assert not shared.leases
+
+
+def test_unreachable_shared_store_falls_back_to_local():
+    cache = _cache(shared=FakeSharedStore(down=True))
+    key = prediction_input_hash(PAPERS, BANK)
+    entry = cache.single_flight(7, key, lambda: {'questions': ['q']})
+    assert entry['paper'] == {'questions': ['q']}
+    assert cache.get(7)['paper'] == {'questions': ['q']}
+    assert not cache.is_leased(f"7:{key}")
+
+
+if __name__ == "__main__":
+    test_input_hash_tracks_inputs()
+    test_fresh_stale_and_miss()
+    test_single_flight_generates_once()
+    test_single_flight_failure_and_expired_lease()
+    test_forced_refresh_regenerates_fresh_entry_once()
+    test_shared_store_survives_local_loss()
+    test_single_flight_is_shared_across_hosts()
+    test_unreachable_shared_store_falls_back_to_local()
+    print("✅ All prediction cache tests passed")
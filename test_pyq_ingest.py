@@ -0,0 +1,167 @@
+"""
+Tests for cached PDF extraction and question ingestion
+(backend/pyq_parser.py extract_texts, backend/pyq_ingest.py)
+Builds small PDFs with reportlab - no Supabase or network needed
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from reportlab.pdfgen import canvas
+
+from backend.pyq_parser import PdfTextCache, extract_texts, parse_paper_text
+from backend.pyq_ingest import question_rows, upsert_questions, content_hash
+
+LINES = [
+    "GUJARAT TECHNOLOGICAL UNIVERSITY",
+    "BE - SEMESTER-III (NEW) EXAMINATION - {session} {year}",
+    "Subject Code:3130702 Date:18-01-2024",
+    "Subject Name:Data Structures",
+    "Q.1 (a) Explain primitive data types. 03",
+    "(b) {second} 04",
+    "(c) Explain stack operations in detail. 07",
+    "*************",
+]
+
+
+def write_paper(path, session, year, second):
+    pdf = canvas.Canvas(path)
+    y = 800
+    for line in LINES:
+        pdf.drawString(40, y, line.format(session=session, year=year, second=second))
+        y -= 20
+    pdf.save()
+
+
+class FakeTable:
+    """questions table keyed by content_hash, with Supabase's upsert semantics"""
+
+    def __init__(self, client):
+        self.client, self.data, self._action = client, None, None
+
+    def select(self, columns):
+        self._columns = [c.strip() for c in columns.split(',')]
+        return self
+
+    def in_(self, column, values):
+        self._action = ('select', [self.client.rows[v] for v in values if v in self.client.rows])
+        return self
+
+    def upsert(self, rows, on_conflict=None):
+        self.client.calls.append((len(rows), on_conflict))
+        self._action = ('upsert', rows)
+        return self
+
+    def execute(self):
+        action, rows = self._action
+        if action == 'select':
+            self.data = [{c: row.get(c) for c in self._columns} for row in rows]
+        else:
+            if self.client.fail and len(self.client.calls) == 2:
+                raise RuntimeError("boom")
+            for row in rows:
+                self.client.rows[row['content_hash']] = dict(row)
+        return self
+
+
+class FakeClient:
+    def __init__(self, fail=False):
+        self.calls, self.fail, self.rows = [], fail, {}
+
+    def table(self, name):
+        assert name == "questions"
+        return FakeTable(self)
+
+
+def test_extraction_is_cached_by_content_hash():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PdfTextCache(os.path.join(tmp, 'text.sqlite3'))
+        a, b = os.path.join(tmp, 'a.pdf'), os.path.join(tmp, 'b.pdf')
+        write_paper(a, 'WINTER', 2023, 'Explain binary search.')
+        write_paper(b, 'SUMMER', 2024, 'Explain binary search.')
+
+        texts, stats = extract_texts([a, b], workers=1, cache=cache)
+        assert stats['extracted'] == 2 and stats['cached'] == 0 and stats['pages'] == 2
+        assert stats['pages_per_second'] > 0
+        assert "Subject Code:3130702" in texts[a]['text']
+
+        # A copy under another name is the same content: no extraction at all
+        c = os.path.join(tmp, 'copy.pdf')
+        with open(a, 'rb') as src, open(c, 'wb') as dst:
+            dst.write(src.read())
+        texts, stats = extract_texts([a, b, c, os.path.join(tmp, 'missing.pdf')], workers=1, cache=cache)
+        assert stats['cached'] == 3 and stats['extracted'] == 0 and stats['failed'] == 1
+        assert stats['pages_per_second'] is None
+        assert texts[c]['sha256'] == texts[a]['sha256']
+
+
+def test_question_rows_count_papers_and_keep_latest_session():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PdfTextCache(os.path.join(tmp, 'text.sqlite3'))
+        paths = []
+        for session, year, second in [('SUMMER', 2022, 'Explain binary search.'),
+                                      ('WINTER', 2023, 'Explain Binary Search!'),
+                                      ('SUMMER', 2024, 'Explain hashing.')]:
+            paths.append(os.path.join(tmp, f"{session}{year}.pdf"))
+            write_paper(paths[-1], session, year, second)
+        texts, _ = extract_texts(paths, workers=1, cache=cache)
+
+    papers = []
+    for path in paths:
+        paper = parse_paper_text(texts[path]['text'], source=os.path.basename(path))
+        paper['sha256'] = texts[path]['sha256']
+        paper['subject_id'] = 7
+        papers.append(paper)
+    papers.append(dict(papers[0], subject_id=None))  # unmatched subject: skipped
+
+    rows = {r['question_text']: r for r in question_rows(papers)}
+    assert len(rows) == 4
+    stack = rows["Explain stack operations in detail."]
+    assert stack['paper_count'] == stack['frequency_count'] == 3 and stack['is_important']
+    assert (stack['last_asked_year'], stack['last_asked_session']) == (2024, 'Summer')
+    assert stack['marks'] == 7 and stack['question_type'] == 'Long' and stack['gtu_section'] == 'Q1'
+    # Case and punctuation variants are the same question; latest wording wins
+    search = rows["Explain Binary Search!"]
+    assert search['paper_count'] == 2 and search['content_hash'] == content_hash(7, "explain binary search")
+    assert rows["Explain hashing."]['paper_count'] == 1 and not rows["Explain hashing."]['is_important']
+
+
+def test_upserts_are_batched_and_failures_counted():
+    rows = [{'content_hash': str(i), 'question_text': f"q{i}"} for i in range(12)]
+    client = FakeClient()
+    assert upsert_questions(rows, client, batch_size=5) == \
+        {'upserted': 12, 'existing': 0, 'upsert_failed': 0, 'batches': 3}
+    assert client.calls == [(5, 'content_hash'), (5, 'content_hash'), (2, 'content_hash')]
+
+    assert upsert_questions(rows, FakeClient(fail=True), batch_size=5) == \
+        {'upserted': 7, 'existing': 0, 'upsert_failed': 5, 'batches': 3}
+
+
+def test_reingest_keeps_curated_and_cluster_columns():
+    """unit_number, is_important and the dedup frequency survive a re-ingest"""
+    first = [{'content_hash': 'a', 'question_text': 'Explain stack', 'unit_number': 0, 'paper_count': 2,
+              'frequency_count': 2, 'is_important': True, 'last_asked_year': 2023}]
+    client = FakeClient()
+    upsert_questions(first, client)
+    # Curated mapping and a dedup write-back happen between ingests
+    client.rows['a'].update(unit_number=3, frequency_count=5, is_important=False)
+
+    again = [dict(first[0], paper_count=3, frequency_count=3, is_important=True, last_asked_year=2024),
+             {'content_hash': 'b', 'question_text': 'Explain queue', 'unit_number': 0, 'paper_count': 1,
+              'frequency_count': 1, 'is_important': False}]
+    assert upsert_questions(again, client)['existing'] == 1
+    stack = client.rows['a']
+    assert (stack['unit_number'], stack['frequency_count'], stack['is_important']) == (3, 5, False)
+    assert stack['paper_count'] == 3 and stack['last_asked_year'] == 2024
+    assert client.rows['b']['unit_number'] == 0 and client.rows['b']['frequency_count'] == 1
+
+
+if __name__ == "__main__":
+    test_extraction_is_cached_by_content_hash()
+    test_question_rows_count_papers_and_keep_latest_session()
+    test_upserts_are_batched_and_failures_counted()
+    test_reingest_keeps_curated_and_cluster_columns()
+    print("✅ All pyq ingest tests passed")
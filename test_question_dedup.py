@@ -0,0 +1,228 @@
+"""
+Tests for near-duplicate question detection (backend/question_dedup.py)
+Uses a temporary index - no Supabase needed
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from backend.question_dedup import MinHasher, DedupIndex, cluster_signatures, candidate_pairs, write_back
+from backend.question_stats import records_from_question_bank
+
+BANK = [
+    "Explain collision resolution techniques with example.",
+    "What is collision? Explain collision resolution techniques with example.",
+    "EXPLAIN COLLISION RESOLUTION TECHNIQUES WITH EXAMPLE",
+    "Differentiate primitive and non-primitive data structures.",
+    "Differentiate Primitive and Non Primitive Data Structures",
+    "Explain the working of SISO shift register.",
+    "Write an algorithm for insertion in a circular queue.",
+]
+
+
+def item(key, text, source='questions', source_id=None, paper=None, subject=None):
+    return {'key': key, 'source': source, 'source_id': source_id if source_id is not None else key.split(':')[-1],
+            'text': text, 'paper': paper, 'subject': subject}
+
+
+def temp_index(tmp):
+    return DedupIndex(os.path.join(tmp, 'dedup.sqlite3'))
+
+
+def test_signatures_estimate_jaccard():
+    hasher = MinHasher()
+    sig = hasher.signatures(BANK + ["x"])
+    assert sig.shape == (len(BANK) + 1, hasher.num_perm)
+    assert MinHasher.similarity(sig[0], sig[2]) == 1.0  # case and punctuation do not matter
+    assert MinHasher.similarity(sig[0], sig[1]) > 0.6
+    assert MinHasher.similarity(sig[0], sig[5]) < 0.2
+    # Identical signatures share every band bucket
+    keys = hasher.band_keys(sig)
+    assert (keys[0] == keys[2]).all() and not (keys[0] == keys[5]).any()
+
+
+def test_candidate_pairs_cover_bucket_without_all_pairs():
+    band_keys = np.array([[1], [1], [1], [1], [2], [3], [3]])
+    pairs = {tuple(p) for p in candidate_pairs(band_keys)}
+    # Bucket of 4: chained to the predecessor and starred to the first member
+    assert pairs == {(0, 1), (1, 2), (2, 3), (0, 2), (0, 3), (5, 6)}
+
+    hasher = MinHasher()
+    sig = hasher.signatures(BANK)
+    labels, stats = cluster_signatures(sig, hasher.band_keys(sig))
+    assert labels.tolist() == [0, 0, 0, 3, 3, 5, 6]
+    assert stats['matched_pairs'] >= 3
+
+
+def test_rebuild_picks_canonical_and_true_frequency():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = temp_index(tmp)
+        items = [
+            item('pyq:a:0', BANK[0], 'pyq', 'DSW2023.pdf#0', paper='a'),
+            item('pyq:b:3', BANK[1], 'pyq', 'DSS2024.pdf#3', paper='b'),
+            item('pyq:c:1', BANK[2], 'pyq', 'DSW2024.pdf#1', paper='c'),
+            item('pyq:c:9', BANK[0], 'pyq', 'DSW2024.pdf#9', paper='c'),  # same paper twice
+            item('important_questions:4', BANK[0], 'important_questions'),
+            item('questions:12', BANK[2]),
+            item('questions:7', BANK[0]),
+            item('questions:3', BANK[3]),
+            item('questions:9', BANK[4]),
+            item('questions:5', BANK[5]),
+        ]
+        stats = index.rebuild(items)
+        assert stats['items'] == 10 and stats['clusters'] == 3 and stats['duplicates'] == 7
+
+        clusters = sorted(index.clusters(min_size=2), key=lambda c: -len(c['members']))
+        collision, primitive = clusters
+        assert collision['canonical'] == 'questions:7'  # a questions row, smallest id
+        assert collision['frequency'] == 3 and collision['papers'] == 3  # distinct papers, not copies
+        assert primitive['canonical'] == 'questions:3' and primitive['frequency'] == 2  # no paper evidence
+
+
+def test_incremental_add_matches_merges_and_reindexes():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = temp_index(tmp)
+        index.rebuild([item('questions:1', BANK[0]), item('questions:2', BANK[5])])
+
+        result = index.add([item('questions:1', BANK[0]), item('questions:3', BANK[2]),
+                            item('questions:4', BANK[6])])
+        assert result['items'] == 2 and result['matched'] == 1  # unchanged questions:1 is skipped
+        assert index.stats() == {'items': 4, 'clusters': 3, 'duplicates': 1}
+        affected = {c['cluster']: c for c in index.clusters(result['affected_clusters'])}
+        assert {m['key'] for m in affected['questions:1']['members']} == {'questions:1', 'questions:3'}
+
+        # A question whose text changed leaves its old cluster
+        index.add([item('questions:3', "Explain heap sort.")])
+        assert index.stats() == {'items': 4, 'clusters': 4, 'duplicates': 0}
+        assert index.add([])['items'] == 0
+
+
+class FakeQuery:
+    def __init__(self, calls, table, values):
+        self.calls, self.table, self.values = calls, table, values
+
+    def in_(self, column, ids):
+        self.calls.append((self.table, self.values, column, sorted(ids)))
+        return self
+
+    def execute(self):
+        return self
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+
+    def table(self, name):
+        client = self
+
+        class Table:
+            def update(self, values):
+                return FakeQuery(client.calls, name, values)
+        return Table()
+
+
+def test_write_back_groups_updates():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = temp_index(tmp)
+        index.rebuild([item('questions:7', BANK[0]), item('questions:12', BANK[2]),
+                       item('important_questions:4', BANK[1], 'important_questions'),
+                       item('questions:3', BANK[3]), item('questions:9', BANK[4]), item('questions:5', BANK[5])])
+        client = FakeClient()
+        result = write_back(index.clusters(), client, batch_size=500)
+
+    # One request per distinct update; a singleton only loses its canonical id
+    assert result == {'requests': 4, 'failed_rows': 0}
+    assert sorted(client.calls, key=str) == sorted([
+        ('questions', {'canonical_question_id': 7, 'frequency_count': 3}, 'id', [7, 12]),
+        ('important_questions', {'frequency': 3}, 'id', [4]),
+        ('questions', {'canonical_question_id': 3, 'frequency_count': 2}, 'id', [3, 9]),
+        ('questions', {'canonical_question_id': None}, 'id', [5]),
+    ], key=str)
+
+
+def test_text_change_rewrites_the_cluster_it_left():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = temp_index(tmp)
+        index.rebuild([item('questions:1', BANK[0]), item('questions:2', BANK[2]), item('questions:3', BANK[1])])
+        assert len(index.clusters(min_size=2)[0]['members']) == 3
+
+        # The canonical row is reworded into a different question
+        result = index.add([item('questions:1', "Explain heap sort.")])
+        client = FakeClient()
+        write_back(index.clusters(result['affected_clusters']), client)
+
+    assert sorted(client.calls, key=str) == sorted([
+        ('questions', {'canonical_question_id': 2, 'frequency_count': 2}, 'id', [2, 3]),
+        ('questions', {'canonical_question_id': None}, 'id', [1]),
+    ], key=str)
+    # ...so the question bank counts both questions again
+    rows = [{'id': 1, 'question_text': "Explain heap sort.", 'canonical_question_id': None, 'frequency_count': 3},
+            {'id': 2, 'question_text': BANK[2], 'canonical_question_id': 2, 'frequency_count': 2},
+            {'id': 3, 'question_text': BANK[1], 'canonical_question_id': 2, 'frequency_count': 2}]
+    assert [r['text'] for r in records_from_question_bank(rows)] == ["Explain heap sort.", BANK[2]]
+
+
+def test_deleted_rows_are_evicted_and_paper_counts_kept():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = temp_index(tmp)
+        index.rebuild([item('questions:1', BANK[0]), item('questions:2', BANK[2]), item('questions:3', BANK[3])])
+        assert index.keys(['questions']) == {'questions:1', 'questions:2', 'questions:3'}
+
+        result = index.remove(['questions:1'])
+        assert result == {'removed': 1, 'affected_clusters': ['questions:2']}
+        assert index.stats() == {'items': 2, 'clusters': 2, 'duplicates': 0}
+
+        # The ingested paper count is the frequency of a row no parsed paper backs
+        client = FakeClient()
+        write_back(index.clusters(result['affected_clusters'], paper_counts={'questions:2': 4}), client)
+    assert client.calls == [('questions', {'canonical_question_id': None, 'frequency_count': 4}, 'id', [2])]
+
+
+def test_clusters_never_span_subjects():
+    """The same wording in two subjects is two questions"""
+    text = "Explain normalization with example."
+    with tempfile.TemporaryDirectory() as tmp:
+        index = temp_index(tmp)
+        index.rebuild([item('questions:1', text, subject='3130703'), item('questions:2', text, subject='3140705'),
+                       item('important_questions:3', text, 'important_questions', subject='3130703')])
+        assert index.stats() == {'items': 3, 'clusters': 2, 'duplicates': 1}
+
+        result = index.add([item('pyq:abc:0', text, 'pyq', 'a.pdf#0', paper='abc', subject='3140705')])
+        assert result['matched'] == 1
+        members = {m['key'] for c in index.clusters(result['affected_clusters']) for m in c['members']}
+        assert members == {'questions:2', 'pyq:abc:0'}
+
+        # Moving a question to another subject re-clusters it there
+        moved = index.add([item('questions:2', text, subject='3130703')])
+        assert moved['items'] == 1
+        assert index.stats() == {'items': 4, 'clusters': 2, 'duplicates': 2}
+        assert {m['key'] for c in index.clusters(min_size=3) for m in c['members']} == \
+            {'questions:1', 'questions:2', 'important_questions:3'}
+
+
+def test_question_bank_skips_non_canonical_rows():
+    rows = [
+        {'id': 7, 'question_text': BANK[0], 'marks': 7, 'canonical_question_id': 7, 'frequency_count': 3},
+        {'id': 12, 'question_text': BANK[2], 'marks': 7, 'canonical_question_id': 7, 'frequency_count': 3},
+        {'id': 5, 'question_text': BANK[5], 'marks': 4, 'canonical_question_id': None, 'frequency_count': 1},
+    ]
+    assert [r['text'] for r in records_from_question_bank(rows)] == [BANK[0], BANK[5]]
+
+
+if __name__ == "__main__":
+    test_signatures_estimate_jaccard()
+    test_candidate_pairs_cover_bucket_without_all_pairs()
+    test_rebuild_picks_canonical_and_true_frequency()
+    test_incremental_add_matches_merges_and_reindexes()
+    test_write_back_groups_updates()
+    test_text_change_rewrites_the_cluster_it_left()
+    test_deleted_rows_are_evicted_and_paper_counts_kept()
+    test_clusters_never_span_subjects()
+    test_question_bank_skips_non_canonical_rows()
+    print("✅ All question dedup tests passed")
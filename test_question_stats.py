@@ -0,0 +1,145 @@
+"""
+Tests for the pyq parser and question frequency engine
+(backend/pyq_parser.py, backend/question_stats.py)
+Uses inline paper text - no PDFs, Supabase or AI credentials needed
+"""
+
+import os
+import sys
+import json
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.pyq_parser import parse_paper_text
+from backend.question_stats import (QuestionFrequencyModel, records_from_pyqs, records_from_question_bank,
+                                    polish_paper, GTU_LAYOUT)
+
+PAPER = """Seat No.: ________ Enrolment No.___________
+GUJARAT TECHNOLOGICAL UNIVERSITY
+BE - SEMESTER–III (NEW) EXAMINATION – WINTER 2023
+Subject Code:3130702 Date:18-01-2024
+Subject Name:Data Structures
+Instructions:
+1. Attempt all questions.
+Q.1 (a) Explain primitive and Non-primitive data types in detail. 03
+ (b) Explain Binary Search with example. 04
+ (c) Explain Asymptotic Notations in detail. 07
+Q.2 (a) Differentiate: Static and Dynamic Memory Allocation 03
+ (b) Construct BST for following sequence and find inorder traversal for
+the same.
+35, 46, 29, 2, 24 ,68, 44, 57, 1, 22, 79, 71
+04
+ (c) What is stack? Explain operations on stack in detail. 07
+  OR
+ (c) What is queue? Explain operations on queue in detail. 07
+ 2/2
+Q.3 (a) Define the following terms: (a) Change, (b) Grow 03
+*************
+"""
+
+def synthetic_papers():
+    """
+    Eight sessions. 'stack push pop' is Q.1(c) every time; every other slot
+    draws from a rotating pool of 48 topics, so each of those is asked in
+    four consecutive sessions.
+    """
+    papers = []
+    sessions = [(y, s) for y in (2021, 2022, 2023, 2024) for s in ("Summer", "Winter")]
+    for index, (year, session) in enumerate(sessions):
+        questions = []
+        slot = 0
+        for q_number, part, marks, alternative in GTU_LAYOUT:
+            if (q_number, part, alternative) == (1, 'c', False):
+                topic = "stack push pop operations"
+            else:
+                topic = f"concept{(index * 12 + slot) % 48}"
+                slot += 1
+            questions.append({'q_number': q_number, 'part': part, 'marks': marks,
+                              'text': f"Explain {topic} with suitable example.", 'alternative': alternative})
+        papers.append({'subject_code': '3130702', 'subject_name': 'Data Structures', 'year': year,
+                       'session': session, 'source': f"DS{session[0]}{year}.pdf", 'questions': questions})
+    return papers
+
+
+def test_parse_paper_text():
+    paper = parse_paper_text(PAPER, source="DSW2023.pdf")
+    assert paper['subject_code'] == '3130702' and paper['subject_name'] == 'Data Structures'
+    assert paper['session'] == 'Winter' and paper['year'] == 2023
+
+    questions = paper['questions']
+    assert [(q['q_number'], q['part'], q['marks']) for q in questions] == [
+        (1, 'a', 3), (1, 'b', 4), (1, 'c', 7), (2, 'a', 3), (2, 'b', 4), (2, 'c', 7), (2, 'c', 7), (3, 'a', 3)]
+    assert questions[4]['text'].startswith("Construct BST") and "79, 71" in questions[4]['text']
+    assert questions[6]['alternative'] and questions[6]['text'].startswith("What is queue")
+    assert "(b) Grow" in questions[7]['text']  # inline list, not a new part
+
+
+def test_predicts_full_paper_ranked_by_recency_weighted_frequency():
+    records = records_from_pyqs(synthetic_papers())
+    model = QuestionFrequencyModel().fit(records)
+    assert model.paper_count == 8
+
+    start = time.perf_counter()
+    paper = model.predict_paper("Data Structures", "3130702")
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    assert elapsed_ms < 100, elapsed_ms
+
+    questions = paper['questions']
+    assert len(questions) == len(GTU_LAYOUT)
+    assert sum(q['marks'] for q in questions if not q['q_number'].endswith('OR')) == 70
+    assert len({q['question'] for q in questions}) == len(questions)  # no question twice
+
+    top = model.top_questions(1)[0]
+    assert "stack push pop" in top['question'] and top['times_asked'] == 8
+    q1c = next(q for q in questions if q['q_number'] == '1(c)')
+    assert "stack push pop" in q1c['question'] and q1c['probability'] == 'High'
+    assert paper['analysis']['marks_distribution'] == {3: 64, 4: 64, 7: 72}
+
+
+def test_question_bank_units_and_weights():
+    rows = [
+        {'question_text': 'Explain deadlock prevention', 'marks': 7, 'unit_number': 3, 'frequency_count': 6},
+        {'question_text': 'Explain deadlock prevention techniques', 'marks': 7, 'unit_number': 3, 'frequency_count': 2},
+        {'question_text': 'Define process control block', 'marks': 3, 'unit_number': 1, 'frequency_count': 1},
+        {'question_text': 'Explain paging with diagram', 'marks': 4, 'unit_number': 2, 'frequency_count': 3},
+    ]
+    model = QuestionFrequencyModel().fit(records_from_question_bank(rows))
+    assert len(model.groups) == 3
+    deadlock = model.top_questions(1)[0]
+    assert deadlock['times_asked'] == 8 and deadlock['unit'] == 3
+    coverage = model.unit_coverage()
+    assert coverage[3] > coverage[2] > coverage[1]
+
+
+def test_empty_model_predicts_empty_paper():
+    for records in ([], [{'text': '?? --', 'marks': 3}]):
+        model = QuestionFrequencyModel().fit(records)
+        assert model.paper_count == 0
+        paper = model.predict_paper("DS", "3130702")
+        assert paper['questions'] == [] and paper['analysis']['papers_analyzed'] == 0
+        assert paper['analysis']['most_repeated'] == []
+
+
+def test_polish_keeps_structure_and_falls_back():
+    paper = QuestionFrequencyModel().fit(records_from_pyqs(synthetic_papers())).predict_paper("DS")
+
+    def good(prompt, system=None):
+        texts = json.loads(prompt[prompt.index('['):])
+        return json.dumps([t.upper() for t in texts])
+
+    polished = polish_paper(paper, good)
+    assert polished['polished'] and polished['questions'][0]['question'].isupper()
+    assert [q['marks'] for q in polished['questions']] == [q['marks'] for q in paper['questions']]
+
+    assert polish_paper(paper, lambda p, s=None: '["too short"]') is paper
+    assert polish_paper(paper, lambda p, s=None: None) is paper
+
+
+if __name__ == "__main__":
+    test_parse_paper_text()
+    test_predicts_full_paper_ranked_by_recency_weighted_frequency()
+    test_question_bank_units_and_weights()
+    test_empty_model_predicts_empty_paper()
+    test_polish_keeps_structure_and_falls_back()
+    print("✅ All question stats tests passed")
@@ -0,0 +1,137 @@
+"""
+Tests for AI route rate limiting (backend/rate_limit.py)
+Uses a temporary SQLite store - no Flask app or AI credentials needed
+"""
+
+import os
+import sys
+import time
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend import rate_limit
+from backend.rate_limit import RateLimiter, RateLimitExceeded
+
+
+def _limiter():
+    return RateLimiter(os.path.join(tempfile.mkdtemp(), "ratelimit.sqlite3"))
+
+
+def test_token_bucket_burst_then_refill():
+    """Burst capacity is honoured, then requests wait for refill"""
+    limiter = _limiter()
+    results = [limiter.try_acquire_token("ai:ip:1", rate=10.0, capacity=3)[0] for _ in range(4)]
+    assert results == [True, True, True, False]
+
+    allowed, retry_after = limiter.try_acquire_token("ai:ip:1", rate=10.0, capacity=3)
+    assert not allowed and 0 < retry_after <= 0.1
+
+    time.sleep(0.15)
+    assert limiter.try_acquire_token("ai:ip:1", rate=10.0, capacity=3)[0]
+    # Buckets are per key
+    assert limiter.try_acquire_token("ai:ip:2", rate=10.0, capacity=3)[0]
+
+
+def test_wait_for_token_queues_briefly():
+    """An empty bucket waits for the next token instead of failing"""
+    limiter = _limiter()
+    rate_limit.RATE_LIMITS['test'] = (20.0, 1)
+    limiter.wait_for_token('test', 'user:a')
+    started = time.time()
+    limiter.wait_for_token('test', 'user:a', max_wait=1)
+    assert 0.02 < time.time() - started < 0.5
+
+
+def test_wait_for_token_rejects_with_retry_after():
+    limiter = _limiter()
+    rate_limit.RATE_LIMITS['slow'] = (0.01, 1)
+    limiter.wait_for_token('slow', 'user:b')
+    try:
+        limiter.wait_for_token('slow', 'user:b', max_wait=0.5)
+        assert False, "expected RateLimitExceeded"
+    except RateLimitExceeded as e:
+        assert e.retry_after > 50
+
+
+def test_provider_concurrency_limit():
+    """At most N calls hold a provider slot; others wait for a release"""
+    limiter = _limiter()
+    rate_limit.PROVIDER_CONCURRENCY['fake'] = 2
+    first = limiter.wait_for_slot('fake')
+    second = limiter.wait_for_slot('fake')
+    assert limiter.slots_in_use('fake') == 2
+
+    try:
+        limiter.wait_for_slot('fake', max_wait=0.2)
+        assert False, "expected RateLimitExceeded"
+    except RateLimitExceeded:
+        pass
+
+    threading.Timer(0.2, limiter.release_slot, args=(first,)).start()
+    third = limiter.wait_for_slot('fake', max_wait=2)
+    assert third
+    limiter.release_slot(second)
+    limiter.release_slot(third)
+    assert limiter.slots_in_use('fake') == 0
+
+
+def test_bounded_queue_rejects_when_full():
+    limiter = _limiter()
+    rate_limit.PROVIDER_CONCURRENCY['busy'] = 1
+    limiter.wait_for_slot('busy')
+    try:
+        limiter.wait_for_slot('busy', max_wait=0.2, max_waiters=0)
+        assert False, "expected RateLimitExceeded"
+    except RateLimitExceeded as e:
+        assert "saturated" in str(e)
+
+
+def test_client_ip_ignores_spoofed_forwarded_entries():
+    """Only entries appended by trusted proxies count; the client's own are ignored"""
+    spoofed = "1.1.1.1, 2.2.2.2, 203.0.113.7"
+    assert rate_limit.client_ip(spoofed, "10.0.0.1", hops=1) == "203.0.113.7"
+    assert rate_limit.client_ip(spoofed, "10.0.0.1", hops=2) == "2.2.2.2"
+    # No trusted proxy, or fewer entries than hops: the socket peer
+    assert rate_limit.client_ip(spoofed, "10.0.0.1", hops=0) == "10.0.0.1"
+    assert rate_limit.client_ip("203.0.113.7", "10.0.0.1", hops=2) == "10.0.0.1"
+    assert rate_limit.client_ip("", None, hops=1) == "unknown"
+
+
+def test_request_identity_prefers_jwt_user():
+    import jwt
+    from backend.config import Config
+    token = jwt.encode({'sub': '42', 'type': 'access'}, Config.JWT_SECRET_KEY, algorithm='HS256')
+    assert rate_limit.request_identity(f"Bearer {token}", "9.9.9.9", "10.0.0.1") == "user:42"
+    forged = jwt.encode({'sub': '42', 'type': 'access'}, 'not-the-secret', algorithm='HS256')
+    assert rate_limit.request_identity(f"Bearer {forged}", "9.9.9.9", "10.0.0.1").startswith("ip:")
+    refresh = jwt.encode({'sub': '42', 'type': 'refresh'}, Config.JWT_SECRET_KEY, algorithm='HS256')
+    assert rate_limit.bearer_identity(f"Bearer {refresh}") is None
+
+
+def test_flask_identity_behind_proxy_fix(monkeypatch):
+    """A forged X-Forwarded-For prefix does not give the client a new bucket"""
+    from flask import Flask
+    monkeypatch.setattr(rate_limit, 'TRUSTED_PROXY_HOPS', 1)
+    app = rate_limit.install_proxy_fix(Flask(__name__))
+
+    @app.route('/whoami')
+    def whoami():
+        return rate_limit._flask_identity()
+
+    client = app.test_client()
+    for spoof in ("1.1.1.1", "2.2.2.2"):
+        response = client.get('/whoami', headers={'X-Forwarded-For': f"{spoof}, 203.0.113.7"})
+        assert response.get_data(as_text=True) == "ip:203.0.113.7"
+
+
+if __name__ == "__main__":
+    test_token_bucket_burst_then_refill()
+    test_wait_for_token_queues_briefly()
+    test_wait_for_token_rejects_with_retry_after()
+    test_provider_concurrency_limit()
+    test_bounded_queue_rejects_when_full()
+    test_client_ip_ignores_spoofed_forwarded_entries()
+    test_request_identity_prefers_jwt_user()
+    print("✅ All rate limit tests passed")
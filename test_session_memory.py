@@ -0,0 +1,119 @@
+"""
+Tests for per-session agent memory (backend/session_memory.py)
+Uses a temporary SQLite store - no FastAPI or AI credentials needed
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.session_memory import SessionMemory
+
+
+def _memory(**kwargs):
+    kwargs.setdefault('persist', True)
+    return SessionMemory(db_path=os.path.join(tempfile.mkdtemp(), "sessions.sqlite3"), **kwargs)
+
+
+def test_sessions_are_isolated_and_bounded():
+    memory = _memory(max_turns=3)
+    for i in range(5):
+        memory.add_turn("alice", "user", f"alice {i}")
+    memory.add_turn("bob", "user", "bob 0")
+
+    assert [t['content'] for t in memory.recent("alice", limit=0)] == ["alice 2", "alice 3", "alice 4"]
+    assert [t['content'] for t in memory.recent("bob")] == ["bob 0"]
+    assert memory.recent(None) == []
+    assert "alice 4" in memory.context("alice") and "bob" not in memory.context("alice")
+
+
+def test_lru_eviction_by_count_bytes_and_idle():
+    memory = _memory(persist=False, max_sessions=2)
+    memory.add_turn("a", "user", "x")
+    memory.add_turn("b", "user", "x")
+    memory.recent("a")  # touch a, so b is least recently used
+    memory.add_turn("c", "user", "x")
+    assert set(memory._sessions) == {"a", "c"}
+    assert memory.stats()['evictions'] == 1
+
+    memory = _memory(persist=False, max_bytes=2000)
+    for i in range(20):
+        memory.add_turn(f"s{i}", "user", "y" * 500)
+    stats = memory.stats()
+    assert stats['bytes'] <= 2000 and stats['sessions'] < 20
+
+    memory = _memory(persist=False, idle_ttl=0.05)
+    memory.add_turn("old", "user", "x")
+    time.sleep(0.1)
+    memory.add_turn("new", "user", "x")
+    assert list(memory._sessions) == ["new"]
+
+
+def test_evicted_session_reloads_from_store():
+    memory = _memory(max_sessions=1, max_turns=4)
+    for i in range(6):
+        memory.add_turn("alice", "user", f"turn {i}")
+    memory.add_turn("bob", "user", "hi")  # evicts alice from memory
+    assert "alice" not in memory._sessions
+
+    assert [t['content'] for t in memory.recent("alice", limit=0)] == [f"turn {i}" for i in range(2, 6)]
+    rows = memory._conn().execute("SELECT COUNT(*) FROM session_turns WHERE session_id = 'alice'").fetchone()[0]
+    assert rows == 4
+
+    # A second instance (another worker) sees the same context
+    other = SessionMemory(db_path=memory.db_path, persist=True)
+    assert other.recent("bob")[0]['content'] == "hi"
+
+
+def test_cached_session_sees_other_workers_turns():
+    """A session cached in one worker picks up turns another worker wrote"""
+    first = _memory(max_turns=3)
+    second = SessionMemory(db_path=first.db_path, persist=True, max_turns=3)
+    first.add_turn("alice", "user", "question 1")
+    assert [t['content'] for t in second.recent("alice", limit=0)] == ["question 1"]
+
+    second.add_turn("alice", "assistant", "answer 1")
+    first.add_turn("alice", "user", "question 2")
+    second.add_turn("alice", "assistant", "answer 2")
+    expected = ["answer 1", "question 2", "answer 2"]
+    assert [t['content'] for t in first.recent("alice", limit=0)] == expected
+    assert [t['content'] for t in second.recent("alice", limit=0)] == expected
+    assert first.stats()['bytes'] == second.stats()['bytes'] > 0
+
+
+def test_persisted_feedback_is_bounded(monkeypatch):
+    from backend import session_memory
+    monkeypatch.setattr(session_memory, 'SESSION_FEEDBACK_LIMIT', 3)
+    memory = _memory()
+    for rating in (1, 1, 5, 5, 5):
+        memory.add_feedback({"user_input": "q", "agent_response": "a", "rating": rating})
+    assert memory._conn().execute("SELECT COUNT(*) FROM session_feedback").fetchone()[0] == 3
+    summary = SessionMemory(db_path=memory.db_path, persist=True).feedback_summary()
+    # Totals cover every entry; low-rated examples come from the retained window
+    assert summary['count'] == 5 and summary['avg_rating'] == 17 / 5
+    assert summary['low_rated'] == 0
+
+
+def test_feedback_summary():
+    for persist in (True, False):
+        memory = _memory(persist=persist)
+        assert memory.feedback_summary()['count'] == 0
+        for rating in (5, 4, 1, 2):
+            memory.add_feedback({"user_input": f"q{rating}", "agent_response": "a",
+                                 "rating": rating, "comment": "meh"}, session_id="s")
+        summary = memory.feedback_summary()
+        assert summary['count'] == 4 and summary['avg_rating'] == 3
+        assert summary['low_rated'] == 2
+        assert [f['user_input'] for f in summary['low_rated_examples']] == ["q2", "q1"]
+
+
+if __name__ == "__main__":
+    test_sessions_are_isolated_and_bounded()
+    test_lru_eviction_by_count_bytes_and_idle()
+    test_evicted_session_reloads_from_store()
+    test_cached_session_sees_other_workers_turns()
+    test_feedback_summary()
+    print("✅ All session memory tests passed")
@@ -0,0 +1,129 @@
+"""
+Tests for structured LLM output (backend/structured_output.py)
+Broken JSON the way models actually produce it - no LLM needed
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('TELEMETRY_DB_PATH', os.path.join(tempfile.mkdtemp(), 'telemetry.db'))
+
+import pytest
+
+from backend.structured_output import (TolerantJSONParser, StructuredOutputError, parse_structured, repair_json,
+                                       PLANNER_DECISION, PREDICTED_PAPER, GTU_ANSWER)
+from backend.telemetry import get_telemetry
+
+
+def test_clean_json_needs_no_repair():
+    value, repairs = repair_json('{"answer": "ok", "unit": "Unit 1"}')
+    assert value == {"answer": "ok", "unit": "Unit 1"}
+    assert repairs == []
+
+
+@pytest.mark.parametrize("text, expected, repair", [
+    ('```json\n{"a": 1}\n```', {"a": 1}, 'surrounding_text'),
+    ('{"a": [1, 2,], }', {"a": [1, 2]}, 'trailing_comma'),
+    ('{"a": 1 "b": 2}', {"a": 1, "b": 2}, 'missing_comma'),
+    ('{"a": "b" "c": 1}', {"a": "b", "c": 1}, 'missing_comma'),
+    ('["x" "y"]', ["x", "y"], 'missing_comma'),
+    ("{'a': 'x', b: True, 'c': None}", {"a": "x", "b": True, "c": None}, 'single_quotes'),
+    ('{"a": "line1\nline2"}', {"a": "line1\nline2"}, 'control_character'),
+    ('{"a": "He said "hi" there"}', {"a": 'He said "hi" there'}, 'unescaped_quote'),
+    ('{"a": "C:\\d"}', {"a": "C:\\d"}, 'invalid_escape'),
+    ('{"a": 1, // note\n "b": 2}', {"a": 1, "b": 2}, 'comments'),
+])
+def test_common_defects_are_repaired(text, expected, repair):
+    value, repairs = repair_json(text)
+    assert value == expected
+    assert repair in repairs
+
+
+def test_truncated_output_keeps_complete_items():
+    text = '{"questions": [{"q_number": "1(a)", "question": "Define DBMS"}, {"q_number": "1(b)", "quest'
+    value, repairs = repair_json(text)
+    assert value == {"questions": [{"q_number": "1(a)", "question": "Define DBMS"}, {"q_number": "1(b)"}]}
+    assert 'truncated' in repairs
+
+
+def test_truncated_string_value_is_kept():
+    value, _ = repair_json('{"answer": "1. Normalization removes redund')
+    assert value == {"answer": "1. Normalization removes redund"}
+
+
+def test_missing_comma_after_string_keeps_the_value():
+    text = '{"questions":[{"q_number":"1","question":"Explain DBMS" "marks": 7}]}'
+    value, repairs = repair_json(text)
+    assert value == {"questions": [{"q_number": "1", "question": "Explain DBMS", "marks": 7}]}
+    assert repairs == ['missing_comma']
+    # Streamed one character at a time, the quote is only judged once the next key is complete
+    parser = TolerantJSONParser()
+    for ch in text:
+        parser.feed(ch)
+    assert parser.finish() == value
+
+
+def test_incremental_feed_matches_one_shot():
+    text = "Here you go:\n```json\n{'action': 'generate_pdf', parameters: {'unit_number': 3,},}\n```"
+    parser = TolerantJSONParser()
+    for ch in text:
+        parser.feed(ch)
+    assert parser.finish() == repair_json(text)[0]
+
+
+def test_snapshot_mid_stream():
+    parser = TolerantJSONParser().feed('{"a": [1, 2, {"b": "hel')
+    assert parser.snapshot() == {"a": [1, 2, {"b": "hel"}]}
+
+
+def test_no_json_raises():
+    with pytest.raises(StructuredOutputError):
+        repair_json("I cannot help with that.")
+
+
+def test_paper_schema_coerces_and_drops_broken_parts():
+    text = ('{"subject_name": "DBMS", "questions": ['
+            '{"q_number": "1(a)", "question": "Define DBMS", "marks": "3", "probability": "high"},'
+            '{"q_number": "1(b)", "marks": 4},'
+            '{"q_number": "1(c)", "question": "Explain ER model", "marks": 7.0, "probability": "Medium"}]}')
+    paper = parse_structured(text, PREDICTED_PAPER)
+    assert [q["q_number"] for q in paper["questions"]] == ["1(a)", "1(c)"]
+    assert paper["questions"][0]["marks"] == 3
+    assert paper["questions"][0]["probability"] == "High"
+    assert paper["questions"][1]["marks"] == 7
+
+
+def test_paper_without_valid_questions_fails():
+    with pytest.raises(StructuredOutputError) as e:
+        parse_structured('{"subject_name": "DBMS", "questions": []}', PREDICTED_PAPER)
+    assert e.value.errors
+
+
+def test_answer_list_and_plain_text():
+    answer = parse_structured('{"answer": ["Point 1", "Point 2"], "unit": "Unit 2"}', GTU_ANSWER)
+    assert answer["answer"] == "Point 1\nPoint 2"
+    answer = parse_structured("Normalization is the process of ...", GTU_ANSWER, text_field="answer")
+    assert answer == {"answer": "Normalization is the process of ..."}
+
+
+def test_planner_decision_and_plan():
+    decision = parse_structured({"role": "assistant", "content": '{"action": "create_quiz", "confidence": "0.8"}'},
+                                PLANNER_DECISION)
+    assert decision == {"action": "create_quiz", "parameters": {}, "reasoning": "", "confidence": 0.8}
+    plan = parse_structured('{"steps": [{"id": "s1", "action": "generate_pdf"}]}', PLANNER_DECISION)
+    assert plan["steps"][0]["depends_on"] == []
+
+
+def test_outcomes_are_counted():
+    telemetry = get_telemetry()
+    parse_structured('{"answer": "ok"}', GTU_ANSWER)
+    parse_structured('{"answer": "ok",}', GTU_ANSWER)
+    with pytest.raises(StructuredOutputError):
+        parse_structured('{"unit": "Unit 1"}', GTU_ANSWER)
+    counts = telemetry.summary()['structured_outputs']['gtu_answer']
+    assert counts['clean'] >= 1 and counts['repaired'] >= 1 and counts['failed'] >= 1
+    metrics = telemetry.render_prometheus()
+    assert 'gtu_structured_repairs_total' in metrics
+    assert 'repair="trailing_comma"' in metrics
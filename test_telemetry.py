@@ -0,0 +1,142 @@
+"""
+Tests for LLM call telemetry (backend/telemetry.py)
+Uses a temporary SQLite snapshot store - no Prometheus or AI credentials needed
+"""
+
+import os
+import re
+import sys
+import subprocess
+import tempfile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+from backend import telemetry
+from backend.telemetry import LATENCY_BUCKETS, Telemetry, metrics_access_denied
+
+
+def _telemetry(db_path=None):
+    return Telemetry(db_path or os.path.join(tempfile.mkdtemp(), "telemetry.sqlite3"))
+
+
+def _samples(text):
+    """Prometheus exposition -> {metric{labels}: value}"""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_histogram_bucket_counts():
+    """Each latency lands in the first bucket whose bound it does not exceed"""
+    t = _telemetry()
+    for latency in (0.05, 0.1, 0.3, 7.0, 500.0):
+        t.record_llm_call('chat', 'groq', 'llama-3.1-8b-instant', latency)
+
+    hist = t.histograms['chat\x1fgroq\x1fllama-3.1-8b-instant']
+    assert len(hist['buckets']) == len(LATENCY_BUCKETS) + 1
+    assert hist['buckets'][LATENCY_BUCKETS.index(0.1)] == 2
+    assert hist['buckets'][LATENCY_BUCKETS.index(0.5)] == 1
+    assert hist['buckets'][LATENCY_BUCKETS.index(10.0)] == 1
+    assert hist['buckets'][-1] == 1
+    assert sum(hist['buckets']) == 5
+    assert abs(hist['sum'] - 507.45) < 1e-9
+
+
+def test_prometheus_exposition_format():
+    t = _telemetry()
+    t.record_llm_call('chat', 'bytez', 'openai/gpt-4o', 0.3, prompt_tokens=1000, completion_tokens=500)
+    t.record_llm_call('chat', 'bytez', 'openai/gpt-4o', 3.0, status='truncated')
+    t.record_cache('answers', hit=True, route='chat')
+    text = t.render_prometheus()
+
+    assert text.endswith("\n")
+    assert "# TYPE gtu_llm_calls_total counter" in text
+    assert "# TYPE gtu_llm_latency_seconds histogram" in text
+    sample = re.compile(r'^gtu_[a-z_]+\{([a-z_]+="[^"]*")(,[a-z_]+="[^"]*")*\} \S+$')
+    for line in text.splitlines():
+        if line.startswith('# TYPE '):
+            assert line.split()[-1] in ('counter', 'histogram'), line
+        else:
+            assert sample.match(line), line
+            float(line.rsplit(' ', 1)[1])
+
+    samples = _samples(text)
+    base = 'route="chat",provider="bytez",model="openai/gpt-4o"'
+    assert samples[f'gtu_llm_calls_total{{{base},status="ok"}}'] == 1
+    assert samples[f'gtu_llm_calls_total{{{base},status="truncated"}}'] == 1
+    assert samples[f'gtu_llm_prompt_tokens_total{{{base}}}'] == 1000
+    assert samples[f'gtu_llm_cost_usd_total{{{base}}}'] == (1000 * 2.50 + 500 * 10.00) / 1_000_000
+    assert samples['gtu_cache_hits_total{route="chat",cache="answers"}'] == 1
+
+    # Buckets are cumulative and end at +Inf == _count
+    buckets = [samples[f'gtu_llm_latency_seconds_bucket{{{base},le="{bound}"}}']
+               for bound in list(LATENCY_BUCKETS) + ['+Inf']]
+    assert buckets == sorted(buckets)
+    assert buckets[LATENCY_BUCKETS.index(0.25)] == 0 and buckets[LATENCY_BUCKETS.index(0.5)] == 1
+    assert buckets[-1] == samples[f'gtu_llm_latency_seconds_count{{{base}}}'] == 2
+    assert abs(samples[f'gtu_llm_latency_seconds_sum{{{base}}}'] - 3.3) < 1e-6
+
+
+def test_metrics_merged_across_processes():
+    """/metrics served by one worker includes what other workers recorded"""
+    db_path = os.path.join(tempfile.mkdtemp(), "telemetry.sqlite3")
+    script = (
+        "from backend.telemetry import Telemetry\n"
+        f"t = Telemetry({db_path!r})\n"
+        "t.record_llm_call('chat', 'groq', 'llama-3.1-8b-instant', 0.2, prompt_tokens=10)\n"
+        "t.record_llm_call('notes', 'groq', 'llama-3.1-8b-instant', 40.0)\n"
+        "t.record_fallback('bytez', 'groq', route='chat')\n"
+        "t._maybe_flush(force=True)\n"
+    )
+    subprocess.run([sys.executable, '-c', script], cwd=ROOT, check=True)
+
+    local = _telemetry(db_path)
+    local.record_llm_call('chat', 'groq', 'llama-3.1-8b-instant', 0.2, prompt_tokens=5)
+    samples = _samples(local.render_prometheus())
+
+    base = 'route="chat",provider="groq",model="llama-3.1-8b-instant"'
+    assert samples[f'gtu_llm_calls_total{{{base},status="ok"}}'] == 2
+    assert samples[f'gtu_llm_prompt_tokens_total{{{base}}}'] == 15
+    assert samples[f'gtu_llm_latency_seconds_bucket{{{base},le="0.25"}}'] == 2
+    assert samples['gtu_llm_latency_seconds_count{route="notes",provider="groq",model="llama-3.1-8b-instant"}'] == 1
+    assert samples['gtu_llm_fallbacks_total{route="chat",from_provider="bytez",to_provider="groq"}'] == 1
+
+    summary = local.summary()
+    assert summary['total_calls'] == 3 and summary['fallbacks_total'] == 1
+    assert summary['by_route']['notes']['calls'] == 1
+
+
+def test_stale_snapshots_are_not_merged():
+    """A worker that stopped flushing a day ago no longer counts"""
+    db_path = os.path.join(tempfile.mkdtemp(), "telemetry.sqlite3")
+    old = _telemetry(db_path)
+    old.record_llm_call('chat', 'groq', 'm', 0.2)
+    old._maybe_flush(force=True)
+    telemetry.connect(db_path).execute("UPDATE metric_snapshots SET process = 'dead-worker', updated_at = 0")
+
+    samples = _samples(_telemetry(db_path).render_prometheus())
+    assert not any(name.startswith('gtu_llm_calls_total') for name in samples)
+
+
+def test_metrics_need_a_token_or_explicit_opt_in():
+    # Default: no token and not public - the endpoints do not exist
+    assert metrics_access_denied(None, token='', public=False) == 404
+    assert metrics_access_denied('Bearer anything', token='', public=False) == 404
+    assert metrics_access_denied(None, token='', public=True) is None
+    # With a token, only the exact bearer header is served (METRICS_PUBLIC does not bypass it)
+    assert metrics_access_denied('Bearer s3cret', token='s3cret', public=True) is None
+    assert metrics_access_denied('Bearer wrong', token='s3cret') == 401
+    assert metrics_access_denied(None, token='s3cret') == 401
+
+
+if __name__ == "__main__":
+    test_histogram_bucket_counts()
+    test_prometheus_exposition_format()
+    test_metrics_merged_across_processes()
+    test_stale_snapshots_are_not_merged()
+    test_metrics_need_a_token_or_explicit_opt_in()
+    print("✅ All telemetry tests passed")
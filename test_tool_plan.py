@@ -0,0 +1,137 @@
+"""
+Tests for multi-tool plans (backend/tool_plan.py)
+Tools are plain functions with sleeps - no LLM needed
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from backend.tool_plan import PlanError, PlanExecutor, parse_plan, format_plan_result
+from backend.intent_router import IntentRouter
+
+
+def sleeper(seconds, value):
+    def tool(**params):
+        time.sleep(seconds)
+        return f"{value}({', '.join(f'{k}={v}' for k, v in sorted(params.items()))})"
+    return tool
+
+
+def broken(**params):
+    raise RuntimeError("provider down")
+
+
+TOOLS = {
+    'generate_flashcards': sleeper(0.3, 'cards'),
+    'generate_pdf': sleeper(0.3, 'pdf'),
+    'create_quiz': sleeper(0.3, 'quiz'),
+    'answer_question': sleeper(0.0, 'answer'),
+    'summarize_video': sleeper(2.0, 'summary'),
+    'search_materials': broken,
+}
+
+
+def test_single_action_decision_is_one_step_plan():
+    steps = parse_plan({"action": "generate_pdf", "parameters": {"subject_code": "3130703", "unit_number": 3}})
+    assert [s.to_dict() for s in steps] == [{'id': 's1', 'action': 'generate_pdf', 'depends_on': [],
+                                             'parameters': {'subject_code': '3130703', 'unit_number': 3}}]
+
+
+def test_plan_order_references_and_validation():
+    steps = parse_plan({"steps": [
+        {"id": "quiz", "action": "create_quiz", "parameters": {"topic": "$notes"}},
+        {"id": "notes", "action": "answer_question", "parameters": {"question": "DBMS unit 3"}},
+    ]}, TOOLS)
+    assert [s.id for s in steps] == ['notes', 'quiz']
+    assert steps[1].depends_on == ['notes']  # "$notes" is an implicit dependency
+
+    bad_plans = [
+        {"steps": [{"id": "a", "action": "create_quiz", "depends_on": ["b"]},
+                   {"id": "b", "action": "generate_pdf", "depends_on": ["a"]}]},
+        {"steps": [{"action": "hack_the_planet"}]},
+        {"steps": [{"id": "a", "action": "create_quiz", "depends_on": ["missing"]}]},
+        {"steps": []},
+        {"steps": [{"action": "create_quiz"}] * 7},
+    ]
+    for plan in bad_plans:
+        with pytest.raises(PlanError):
+            parse_plan(plan, TOOLS)
+
+
+def test_independent_steps_run_concurrently():
+    executor = PlanExecutor(max_workers=4)
+    steps = parse_plan({"steps": [
+        {"action": "generate_flashcards", "parameters": {"topic": "DBMS Unit 3"}},
+        {"action": "generate_pdf", "parameters": {"subject_code": "3130703", "unit_number": 3}},
+        {"action": "create_quiz", "parameters": {"topic": "DBMS Unit 3"}},
+    ]}, TOOLS)
+    started = time.perf_counter()
+    plan = executor.run(steps, TOOLS)
+    elapsed = time.perf_counter() - started
+
+    assert plan['status'] == 'ok'
+    assert [s['result'] for s in plan['steps']] == [
+        'cards(topic=DBMS Unit 3)', 'pdf(subject_code=3130703, unit_number=3)', 'quiz(topic=DBMS Unit 3)']
+    # The slowest branch (0.3s), not the sum (0.9s)
+    assert elapsed < 0.6
+    executor.shutdown()
+
+
+def test_results_flow_along_dependencies():
+    executor = PlanExecutor(max_workers=4)
+    steps = parse_plan({"steps": [
+        {"id": "a", "action": "answer_question", "parameters": {"question": "normalization"}},
+        {"id": "q", "action": "create_quiz", "parameters": {"topic": "$a", "difficulty": "hard"}},
+    ]}, TOOLS)
+    plan = executor.run(steps, TOOLS)
+    assert plan['steps'][1]['result'] == 'quiz(difficulty=hard, topic=answer(question=normalization))'
+    executor.shutdown()
+
+
+def test_timeouts_and_failures_return_partial_results():
+    executor = PlanExecutor(max_workers=4, default_timeout=1.0, timeouts={'summarize_video': 0.2})
+    steps = parse_plan({"steps": [
+        {"id": "video", "action": "summarize_video", "parameters": {"video_url": "https://youtu.be/x"}},
+        {"id": "cards", "action": "generate_flashcards", "parameters": {"topic": "$video"}},
+        {"id": "search", "action": "search_materials", "parameters": {"query": "dbms"}},
+        {"id": "pdf", "action": "generate_pdf", "parameters": {"subject_code": "3130703", "unit_number": 3}},
+    ]}, TOOLS)
+    streamed = []
+    started = time.perf_counter()
+    plan = executor.run(steps, TOOLS, on_result=lambda entry: streamed.append(entry['id']))
+    elapsed = time.perf_counter() - started
+
+    statuses = {s['id']: s['status'] for s in plan['steps']}
+    assert statuses == {'video': 'timeout', 'cards': 'skipped', 'search': 'failed', 'pdf': 'ok'}
+    assert plan['status'] == 'partial'
+    assert elapsed < 1.0  # did not wait for the 2s video summary
+    # Streamed as they settle: the failure, the 0.2s timeout and its dependent, then the 0.3s PDF
+    assert streamed == ['search', 'video', 'cards', 'pdf']
+    assert executor.stats()['timeout'] == 1
+
+    reply = format_plan_result(plan)
+    assert 'provider down' in reply and 'pdf(subject_code=3130703, unit_number=3)' in reply
+    executor.shutdown()
+
+
+def test_router_leaves_compound_requests_to_planner():
+    router = IntentRouter()
+    assert router.tool_actions("make flashcards and a pdf for unit 3 of 3130703") == \
+        ['generate_flashcards', 'generate_pdf']
+    assert router.route("make flashcards and a pdf for unit 3 of 3130703") is None
+    assert router.route("make 10 flashcards on normalization")['action'] == 'generate_flashcards'
+
+
+if __name__ == "__main__":
+    test_single_action_decision_is_one_step_plan()
+    test_plan_order_references_and_validation()
+    test_independent_steps_run_concurrently()
+    test_results_flow_along_dependencies()
+    test_timeouts_and_failures_return_partial_results()
+    test_router_leaves_compound_requests_to_planner()
+    print("✅ All tool plan tests passed")
@@ -0,0 +1,140 @@
+"""
+Tests for map-reduce video summarization (backend/video_summaries.py)
+A local transcript stand-in replaces YouTube and a stub completes prompts -
+no network or AI credentials needed
+"""
+
+import os
+import sys
+import time
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.video_summaries import (VideoStore, VideoSummarizer, VideoSummaryError,
+                                     chunk_segments, format_timestamp)
+
+
+def local_transcript(minutes=60, words_per_segment=40):
+    """Stand-in transcript: one 10 second segment per step, numbered words"""
+    def fetch(video_id):
+        fetch.calls += 1
+        return [{'text': f"{video_id} part {i} " + " ".join(f"w{i}_{j}" for j in range(words_per_segment)),
+                 'start': i * 10.0, 'duration': 10.0}
+                for i in range(minutes * 6)]
+    fetch.calls = 0
+    return fetch
+
+
+class StubLLM:
+    def __init__(self, delay=0.0, fail=lambda prompt: False):
+        self.delay = delay
+        self.fail = fail
+        self.lock = threading.Lock()
+        self.prompts = []
+        self.in_flight = self.peak = 0
+
+    def __call__(self, prompt, system=None):
+        with self.lock:
+            self.prompts.append(prompt)
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+        if self.fail(prompt):
+            return None
+        kind = 'chunk' if prompt.startswith('Summarize this section') else \
+            'merge' if prompt.startswith('Merge') else 'final'
+        return f"{kind} summary {len(self.prompts)}"
+
+    def count(self, prefix):
+        return sum(1 for p in self.prompts if p.startswith(prefix))
+
+
+def _summarizer(llm, fetch, **kwargs):
+    store = VideoStore(os.path.join(tempfile.mkdtemp(), "videos.sqlite3"))
+    return VideoSummarizer(llm, store=store, fetch_transcript=fetch, **kwargs)
+
+
+def test_chunking_respects_token_budget_and_timestamps():
+    segments = local_transcript(minutes=10)("vid")
+    chunks = chunk_segments(segments, max_tokens=500)
+    assert len(chunks) > 1
+    assert all(len(c['text']) / 4 <= 500 + 100 for c in chunks)
+    assert chunks[0]['start'] == 0 and chunks[-1]['end'] == 600
+    assert " ".join(c['text'] for c in chunks).count("part ") == 60
+    assert format_timestamp(75) == "1:15" and format_timestamp(3725) == "1:02:05"
+
+
+def test_long_video_covers_whole_transcript_concurrently():
+    llm = StubLLM(delay=0.05)
+    fetch = local_transcript(minutes=60)
+    summarizer = _summarizer(llm, fetch, chunk_tokens=800, concurrency=4, fan_in=3)
+    result = summarizer.summarize("lecture1")
+
+    chunk_calls = llm.count('Summarize this section')
+    assert result['chunks'] == chunk_calls > 10
+    assert result['chunks_generated'] == chunk_calls and result['chunks_failed'] == 0
+    assert llm.count('Merge') > 0  # more chunks than fan_in -> hierarchical reduce
+    assert result['summary'].startswith('final summary')
+    assert 1 < llm.peak <= 4
+    # The last part of the lecture reached the LLM (the old code stopped at 3000 chars)
+    assert any("lecture1 part 359 " in p for p in llm.prompts)
+
+
+def test_transcript_and_summaries_are_reused():
+    llm = StubLLM()
+    fetch = local_transcript(minutes=30)
+    summarizer = _summarizer(llm, fetch, chunk_tokens=800)
+    first = summarizer.summarize("vid")
+    calls = len(llm.prompts)
+
+    again = summarizer.summarize("vid")
+    assert again['cached'] and again['summary'] == first['summary']
+    assert fetch.calls == 1 and len(llm.prompts) == calls
+
+    forced = summarizer.summarize("vid", force=True)
+    assert not forced['cached'] and fetch.calls == 2
+    assert forced['chunks_generated'] == forced['chunks']
+
+
+def test_failed_chunks_are_retried_on_next_call():
+    failing = {'on': True}
+    llm = StubLLM(fail=lambda p: failing['on'] and "vid part 0 " in p and p.startswith('Summarize this section'))
+    summarizer = _summarizer(llm, local_transcript(minutes=20), chunk_tokens=800)
+
+    partial = summarizer.summarize("vid")
+    assert partial['chunks_failed'] == 1 and partial['summary']
+    assert summarizer.store.final_summary("vid") is None
+
+    failing['on'] = False
+    llm.prompts.clear()
+    resumed = summarizer.summarize("vid")
+    assert resumed['chunks_failed'] == 0
+    assert resumed['chunks_generated'] == 1 and resumed['chunks_reused'] == resumed['chunks'] - 1
+    assert llm.count('Summarize this section') == 1
+
+
+def test_short_video_and_missing_transcript():
+    llm = StubLLM()
+    summarizer = _summarizer(llm, local_transcript(minutes=1), chunk_tokens=5000)
+    result = summarizer.summarize("short")
+    assert result['chunks'] == 1 and len(llm.prompts) == 1
+
+    summarizer = _summarizer(llm, lambda video_id: [])
+    try:
+        summarizer.summarize("none")
+        assert False, "expected VideoSummaryError"
+    except VideoSummaryError:
+        pass
+
+
+if __name__ == "__main__":
+    test_chunking_respects_token_budget_and_timestamps()
+    test_long_video_covers_whole_transcript_concurrently()
+    test_transcript_and_summaries_are_reused()
+    test_failed_chunks_are_retried_on_next_call()
+    test_short_video_and_missing_transcript()
+    print("✅ All video summary tests passed")